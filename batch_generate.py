@@ -0,0 +1,161 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import generate
+import main
+from codegen_profile import drain_profile, enable_profiling, print_profile_summary, profile_span, write_trace
+from reactive_async import ASYNC_DRIVERS
+
+# スキーマディレクトリ内のコレクション定義をまとめて生成する
+#   python batch_generate.py schemas/ --out ./Java/Generate --jobs 8
+# 1ファイルに { コレクション名: { column_list, queries, ... } } を1つ以上書く（JSON / YAML）
+# queries が SQL（"query"）なら main.py、JSON 条件（"type"）なら generate.py で生成する
+
+SCHEMA_EXTENSIONS = (".json", ".yaml", ".yml")
+
+# コード生成に使うモジュール（コレクション定義の "generator" で明示できる）
+GENERATORS = ("sql", "json")
+
+def load_schema_file(path):
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".json"):
+            return json.load(f)
+        try:
+            import yaml
+        except ImportError:
+            raise RuntimeError(f"YAML のスキーマを読むには PyYAML が必要です: {path}")
+        return yaml.safe_load(f)
+
+def find_schema_files(schema_dir):
+    paths = []
+    for root, _, files in os.walk(schema_dir):
+        paths.extend(os.path.join(root, name) for name in files if name.endswith(SCHEMA_EXTENSIONS))
+    return sorted(paths)
+
+def detect_generator(definition):
+    generator = definition.get("generator")
+    if generator is None:
+        queries = definition.get("queries", [])
+        generator = "json" if queries and all("type" in query for query in queries) else "sql"
+    if generator not in GENERATORS:
+        raise ValueError(f"generator は {GENERATORS} のいずれかを指定してください: {generator}")
+    return generator
+
+def load_collections(schema_dir):
+    """
+    スキーマディレクトリからコレクション定義を読み込む
+
+    Args:
+        schema_dir (str): JSON / YAML のスキーマを置いたディレクトリ（サブディレクトリも含む）
+
+    Returns:
+        list: [(コレクション名, 定義, スキーマファイルのパス)]
+    """
+    collections = []
+    seen = {}
+    for path in find_schema_files(schema_dir):
+        schema = load_schema_file(path)
+        if not isinstance(schema, dict):
+            raise ValueError(f"スキーマはコレクション名をキーにしたオブジェクトで書いてください: {path}")
+        for name, definition in schema.items():
+            if name in seen:
+                raise ValueError(f"コレクション {name} が {seen[name]} と {path} で重複しています")
+            seen[name] = path
+            collections.append((name, definition, path))
+    return collections
+
+def generate_collection(task):
+    """
+    1コレクション分のコードを生成する（プロセスプールのワーカーで実行）
+
+    Args:
+        task (tuple): (コレクション名, 定義, 出力先, writeJavaCode のオプション, ビルドキャッシュを使うか, 計測するか)
+
+    Returns:
+        tuple: (コレクション名, generator, 経過秒数, 状態, エラーメッセージ or None, (trace のイベント, カウンタ) or None)
+    """
+    name, definition, write_path, options, use_build_cache, profile = task
+    # ワーカーごとに記録し、親プロセスで1つの trace にまとめる
+    enable_profiling(profile)
+    start = time.perf_counter()
+    generator = None
+    status, error = "failed", None
+    try:
+        generator = detect_generator(definition)
+        if generator == "sql":
+            generated = main.writeJavaCode(collection={name: definition}, db_name=name, write_path=write_path, use_build_cache=use_build_cache, **options)
+        else:
+            generated = generate.generate_java_code({name: definition}, name, write_path=write_path, verbose=False, use_build_cache=use_build_cache)
+        status = "generated" if generated else "up-to-date"
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    trace = drain_profile() if profile else None
+    return name, generator, time.perf_counter() - start, status, error, trace
+
+def run_batch(collections, write_path, jobs, options, use_build_cache=True, profile=False):
+    tasks = [(name, definition, write_path, options, use_build_cache, profile) for name, definition, _ in collections]
+    if jobs <= 1:
+        return [generate_collection(task) for task in tasks]
+    # 時間のかかるコレクション（クエリ数が多い）から投入して、最後に1つだけ残る待ち時間を減らす
+    tasks.sort(key=lambda task: len(task[1].get("queries", [])), reverse=True)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(generate_collection, tasks))
+
+def print_summary(results, elapsed):
+    width = max([len("collection")] + [len(name) for name, *_ in results])
+    print(f"{'collection'.ljust(width)}  generator  time(s)  status")
+    for name, generator, seconds, status, error, _ in sorted(results, key=lambda result: result[2], reverse=True):
+        print(f"{name.ljust(width)}  {(generator or '-').ljust(9)}  {seconds:7.3f}  {status}{' ' + error if error else ''}")
+    failed = sum(1 for result in results if result[4])
+    up_to_date = sum(1 for result in results if result[3] == "up-to-date")
+    total = sum(result[2] for result in results)
+    print(f"{len(results)} collections, {up_to_date} up to date, {failed} failed, wall {elapsed:.3f}s (sum of collections {total:.3f}s)")
+
+# 親プロセスの区間と各ワーカーの区間・カウンタを1つの trace にまとめて書き出す
+def write_batch_trace(path, results):
+    events, counters = drain_profile()
+    for *_, trace in results:
+        if trace is None:
+            continue
+        worker_events, worker_counters = trace
+        events.extend(worker_events)
+        for name, count in worker_counters.items():
+            counters[name] = counters.get(name, 0) + count
+    write_trace(path, events, counters)
+    print_profile_summary(events, counters)
+    print(f"Wrote trace {path}")
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="スキーマディレクトリのコレクション定義をまとめてJavaコードに変換する")
+    parser.add_argument("schema_dir", help="JSON / YAML のコレクション定義を置いたディレクトリ")
+    parser.add_argument("--out", default="./Java/Generate", help="出力先ディレクトリ")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="並列に生成するプロセス数（1 でプロセスプールを使わない）")
+    parser.add_argument("--async-driver", choices=ASYNC_DRIVERS, default="sync", help="SQL スキーマの非同期メソッドの生成モード")
+    parser.add_argument("--auto-index-mode", choices=main.AUTO_INDEX_MODES, default="planner", help="SQL スキーマの WHERE 句へのインデックス条件の追加方法")
+    parser.add_argument("--recommend-indexes", action="store_true", help="SQL スキーマのインデックス提案レポートも出力する")
+    parser.add_argument("--force", action="store_true", help="ビルドキャッシュを無視してすべて生成する（内容が変わらないファイルは書き換えない）")
+    parser.add_argument("--profile", metavar="TRACE", help="コレクション・クエリ・生成関数ごとの経過時間と sqlparse の呼び出し回数を Chrome の trace event 形式で TRACE に書き出す")
+    args = parser.parse_args()
+
+    collections = load_collections(args.schema_dir)
+    if not collections:
+        print(f"スキーマが見つかりません: {args.schema_dir}", file=sys.stderr)
+        return 1
+    os.makedirs(args.out, exist_ok=True)
+    options = {"async_driver": args.async_driver, "auto_index_mode": args.auto_index_mode, "recommend_indexes": args.recommend_indexes}
+    profile = args.profile is not None
+    enable_profiling(profile)
+    start = time.perf_counter()
+    with profile_span("batch", "batch", jobs=args.jobs, collections=len(collections)):
+        results = run_batch(collections, args.out, args.jobs, options, use_build_cache=not args.force, profile=profile)
+    print_summary(results, time.perf_counter() - start)
+    if profile:
+        write_batch_trace(args.profile, results)
+    return 1 if any(result[4] for result in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,841 @@
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import sqlparse
+
+import generate
+import main
+import sql_tokenizer
+from column_schema import reset_column_schemas
+from keyset_page import generate_keyset_comparator, generate_seek_predicate, get_last_param_name
+
+# ベンチマーク用のカラム定義
+synthetic_column_list = [
+    {"variable_type": "String", "variable_name": "player_id", "variable_explanation": "プレイヤーID", "index_type": "unique", "is_array": False},
+    {"variable_type": "String", "variable_name": "player_name", "variable_explanation": "プレイヤー名", "index_type": "hash", "is_array": False},
+    {"variable_type": "double", "variable_name": "balance", "variable_explanation": "残高", "index_type": "none", "is_array": False},
+    {"variable_type": "int", "variable_name": "job_id", "variable_explanation": "職業ID", "index_type": "none", "is_array": False},
+    {"variable_type": "int", "variable_name": "level", "variable_explanation": "レベル", "index_type": "ascending", "is_array": False},
+    {"variable_type": "String", "variable_name": "email", "variable_explanation": "メールアドレス", "index_type": "none", "is_array": False},
+    {"variable_type": "String", "variable_name": "tags", "variable_explanation": "タグ", "index_type": "none", "is_array": True},
+    {"variable_type": "double", "variable_name": "ratings", "variable_explanation": "評価", "index_type": "none", "is_array": True},
+]
+
+# クエリのひな形（{t} はテーブル名）
+synthetic_query_templates = [
+    "SELECT * FROM {t} WHERE player_id = arg1",
+    "SELECT * FROM {t} WHERE player_name = arg1 AND level >= arg2 ORDER BY balance DESC LIMIT 1",
+    "SELECT * FROM {t} WHERE balance > arg1 AND balance < arg2 OR job_id = arg3 ORDER BY level ASC",
+    "SELECT * FROM {t} WHERE tags ALL arg1 AND level <= arg2 LIMIT 10",
+    "SELECT * FROM {t} WHERE job_id IN arg1",
+    "SELECT * FROM {t}",
+    "UPDATE {t} SET balance = balance + arg1? WHERE player_id = arg2 AND",
+    "UPDATE {t} SET job_id = arg1, email = arg2 WHERE player_id = arg3 AND level >= arg4?",
+    "UPDATE {t} SET tags = tags + arg1 WHERE player_id = arg2 AND tags ALL arg3",
+    "DELETE FROM {t} WHERE player_id = arg1 AND job_id = arg2",
+    "INSERT INTO {t} (player_id, player_name, level) VALUES (arg1, arg2, arg3)",
+]
+
+def build_synthetic_collection(name, query_count, seed=0):
+    """
+    ベンチマーク用のコレクション情報を生成する
+
+    Args:
+        name (str): コレクション名
+        query_count (int): 生成するクエリ数
+        seed (int): 乱数シード
+
+    Returns:
+        dict: writeJavaCode に渡せるコレクション情報
+    """
+    rng = random.Random(seed)
+    queries = []
+    for i in range(query_count):
+        template = rng.choice(synthetic_query_templates)
+        queries.append({"query": template.format(t=name), "method_name": f"query{i}"})
+    return {name: {"column_list": [dict(col) for col in synthetic_column_list], "queries": queries}}
+
+def time_write_java_code(collection, db_name, share_parse, repeat):
+    best = None
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as write_path:
+            start = time.perf_counter()
+            main.writeJavaCode(collection=collection, db_name=db_name, write_path=write_path, share_parse=share_parse)
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+# クエリの共有解析（parse_sql_query）による高速化を計測
+def bench_shared_parse(query_count=1000, repeat=3):
+    db_name = "bench_player"
+    collection = build_synthetic_collection(db_name, query_count)
+    per_emitter = time_write_java_code(collection, db_name, share_parse=False, repeat=repeat)
+    shared = time_write_java_code(collection, db_name, share_parse=True, repeat=repeat)
+    print(f"writeJavaCode ({query_count} queries, best of {repeat})")
+    print(f"  parse per emitter : {per_emitter:.3f}s")
+    print(f"  shared parse      : {shared:.3f}s")
+    print(f"  speedup           : {per_emitter / shared:.2f}x")
+    return per_emitter, shared
+
+# 長い WHERE 句の項（ひな形の {i} は引数の番号）
+where_term_templates = [
+    "level >= arg{i}",
+    "player_name = arg{i}",
+    "balance < arg{i}",
+    "tags ALL arg{i}",
+    "job_id IN arg{i}",
+]
+
+def build_long_where(term_count):
+    terms = [where_term_templates[i % len(where_term_templates)].format(i=i + 1) for i in range(term_count)]
+    where_clause = terms[0]
+    for i, term in enumerate(terms[1:]):
+        where_clause += (" AND " if i % 2 == 0 else " OR ") + term
+    return where_clause
+
+def time_best(func, repeat):
+    best = None
+    for _ in range(repeat):
+        # 同じ文字列の解析結果はキャッシュされるので、毎回空にしてから計測する
+        sql_tokenizer.scan_statement.cache_clear()
+        sql_tokenizer.tokenize_where.cache_clear()
+        sql_tokenizer.split_conditions.cache_clear()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+# AND / OR の項が多い WHERE 句で、字句解析・フィルタ変換・引数の型判定が項数に対して線形に伸びるかを計測
+def bench_where_scaling(term_counts=(250, 500, 1000, 2000, 4000), repeat=5):
+    db_name = "bench_player"
+    collection_info = build_synthetic_collection(db_name, 0)
+    stages = {
+        "tokenize_where": lambda where_clause, sql: sql_tokenizer.tokenize_where(where_clause),
+        "parse_where_clause": lambda where_clause, sql: main.parse_where_clause(where_clause, collection_info, db_name),
+        # parse_sql_query 全体は sqlparse（トークン数に上限がある）が支配的なので、自前の解析部分だけを計測する
+        "get_arg_types": lambda where_clause, sql: main.get_arg_types(db_name, sql_tokenizer.scan_statement(sql)["args"], sql, collection_info),
+    }
+    timings = {name: [] for name in stages}
+    print(f"WHERE clause scaling (best of {repeat}, us per term)")
+    print(f"  {'terms':>6}  " + "  ".join(f"{name:>18}" for name in stages))
+    for term_count in term_counts:
+        where_clause = build_long_where(term_count)
+        sql = f"SELECT * FROM {db_name} WHERE {where_clause}"
+        for name, stage in stages.items():
+            timings[name].append(time_best(lambda: stage(where_clause, sql), repeat))
+        print(f"  {term_count:>6}  " + "  ".join(f"{timings[name][-1] / term_count * 1e6:>18.2f}" for name in stages))
+    # 最小・最大の項数の間での伸び方の指数（1 なら線形、2 なら二乗）
+    growth = math.log(term_counts[-1] / term_counts[0])
+    print("  exponent: " + ", ".join(f"{name} {math.log(timings[name][-1] / timings[name][0]) / growth:.2f}" for name in stages))
+    return timings
+
+# ベンチマークスイートの規模（カラム数 × クエリ数。--quick は小さい規模だけ）
+SUITE_COLUMN_COUNTS = (10, 100, 1000)
+SUITE_QUERY_COUNTS = (10, 100, 1000, 5000)
+QUICK_COLUMN_COUNTS = (10, 100)
+QUICK_QUERY_COUNTS = (10, 100)
+# ベースラインからの悪化をこの割合まで許す（短い区間の揺れは MIN_* 未満の差なら無視する）
+DEFAULT_TIME_THRESHOLD = 0.25
+DEFAULT_MEMORY_THRESHOLD = 0.25
+MIN_TIME_REGRESSION_SECONDS = 0.005
+MIN_MEMORY_REGRESSION_BYTES = 256 * 1024
+
+suite_variable_types = ("String", "int", "double")
+
+def build_suite_columns(column_count):
+    """
+    スイート用のカラム定義を生成する（c0 が unique、100 カラムごとに hash / ascending、10 カラムごとに配列）
+
+    Args:
+        column_count (int): カラム数
+
+    Returns:
+        list: main.py / generate.py のどちらにも渡せるカラム定義
+    """
+    columns = []
+    for i in range(column_count):
+        if i == 0:
+            index_type = "unique"
+        elif i % 100 == 1:
+            index_type = "hash"
+        elif i % 100 == 2:
+            index_type = "ascending"
+        else:
+            index_type = "none"
+        columns.append({
+            "variable_type": suite_variable_types[i % len(suite_variable_types)],
+            "variable_name": f"c{i}",
+            "variable_explanation": f"カラム{i}",
+            "index_type": index_type,
+            "is_array": i % 10 == 9 and index_type == "none",
+        })
+    return columns
+
+# WHERE 句の項数（0 は WHERE なし）。クエリごとにこの中から選ぶ
+suite_where_term_counts = (0, 1, 2, 4, 8)
+
+def build_suite_where(rng, columns, term_count, first_arg):
+    scalars = [col for col in columns if not col["is_array"]]
+    arrays = [col for col in columns if col["is_array"]]
+    terms = []
+    for i in range(term_count):
+        arg = f"arg{first_arg + i}"
+        if arrays and rng.random() < 0.2:
+            terms.append(f'{rng.choice(arrays)["variable_name"]} {rng.choice(("ALL", "IN"))} {arg}')
+        else:
+            terms.append(f'{rng.choice(scalars)["variable_name"]} {rng.choice(("=", ">=", "<", "!="))} {arg}')
+    where_clause = terms[0] if terms else ""
+    for term in terms[1:]:
+        where_clause += (" OR " if rng.random() < 0.2 else " AND ") + term
+    return where_clause
+
+def build_suite_sql_queries(table, columns, query_count, seed=0):
+    """
+    writeJavaCode 用のクエリを生成する（SELECT / UPDATE / DELETE / INSERT / 集計を混ぜ、WHERE 句の項数も変える）
+
+    Args:
+        table (str): テーブル名
+        columns (list): カラム定義
+        query_count (int): クエリ数
+        seed (int): 乱数シード
+
+    Returns:
+        list: {"query", "method_name"} のリスト
+    """
+    rng = random.Random(seed)
+    scalars = [col["variable_name"] for col in columns if not col["is_array"]]
+    numbers = [col["variable_name"] for col in columns if not col["is_array"] and col["variable_type"] != "String"]
+    queries = []
+    for i in range(query_count):
+        kind = rng.choices(("select", "update", "delete", "insert", "aggregate"), weights=(50, 25, 10, 10, 5))[0]
+        term_count = rng.choice(suite_where_term_counts)
+        if kind == "select":
+            where_clause = build_suite_where(rng, columns, term_count, 1)
+            sql = f"SELECT * FROM {table}" + (f" WHERE {where_clause}" if where_clause else "")
+            if rng.random() < 0.3:
+                sql += f" ORDER BY {rng.choice(scalars)} {rng.choice(('ASC', 'DESC'))}"
+            if rng.random() < 0.4:
+                sql += f" LIMIT {rng.choice((1, 10))}"
+        elif kind == "update":
+            set_columns = rng.sample(scalars, min(len(scalars), rng.randint(1, 3)))
+            set_clause = ", ".join(f"{name} = arg{j + 1}" for j, name in enumerate(set_columns))
+            where_clause = build_suite_where(rng, columns, max(term_count, 1), len(set_columns) + 1)
+            sql = f"UPDATE {table} SET {set_clause} WHERE {where_clause}"
+        elif kind == "delete":
+            sql = f"DELETE FROM {table} WHERE {build_suite_where(rng, columns, max(term_count, 1), 1)}"
+        elif kind == "insert":
+            insert_columns = rng.sample(scalars, min(len(scalars), rng.randint(1, 4)))
+            sql = f"INSERT INTO {table} ({', '.join(insert_columns)}) VALUES ({', '.join(f'arg{j + 1}' for j in range(len(insert_columns)))})"
+        else:
+            sql = f"SELECT {scalars[1]}, COUNT(*), SUM({rng.choice(numbers)}) FROM {table} GROUP BY {scalars[1]}"
+        queries.append({"query": sql, "method_name": f"query{i}"})
+    return queries
+
+def build_suite_json_queries(columns, query_count, seed=0):
+    """
+    generate_java_code 用のクエリを生成する（SELECT / UPDATE、WHERE の条件数・ソート・LIMIT を変える）
+
+    Args:
+        columns (list): カラム定義
+        query_count (int): クエリ数
+        seed (int): 乱数シード
+
+    Returns:
+        list: generate.py の queries 形式のリスト
+    """
+    rng = random.Random(seed)
+    queries = []
+    for i in range(query_count):
+        where = []
+        for col in rng.sample(columns, min(len(columns), rng.choice(suite_where_term_counts))):
+            condition = {"comparison": col["variable_name"]}
+            if col["is_array"]:
+                condition.update({"match_type": rng.choice(("ANY", "ALL")), "fixed_flag": True})
+            elif rng.random() < 0.5:
+                condition["compar_type"] = rng.choice((">=", "<=", ">", "<", "!="))
+            if where:
+                condition["conditions"] = "and"
+            where.append(condition)
+        query = {"type": "SELECT", "where": where, "method_name": f"query{i}"}
+        if rng.random() < 0.3:
+            query["type"] = "UPDATE"
+            scalars = [col for col in columns if not col["is_array"]]
+            query["set"] = [{"renewal": col["variable_name"], "details_type": "Add"} for col in rng.sample(scalars, min(len(scalars), rng.randint(1, 3)))]
+        elif rng.random() < 0.5:
+            order = {"limit": rng.choice((1, 10))}
+            if rng.random() < 0.5:
+                order["sort"] = [{"comparison": rng.choice(columns)["variable_name"], "type": rng.choice(("asc", "desc"))}]
+            query["order"] = order
+        queries.append(query)
+    return queries
+
+# 毎回同じ状態から計測するため、解析結果・カラム参照表のキャッシュを空にする
+def reset_generator_caches():
+    sql_tokenizer.scan_statement.cache_clear()
+    sql_tokenizer.tokenize_where.cache_clear()
+    sql_tokenizer.split_conditions.cache_clear()
+    reset_column_schemas()
+
+def measure_stage(func, repeat):
+    """
+    1つの段階の経過時間（最良値）とピークメモリを計測する
+
+    時間は tracemalloc を止めた状態で repeat 回計測し、メモリは別に1回 tracemalloc を有効にして計測する
+
+    Args:
+        func (function): 計測する処理
+        repeat (int): 時間の計測回数
+
+    Returns:
+        dict: {"seconds": 最良の経過秒数, "peak_bytes": Python が確保したメモリのピーク}
+    """
+    best = None
+    for _ in range(repeat):
+        reset_generator_caches()
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    reset_generator_caches()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": best, "peak_bytes": peak}
+
+def get_suite_stages(column_count, query_count, write_path, seed=0):
+    """
+    1つの規模で計測する段階を作る
+
+    Returns:
+        dict: 段階名 → 計測する処理
+          sql.parse     : main.parse_sql_query（全クエリの解析のみ）
+          sql.write     : main.writeJavaCode（解析・生成・書き出し）
+          json.db_class : generate.generate_db_class（Db クラスの生成のみ）
+          json.write    : generate.generate_java_code（生成・書き出し）
+    """
+    table = "bench_suite"
+    columns = build_suite_columns(column_count)
+    sql_collection = {table: {"column_list": columns, "queries": build_suite_sql_queries(table, columns, query_count, seed)}}
+    json_columns = [dict(col) for col in columns]
+    json_data = {table: {"column_list": json_columns, "queries": build_suite_json_queries(json_columns, query_count, seed)}}
+    class_name = generate.generate_class_name(table)
+    return {
+        "sql.parse": lambda: [main.parse_sql_query(item["query"], sql_collection) for item in sql_collection[table]["queries"]],
+        "sql.write": lambda: main.writeJavaCode(collection=sql_collection, db_name=table, write_path=os.path.join(write_path, "sql"), use_build_cache=False),
+        "json.db_class": lambda: generate.generate_db_class(class_name, json_data[table]["queries"], json_columns, table),
+        "json.write": lambda: generate.generate_java_code(json_data, table, write_path=os.path.join(write_path, "json"), verbose=False, use_build_cache=False),
+    }
+
+def run_suite(column_counts, query_counts, repeat=3, seed=0):
+    """
+    カラム数 × クエリ数の各規模で、各段階の時間とピークメモリを計測する
+
+    Returns:
+        dict: "c{カラム数}_q{クエリ数}/{段階名}" → {"seconds", "peak_bytes"}
+    """
+    results = {}
+    print(f"{'case':<14}  {'stage':<14}  {'time(s)':>9}  {'peak(MB)':>9}")
+    for column_count in column_counts:
+        for query_count in query_counts:
+            case = f"c{column_count}_q{query_count}"
+            with tempfile.TemporaryDirectory() as write_path:
+                for stage, func in get_suite_stages(column_count, query_count, write_path, seed).items():
+                    result = measure_stage(func, repeat)
+                    results[f"{case}/{stage}"] = result
+                    print(f"{case:<14}  {stage:<14}  {result['seconds']:>9.3f}  {result['peak_bytes'] / 1024 / 1024:>9.1f}")
+    return results
+
+def get_suite_environment():
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "sqlparse": getattr(sqlparse, "__version__", "unknown"),
+    }
+
+def save_suite_results(path, results, seed):
+    with open(path, mode="w", encoding="utf-8") as f:
+        json.dump({"environment": get_suite_environment(), "seed": seed, "results": results}, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"Saved {path}")
+
+def find_regressions(results, baseline, time_threshold=DEFAULT_TIME_THRESHOLD, memory_threshold=DEFAULT_MEMORY_THRESHOLD):
+    """
+    ベースラインより閾値を超えて遅く・大きくなった段階を探す
+
+    Args:
+        results (dict): run_suite の結果
+        baseline (dict): save_suite_results で保存した JSON の内容
+        time_threshold (float): 時間の悪化を許す割合（0.25 なら 1.25 倍まで）
+        memory_threshold (float): ピークメモリの悪化を許す割合
+
+    Returns:
+        list: 悪化の説明
+    """
+    regressions = []
+    for key, result in results.items():
+        before = baseline["results"].get(key)
+        if before is None:
+            continue
+        if result["seconds"] > before["seconds"] * (1 + time_threshold) and result["seconds"] - before["seconds"] >= MIN_TIME_REGRESSION_SECONDS:
+            regressions.append(f"{key}: time {before['seconds']:.3f}s -> {result['seconds']:.3f}s ({result['seconds'] / before['seconds']:.2f}x)")
+        if result["peak_bytes"] > before["peak_bytes"] * (1 + memory_threshold) and result["peak_bytes"] - before["peak_bytes"] >= MIN_MEMORY_REGRESSION_BYTES:
+            regressions.append(f"{key}: peak memory {before['peak_bytes'] / 1024 / 1024:.1f}MB -> {result['peak_bytes'] / 1024 / 1024:.1f}MB ({result['peak_bytes'] / before['peak_bytes']:.2f}x)")
+    return regressions
+
+def bench_suite(column_counts=SUITE_COLUMN_COUNTS, query_counts=SUITE_QUERY_COUNTS, repeat=3, seed=0, save_path=None, baseline_path=None,
+                time_threshold=DEFAULT_TIME_THRESHOLD, memory_threshold=DEFAULT_MEMORY_THRESHOLD):
+    """
+    ベンチマークスイートを実行し、ベースラインがあれば比較する
+
+    Returns:
+        int: 終了コード（閾値を超えて悪化した段階があれば 1）
+    """
+    results = run_suite(column_counts, query_counts, repeat, seed)
+    if save_path:
+        save_suite_results(save_path, results, seed)
+    if not baseline_path:
+        return 0
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("environment") != get_suite_environment():
+        print(f"warning: ベースラインの環境が異なります: {baseline.get('environment')}")
+    regressions = find_regressions(results, baseline, time_threshold, memory_threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    print(f"{len(regressions)} regressions against {baseline_path} (time +{time_threshold:.0%}, memory +{memory_threshold:.0%})")
+    return 1 if regressions else 0
+
+def parse_count_list(value):
+    return tuple(int(count) for count in value.split(",") if count.strip())
+
+# キャッシュのウォームアップ時間を計測する Java ハーネスを生成
+# （生成した XxxCollectionDb と同じパッケージに置き、MongoDB に接続して実行する）
+def write_warmup_benchmark(write_path, collection_name, batch_sizes=(100, 1000, 5000), thread_counts=(1, 4), repeat=3):
+    class_name = main.snake_to_pascal(collection_name.capitalize())
+    db_class = f"{class_name}CollectionDb"
+    method = f"MemoryCache{class_name}CollectionData"
+    bench_class = f"{class_name}WarmupBenchmark"
+    batch_list = ", ".join(str(size) for size in batch_sizes)
+    thread_list = ", ".join(str(count) for count in thread_counts)
+    java_code = [
+        "import com.mongodb.client.MongoClient;",
+        "import com.mongodb.client.MongoClients;",
+        "import com.mongodb.client.MongoDatabase;",
+        "import java.util.concurrent.atomic.AtomicLong;",
+        "",
+        f"public class {bench_class} {{",
+        "    // 使い方: java " + bench_class + " <mongodb-uri> <database>",
+        "    public static void main(String[] args) {",
+        '        String uri = args.length > 0 ? args[0] : "mongodb://localhost:27017";',
+        '        String database = args.length > 1 ? args[1] : "test";',
+        f"        int[] batchSizes = {{{batch_list}}};",
+        f"        int[] threadCounts = {{{thread_list}}};",
+        "        try (MongoClient client = MongoClients.create(uri)) {",
+        "            MongoDatabase db = client.getDatabase(database);",
+        "            // 接続確立とJITのためのウォームアップ実行",
+        f"            {db_class}.{method}(db);",
+        "            for (int batchSize : batchSizes) {",
+        "                for (int threads : threadCounts) {",
+        "                    long best = Long.MAX_VALUE;",
+        "                    AtomicLong loaded = new AtomicLong();",
+        f"                    for (int i = 0; i < {repeat}; i++) {{",
+        "                        long start = System.nanoTime();",
+        f"                        {db_class}.{method}(db, batchSize, threads, loaded::set);",
+        "                        best = Math.min(best, System.nanoTime() - start);",
+        "                    }",
+        '                    System.out.printf("batchSize=%d threads=%d docs=%d best=%.1fms%n",',
+        "                        batchSize, threads, loaded.get(), best / 1_000_000.0);",
+        "                }",
+        "            }",
+        "        }",
+        "    }",
+        "}",
+    ]
+    os.makedirs(write_path, exist_ok=True)
+    path = f"{write_path}/{bench_class}.java"
+    with open(path, mode="w", encoding="utf-8") as f:
+        for line in java_code:
+            f.write(line + "\n")
+    print(f"Generated {path}")
+    return path
+
+# JMH ベンチマーク用のサンプル値（Java の式）
+sample_java_values = {
+    "String": '"value"',
+    "int": "42",
+    "double": "1.5",
+    "Date": "new Date(0)",
+}
+
+# Document 経由のデコードと Codec による直接デコードを比較する JMH ベンチマークを生成
+# （生成先には writeJavaCode の出力も書き出すので、そのまま JMH プロジェクトに置ける）
+def write_codec_benchmark(write_path, collection_name, array_length=8):
+    collection = build_synthetic_collection(collection_name, 0)
+    main.writeJavaCode(collection=collection, db_name=collection_name, write_path=write_path)
+    class_name = main.snake_to_pascal(collection_name.capitalize())
+    data_class = f"{class_name}CollectionData"
+    bench_class = f"{class_name}DecodeBenchmark"
+    sample_fields = []
+    for col in collection[collection_name]["column_list"]:
+        value = sample_java_values.get(col["variable_type"], "null")
+        if col.get("is_array", False):
+            value = f"Arrays.asList({', '.join([value] * array_length)})"
+        sample_fields.append(f'            .append("{col["variable_name"]}", {value})')
+    java_code = [
+        "import org.bson.BsonBinaryReader;",
+        "import org.bson.Document;",
+        "import org.bson.RawBsonDocument;",
+        "import org.bson.codecs.Codec;",
+        "import org.bson.codecs.DecoderContext;",
+        "import org.bson.codecs.DocumentCodec;",
+        "import org.openjdk.jmh.annotations.*;",
+        "import java.util.Arrays;",
+        "import java.util.Date;",
+        "import java.util.List;",
+        "import java.util.concurrent.TimeUnit;",
+        "",
+        "@State(Scope.Benchmark)",
+        "@BenchmarkMode(Mode.AverageTime)",
+        "@OutputTimeUnit(TimeUnit.NANOSECONDS)",
+        "@Warmup(iterations = 3)",
+        "@Measurement(iterations = 5)",
+        "@Fork(1)",
+        f"public class {bench_class} {{",
+        "    private final DecoderContext context = DecoderContext.builder().build();",
+        "    private final DocumentCodec documentCodec = new DocumentCodec();",
+        f"    private final Codec<{data_class}> pojoCodec = {data_class}Codec.REGISTRY.get({data_class}.class);",
+        "    private RawBsonDocument raw;",
+        "",
+        "    @Setup",
+        "    public void setup() {",
+        '        Document doc = new Document("_id", 1)',
+        *sample_fields[:-1],
+        sample_fields[-1] + ";",
+        "        raw = new RawBsonDocument(doc, documentCodec);",
+        "    }",
+        "",
+        "    // 従来: Document にデコードしてからコンストラクタで詰め替える",
+        "    @Benchmark",
+        f"    public {data_class} documentThenConstructor() {{",
+        f"        return new {data_class}(documentCodec.decode(new BsonBinaryReader(raw.getByteBuffer().asNIO()), context));",
+        "    }",
+        "",
+        "    // Codec: BSON から直接デコードする",
+        "    @Benchmark",
+        f"    public {data_class} codec() {{",
+        "        return pojoCodec.decode(new BsonBinaryReader(raw.getByteBuffer().asNIO()), context);",
+        "    }",
+        "}",
+    ]
+    path = f"{write_path}/{bench_class}.java"
+    with open(path, mode="w", encoding="utf-8") as f:
+        for line in java_code:
+            f.write(line + "\n")
+    print(f"Generated {path}")
+    return path
+
+# auto_index_mode ごとに WHERE 句から生成されるフィルタを比較する
+def compare_filter_shapes(collection_info, modes=("exists", "planner")):
+    """
+    サンプルクエリの WHERE 句を各 auto_index_mode で変換し、フィルタの形を並べる
+
+    Args:
+        collection_info (dict): コレクション情報
+        modes (tuple): 比較する auto_index_mode（先頭が変更前）
+
+    Returns:
+        list: {"method_name", "sql", "args", モード名: フィルタ式} のリスト
+    """
+    collection = next(iter(collection_info))
+    shapes = []
+    for item in collection_info[collection]["queries"]:
+        parsed_query = main.parse_sql_query(item["query"], collection_info)
+        where_clause = parsed_query["select_where_clause"] if parsed_query["operation"] == "select" else parsed_query["where_clause"]
+        if parsed_query["operation"] == "insert" or not where_clause:
+            continue
+        shape = {"method_name": item["method_name"], "sql": item["query"], "args": parsed_query["arg_params"]}
+        for mode in modes:
+            shape[mode] = main.parse_where_clause(where_clause.group(1), collection_info, collection, auto_index=True, auto_index_mode=main.validate_auto_index_mode(mode)).replace("?", "")
+        shapes.append(shape)
+    return shapes
+
+def print_filter_shapes(collection_info, modes=("exists", "planner")):
+    shapes = compare_filter_shapes(collection_info, modes)
+    changed = 0
+    for shape in shapes:
+        before, after = shape[modes[0]], shape[modes[-1]]
+        if before == after:
+            continue
+        changed += 1
+        print(f"{shape['method_name']}: {shape['sql']}")
+        print(f"  {modes[0]:<8}: {before}")
+        print(f"  {modes[-1]:<8}: {after}")
+    print(f"{changed} / {len(shapes)} filters changed")
+    return shapes
+
+# 引数のサンプル値（Java の式）
+sample_arg_values = {
+    "String": '"sample"',
+    "Integer": "1",
+    "Double": "1.0",
+    "Date": "new Date(0)",
+}
+
+def get_sample_arg_value(java_type):
+    if java_type.startswith("List<"):
+        return f"Arrays.asList({get_sample_arg_value(java_type[5:-1])})"
+    return sample_arg_values.get(java_type, "null")
+
+# 変更前後のフィルタを explain で比較する Java ハーネスを生成
+# （MongoDB に接続し、各フィルタの勝ちプランと走査したキー数・ドキュメント数を出力する）
+def write_explain_harness(write_path, collection_info, modes=("exists", "planner")):
+    collection = next(iter(collection_info))
+    class_name = main.snake_to_pascal(collection.capitalize())
+    harness_class = f"{class_name}FilterExplainHarness"
+    body = []
+    for shape in compare_filter_shapes(collection_info, modes):
+        body.append("            {")
+        for param in filter(None, (p.strip() for p in shape["args"].split(","))):
+            java_type, arg = param.rsplit(" ", 1)
+            body.append(f"                {java_type} {arg} = {get_sample_arg_value(java_type)};")
+        for mode in modes:
+            body.append(f'                explain(collection, "{shape["method_name"]} ({mode})", {shape[mode]});')
+        body.append("            }")
+    java_code = [
+        "import com.mongodb.ExplainVerbosity;",
+        "import com.mongodb.client.MongoClient;",
+        "import com.mongodb.client.MongoClients;",
+        "import com.mongodb.client.MongoCollection;",
+        "import com.mongodb.client.model.Filters;",
+        "import org.bson.Document;",
+        "import org.bson.conversions.Bson;",
+        "import java.util.Arrays;",
+        "import java.util.Date;",
+        "import java.util.List;",
+        "",
+        f"public class {harness_class} {{",
+        f"    // 使い方: java {harness_class} <mongodb-uri> <database>",
+        "    public static void main(String[] args) {",
+        '        String uri = args.length > 0 ? args[0] : "mongodb://localhost:27017";',
+        '        String database = args.length > 1 ? args[1] : "test";',
+        "        try (MongoClient client = MongoClients.create(uri)) {",
+        f'            MongoCollection<Document> collection = client.getDatabase(database).getCollection("{collection}");',
+        *body,
+        "        }",
+        "    }",
+        "",
+        "    private static void explain(MongoCollection<Document> collection, String label, Bson filter) {",
+        "        Document result = collection.find(filter).explain(ExplainVerbosity.EXECUTION_STATS);",
+        '        Document stats = result.get("executionStats", Document.class);',
+        '        Document plan = result.get("queryPlanner", Document.class).get("winningPlan", Document.class);',
+        '        System.out.printf("%-48s %-24s keys=%s docs=%s returned=%s%n", label, stages(plan),',
+        '            stats.get("totalKeysExamined"), stats.get("totalDocsExamined"), stats.get("nReturned"));',
+        "    }",
+        "",
+        "    // 勝ちプランのステージを入れ子の順に並べる（例: FETCH<IXSCAN）",
+        "    private static String stages(Document plan) {",
+        "        StringBuilder stages = new StringBuilder();",
+        "        while (plan != null) {",
+        "            if (stages.length() > 0) {",
+        '                stages.append("<");',
+        "            }",
+        '            stages.append(plan.getString("stage"));',
+        '            plan = plan.get("inputStage", Document.class);',
+        "        }",
+        "        return stages.toString();",
+        "    }",
+        "}",
+    ]
+    os.makedirs(write_path, exist_ok=True)
+    path = f"{write_path}/{harness_class}.java"
+    with open(path, mode="w", encoding="utf-8") as f:
+        for line in java_code:
+            f.write(line + "\n")
+    print(f"Generated {path}")
+    return path
+
+# keyset ページングの検証用の並び替えキー（a は null を含む値、id は unique キー）
+keyset_check_orders = (
+    [["a", 1], ["id", 1]],
+    [["a", -1], ["id", 1]],
+    [["a", 1], ["b", -1], ["id", 1]],
+)
+
+# seek 条件（generate_seek_predicate）と並び順（generate_keyset_comparator）が一致するかを確かめる Java プログラムを生成
+# （MongoDB には接続しない。null を含むキーで前ページ最後の行ごとに「後ろの行」が一致するかと、ページを辿って全件を1回ずつ読めるかを確かめる）
+def write_keyset_check(write_path, page_size=2):
+    check_class = "KeysetSeekCheck"
+    members = []
+    checks = []
+    for i, keys in enumerate(keyset_check_orders):
+        key_order = ", ".join(f'{field} {"DESC" if direction == -1 else "ASC"}' for field, direction in keys)
+        params = ", ".join(f"Integer {get_last_param_name(field)}" for field, _ in keys)
+        members.extend([
+            f"    // {key_order}",
+            f"    private static boolean seek{i}(Row data, {params}) {{",
+            f"        return {generate_seek_predicate(keys, lambda field: f'data.get{field.capitalize()}()')};",
+            "    }",
+            "",
+            f"    private static final Comparator<Row> ORDER{i} = {generate_keyset_comparator(keys, lambda field: f'Row::get{field.capitalize()}')};",
+            "",
+        ])
+        last_args = ", ".join(f"last.get{field.capitalize()}()" for field, _ in keys)
+        checks.append(f'        failures += check("{key_order}", ORDER{i}, (data, last) -> seek{i}(data, {last_args}));')
+    java_code = [
+        "import java.util.ArrayList;",
+        "import java.util.Arrays;",
+        "import java.util.Collections;",
+        "import java.util.Comparator;",
+        "import java.util.List;",
+        "import java.util.Objects;",
+        "import java.util.function.BiPredicate;",
+        "import java.util.stream.Collectors;",
+        "",
+        f"public class {check_class} {{",
+        f"    // 使い方: java {check_class}（不一致があれば終了コード 1）",
+        "    static final class Row {",
+        "        final Integer a;",
+        "        final Integer b;",
+        "        final Integer id;",
+        "",
+        "        Row(Integer a, Integer b, Integer id) {",
+        "            this.a = a;",
+        "            this.b = b;",
+        "            this.id = id;",
+        "        }",
+        "",
+        "        Integer getA() { return a; }",
+        "        Integer getB() { return b; }",
+        "        Integer getId() { return id; }",
+        "",
+        "        @Override",
+        "        public String toString() {",
+        '            return "(a=" + a + ", b=" + b + ", id=" + id + ")";',
+        "        }",
+        "    }",
+        "",
+        "    static final List<Row> ROWS = Arrays.asList(",
+        "        new Row(null, null, 1), new Row(null, 1, 2), new Row(null, 1, 3), new Row(1, null, 4),",
+        "        new Row(1, 2, 5), new Row(2, 1, 6), new Row(2, 1, 7), new Row(2, null, 8), new Row(3, 3, 9));",
+        "",
+        *members,
+        "    public static void main(String[] args) {",
+        "        int failures = 0;",
+        *checks,
+        '        System.out.println(failures == 0 ? "OK" : failures + " mismatches");',
+        "        System.exit(failures == 0 ? 0 : 1);",
+        "    }",
+        "",
+        "    private static int check(String label, Comparator<Row> order, BiPredicate<Row, Row> seek) {",
+        "        List<Row> sorted = new ArrayList<>(ROWS);",
+        "        sorted.sort(order);",
+        "        int failures = 0;",
+        "        // 前ページ最後の行ごとに、seek 条件を満たす行が並び順で後ろの行と一致するか",
+        "        for (Row last : sorted) {",
+        "            for (Row data : sorted) {",
+        "                boolean expected = order.compare(data, last) > 0;",
+        "                if (seek.test(data, last) != expected) {",
+        '                    System.out.println(label + ": last=" + last + " row=" + data + " expected " + (expected ? "after" : "not after"));',
+        "                    failures++;",
+        "                }",
+        "            }",
+        "        }",
+        "        // ページを辿って全件を並び順どおりに1回ずつ読めるか",
+        "        List<Row> visited = new ArrayList<>();",
+        "        Row last = null;",
+        "        while (true) {",
+        "            Row current = last;",
+        "            List<Row> page = sorted.stream()",
+        "                .filter(data -> current == null || seek.test(data, current))",
+        "                .sorted(order)",
+        f"                .limit({page_size})",
+        "                .collect(Collectors.toList());",
+        "            if (page.isEmpty()) break;",
+        "            visited.addAll(page);",
+        "            last = page.get(page.size() - 1);",
+        "        }",
+        "        if (!visited.equals(sorted)) {",
+        '            System.out.println(label + ": pages " + visited + " != " + sorted);',
+        "            failures++;",
+        "        }",
+        "        return failures;",
+        "    }",
+        "}",
+    ]
+    os.makedirs(write_path, exist_ok=True)
+    path = f"{write_path}/{check_class}.java"
+    with open(path, mode="w", encoding="utf-8") as f:
+        for line in java_code:
+            f.write(line + "\n")
+    print(f"Generated {path}")
+    return path
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Javaコード生成のベンチマーク")
+    parser.add_argument("--queries", type=int, default=1000, help="生成するクエリ数")
+    parser.add_argument("--repeat", type=int, default=3, help="計測回数（最良値を採用）")
+    parser.add_argument("--warmup-harness", metavar="DIR", help="キャッシュウォームアップ計測用のJavaハーネスをDIRに生成する")
+    parser.add_argument("--codec-jmh", metavar="DIR", help="デコード方式を比較するJMHベンチマークをDIRに生成する")
+    parser.add_argument("--collection", default="bench_player", help="ウォームアップ計測対象のコレクション名")
+    parser.add_argument("--filter-shapes", action="store_true", help="auto_index_mode の変更前後で WHERE 句のフィルタを比較する")
+    parser.add_argument("--explain-harness", metavar="DIR", help="変更前後のフィルタを explain で比較するJavaハーネスをDIRに生成する")
+    parser.add_argument("--keyset-check", metavar="DIR", help="keyset ページングの seek 条件と並び順が null を含むキーでも一致するかを確かめるJavaプログラムをDIRに生成する")
+    parser.add_argument("--where-scaling", action="store_true", help="AND / OR の項が多い WHERE 句の解析時間が項数に対して線形かを計測する")
+    parser.add_argument("--suite", action="store_true", help="合成スキーマの規模を変えて、生成の段階ごとの時間とピークメモリを計測する")
+    parser.add_argument("--quick", action="store_true", help="--suite を小さい規模（10 / 100 カラム × 10 / 100 クエリ）だけで実行する")
+    parser.add_argument("--suite-columns", type=parse_count_list, help="--suite のカラム数（カンマ区切り）")
+    parser.add_argument("--suite-queries", type=parse_count_list, help="--suite のクエリ数（カンマ区切り）")
+    parser.add_argument("--seed", type=int, default=0, help="合成スキーマの乱数シード")
+    parser.add_argument("--save-baseline", metavar="JSON", help="--suite の結果を JSON に保存する")
+    parser.add_argument("--baseline", metavar="JSON", help="--suite の結果を保存済みの結果と比較し、閾値を超えて悪化していれば終了コード 1 にする")
+    parser.add_argument("--time-threshold", type=float, default=DEFAULT_TIME_THRESHOLD, help="時間の悪化を許す割合")
+    parser.add_argument("--memory-threshold", type=float, default=DEFAULT_MEMORY_THRESHOLD, help="ピークメモリの悪化を許す割合")
+    args = parser.parse_args()
+    if args.suite:
+        column_counts = args.suite_columns or (QUICK_COLUMN_COUNTS if args.quick else SUITE_COLUMN_COUNTS)
+        query_counts = args.suite_queries or (QUICK_QUERY_COUNTS if args.quick else SUITE_QUERY_COUNTS)
+        return bench_suite(column_counts, query_counts, repeat=args.repeat, seed=args.seed, save_path=args.save_baseline, baseline_path=args.baseline,
+                           time_threshold=args.time_threshold, memory_threshold=args.memory_threshold)
+    if args.where_scaling:
+        bench_where_scaling(repeat=args.repeat)
+        return
+    if args.filter_shapes or args.explain_harness:
+        collection = build_synthetic_collection(args.collection, 0)
+        collection[args.collection]["queries"] = [
+            {"query": template.format(t=args.collection), "method_name": f"query{i}"}
+            for i, template in enumerate(synthetic_query_templates)
+        ]
+        if args.explain_harness:
+            write_explain_harness(args.explain_harness, collection)
+        else:
+            print_filter_shapes(collection)
+        return
+    if args.keyset_check:
+        write_keyset_check(args.keyset_check)
+        return
+    if args.warmup_harness:
+        write_warmup_benchmark(args.warmup_harness, args.collection, repeat=args.repeat)
+        return
+    if args.codec_jmh:
+        write_codec_benchmark(args.codec_jmh, args.collection)
+        return
+    bench_shared_parse(query_count=args.queries, repeat=args.repeat)
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,136 @@
+# 全件を読み込めない大きなコレクション用の、上限付き read-through キャッシュを生成する（main.py / generate.py 共通）
+# unique キーで引いたデータだけを LRU で最大 cache_max_size 件保持し、cache_ttl_seconds 経過したものは失効させる
+
+BOUNDED_CACHE_CLASS = "BoundedCache"
+
+# キャッシュの方式: "full"（MemoryCache で全件読み込み）/ "bounded"（上限付き read-through）
+CACHE_MODES = ("full", "bounded")
+
+DEFAULT_CACHE_MAX_SIZE = 10000
+DEFAULT_CACHE_TTL_SECONDS = 300
+
+# コレクション定義で上限付きキャッシュを使うか
+def is_bounded_cache_enabled(collection_detail):
+    mode = collection_detail.get("cache_mode", "full")
+    if mode not in CACHE_MODES:
+        raise ValueError(f"cache_mode は {CACHE_MODES} のいずれかを指定してください: {mode}")
+    return mode == "bounded"
+
+def generate_bounded_cache_fields(collection_detail, key_type, data_class):
+    max_size = collection_detail.get("cache_max_size", DEFAULT_CACHE_MAX_SIZE)
+    ttl_seconds = collection_detail.get("cache_ttl_seconds", DEFAULT_CACHE_TTL_SECONDS)
+    return [
+        f"// unique キー → データの上限付きキャッシュ（最大 {max_size} 件、{ttl_seconds} 秒で失効。0 以下なら失効しない）",
+        f"public static final {BOUNDED_CACHE_CLASS}<{key_type}, {data_class}> cache_bounded = new {BOUNDED_CACHE_CLASS}<>({max_size}, {ttl_seconds * 1000}L);",
+    ]
+
+# キャッシュ本体（コレクションに依存しないので1ファイルにまとめ、同期版・Reactive 版のどちらからも使う）
+def generate_bounded_cache_class():
+    return [
+        "import java.util.LinkedHashMap;",
+        "import java.util.Map;",
+        "import java.util.concurrent.TimeUnit;",
+        "import java.util.concurrent.atomic.AtomicLong;",
+        "import java.util.concurrent.atomic.LongAdder;",
+        "",
+        "// 上限付きの read-through キャッシュ（アクセス順の LRU で追い出し、エントリごとに TTL で失効させる）",
+        f"public class {BOUNDED_CACHE_CLASS}<K, V> {{",
+        "    private static final class Entry<V> {",
+        "        final V value;",
+        "        final long expiresAt;",
+        "",
+        "        Entry(V value, long expiresAt) {",
+        "            this.value = value;",
+        "            this.expiresAt = expiresAt;",
+        "        }",
+        "    }",
+        "",
+        "    private final int maxSize;",
+        "    private final long ttlNanos;",
+        "    private final LinkedHashMap<K, Entry<V>> entries;",
+        "    // invalidate のたびに進める世代（読み込み中に書き込みがあった値は put しない）",
+        "    private final AtomicLong generation = new AtomicLong();",
+        "    private final LongAdder hits = new LongAdder();",
+        "    private final LongAdder misses = new LongAdder();",
+        "    private final LongAdder evictions = new LongAdder();",
+        "    private final LongAdder expirations = new LongAdder();",
+        "",
+        f"    public {BOUNDED_CACHE_CLASS}(int maxSize, long ttlMillis) {{",
+        "        this.maxSize = Math.max(1, maxSize);",
+        "        this.ttlNanos = ttlMillis > 0 ? TimeUnit.MILLISECONDS.toNanos(ttlMillis) : 0;",
+        "        this.entries = new LinkedHashMap<K, Entry<V>>(16, 0.75f, true) {",
+        "            @Override",
+        "            protected boolean removeEldestEntry(Map.Entry<K, Entry<V>> eldest) {",
+        f"                if (size() <= {BOUNDED_CACHE_CLASS}.this.maxSize) return false;",
+        "                evictions.increment();",
+        "                return true;",
+        "            }",
+        "        };",
+        "    }",
+        "",
+        "    // キャッシュ済みの値（無い・失効している場合は null）",
+        "    public synchronized V get(K key) {",
+        "        Entry<V> entry = key == null ? null : entries.get(key);",
+        "        if (entry != null && ttlNanos > 0 && System.nanoTime() - entry.expiresAt > 0) {",
+        "            entries.remove(key);",
+        "            expirations.increment();",
+        "            entry = null;",
+        "        }",
+        "        if (entry == null) {",
+        "            misses.increment();",
+        "            return null;",
+        "        }",
+        "        hits.increment();",
+        "        return entry.value;",
+        "    }",
+        "",
+        "    // DB を読む前に取得し、読み込んだ値を put するときに渡す",
+        "    public long generation() {",
+        "        return generation.get();",
+        "    }",
+        "",
+        "    // readGeneration 以降に invalidate が無かった場合だけ追加する（書き込み前の値で上書きしないため）",
+        "    public synchronized void put(K key, V value, long readGeneration) {",
+        "        if (key == null || value == null || generation.get() != readGeneration) return;",
+        "        entries.put(key, new Entry<>(value, System.nanoTime() + ttlNanos));",
+        "    }",
+        "",
+        "    public synchronized void invalidate(K key) {",
+        "        generation.incrementAndGet();",
+        "        entries.remove(key);",
+        "    }",
+        "",
+        "    // どのデータが変わったか分からない書き込み（unique キー以外の条件・複数件）の後に呼ぶ",
+        "    public synchronized void invalidateAll() {",
+        "        generation.incrementAndGet();",
+        "        entries.clear();",
+        "    }",
+        "",
+        "    public synchronized int size() {",
+        "        return entries.size();",
+        "    }",
+        "",
+        "    public long getHitCount() {",
+        "        return hits.sum();",
+        "    }",
+        "",
+        "    public long getMissCount() {",
+        "        return misses.sum();",
+        "    }",
+        "",
+        "    // 件数の上限で追い出した数",
+        "    public long getEvictionCount() {",
+        "        return evictions.sum();",
+        "    }",
+        "",
+        "    // TTL で失効させた数",
+        "    public long getExpirationCount() {",
+        "        return expirations.sum();",
+        "    }",
+        "",
+        "    public double getHitRate() {",
+        "        long total = hits.sum() + misses.sum();",
+        "        return total == 0 ? 0.0 : (double) hits.sum() / total;",
+        "    }",
+        "}",
+    ]
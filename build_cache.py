@@ -0,0 +1,135 @@
+# 生成結果のビルドキャッシュ（main.py / generate.py 共通）
+# コレクション定義・クエリ・生成オプション・ジェネレータ自身のソースのハッシュが前回と同じで、
+# 生成済みのファイルも書き換えられていなければ再生成しない。
+# 再生成する場合も内容が変わったファイルだけを一時ファイル経由で置き換えるので、
+# 変わっていないファイルの更新日時は変わらず、Gradle のインクリメンタルコンパイルが効く
+import hashlib
+import io
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+# 出力先ディレクトリ内に置く、コレクションごとのマニフェストのディレクトリ
+BUILD_CACHE_DIR = ".codegen-cache"
+
+_generator_version = None
+
+# ジェネレータのソース（このディレクトリの *.py）のハッシュ（変更すると全コレクションを再生成する）
+def get_generator_version():
+    global _generator_version
+    if _generator_version is None:
+        digest = hashlib.sha256()
+        source_dir = os.path.dirname(os.path.abspath(__file__))
+        for name in sorted(os.listdir(source_dir)):
+            if name.endswith(".py"):
+                with open(os.path.join(source_dir, name), "rb") as f:
+                    digest.update(name.encode("utf-8"))
+                    digest.update(f.read())
+        _generator_version = digest.hexdigest()
+    return _generator_version
+
+def compute_build_key(generator, collection_name, definition, options=None):
+    """
+    ビルドキャッシュのキーを計算する
+
+    Args:
+        generator (str): "sql"（main.py）/ "json"（generate.py）
+        collection_name (str): コレクション名
+        definition (dict): コレクション定義（カラム・クエリ・キャッシュ設定）
+        options (dict): 出力に影響する生成オプション
+
+    Returns:
+        str: キー（SHA-256 の16進文字列）
+    """
+    payload = json.dumps({
+        "generator": generator,
+        "version": get_generator_version(),
+        "collection": collection_name,
+        "definition": definition,
+        "options": options or {},
+    }, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+def get_manifest_path(write_path, cache_name):
+    return os.path.join(write_path, BUILD_CACHE_DIR, f"{cache_name}.json")
+
+def is_up_to_date(write_path, cache_name, key):
+    # 前回と同じキーで、記録したファイルがすべて前回書いた内容のまま残っているか
+    try:
+        with open(get_manifest_path(write_path, cache_name), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if manifest.get("key") != key or not manifest.get("files"):
+        return False
+    for file_name, digest in manifest["files"].items():
+        try:
+            with open(os.path.join(write_path, file_name), "rb") as f:
+                if hash_bytes(f.read()) != digest:
+                    return False
+        except OSError:
+            return False
+    return True
+
+def save_manifest(write_path, cache_name, key, written):
+    files = {os.path.relpath(path, write_path): digest for path, digest in sorted(written.items())}
+    write_if_changed(get_manifest_path(write_path, cache_name), json.dumps({"key": key, "files": files}, indent=2, sort_keys=True) + "\n")
+
+def write_if_changed(path, content):
+    """
+    内容が変わった場合だけファイルを書き換える（同じディレクトリの一時ファイルに書いてから置き換える）
+
+    Args:
+        path (str): 出力先のパス
+        content (str): ファイルの内容
+
+    Returns:
+        tuple: (内容のハッシュ, ファイルを書き換えたか)
+    """
+    data = content.encode("utf-8")
+    digest = hash_bytes(data)
+    if not has_changed(path, data):
+        return digest, False
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        # mkstemp は 0600 で作るので、通常の open と同じく umask に従ったパーミッションにする
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(temp_path, 0o666 & ~umask)
+        # 同じファイルを複数のプロセスが書いても（BulkInsertResult.java 等）、読み手には書きかけの内容が見えない
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return digest, True
+
+def has_changed(path, data):
+    try:
+        with open(path, "rb") as f:
+            return f.read() != data
+    except OSError:
+        return True
+
+@contextmanager
+def open_generated(path, written=None):
+    """
+    open(path, "w") の代わりに使う。書いた内容は閉じるときに write_if_changed で出力する
+
+    Args:
+        path (str): 出力先のパス
+        written (dict): 出力したファイルのパス → 内容のハッシュを記録する（マニフェスト用）
+    """
+    buffer = io.StringIO()
+    yield buffer
+    digest, _ = write_if_changed(path, buffer.getvalue())
+    if written is not None:
+        written[path] = digest
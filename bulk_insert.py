@@ -0,0 +1,153 @@
+# チャンク分割・順序なしの bulkInsert と、その結果クラスを生成する（main.py / generate.py 共通）
+
+BULK_INSERT_RESULT_CLASS = "BulkInsertResult"
+
+def get_bulk_insert_result_type(data_class):
+    return f"{BULK_INSERT_RESULT_CLASS}<{data_class}>"
+
+# 結果クラス（ドライバに依存しないので同期版・Reactive 版のどちらからも使う）
+def generate_bulk_insert_result_class():
+    return [
+        "import com.mongodb.MongoBulkWriteException;",
+        "import com.mongodb.bulk.BulkWriteError;",
+        "import java.util.ArrayList;",
+        "import java.util.Collections;",
+        "import java.util.IdentityHashMap;",
+        "import java.util.List;",
+        "import java.util.Set;",
+        "import java.util.concurrent.CompletionException;",
+        "",
+        "// bulkInsert の結果（挿入できた件数と、重複キー・その他のエラーで挿入できなかったデータ）",
+        f"public class {BULK_INSERT_RESULT_CLASS}<T> {{",
+        "    private long insertedCount;",
+        "    private final List<T> duplicates = new ArrayList<>();",
+        "    private final List<T> failures = new ArrayList<>();",
+        "",
+        "    public long getInsertedCount() {",
+        "        return insertedCount;",
+        "    }",
+        "",
+        "    // 重複キー（エラーコード 11000）で挿入できなかったデータ",
+        "    public List<T> getDuplicates() {",
+        "        return Collections.unmodifiableList(duplicates);",
+        "    }",
+        "",
+        "    // 重複キー以外のエラーで挿入できなかったデータ",
+        "    public List<T> getFailures() {",
+        "        return Collections.unmodifiableList(failures);",
+        "    }",
+        "",
+        "    public boolean isSuccess() {",
+        "        return duplicates.isEmpty() && failures.isEmpty();",
+        "    }",
+        "",
+        "    // dataList のうち挿入できたデータ（キャッシュへの反映用）",
+        "    public List<T> getInserted(List<T> dataList) {",
+        "        Set<T> rejected = Collections.newSetFromMap(new IdentityHashMap<>());",
+        "        rejected.addAll(duplicates);",
+        "        rejected.addAll(failures);",
+        "        List<T> inserted = new ArrayList<>();",
+        "        for (T data : dataList) {",
+        "            if (!rejected.contains(data)) {",
+        "                inserted.add(data);",
+        "            }",
+        "        }",
+        "        return inserted;",
+        "    }",
+        "",
+        f"    public {BULK_INSERT_RESULT_CLASS}<T> merge({BULK_INSERT_RESULT_CLASS}<T> other) {{",
+        "        insertedCount += other.insertedCount;",
+        "        duplicates.addAll(other.duplicates);",
+        "        failures.addAll(other.failures);",
+        "        return this;",
+        "    }",
+        "",
+        "    // 1チャンク分の insertMany の結果から作る（error が null なら全件挿入済み）",
+        f"    public static <T> {BULK_INSERT_RESULT_CLASS}<T> of(List<T> chunk, Throwable error) {{",
+        f"        {BULK_INSERT_RESULT_CLASS}<T> result = new {BULK_INSERT_RESULT_CLASS}<>();",
+        "        Throwable cause = error instanceof CompletionException && error.getCause() != null ? error.getCause() : error;",
+        "        if (cause == null) {",
+        "            result.insertedCount = chunk.size();",
+        "        } else if (cause instanceof MongoBulkWriteException) {",
+        "            // ordered(false) なのでエラーになったデータ以外は挿入されている",
+        "            MongoBulkWriteException e = (MongoBulkWriteException) cause;",
+        "            result.insertedCount = e.getWriteResult().getInsertedCount();",
+        "            for (BulkWriteError writeError : e.getWriteErrors()) {",
+        "                T data = chunk.get(writeError.getIndex());",
+        "                if (writeError.getCode() == 11000) {",
+        "                    result.duplicates.add(data);",
+        "                } else {",
+        "                    result.failures.add(data);",
+        "                }",
+        "            }",
+        "        } else {",
+        "            result.failures.addAll(chunk);",
+        "        }",
+        "        return result;",
+        "    }",
+        "",
+        f"    public static <T> {BULK_INSERT_RESULT_CLASS}<T> failed(List<T> dataList) {{",
+        f"        {BULK_INSERT_RESULT_CLASS}<T> result = new {BULK_INSERT_RESULT_CLASS}<>();",
+        "        result.failures.addAll(dataList);",
+        "        return result;",
+        "    }",
+        "}",
+    ]
+
+# bulkInsert の設定（1回の insertMany に含める件数・並列に書き込むチャンク数）
+def generate_bulk_insert_fields(default_parallelism=1):
+    return [
+        f"public static int bulk_insert_parallelism = {default_parallelism};",
+    ]
+
+# dataList を chunkSize 件ずつ ordered(false) で insertMany する関数を生成（同期ドライバ版）
+def generate_bulk_insert_chunks_code():
+    result = BULK_INSERT_RESULT_CLASS
+    return [
+        "// dataList を chunkSize 件ずつ ordered(false) で insertMany する。parallelism > 1 の場合はチャンクを並列に書き込む",
+        f"public static <T> {result}<T> bulkInsertChunks(MongoCollection<Document> collection, List<T> dataList, Function<T, Document> toDocument, int chunkSize, int parallelism) {{",
+        "    int size = Math.max(1, chunkSize);",
+        "    List<List<T>> chunks = new ArrayList<>();",
+        "    for (int from = 0; from < dataList.size(); from += size) {",
+        "        chunks.add(dataList.subList(from, Math.min(from + size, dataList.size())));",
+        "    }",
+        f"    {result}<T> result = new {result}<>();",
+        "    if (parallelism <= 1 || chunks.size() <= 1) {",
+        "        for (List<T> chunk : chunks) {",
+        "            result.merge(insertChunk(collection, chunk, toDocument));",
+        "        }",
+        "        return result;",
+        "    }",
+        "    ExecutorService pool = Executors.newFixedThreadPool(Math.min(parallelism, chunks.size()));",
+        "    try {",
+        f"        List<Future<{result}<T>>> futures = new ArrayList<>();",
+        "        for (List<T> chunk : chunks) {",
+        "            futures.add(pool.submit(() -> insertChunk(collection, chunk, toDocument)));",
+        "        }",
+        f"        for (Future<{result}<T>> future : futures) {{",
+        "            result.merge(future.get());",
+        "        }",
+        "    } catch (InterruptedException e) {",
+        "        Thread.currentThread().interrupt();",
+        "        throw new IllegalStateException(e);",
+        "    } catch (ExecutionException e) {",
+        "        throw new IllegalStateException(e.getCause());",
+        "    } finally {",
+        "        pool.shutdown();",
+        "    }",
+        "    return result;",
+        "}",
+        "",
+        f"private static <T> {result}<T> insertChunk(MongoCollection<Document> collection, List<T> chunk, Function<T, Document> toDocument) {{",
+        "    List<Document> documents = new ArrayList<>(chunk.size());",
+        "    for (T data : chunk) {",
+        "        documents.add(toDocument.apply(data));",
+        "    }",
+        "    try {",
+        "        collection.insertMany(documents, new InsertManyOptions().ordered(false));",
+        f"        return {result}.of(chunk, null);",
+        "    } catch (MongoException e) {",
+        f"        return {result}.of(chunk, e);",
+        "    }",
+        "}",
+    ]
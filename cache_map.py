@@ -0,0 +1,355 @@
+# 変更しないキャッシュ用のマップ（永続ハッシュトライ）を生成する（main.py / generate.py 共通）
+# 公開したマップは変更しない。with / without は変更したキーの経路のノード（1段 32 分岐なので高々 7 段）だけを作り直した新しいマップを返し、
+# 残りのノードは元のマップと共有する。書き込み側は新しいマップとインデックスを作り終えてから、スナップショットを1回の volatile 代入で公開する
+# 1件あたりの容量はノードの配列の2要素分なので、HashMap / ConcurrentHashMap のエントリより小さい（null のキーも使える）
+
+CACHE_MAP_CLASS = "CacheMap"
+
+def generate_cache_map_class():
+    return [
+        "import java.util.AbstractMap;",
+        "import java.util.AbstractSet;",
+        "import java.util.Arrays;",
+        "import java.util.Collections;",
+        "import java.util.Iterator;",
+        "import java.util.Map;",
+        "import java.util.NoSuchElementException;",
+        "import java.util.Objects;",
+        "import java.util.Set;",
+        "",
+        "// 変更しないマップ。with / without は変更したキーの経路だけを作り直した新しいマップを返す（読み取りはロック不要）",
+        f"public final class {CACHE_MAP_CLASS}<K, V> extends AbstractMap<K, V> {{",
+        "    private static final int BITS = 5;",
+        "    private static final int MASK = (1 << BITS) - 1;",
+        "    // ノードの配列は [キー, 値] の組を並べる。キーが SUBNODE の組は値が子ノード",
+        "    private static final Object SUBNODE = new Object();",
+        "    private static final Object NOT_FOUND = new Object();",
+        f"    private static final {CACHE_MAP_CLASS}<?, ?> EMPTY = new {CACHE_MAP_CLASS}<>(new BitmapNode(0, new Object[0]), 0);",
+        "",
+        "    private final Node root;",
+        "    private final int size;",
+        "",
+        f"    private {CACHE_MAP_CLASS}(Node root, int size) {{",
+        "        this.root = root;",
+        "        this.size = size;",
+        "    }",
+        "",
+        "    @SuppressWarnings(\"unchecked\")",
+        f"    public static <K, V> {CACHE_MAP_CLASS}<K, V> empty() {{",
+        f"        return ({CACHE_MAP_CLASS}<K, V>) EMPTY;",
+        "    }",
+        "",
+        "    // 作り終えたマップの内容で作る（全件読み込み）",
+        f"    public static <K, V> {CACHE_MAP_CLASS}<K, V> of(Map<? extends K, ? extends V> source) {{",
+        f"        {CACHE_MAP_CLASS}<K, V> map = empty();",
+        "        for (Map.Entry<? extends K, ? extends V> entry : source.entrySet()) {",
+        "            map = map.with(entry.getKey(), entry.getValue());",
+        "        }",
+        "        return map;",
+        "    }",
+        "",
+        "    private static int spread(Object key) {",
+        "        int h = Objects.hashCode(key);",
+        "        return h ^ (h >>> 16);",
+        "    }",
+        "",
+        "    @Override",
+        "    public V get(Object key) {",
+        "        return getOrDefault(key, null);",
+        "    }",
+        "",
+        "    @Override",
+        "    @SuppressWarnings(\"unchecked\")",
+        "    public V getOrDefault(Object key, V defaultValue) {",
+        "        Object found = root.find(spread(key), 0, key);",
+        "        return found == NOT_FOUND ? defaultValue : (V) found;",
+        "    }",
+        "",
+        "    @Override",
+        "    public boolean containsKey(Object key) {",
+        "        return root.find(spread(key), 0, key) != NOT_FOUND;",
+        "    }",
+        "",
+        "    @Override",
+        "    public int size() {",
+        "        return size;",
+        "    }",
+        "",
+        "    @Override",
+        "    public boolean isEmpty() {",
+        "        return size == 0;",
+        "    }",
+        "",
+        "    // key を value にした新しいマップ（同じ値なら自身を返す）",
+        f"    public {CACHE_MAP_CLASS}<K, V> with(K key, V value) {{",
+        "        boolean[] added = new boolean[1];",
+        "        Node next = root.with(spread(key), 0, key, value, added);",
+        f"        return next == root ? this : new {CACHE_MAP_CLASS}<>(next, added[0] ? size + 1 : size);",
+        "    }",
+        "",
+        "    // key を取り除いた新しいマップ（無ければ自身を返す）",
+        f"    public {CACHE_MAP_CLASS}<K, V> without(Object key) {{",
+        "        Node next = root.without(spread(key), 0, key);",
+        "        if (next == root) return this;",
+        f"        return next == null ? empty() : new {CACHE_MAP_CLASS}<>(next, size - 1);",
+        "    }",
+        "",
+        "    @Override",
+        "    public Set<Map.Entry<K, V>> entrySet() {",
+        "        return new AbstractSet<Map.Entry<K, V>>() {",
+        "            @Override",
+        "            public Iterator<Map.Entry<K, V>> iterator() {",
+        "                return new EntryIterator();",
+        "            }",
+        "",
+        "            @Override",
+        "            public int size() {",
+        "                return size;",
+        "            }",
+        "        };",
+        "    }",
+        "",
+        "    // 転置インデックス（値 → データの集合）の各 value に data を加えたインデックスを返す",
+        f"    public static <E, V> {CACHE_MAP_CLASS}<E, {CACHE_MAP_CLASS}<V, Boolean>> addPostings({CACHE_MAP_CLASS}<E, {CACHE_MAP_CLASS}<V, Boolean>> index, Iterable<? extends E> values, V data) {{",
+        "        if (values == null) return index;",
+        "        for (E value : values) {",
+        f"            index = index.with(value, index.getOrDefault(value, {CACHE_MAP_CLASS}.<V, Boolean>empty()).with(data, Boolean.TRUE));",
+        "        }",
+        "        return index;",
+        "    }",
+        "",
+        "    // 転置インデックスの各 value から data を外したインデックスを返す（空になった集合は取り除く）",
+        f"    public static <E, V> {CACHE_MAP_CLASS}<E, {CACHE_MAP_CLASS}<V, Boolean>> removePostings({CACHE_MAP_CLASS}<E, {CACHE_MAP_CLASS}<V, Boolean>> index, Iterable<? extends E> values, V data) {{",
+        "        if (values == null) return index;",
+        "        for (E value : values) {",
+        f"            {CACHE_MAP_CLASS}<V, Boolean> postings = index.get(value);",
+        "            if (postings == null) continue;",
+        "            postings = postings.without(data);",
+        "            index = postings.isEmpty() ? index.without(value) : index.with(value, postings);",
+        "        }",
+        "        return index;",
+        "    }",
+        "",
+        "    // value を含むデータの集合（無ければ空集合）",
+        f"    public static <E, V> Set<V> postings(Map<E, {CACHE_MAP_CLASS}<V, Boolean>> index, Object value) {{",
+        f"        {CACHE_MAP_CLASS}<V, Boolean> postings = index.get(value);",
+        "        return postings == null ? Collections.emptySet() : postings.keySet();",
+        "    }",
+        "",
+        "    private abstract static class Node {",
+        "        final Object[] array;",
+        "",
+        "        Node(Object[] array) {",
+        "            this.array = array;",
+        "        }",
+        "",
+        "        abstract Object find(int hash, int shift, Object key);",
+        "",
+        "        abstract Node with(int hash, int shift, Object key, Object value, boolean[] added);",
+        "",
+        "        // 取り除いた結果が空になった場合は null",
+        "        abstract Node without(int hash, int shift, Object key);",
+        "",
+        "        // ハッシュ値が異なる2件を持つノード（shift の段から下を作る）。ハッシュ値が同じならまとめて1つのノードに入れる",
+        "        static Node pair(int shift, int hash1, Object key1, Object value1, int hash2, Object key2, Object value2) {",
+        "            if (hash1 == hash2) return new CollisionNode(hash1, new Object[] {key1, value1, key2, value2});",
+        "            int slot1 = (hash1 >>> shift) & MASK;",
+        "            int slot2 = (hash2 >>> shift) & MASK;",
+        "            if (slot1 == slot2) {",
+        "                return new BitmapNode(1 << slot1, new Object[] {SUBNODE, pair(shift + BITS, hash1, key1, value1, hash2, key2, value2)});",
+        "            }",
+        "            Object[] array = slot1 < slot2 ? new Object[] {key1, value1, key2, value2} : new Object[] {key2, value2, key1, value1};",
+        "            return new BitmapNode((1 << slot1) | (1 << slot2), array);",
+        "        }",
+        "    }",
+        "",
+        "    // ハッシュ値の 5 ビットごとに分岐するノード（使っている分岐だけを bitmap で持つ）",
+        "    private static final class BitmapNode extends Node {",
+        "        final int bitmap;",
+        "",
+        "        BitmapNode(int bitmap, Object[] array) {",
+        "            super(array);",
+        "            this.bitmap = bitmap;",
+        "        }",
+        "",
+        "        @Override",
+        "        Object find(int hash, int shift, Object key) {",
+        "            int bit = 1 << ((hash >>> shift) & MASK);",
+        "            if ((bitmap & bit) == 0) return NOT_FOUND;",
+        "            int i = 2 * Integer.bitCount(bitmap & (bit - 1));",
+        "            if (array[i] == SUBNODE) return ((Node) array[i + 1]).find(hash, shift + BITS, key);",
+        "            return Objects.equals(array[i], key) ? array[i + 1] : NOT_FOUND;",
+        "        }",
+        "",
+        "        @Override",
+        "        Node with(int hash, int shift, Object key, Object value, boolean[] added) {",
+        "            int bit = 1 << ((hash >>> shift) & MASK);",
+        "            int i = 2 * Integer.bitCount(bitmap & (bit - 1));",
+        "            if ((bitmap & bit) == 0) {",
+        "                Object[] next = new Object[array.length + 2];",
+        "                System.arraycopy(array, 0, next, 0, i);",
+        "                next[i] = key;",
+        "                next[i + 1] = value;",
+        "                System.arraycopy(array, i, next, i + 2, array.length - i);",
+        "                added[0] = true;",
+        "                return new BitmapNode(bitmap | bit, next);",
+        "            }",
+        "            Object currentKey = array[i];",
+        "            Object currentValue = array[i + 1];",
+        "            Object nextKey = currentKey;",
+        "            Object nextValue;",
+        "            if (currentKey == SUBNODE) {",
+        "                Node child = ((Node) currentValue).with(hash, shift + BITS, key, value, added);",
+        "                if (child == currentValue) return this;",
+        "                nextValue = child;",
+        "            } else if (Objects.equals(currentKey, key)) {",
+        "                if (currentValue == value) return this;",
+        "                nextValue = value;",
+        "            } else {",
+        "                added[0] = true;",
+        "                nextKey = SUBNODE;",
+        "                nextValue = pair(shift + BITS, spread(currentKey), currentKey, currentValue, hash, key, value);",
+        "            }",
+        "            Object[] next = array.clone();",
+        "            next[i] = nextKey;",
+        "            next[i + 1] = nextValue;",
+        "            return new BitmapNode(bitmap, next);",
+        "        }",
+        "",
+        "        @Override",
+        "        Node without(int hash, int shift, Object key) {",
+        "            int bit = 1 << ((hash >>> shift) & MASK);",
+        "            if ((bitmap & bit) == 0) return this;",
+        "            int i = 2 * Integer.bitCount(bitmap & (bit - 1));",
+        "            if (array[i] == SUBNODE) {",
+        "                Node child = ((Node) array[i + 1]).without(hash, shift + BITS, key);",
+        "                if (child == array[i + 1]) return this;",
+        "                if (child != null) {",
+        "                    Object[] next = array.clone();",
+        "                    if (child.array.length == 2 && child.array[0] != SUBNODE) {",
+        "                        // 子に1件だけ残った場合はこの段に引き上げる",
+        "                        next[i] = child.array[0];",
+        "                        next[i + 1] = child.array[1];",
+        "                    } else {",
+        "                        next[i + 1] = child;",
+        "                    }",
+        "                    return new BitmapNode(bitmap, next);",
+        "                }",
+        "            } else if (!Objects.equals(array[i], key)) {",
+        "                return this;",
+        "            }",
+        "            if (bitmap == bit) return null;",
+        "            Object[] next = new Object[array.length - 2];",
+        "            System.arraycopy(array, 0, next, 0, i);",
+        "            System.arraycopy(array, i + 2, next, i, array.length - i - 2);",
+        "            return new BitmapNode(bitmap ^ bit, next);",
+        "        }",
+        "    }",
+        "",
+        "    // ハッシュ値が完全に一致するキーをまとめるノード（線形に探す）",
+        "    private static final class CollisionNode extends Node {",
+        "        final int hash;",
+        "",
+        "        CollisionNode(int hash, Object[] array) {",
+        "            super(array);",
+        "            this.hash = hash;",
+        "        }",
+        "",
+        "        private int indexOf(Object key) {",
+        "            for (int i = 0; i < array.length; i += 2) {",
+        "                if (Objects.equals(array[i], key)) return i;",
+        "            }",
+        "            return -1;",
+        "        }",
+        "",
+        "        @Override",
+        "        Object find(int hash, int shift, Object key) {",
+        "            int i = hash == this.hash ? indexOf(key) : -1;",
+        "            return i < 0 ? NOT_FOUND : array[i + 1];",
+        "        }",
+        "",
+        "        @Override",
+        "        Node with(int hash, int shift, Object key, Object value, boolean[] added) {",
+        "            if (hash != this.hash) {",
+        "                // ハッシュ値が異なるキーは、この段で分岐するノードの下に置く",
+        "                return new BitmapNode(1 << ((this.hash >>> shift) & MASK), new Object[] {SUBNODE, this}).with(hash, shift, key, value, added);",
+        "            }",
+        "            int i = indexOf(key);",
+        "            if (i >= 0) {",
+        "                if (array[i + 1] == value) return this;",
+        "                Object[] next = array.clone();",
+        "                next[i + 1] = value;",
+        "                return new CollisionNode(hash, next);",
+        "            }",
+        "            Object[] next = Arrays.copyOf(array, array.length + 2);",
+        "            next[array.length] = key;",
+        "            next[array.length + 1] = value;",
+        "            added[0] = true;",
+        "            return new CollisionNode(hash, next);",
+        "        }",
+        "",
+        "        @Override",
+        "        Node without(int hash, int shift, Object key) {",
+        "            int i = hash == this.hash ? indexOf(key) : -1;",
+        "            if (i < 0) return this;",
+        "            if (array.length == 2) return null;",
+        "            Object[] next = new Object[array.length - 2];",
+        "            System.arraycopy(array, 0, next, 0, i);",
+        "            System.arraycopy(array, i + 2, next, i, array.length - i - 2);",
+        "            return new CollisionNode(hash, next);",
+        "        }",
+        "    }",
+        "",
+        "    // 深さ優先でノードの配列をたどる（段数は高々 8 なので固定長のスタックで足りる）",
+        "    private final class EntryIterator implements Iterator<Map.Entry<K, V>> {",
+        "        private final Object[][] arrays = new Object[16][];",
+        "        private final int[] positions = new int[16];",
+        "        private int depth;",
+        "        private Object nextKey;",
+        "        private Object nextValue;",
+        "        private boolean ready;",
+        "",
+        "        EntryIterator() {",
+        "            arrays[0] = root.array;",
+        "            advance();",
+        "        }",
+        "",
+        "        private void advance() {",
+        "            ready = false;",
+        "            while (depth >= 0) {",
+        "                Object[] array = arrays[depth];",
+        "                int i = positions[depth];",
+        "                if (i >= array.length) {",
+        "                    depth--;",
+        "                    continue;",
+        "                }",
+        "                positions[depth] = i + 2;",
+        "                if (array[i] == SUBNODE) {",
+        "                    depth++;",
+        "                    arrays[depth] = ((Node) array[i + 1]).array;",
+        "                    positions[depth] = 0;",
+        "                } else {",
+        "                    nextKey = array[i];",
+        "                    nextValue = array[i + 1];",
+        "                    ready = true;",
+        "                    return;",
+        "                }",
+        "            }",
+        "        }",
+        "",
+        "        @Override",
+        "        public boolean hasNext() {",
+        "            return ready;",
+        "        }",
+        "",
+        "        @Override",
+        "        @SuppressWarnings(\"unchecked\")",
+        "        public Map.Entry<K, V> next() {",
+        "            if (!ready) throw new NoSuchElementException();",
+        "            Map.Entry<K, V> entry = new AbstractMap.SimpleImmutableEntry<>((K) nextKey, (V) nextValue);",
+        "            advance();",
+        "            return entry;",
+        "        }",
+        "    }",
+        "}",
+    ]
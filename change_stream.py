@@ -0,0 +1,152 @@
+# Change Stream によるキャッシュの差分更新コードを生成する（main.py / generate.py 共通）
+
+# コレクション定義で Change Stream の監視コードを生成するか
+def is_change_stream_enabled(collection_detail):
+    return collection_detail.get("change_stream", False)
+
+def generate_change_stream_imports():
+    return [
+        "import com.mongodb.MongoException;",
+        "import com.mongodb.client.ChangeStreamIterable;",
+        "import com.mongodb.client.MongoChangeStreamCursor;",
+        "import com.mongodb.client.model.changestream.ChangeStreamDocument;",
+        "import com.mongodb.client.model.changestream.FullDocument;",
+        "import com.mongodb.client.model.changestream.OperationType;",
+        "import org.bson.BsonDocument;",
+        "import org.bson.BsonValue;",
+        "import java.util.concurrent.ConcurrentHashMap;",
+    ]
+
+def generate_change_stream_fields(data_class):
+    return [
+        "// 最後に適用した Change Stream イベントの再開トークン",
+        "public static volatile BsonDocument change_stream_resume_token;",
+        "private static final System.Logger change_stream_logger = System.getLogger(collection_name + \".change_stream\");",
+        "// _id → キャッシュ済みデータ（削除イベントは _id しか持たないため）",
+        f"public static Map<Object, {data_class}> cache_document_ids = new ConcurrentHashMap<>();",
+    ]
+
+def generate_change_stream_code(data_class, memory_cache_method, replace_lines):
+    """
+    Change Stream を監視してキャッシュへ差分を適用する Java コードを生成する
+
+    Args:
+        data_class (str): キャッシュするデータクラス名
+        memory_cache_method (str): 全件読み込みを行う MemoryCache 関数名
+        replace_lines (list): old をキャッシュ（インデックス含む）から取り除き、data を追加する Java 文
+            （どちらも null の場合がある。1件のイベントの変更は1回の書き込みで公開する）
+
+    Returns:
+        list: Java コードの行リスト（インデントはクラス直下を 0 とする）
+    """
+    java_code = []
+    java_code.append("// Change Stream を開く（再開トークンがあればその続きから）")
+    java_code.append("public static ChangeStreamIterable<Document> openChangeStream(MongoDatabase db) {")
+    java_code.append("    ChangeStreamIterable<Document> stream = db.getCollection(collection_name).watch().fullDocument(FullDocument.UPDATE_LOOKUP);")
+    java_code.append("    BsonDocument token = change_stream_resume_token;")
+    java_code.append("    return token != null ? stream.resumeAfter(token) : stream;")
+    java_code.append("}")
+    java_code.append("")
+    java_code.append("// 監視スレッドを開始する。再開トークンが無ければ監視位置を確定してから全件読み込みを行う")
+    java_code.append("public static Thread startChangeStreamWatcher(MongoDatabase db) {")
+    java_code.append("    Thread watcher = new Thread(() -> {")
+    java_code.append("        while (!Thread.currentThread().isInterrupted()) {")
+    java_code.append("            try {")
+    java_code.append("                if (change_stream_resume_token == null) {")
+    java_code.append("                    BsonDocument startToken;")
+    java_code.append("                    try (MongoChangeStreamCursor<ChangeStreamDocument<Document>> cursor = db.getCollection(collection_name).watch().cursor()) {")
+    java_code.append("                        startToken = cursor.getResumeToken();")
+    java_code.append("                    }")
+    java_code.append(f"                    {memory_cache_method}(db);")
+    java_code.append("                    // 全件読み込みが終わってから監視位置を確定する（失敗した場合は次の試行で読み込みからやり直す）")
+    java_code.append("                    change_stream_resume_token = startToken;")
+    java_code.append("                }")
+    java_code.append("                // invalidate 等で監視が終わった場合はトークンを捨てて全件読み込みからやり直す")
+    java_code.append("                if (!watchChanges(openChangeStream(db))) change_stream_resume_token = null;")
+    java_code.append("            } catch (RuntimeException e) {")
+    java_code.append("                // デコードの失敗などドライバ以外の例外は同じイベントで繰り返し失敗するので、全件読み込みからやり直す")
+    java_code.append("                if (!(e instanceof MongoException)) change_stream_resume_token = null;")
+    java_code.append("                change_stream_logger.log(System.Logger.Level.WARNING, \"change stream watcher failed: \" + collection_name, e);")
+    java_code.append("                try {")
+    java_code.append("                    Thread.sleep(1000);")
+    java_code.append("                } catch (InterruptedException interrupted) {")
+    java_code.append("                    return;")
+    java_code.append("                }")
+    java_code.append("            }")
+    java_code.append("        }")
+    java_code.append(f"    }}, collection_name + \"-change-stream\");")
+    java_code.append("    watcher.setDaemon(true);")
+    java_code.append("    watcher.start();")
+    java_code.append("    return watcher;")
+    java_code.append("}")
+    java_code.append("")
+    java_code.append("// Change Stream のイベントを順に適用する（終了・例外のどちらでもサーバ側のカーソルを閉じる）")
+    java_code.append("public static boolean watchChanges(ChangeStreamIterable<Document> changes) {")
+    java_code.append("    try (MongoChangeStreamCursor<ChangeStreamDocument<Document>> cursor = changes.cursor()) {")
+    java_code.append("        return watchChanges(() -> cursor);")
+    java_code.append("    }")
+    java_code.append("}")
+    java_code.append("")
+    java_code.append("// イベントを順に適用する。任意の Iterable（テスト用の偽ストリーム等）を渡せる")
+    java_code.append("// 戻り値: 割り込みまたはイベント切れで終了した場合 true、invalidate 等で再開できない場合 false")
+    java_code.append("public static boolean watchChanges(Iterable<ChangeStreamDocument<Document>> changes) {")
+    java_code.append("    for (ChangeStreamDocument<Document> change : changes) {")
+    java_code.append("        if (!applyChange(change)) return false;")
+    java_code.append("        if (Thread.currentThread().isInterrupted()) break;")
+    java_code.append("    }")
+    java_code.append("    return true;")
+    java_code.append("}")
+    java_code.append("")
+    java_code.append("public static boolean applyChange(ChangeStreamDocument<Document> change) {")
+    java_code.append("    return applyChange(change.getOperationType(), change.getDocumentKey(), change.getFullDocument(), change.getResumeToken());")
+    java_code.append("}")
+    java_code.append("")
+    java_code.append("// 1件のイベントをキャッシュへ適用する。戻り値が false の場合は監視を続けられない（要全件読み込み）")
+    java_code.append("public static synchronized boolean applyChange(OperationType operationType, BsonDocument documentKey, Document fullDocument, BsonDocument resumeToken) {")
+    java_code.append("    switch (operationType) {")
+    java_code.append("        case INSERT:")
+    java_code.append("        case UPDATE:")
+    java_code.append("        case REPLACE: {")
+    java_code.append("            // 更新後に削除された場合は fullDocument が null になるので削除として扱う")
+    java_code.append("            Object id = documentId(documentKey);")
+    java_code.append("            if (id == null) break;")
+    java_code.append(f"            {data_class} old = cache_document_ids.remove(id);")
+    java_code.append(f"            {data_class} data = fullDocument != null ? new {data_class}(fullDocument) : null;")
+    java_code.append("            if (data != null) cache_document_ids.put(id, data);")
+    java_code.append("            if (cache_data != null && (old != null || data != null)) cacheReplace(old, data);")
+    java_code.append("            break;")
+    java_code.append("        }")
+    java_code.append("        case DELETE: {")
+    java_code.append("            Object id = documentId(documentKey);")
+    java_code.append("            if (id == null) break;")
+    java_code.append(f"            {data_class} old = cache_document_ids.remove(id);")
+    java_code.append("            if (cache_data != null && old != null) cacheReplace(old, null);")
+    java_code.append("            break;")
+    java_code.append("        }")
+    java_code.append("        case DROP:")
+    java_code.append("        case RENAME:")
+    java_code.append("        case DROP_DATABASE:")
+    java_code.append("        case INVALIDATE:")
+    java_code.append("            return false;")
+    java_code.append("        default:")
+    java_code.append("            break;")
+    java_code.append("    }")
+    java_code.append("    if (resumeToken != null) change_stream_resume_token = resumeToken;")
+    java_code.append("    return true;")
+    java_code.append("}")
+    java_code.append("")
+    java_code.append(f"private static void cacheReplace({data_class} old, {data_class} data) {{")
+    java_code.extend("    " + line for line in replace_lines)
+    java_code.append("}")
+    java_code.append("")
+    java_code.append("// documentKey の _id を Document の読み込み結果と同じ Java の型に変換する")
+    java_code.append("private static Object documentId(BsonDocument documentKey) {")
+    java_code.append("    BsonValue id = documentKey == null ? null : documentKey.get(\"_id\");")
+    java_code.append("    if (id == null) return null;")
+    java_code.append("    if (id.isObjectId()) return id.asObjectId().getValue();")
+    java_code.append("    if (id.isString()) return id.asString().getValue();")
+    java_code.append("    if (id.isInt32()) return id.asInt32().getValue();")
+    java_code.append("    if (id.isInt64()) return id.asInt64().getValue();")
+    java_code.append("    return id;")
+    java_code.append("}")
+    return java_code
@@ -0,0 +1,151 @@
+# コード生成の計測（--profile）
+# 有効にした場合だけ、コレクション・クエリ・生成関数ごとの経過時間と sqlparse の呼び出し回数を記録し、
+# Chrome の trace event 形式の JSON（chrome://tracing / Perfetto で開ける）に書き出す
+# 無効のとき（既定）は profiled を付けた関数でもフラグを1つ見るだけで、出力は変わらない
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+_enabled = False
+_events = []
+_counters = {}
+
+def enable_profiling(enabled=True):
+    global _enabled
+    _enabled = enabled
+
+def is_profiling():
+    return _enabled
+
+# 記録した区間・カウンタを空にする
+def reset_profile():
+    _events.clear()
+    _counters.clear()
+
+# 記録した (イベント, カウンタ) を取り出して空にする（プロセスプールのワーカーが1コレクションごとに親へ返す）
+def drain_profile():
+    events, counters = list(_events), dict(_counters)
+    reset_profile()
+    return events, counters
+
+def now_micros():
+    # perf_counter は Linux ではプロセス間で共通の単調時計なので、ワーカーの記録をそのまま並べられる
+    return time.perf_counter() * 1e6
+
+@contextmanager
+def profile_span(name, category, **args):
+    """
+    with の中の経過時間を1つの区間（Chrome trace の "X" イベント）として記録する
+
+    Args:
+        name (str): 区間の名前
+        category (str): "collection" / "query" / "emitter" / "parse" など
+        **args: trace の args に記録する値
+    """
+    if not _enabled:
+        yield
+        return
+    start = now_micros()
+    try:
+        yield
+    finally:
+        _events.append({
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": start,
+            "dur": now_micros() - start,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args,
+        })
+
+def profiled(category, name=None, arg_names=()):
+    """
+    関数の呼び出しを区間として記録するデコレータ
+
+    Args:
+        category (str): 区間のカテゴリ
+        name: 区間の名前（文字列、または引数名 → 値の辞書を受け取って名前を返す関数。省略時は関数名）
+        arg_names (tuple): trace の args に記録する引数名
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = bound.arguments
+            span_name = name(arguments) if callable(name) else (name or func.__name__)
+            with profile_span(span_name, category, **{arg: arguments[arg] for arg in arg_names}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# 呼び出し回数などを数える（trace には累計値の "C" イベントとして記録する）
+def count_event(name, amount=1):
+    if not _enabled:
+        return
+    _counters[name] = _counters.get(name, 0) + amount
+    _events.append({
+        "name": name,
+        "ph": "C",
+        "ts": now_micros(),
+        "pid": os.getpid(),
+        "tid": threading.get_ident(),
+        "args": {"count": _counters[name]},
+    })
+
+def write_trace(path, events=None, counters=None):
+    """
+    記録した区間を Chrome の trace event 形式で書き出す
+
+    Args:
+        path (str): 出力先の JSON
+        events (list): 書き出すイベント（省略時はこのプロセスで記録したもの。バッチ生成ではワーカーの分をまとめて渡す）
+        counters (dict): カウンタの合計（省略時はこのプロセスのもの）
+    """
+    trace = {
+        "traceEvents": _events if events is None else events,
+        "displayTimeUnit": "ms",
+        "otherData": {"counters": _counters if counters is None else counters},
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, mode="w", encoding="utf-8") as f:
+        json.dump(trace, f, ensure_ascii=False, default=str)
+
+def summarize_trace(events):
+    """
+    区間をカテゴリ・名前ごとに集計する
+
+    Args:
+        events (list): trace のイベント
+
+    Returns:
+        list: [(カテゴリ, 名前, 回数, 合計ミリ秒)]（合計の大きい順）
+    """
+    totals = {}
+    for event in events:
+        if event.get("ph") != "X":
+            continue
+        key = (event["cat"], event["name"])
+        count, total = totals.get(key, (0, 0.0))
+        totals[key] = (count + 1, total + event["dur"] / 1000)
+    return sorted(((cat, name, count, total) for (cat, name), (count, total) in totals.items()), key=lambda row: row[3], reverse=True)
+
+def print_profile_summary(events=None, counters=None, limit=20):
+    rows = summarize_trace(_events if events is None else events)
+    print(f"{'category':<10}  {'name':<40}  {'calls':>6}  {'total(ms)':>10}")
+    for category, name, count, total in rows[:limit]:
+        print(f"{category:<10}  {name[:40]:<40}  {count:>6}  {total:>10.2f}")
+    for name, count in sorted((_counters if counters is None else counters).items()):
+        print(f"{name}: {count}")
@@ -0,0 +1,63 @@
+# コレクションのカラム定義の参照表（main.py / generate.py 共通）
+# 条件・SET 句・INSERT 句のたびに column_list を先頭から探す代わりに、
+# コレクションごとに一度だけ作った辞書でカラム・Java の型・getter 名・インデックスを引く
+
+# 参照表のキャッシュ: (id(column_list), 型の対応, getter 名の対応) → (column_list, カラム数, 参照表)
+_schemas = {}
+# 1プロセスで生成するコレクション数の目安（超えたら作り直す）
+MAX_CACHED_SCHEMAS = 256
+
+def build_column_schema(column_list, java_type, getter_name):
+    """
+    カラム定義の参照表を作る
+
+    Args:
+        column_list (list): コレクションのカラム定義
+        java_type (function): variable_type → Java の型（生成モジュールごとの対応表）
+        getter_name (function): カラム名 → getter のメソッド名
+
+    Returns:
+        dict: columns（カラム名 → カラム定義）、java_types（カラム名 → Java の型）、
+              getters（カラム名 → getter 名）、index_types（カラム名 → インデックスの種類）、
+              indexed_columns（インデックス付きのカラム。定義順）
+    """
+    columns = {}
+    for col in column_list:
+        # 同じ名前のカラムが複数ある場合は、従来の先頭からの検索と同じく最初のものを使う
+        columns.setdefault(col["variable_name"], col)
+    return {
+        "columns": columns,
+        "java_types": {name: java_type(col["variable_type"]) for name, col in columns.items()},
+        "getters": {name: getter_name(name) for name in columns},
+        "index_types": {name: col.get("index_type", "none") for name, col in columns.items()},
+        "indexed_columns": [col for col in column_list if col.get("index_type", "none") != "none"],
+    }
+
+def get_column_schema(column_list, java_type, getter_name):
+    """
+    カラム定義の参照表を取得する（同じ column_list に対しては一度だけ作る）
+
+    生成中に column_list の要素を書き換えた場合は反映されないので、定義を変えるときは新しいリストを渡すこと
+
+    Args:
+        column_list (list): コレクションのカラム定義
+        java_type (function): variable_type → Java の型
+        getter_name (function): カラム名 → getter のメソッド名
+
+    Returns:
+        dict: build_column_schema の参照表（共有するので書き換えないこと）
+    """
+    key = (id(column_list), java_type, getter_name)
+    cached = _schemas.get(key)
+    # キャッシュが column_list 自体を保持しているので、id が別のリストに再利用されることはない
+    if cached is not None and cached[0] is column_list and cached[1] == len(column_list):
+        return cached[2]
+    if len(_schemas) >= MAX_CACHED_SCHEMAS:
+        _schemas.clear()
+    schema = build_column_schema(column_list, java_type, getter_name)
+    _schemas[key] = (column_list, len(column_list), schema)
+    return schema
+
+# 参照表のキャッシュを空にする（ベンチマークで毎回作り直すときなど）
+def reset_column_schemas():
+    _schemas.clear()
@@ -0,0 +1,17 @@
+# SELECT の結果を List に溜めずに、MongoCursor から1件ずつデコードして返すための共通処理（main.py / generate.py 共通）
+# find(...).batchSize(n) のカーソルは n 件ずつサーバから取得するので、全件を読んでもヒープに載るのは1バッチ分だけ
+
+# カーソルで1回にサーバから取得する件数（Cursor / Stream 版で batchSize を省略した場合）
+def generate_cursor_fields(default_batch_size=1000):
+    return [
+        f"public static int cursor_batch_size = {default_batch_size};",
+    ]
+
+def generate_cursor_stream_code():
+    return [
+        "// MongoCursor を逐次デコードする Stream にする（Stream を close するとカーソルも閉じる）",
+        "public static <T> Stream<T> streamCursor(MongoCursor<T> cursor) {",
+        "    return StreamSupport.stream(Spliterators.spliteratorUnknownSize(cursor, Spliterator.ORDERED | Spliterator.NONNULL), false)",
+        "        .onClose(cursor::close);",
+        "}",
+    ]
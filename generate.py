@@ -1,4 +1,17 @@
+import argparse
 import json
+import os
+
+from bulk_insert import BULK_INSERT_RESULT_CLASS, generate_bulk_insert_chunks_code, generate_bulk_insert_fields, generate_bulk_insert_result_class, get_bulk_insert_result_type
+from keyset_page import generate_keyset_comparator, generate_keyset_params, generate_keyset_sort, generate_seek_filter, generate_seek_predicate, generate_sorted_top_code, get_keyset_keys, get_last_param_name
+from cursor_stream import generate_cursor_fields, generate_cursor_stream_code
+from codegen_profile import enable_profiling, print_profile_summary, profiled, write_trace
+from column_schema import get_column_schema
+from build_cache import compute_build_key, is_up_to_date, save_manifest, write_if_changed
+from bounded_cache import BOUNDED_CACHE_CLASS, generate_bounded_cache_class, generate_bounded_cache_fields, is_bounded_cache_enabled
+from cache_map import CACHE_MAP_CLASS, generate_cache_map_class
+from change_stream import generate_change_stream_code, generate_change_stream_fields, generate_change_stream_imports, is_change_stream_enabled
+from pojo_codec import generate_codec_class, generate_typed_collection_code, get_codec_class_name
 
 def to_camel_case(snake_str):
     components = snake_str.split('_')
@@ -60,17 +73,417 @@ def generate_cache_key_getter(columns, index_fields):
     return key_getters
 
 def get_index_types(columns, index_fields):
-    index_types = []
-    for field in index_fields:
-        for col in columns:
-            if col["variable_name"] == field:
-                index_types.append(generate_java_type(col["variable_type"]))
-                break
-    return index_types
+    java_types = get_schema(columns)["java_types"]
+    return [java_types[field] for field in index_fields if field in java_types]
+
+def get_getter_method(field):
+    camel = to_camel_case(field)
+    return f"get{camel[0].upper() + camel[1:]}"
+
+# カラムの参照表（カラム名 → 定義・Java の型・getter 名、インデックス付きのカラム）
+def get_schema(columns):
+    return get_column_schema(columns, generate_java_type, get_getter_method)
+
+# インデックスフィールドを取得（優先順位: unique > hash > index）
+def get_index_fields(columns):
+    index_fields = []
+    for col in get_schema(columns)["indexed_columns"]:
+        if col["index_type"] == "unique":
+            index_fields.insert(0, col["variable_name"])
+        elif col["index_type"] == "hash":
+            index_fields.append(col["variable_name"])
+        elif col["index_type"] == "index":
+            index_fields.append(col["variable_name"])
+    return index_fields
+
+
+# 配列カラム（転置インデックスの対象）を取得
+def get_array_columns(columns):
+    return [col for col in columns if col["is_array"]]
+
+# 転置インデックス（要素値 → そのデータの集合）の型
+def get_array_index_type(class_name, col):
+    return f"{CACHE_MAP_CLASS}<{generate_java_type(col['variable_type'])}, {CACHE_MAP_CLASS}<{class_name}, Boolean>>"
+
+# cache_data の値の型（キーが2つの場合は内側のキー → データのマップ）
+def get_cache_value_type(class_name, index_fields, index_types):
+    return class_name if len(index_fields) == 1 else f"{CACHE_MAP_CLASS}<{index_types[1]}, {class_name}>"
+
+# cache_data のスナップショットクラスを生成（データのマップと転置インデックスを1つにまとめ、公開後は変更しない）
+def generate_cache_snapshot_class(class_name, columns, index_fields, index_types):
+    key_type = index_types[0]
+    value_type = get_cache_value_type(class_name, index_fields, index_types)
+    fields = [(f"{CACHE_MAP_CLASS}<{key_type}, {value_type}>", "data")]
+    fields.extend((get_array_index_type(class_name, col), f"array_index_{col['variable_name']}") for col in get_array_columns(columns))
+    declarations = "".join(f"\n        public final {field_type} {name};" for field_type, name in fields)
+    params = ", ".join(f"{field_type} {name}" for field_type, name in fields)
+    assignments = "".join(f"\n            this.{name} = {name};" for _, name in fields)
+    empty_args = ", ".join(f"{CACHE_MAP_CLASS}.empty()" for _ in fields)
+    return f"""
+    // cache_data のスナップショット: データのマップと転置インデックスをまとめて持ち、公開後は変更しない
+    // cacheWrite が変更を反映した新しいスナップショットを作り、cache_data への1回の volatile 代入で公開する
+    public static final class CacheSnapshot extends AbstractMap<{key_type}, {value_type}> {{
+        static final CacheSnapshot EMPTY = new CacheSnapshot({empty_args});{declarations}
+
+        CacheSnapshot({params}) {{{assignments}
+        }}
+
+        @Override
+        public {value_type} get(Object key) {{
+            return data.get(key);
+        }}
+
+        @Override
+        public boolean containsKey(Object key) {{
+            return data.containsKey(key);
+        }}
+
+        @Override
+        public int size() {{
+            return data.size();
+        }}
+
+        @Override
+        public Set<Map.Entry<{key_type}, {value_type}>> entrySet() {{
+            return data.entrySet();
+        }}
+    }}
+"""
+
+# 転置インデックスの集合演算（ANY / ALL）を行うメソッドを生成
+def generate_array_index_members(columns):
+    if not get_array_columns(columns):
+        return ""
+    return f"""
+    // いずれかの値を含むドキュメント（ANY）: 各値の集合の和
+    private static <K, V> Set<V> postingsAny(Map<K, {CACHE_MAP_CLASS}<V, Boolean>> index, Collection<K> values) {{
+        Set<V> result = new LinkedHashSet<>();
+        for (K value : values) {{
+            result.addAll({CACHE_MAP_CLASS}.postings(index, value));
+        }}
+        return result;
+    }}
+
+    // 全ての値を含むドキュメント（ALL）: 小さい集合から順に積を取る
+    private static <K, V> Set<V> postingsAll(Map<K, {CACHE_MAP_CLASS}<V, Boolean>> index, Collection<K> values) {{
+        List<Set<V>> postingsList = new ArrayList<>();
+        for (K value : values) {{
+            Set<V> postings = {CACHE_MAP_CLASS}.postings(index, value);
+            if (postings.isEmpty()) return Collections.emptySet();
+            postingsList.add(postings);
+        }}
+        if (postingsList.isEmpty()) return Collections.emptySet();
+        postingsList.sort(Comparator.comparingInt(Set::size));
+        Set<V> result = new LinkedHashSet<>(postingsList.get(0));
+        for (int i = 1; i < postingsList.size() && !result.isEmpty(); i++) {{
+            result.retainAll(postingsList.get(i));
+        }}
+        return result;
+    }}
+"""
+
+# キャッシュへの書き込み（全件読み込み・memory_update・一括挿入・Change Stream 共通）を行うメソッドを生成
+def generate_cache_write_method(class_name, columns, index_fields, index_types):
+    """
+    公開中のスナップショットは変更せず、CacheMap の with / without で変更したキーの経路だけを作り直した
+    データのマップと転置インデックスから新しいスナップショットを作り、cache_data へ1回代入して公開する。
+    書き込みは synchronized で直列化し、読み取り側はロックを取らずに書き込み前後どちらかの完成したスナップショットを見る
+    （一括挿入や Change Stream の置き換えが途中まで反映された状態や、データと転置インデックスが食い違う状態は見えない）。
+    reset が true の場合は空のスナップショットから作る（全件読み込み）。
+    """
+    array_columns = get_array_columns(columns)
+    value_type = get_cache_value_type(class_name, index_fields, index_types)
+    copies = [
+        "CacheSnapshot current = reset ? CacheSnapshot.EMPTY : cache_data;",
+        "if (current == null) return;",
+        f"{CACHE_MAP_CLASS}<{index_types[0]}, {value_type}> next = current.data;",
+    ]
+    copies.extend(f"{get_array_index_type(class_name, col)} next_array_index_{col['variable_name']} = current.array_index_{col['variable_name']};" for col in array_columns)
+
+    if len(index_fields) == 1:
+        key = get_getter_name(index_fields[0], "data")
+        remove_body = [f"next = next.without({key});"]
+        add_body = [f"next = next.with({key}, data);"]
+        lookup = f"{class_name} old = next.get({key});"
+    else:
+        outer_key = f"String.valueOf({get_getter_name(index_fields[0], 'data')})"
+        inner_key = get_getter_name(index_fields[1], "data")
+        remove_body = [
+            f"{value_type} innerMap = next.get({outer_key});",
+            "if (innerMap == null) continue;",
+            f"innerMap = innerMap.without({inner_key});",
+            f"next = innerMap.isEmpty() ? next.without({outer_key}) : next.with({outer_key}, innerMap);",
+        ]
+        add_body = [
+            f"{value_type} innerMap = next.getOrDefault({outer_key}, {CACHE_MAP_CLASS}.empty());",
+            f"next = next.with({outer_key}, innerMap.with({inner_key}, data));",
+        ]
+        lookup = f"{class_name} old = innerMap.get({inner_key});"
+    if array_columns:
+        # 置き換えた・取り除いたデータを転置インデックスから外し、加えたデータを登録する
+        unindex = ["if (old != null) {"]
+        unindex.extend(f"    next_array_index_{col['variable_name']} = {CACHE_MAP_CLASS}.removePostings(next_array_index_{col['variable_name']}, {get_getter_name(col['variable_name'], 'old')}, old);" for col in array_columns)
+        unindex.append("}")
+        index = [f"next_array_index_{col['variable_name']} = {CACHE_MAP_CLASS}.addPostings(next_array_index_{col['variable_name']}, {get_getter_name(col['variable_name'], 'data')}, data);" for col in array_columns]
+        # old はデータのマップを書き換える前に引く（キーが2つの場合は内側のマップを取得した後）
+        remove_body.insert(2 if len(index_fields) > 1 else 0, lookup)
+        add_body.insert(1 if len(index_fields) > 1 else 0, lookup)
+        remove_body += unindex
+        add_body += unindex + index
+
+    snapshot_args = ", ".join(["next"] + [f"next_array_index_{col['variable_name']}" for col in array_columns])
+    copies_code = "".join("\n        " + line for line in copies)
+    remove_code = "".join("\n            " + line for line in remove_body)
+    add_code = "".join("\n            " + line for line in add_body)
+    return f"""
+    // キャッシュへの書き込み: 変更を反映した新しいスナップショットを作り、cache_data へ1回代入して公開する（全件読み込みは空から作る）
+    private static synchronized void cacheWrite(Collection<{class_name}> removed, Collection<{class_name}> added, boolean reset) {{{copies_code}
+        for ({class_name} data : removed) {{{remove_code}
+        }}
+        for ({class_name} data : added) {{{add_code}
+        }}
+        cache_data = new CacheSnapshot({snapshot_args});
+    }}
+"""
+
+# 配列カラムの条件を転置インデックスの参照式に変換（対象外なら None）。式は読み取ったスナップショット（snapshot）を参照する
+def generate_array_index_lookup(field, match_type, single_flag, param_value, columns):
+    col = get_schema(columns)["columns"].get(field)
+    if not col or not col["is_array"]:
+        return None
+    if single_flag:
+        return f"{CACHE_MAP_CLASS}.postings(snapshot.array_index_{field}, {param_value})"
+    if match_type == "ANY":
+        return f"postingsAny(snapshot.array_index_{field}, {param_value})"
+    return f"postingsAll(snapshot.array_index_{field}, {param_value})"
+
+def generate_array_index_cache_access(class_name, postings, is_limit_one, indent):
+    if is_limit_one:
+        lines = [
+            "CacheSnapshot snapshot = cache_data;",
+            "if (snapshot != null) {",
+            f"    Set<{class_name}> postings = {postings};",
+            f"    {class_name} result = postings.isEmpty() ? null : postings.iterator().next();",
+            "    return DataBaseResultPair.of(result != null, result);",
+            "}",
+        ]
+    else:
+        lines = [
+            "CacheSnapshot snapshot = cache_data;",
+            "if (snapshot != null) {",
+            f"    List<{class_name}> resultList = new ArrayList<>({postings});",
+            "    return DataBaseResultPair.of(!resultList.isEmpty(), resultList);",
+            "}",
+        ]
+    return "\n" + "".join(indent + line + "\n" for line in lines)
+
+
+# WHERE 条件（直接引数版）を cache_data の要素に対する条件式にする（DB のフィルタと同じ結果にならない条件を含む場合は None）
+def generate_cache_where_predicate(where_conditions, columns):
+    conditions = []
+    for condition in where_conditions:
+        field = condition["comparison"]
+        column = get_schema(columns)["columns"].get(field)
+        if column is None or "." in field:
+            return None
+        param_name = f"where_{field}"
+        getter = get_getter_name(field)
+        match_type = condition.get("match_type", None)
+        single_flag = condition.get("single_flag", False)
+        if match_type in ("ANY", "ALL") and column["is_array"]:
+            if single_flag:
+                conditions.append(f"{getter} != null && {getter}.contains({param_name})")
+            elif match_type == "ANY":
+                conditions.append(f"{getter} != null && !Collections.disjoint({getter}, {param_name})")
+            else:
+                conditions.append(f"{getter} != null && {getter}.containsAll({param_name})")
+        elif match_type in ("ANY", "ALL") or column["is_array"]:
+            return None
+        else:
+            compar_type = condition.get("compar_type", "eq")
+            if compar_type == "eq":
+                conditions.append(f"Objects.equals({getter}, {param_name})")
+            elif compar_type == "!=":
+                conditions.append(f"!Objects.equals({getter}, {param_name})")
+            elif compar_type in (">=", "<=", ">", "<"):
+                conditions.append(f"{getter} != null && {getter}.compareTo({param_name}) {compar_type} 0")
+            else:
+                return None
+    return " && ".join(conditions) if conditions else "true"
+
+# WHERE 条件（直接引数版）から、読み取ったスナップショット（snapshot）の候補を取り出す Stream 式を生成
+# 先頭のキーの等価条件があればそのキーのデータだけ、配列カラムの ANY / ALL 条件があれば転置インデックスの集合だけを走査する（無ければ全件）
+def generate_cache_candidate_stream(where_conditions, columns, index_fields):
+    for condition in where_conditions:
+        if condition["comparison"] == index_fields[0] and condition.get("compar_type", "eq") == "eq" and not condition.get("match_type"):
+            param_name = f"where_{index_fields[0]}"
+            if len(index_fields) == 1:
+                return f"Stream.ofNullable(snapshot.get({param_name}))"
+            return f"Stream.ofNullable(snapshot.get(String.valueOf({param_name}))).flatMap(innerMap -> innerMap.values().stream())"
+    for condition in where_conditions:
+        field = condition["comparison"]
+        if condition.get("match_type") in ("ANY", "ALL"):
+            postings = generate_array_index_lookup(field, condition["match_type"], condition.get("single_flag", False), f"where_{field}", columns)
+            if postings:
+                return f"{postings}.stream()"
+    if len(index_fields) == 1:
+        return "snapshot.values().stream()"
+    return "snapshot.values().stream().flatMap(innerMap -> innerMap.values().stream())"
+
+# Many 系 SELECT の keyset（seek）ページング版（ORDER BY + unique キーの範囲条件で次のページを取得する）
+def generate_keyset_page_methods(query, collection_name, class_name, columns, param_variations, filter_clause, index_fields, unique_field):
+    sort = [[s["comparison"], -1 if s["type"] != "asc" else 1] for s in query.get("order", {}).get("sort", [])]
+    keys = get_keyset_keys(sort, columns, unique_field)
+    if not keys:
+        return []
+    method_name = query["method_name"]
+    column_types = {col["variable_name"]: generate_java_type(col["variable_type"]) for col in columns}
+    param_str = ', '.join(f"{param[0]} {param[1]}" for param in param_variations)
+    page_params = generate_keyset_params(keys, column_types.get)
+    key_order = ", ".join(f'{field} {"DESC" if direction == -1 else "ASC"}' for field, direction in keys)
+    last_unique = get_last_param_name(unique_field)
 
+    cache_access = ""
+    predicate = generate_cache_where_predicate(query.get("where", []), columns)
+    if predicate is not None:
+        source_stream = generate_cache_candidate_stream(query.get("where", []), columns, index_fields)
+        where_filter = f"\n                .filter(item -> {predicate})" if predicate != "true" else ""
+        comparator = generate_keyset_comparator(keys, lambda field: f"{class_name}::{get_getter_name(field, '')[1:-2]}")
+        cache_access = f"""
+        CacheSnapshot snapshot = cache_data;
+        if (snapshot != null) {{
+            // 候補を1回走査し、前ページより後ろの先頭 pageSize 件だけを並び替える
+            Stream<{class_name}> candidates = {source_stream}{where_filter}
+                .filter(item -> firstPage || {generate_seek_predicate(keys, get_getter_name)});
+            List<{class_name}> resultList = sortedTop(candidates, {comparator}, pageSize);
+            return DataBaseResultPair.of(!resultList.isEmpty(), resultList);
+        }}"""
+    seek_filter = f"firstPage ? {filter_clause} : Filters.and({filter_clause}, {generate_seek_filter(keys)})" if filter_clause != "new Document()" else f"firstPage ? new Document() : {generate_seek_filter(keys)}"
 
+    methods = []
+    for session_param, session_arg in (("", ""), (", ClientSession session", "session, ")):
+        methods.append(f"""
+// keyset ページング: ({key_order}) の順で前ページ最後のキーより後ろを pageSize 件取得する（最初のページは {last_unique} に null）
+public static DataBaseResultPair<Boolean, List<{class_name}>> {method_name}Page(MongoDatabase db{session_param}{', ' + param_str if param_str else ''}, {page_params}) {{
+    try {{
+        boolean firstPage = {last_unique} == null;{cache_access}
+        MongoCollection<{class_name}> collection = typedCollection(db.getCollection("{collection_name}"));
+        Bson filter = {seek_filter};
+        List<{class_name}> resultList = collection.find({session_arg}filter).sort({generate_keyset_sort(keys)}).limit(pageSize).into(new ArrayList<>());
+        return DataBaseResultPair.of(!resultList.isEmpty(), resultList);
+    }} catch (Exception e) {{
+        return DataBaseResultPair.of(false, Collections.emptyList());
+    }}
+}}""")
+    return methods
 
-def generate_query_methods(query, collection_name, class_name, columns):
+# Many 系 SELECT のカーソル版・Stream 版（結果を List に溜めずに batchSize 件ずつ取得して1件ずつデコードする）
+def generate_cursor_methods(query, collection_name, class_name, columns, param_variations, filter_clause, index_fields):
+    sort = [[s["comparison"], -1 if s["type"] != "asc" else 1] for s in query.get("order", {}).get("sort", [])]
+    limit = query.get("order", {}).get("limit")
+    method_name = query["method_name"]
+    param_str = ', '.join(f"{param[0]} {param[1]}" for param in param_variations)
+    arg_str = ', '.join(param[1] for param in param_variations)
+    find_options = (f".sort({generate_keyset_sort(sort)})" if sort else "") + (f".limit({limit})" if limit else "")
+
+    cache_access = ""
+    predicate = generate_cache_where_predicate(query.get("where", []), columns)
+    # ネストしたフィールドで並び替える場合は getter のメソッド参照で比較できないのでカーソルに任せる
+    column_names = {col["variable_name"] for col in columns}
+    if predicate is not None and all(field in column_names for field, _ in sort):
+        source_stream = generate_cache_candidate_stream(query.get("where", []), columns, index_fields)
+        where_filter = f"\n            .filter(item -> {predicate})" if predicate != "true" else ""
+        comparator = generate_keyset_comparator(sort, lambda field: f"{class_name}::{get_getter_name(field, '')[1:-2]}")
+        if sort and limit:
+            result_stream = f"sortedTop({source_stream}{where_filter}, {comparator}, {limit}).stream()"
+        elif sort:
+            result_stream = f"{source_stream}{where_filter}\n            .sorted({comparator})"
+        else:
+            result_stream = f"{source_stream}{where_filter}" + (f"\n            .limit({limit})" if limit else "")
+        # ORDER BY がある場合は並び替えのために候補を全て読んでから返すので、カーソルのように逐次にはならない
+        not_lazy = "\n        // ORDER BY があるので候補を全て読んで並び替えてから返す（逐次には取り出さない）" if sort else ""
+        cache_access = f"""
+    CacheSnapshot snapshot = cache_data;
+    if (snapshot != null) {{{not_lazy}
+        return {result_stream};
+    }}"""
+
+    methods = []
+    for session_param, session_arg in (("", ""), (", ClientSession session", "session, ")):
+        params = f"MongoDatabase db{session_param}{', ' + param_str if param_str else ''}"
+        args = f"db, {session_arg}{arg_str + ', ' if arg_str else ''}"
+        methods.append(f"""
+// カーソル版: batchSize 件ずつ取得しながら1件ずつデコードする（使い終わったら close すること）
+public static MongoCursor<{class_name}> {method_name}Cursor({params}, int batchSize) {{
+    MongoCollection<{class_name}> collection = typedCollection(db.getCollection("{collection_name}"));
+    return collection.find({session_arg}{filter_clause}){find_options}.batchSize(batchSize).iterator();
+}}
+
+public static MongoCursor<{class_name}> {method_name}Cursor({params}) {{
+    return {method_name}Cursor({args}cursor_batch_size);
+}}
+
+// Stream 版: cache_data があればキャッシュから、無ければカーソルから逐次デコードする（try-with-resources で close すること）
+public static Stream<{class_name}> {method_name}Stream({params}, int batchSize) {{{cache_access}
+    return streamCursor({method_name}Cursor({args}batchSize));
+}}
+
+public static Stream<{class_name}> {method_name}Stream({params}) {{
+    return {method_name}Stream({args}cursor_batch_size);
+}}""")
+    return methods
+
+# WHERE 条件のうち unique キーの等価条件（無ければ None）
+def find_unique_key_condition(where_conditions, unique_field):
+    return next((cond for cond in where_conditions
+                 if cond["comparison"] == unique_field and cond.get("compar_type", "eq") == "eq" and not cond.get("match_type")), None)
+
+# 上限付きキャッシュの read-through（unique キーの等価条件で1件取得する SELECT のみ）
+def generate_bounded_cache_read(class_name, columns, where_conditions, unique_field):
+    """
+    Returns:
+        tuple: (DB を読む前の処理, DB から読んだ doc をキャッシュに追加する処理)。対象外の場合は ("", "")
+    """
+    if find_unique_key_condition(where_conditions, unique_field) is None:
+        return "", ""
+    param_name = f"where_{unique_field}"
+    cached = f"cache_bounded.get({param_name})"
+    if len(where_conditions) > 1:
+        # 残りの条件を満たさない場合は DB で確認する
+        predicate = generate_cache_where_predicate(where_conditions, columns)
+        if predicate is None:
+            return "", ""
+        cached = f"Stream.ofNullable({cached}).filter(item -> {predicate}).findFirst().orElse(null)"
+    read = f"""
+        // 上限付きキャッシュ（unique キーで引いたデータを保持）を確認し、無ければ DB から読んで追加する
+        {class_name} bounded = {cached};
+        if (bounded != null) return DataBaseResultPair.of(true, bounded);
+        long boundedGeneration = cache_bounded.generation();"""
+    return read, f"if (doc != null) cache_bounded.put({param_name}, doc, boundedGeneration); "
+
+# 書き込み後に上限付きキャッシュから対象を外す処理（findOneAndUpdate / findOneAndDelete が返したドキュメントの unique キーで外す）
+def generate_bounded_invalidate(doc_name, columns, unique_field, key_changed=False):
+    if key_changed:
+        # unique キー自体を書き換えた場合、返ってくるのは新しいキーなので全件外す
+        return f"        if ({doc_name} != null) cache_bounded.invalidateAll();\n"
+    key_type = get_schema(columns)["java_types"][unique_field]
+    return f'        if ({doc_name} != null) cache_bounded.invalidate({doc_name}.get("{unique_field}", {key_type}.class));\n'
+
+# updateOne（更新後のドキュメントを受け取らない）の後に上限付きキャッシュから対象を外す処理（prefix は set_data 版の getter の接頭辞）
+def generate_bounded_update_invalidate(where_conditions, unique_field, key_changed, prefix=None):
+    key = None if key_changed else find_unique_key_condition(where_conditions, unique_field)
+    if key is None:
+        return "            if (result.getModifiedCount() > 0) cache_bounded.invalidateAll();\n"
+    key_expr = get_getter_name(unique_field, prefix) if prefix and not key.get("fixed_flag", False) else f"where_{unique_field}"
+    return f"            if (result.getModifiedCount() > 0) cache_bounded.invalidate({key_expr});\n"
+
+# 更新後のドキュメントはキャッシュ対象のカラムだけを受け取る（全件読み込みと同じ射影）
+def generate_post_image_options(columns):
+    projection = ", ".join(f'"{col["variable_name"]}"' for col in columns)
+    return f"new FindOneAndUpdateOptions().projection(Projections.include({projection})).returnDocument(ReturnDocument.AFTER)"
+
+@profiled("query", name=lambda arguments: arguments["query"]["method_name"], arg_names=("collection_name",))
+def generate_query_methods(query, collection_name, class_name, columns, bounded_cache=False):
     method_name = query["method_name"]
     where_conditions = query.get("where", [])
     query_type = query["type"]
@@ -80,17 +493,11 @@ def generate_query_methods(query, collection_name, class_name, columns):
     return_type_many = f"DataBaseResultPair<Boolean, List<{class_name}>>"
 
     # インデックスフィールドを取得（優先順位: unique > hash > index）
-    index_fields = []
-    for col in columns:
-        if col["index_type"] == "unique":
-            index_fields.insert(0, col["variable_name"])
-        elif col["index_type"] == "hash":
-            index_fields.append(col["variable_name"])
-        elif col["index_type"] == "index":
-            index_fields.append(col["variable_name"])
+    index_fields = get_index_fields(columns)
     index_types = get_index_types(columns, index_fields)
-    unique_field = next((col["variable_name"] for col in columns if col["index_type"] == "unique"), None)
-    unique_field_getter = f"get{to_camel_case(unique_field)[0].upper() + to_camel_case(unique_field)[1:]}" if unique_field else None
+    schema = get_schema(columns)
+    unique_field = next((col["variable_name"] for col in schema["indexed_columns"] if col["index_type"] == "unique"), None)
+    unique_field_getter = schema["getters"][unique_field] if unique_field else None
 
     # ソートとリミットの処理
     sort_str = ""
@@ -117,13 +524,12 @@ def generate_query_methods(query, collection_name, class_name, columns):
         match_type = condition.get("match_type", None)
         compar_type = condition.get("compar_type", "eq")
 
-        for col in columns:
-            if col["variable_name"] == field:
-                param_type = generate_java_type(col["variable_type"])
-                is_array = col["is_array"]
-                if is_array and not single_flag:
-                    param_type = f"List<{param_type}>"
-                break
+        col = schema["columns"].get(field)
+        if col is not None:
+            param_type = schema["java_types"][field]
+            is_array = col["is_array"]
+            if is_array and not single_flag:
+                param_type = f"List<{param_type}>"
         if "." in field and "pos" in field:
             param_type = "Double"
         elif field == "zone_id":
@@ -163,18 +569,20 @@ def generate_query_methods(query, collection_name, class_name, columns):
         index_field = next((cond["comparison"] for cond in where_conditions if cond["comparison"] in index_fields), None)
         if index_field:
             param_name = f"where_{index_field.replace('.', '_')}"
-            index_type = next((generate_java_type(col["variable_type"]) for col in columns if col["variable_name"] == index_field), "String")
+            index_type = schema["java_types"].get(index_field, "String")
             if len(index_fields) == 1:
                 cache_access = f"""
-                if (cache_data != null && cache_data.containsKey({param_name})) {{
-                    {class_name} result = cache_data.get({param_name});
+                CacheSnapshot snapshot = cache_data;
+                if (snapshot != null && snapshot.containsKey({param_name})) {{
+                    {class_name} result = snapshot.get({param_name});
                     return DataBaseResultPair.of(result != null, result);
                 }}
 """
             else:
                 cache_access = f"""
-                if (cache_data != null && cache_data.containsKey({param_name})) {{
-                    Map<{index_types[1]}, {class_name}> innerMap = cache_data.get({param_name});
+                CacheSnapshot snapshot = cache_data;
+                if (snapshot != null && snapshot.containsKey({param_name})) {{
+                    Map<{index_types[1]}, {class_name}> innerMap = snapshot.get({param_name});
                     {class_name} result = innerMap != null ? innerMap.values().stream().findFirst().orElse(null) : null;
                     return DataBaseResultPair.of(result != null, result);
                 }}
@@ -184,7 +592,11 @@ def generate_query_methods(query, collection_name, class_name, columns):
         param_name = f"where_{field.replace('.', '_')}"
         match_type = where_conditions[0].get("match_type", None)
         single_flag = where_conditions[0].get("single_flag", False)
-        if is_limit_one:
+        postings = generate_array_index_lookup(field, match_type, single_flag, param_name, columns)
+        if postings:
+            # 配列カラムは転置インデックスの集合演算で候補を取得
+            cache_access = generate_array_index_cache_access(class_name, postings, is_limit_one, "                ")
+        elif is_limit_one:
             cache_access = f"""
                 if (cache_data != null) {{
                     {class_name} result = cache_data.values().stream()
@@ -205,16 +617,24 @@ def generate_query_methods(query, collection_name, class_name, columns):
                 }}
 """
 
+    # Codec で直接デコードした結果を返す
+    if is_limit_one:
+        find_result = f"{class_name} doc = results.first(); return DataBaseResultPair.of(doc != null, doc);"
+    else:
+        find_result = f"List<{class_name}> resultList = results.into(new ArrayList<>()); return DataBaseResultPair.of(!resultList.isEmpty(), resultList);"
+
     # SELECTメソッド（直接引数）
     if query_type == "SELECT":
         param_str = ', '.join(f"{param[0]} {param[1]}" for param in param_variations)
+        # 上限付きキャッシュ（トランザクション内の読み込みはセッションの状態を見るため使わない）
+        bounded_read, bounded_put = generate_bounded_cache_read(class_name, columns, where_conditions, unique_field) if bounded_cache and is_limit_one else ("", "")
         methods.append(f"""
 public static {return_type_single if is_limit_one else return_type_many} {method_name}{'One' if is_limit_one else 'Many'}(MongoDatabase db{', ' + param_str if param_str else ''}) {{
     try {{
-        {cache_access}
-        MongoCollection<Document> collection = db.getCollection("{collection_name}");
-        FindIterable<Document> results = collection.find({filter_clause}){sort_str}{limit_str};
-        {'Document doc = results.first(); return DataBaseResultPair.of(doc != null, doc != null ? new ' + class_name + '(doc) : null);' if is_limit_one else f'List<{class_name}> resultList = new ArrayList<>(); for (Document doc : results) {{ resultList.add(new {class_name}(doc)); }} return DataBaseResultPair.of(!resultList.isEmpty(), resultList);'}
+        {cache_access}{bounded_read}
+        MongoCollection<{class_name}> collection = typedCollection(db.getCollection("{collection_name}"));
+        FindIterable<{class_name}> results = collection.find({filter_clause}){sort_str}{limit_str};
+        {find_result.replace("return ", bounded_put + "return ", 1)}
     }} catch (Exception e) {{
         return DataBaseResultPair.of(false, {'null' if is_limit_one else 'Collections.emptyList()'});
     }}
@@ -225,14 +645,20 @@ public static {return_type_single if is_limit_one else return_type_many} {method
 public static {return_type_single if is_limit_one else return_type_many} {method_name}{'One' if is_limit_one else 'Many'}(MongoDatabase db, ClientSession session{', ' + param_str if param_str else ''}) {{
     try {{
         {cache_access}
-        MongoCollection<Document> collection = db.getCollection("{collection_name}");
-        FindIterable<Document> results = collection.find(session, {filter_clause}){sort_str}{limit_str};
-        {'Document doc = results.first(); return DataBaseResultPair.of(doc != null, doc != null ? new ' + class_name + '(doc) : null);' if is_limit_one else f'List<{class_name}> resultList = new ArrayList<>(); for (Document doc : results) {{ resultList.add(new {class_name}(doc)); }} return DataBaseResultPair.of(!resultList.isEmpty(), resultList);'}
+        MongoCollection<{class_name}> collection = typedCollection(db.getCollection("{collection_name}"));
+        FindIterable<{class_name}> results = collection.find(session, {filter_clause}){sort_str}{limit_str};
+        {find_result}
     }} catch (Exception e) {{
         return DataBaseResultPair.of(false, {'null' if is_limit_one else 'Collections.emptyList()'});
     }}
 }}""")
 
+        # keyset ページング版（直接引数・ClientSession付き）
+        if not is_limit_one:
+            methods.extend(generate_keyset_page_methods(query, collection_name, class_name, columns, param_variations, filter_clause, index_fields, unique_field))
+            # カーソル・Stream 版（直接引数・ClientSession付き）
+            methods.extend(generate_cursor_methods(query, collection_name, class_name, columns, param_variations, filter_clause, index_fields))
+
         # SELECTメソッド（set_data使用）
         extra_args = [(p[0], p[1]) for p in param_variations if any(c["comparison"] == p[1].replace("where_", "") and c.get("fixed_flag", False) for c in where_conditions)]
         extra_args_str = ', '.join(f"{arg[0]} {arg[1]}" for arg in extra_args)
@@ -270,18 +696,20 @@ public static {return_type_single if is_limit_one else return_type_many} {method
         elif any(cond["comparison"] in index_fields for cond in where_conditions):
             index_field = next((cond["comparison"] for cond in where_conditions if cond["comparison"] in index_fields), None)
             if index_field:
-                index_type = next((generate_java_type(col["variable_type"]) for col in columns if col["variable_name"] == index_field), "String")
+                index_type = schema["java_types"].get(index_field, "String")
                 if len(index_fields) == 1:
                     cache_access_data = f"""
-                    if (cache_data != null && cache_data.containsKey(set_data.get{to_camel_case(index_field)[0].upper() + to_camel_case(index_field)[1:]}())) {{
-                        {class_name} result = cache_data.get(set_data.get{to_camel_case(index_field)[0].upper() + to_camel_case(index_field)[1:]}());
+                    CacheSnapshot snapshot = cache_data;
+                    if (snapshot != null && snapshot.containsKey(set_data.get{to_camel_case(index_field)[0].upper() + to_camel_case(index_field)[1:]}())) {{
+                        {class_name} result = snapshot.get(set_data.get{to_camel_case(index_field)[0].upper() + to_camel_case(index_field)[1:]}());
                         return DataBaseResultPair.of(result != null, result);
                     }}
 """
                 else:
                     cache_access_data = f"""
-                    if (cache_data != null && cache_data.containsKey(String.valueOf(set_data.get{to_camel_case(index_fields[0])[0].upper() + to_camel_case(index_fields[0])[1:]}()))) {{
-                        Map<{index_types[1]}, {class_name}> innerMap = cache_data.get(String.valueOf(set_data.get{to_camel_case(index_fields[0])[0].upper() + to_camel_case(index_fields[0])[1:]}()));
+                    CacheSnapshot snapshot = cache_data;
+                    if (snapshot != null && snapshot.containsKey(String.valueOf(set_data.get{to_camel_case(index_fields[0])[0].upper() + to_camel_case(index_fields[0])[1:]}()))) {{
+                        Map<{index_types[1]}, {class_name}> innerMap = snapshot.get(String.valueOf(set_data.get{to_camel_case(index_fields[0])[0].upper() + to_camel_case(index_fields[0])[1:]}()));
                         {class_name} result = innerMap != null ? innerMap.values().stream().findFirst().orElse(null) : null;
                         return DataBaseResultPair.of(result != null, result);
                     }}
@@ -292,7 +720,11 @@ public static {return_type_single if is_limit_one else return_type_many} {method
             single_flag = where_conditions[0].get("single_flag", False)
             fixed_flag = where_conditions[0].get("fixed_flag", False)
             param_value = f"where_{field.replace('.', '_')}" if fixed_flag else f"set_data.get{to_camel_case(field)[0].upper() + to_camel_case(field)[1:]}()"
-            if is_limit_one:
+            postings = generate_array_index_lookup(field, match_type, single_flag, param_value, columns)
+            if postings:
+                # 配列カラムは転置インデックスの集合演算で候補を取得
+                cache_access_data = generate_array_index_cache_access(class_name, postings, is_limit_one, "                    ")
+            elif is_limit_one:
                 cache_access_data = f"""
                     if (cache_data != null) {{
                         {class_name} result = cache_data.values().stream()
@@ -317,9 +749,9 @@ public static {return_type_single if is_limit_one else return_type_many} {method
 public static {return_type_single if is_limit_one else return_type_many} {method_name}{'One' if is_limit_one else 'Many'}(MongoDatabase db, {class_name} set_data{', ' + extra_args_str if extra_args_str else ''}) {{
     try {{
         {cache_access_data}
-        MongoCollection<Document> collection = db.getCollection("{collection_name}");
-        FindIterable<Document> results = collection.find({filter_clause_data}){sort_str}{limit_str};
-        {'Document doc = results.first(); return DataBaseResultPair.of(doc != null, doc != null ? new ' + class_name + '(doc) : null);' if is_limit_one else f'List<{class_name}> resultList = new ArrayList<>(); for (Document doc : results) {{ resultList.add(new {class_name}(doc)); }} return DataBaseResultPair.of(!resultList.isEmpty(), resultList);'}
+        MongoCollection<{class_name}> collection = typedCollection(db.getCollection("{collection_name}"));
+        FindIterable<{class_name}> results = collection.find({filter_clause_data}){sort_str}{limit_str};
+        {find_result}
     }} catch (Exception e) {{
         return DataBaseResultPair.of(false, {'null' if is_limit_one else 'Collections.emptyList()'});
     }}
@@ -329,9 +761,9 @@ public static {return_type_single if is_limit_one else return_type_many} {method
 public static {return_type_single if is_limit_one else return_type_many} {method_name}{'One' if is_limit_one else 'Many'}(MongoDatabase db, ClientSession session, {class_name} set_data{', ' + extra_args_str if extra_args_str else ''}) {{
     try {{
         {cache_access_data}
-        MongoCollection<Document> collection = db.getCollection("{collection_name}");
-        FindIterable<Document> results = collection.find(session, {filter_clause_data}){sort_str}{limit_str};
-        {'Document doc = results.first(); return DataBaseResultPair.of(doc != null, doc != null ? new ' + class_name + '(doc) : null);' if is_limit_one else f'List<{class_name}> resultList = new ArrayList<>(); for (Document doc : results) {{ resultList.add(new {class_name}(doc)); }} return DataBaseResultPair.of(!resultList.isEmpty(), resultList);'}
+        MongoCollection<{class_name}> collection = typedCollection(db.getCollection("{collection_name}"));
+        FindIterable<{class_name}> results = collection.find(session, {filter_clause_data}){sort_str}{limit_str};
+        {find_result}
     }} catch (Exception e) {{
         return DataBaseResultPair.of(false, {'null' if is_limit_one else 'Collections.emptyList()'});
     }}
@@ -346,9 +778,8 @@ public static {return_type_single if is_limit_one else return_type_many} {method
         for set_clause in set_clauses:
             field = set_clause["renewal"]
             details_type = set_clause.get("details_type")
-            java_type = next((col["variable_type"] for col in columns if col["variable_name"] == field), "Object")
-            java_type = generate_java_type(java_type)
-            is_array = next((col["is_array"] for col in columns if col["variable_name"] == field), False)
+            java_type = schema["java_types"].get(field, "Object")
+            is_array = schema["columns"][field]["is_array"] if field in schema["columns"] else False
             set_param_name = f"set_{field}"
             if details_type == "Add" and set_clause.get("fixed_flag", False) and not is_array:
                 update_strs.append(f"inc(\"{field}\", {set_param_name})")
@@ -375,19 +806,29 @@ public static {return_type_single if is_limit_one else return_type_many} {method
                 set_args.append((is_array and f"List<{java_type}>" or java_type, set_param_name))
         update_str = f"combine({', '.join(update_strs)})" if len(update_strs) > 1 else update_strs[0]
         extra_args_str = ', '.join(f"{arg[0]} {arg[1]}" for arg in set_args)
+        key_changed = any(set_clause["renewal"] == unique_field for set_clause in set_clauses)
+        bounded_update = generate_bounded_invalidate("updatedDoc", columns, unique_field, key_changed) if bounded_cache else ""
+        bounded_update_lean = generate_bounded_update_invalidate(where_conditions, unique_field, key_changed) if bounded_cache else ""
+        bounded_update_lean_data = generate_bounded_update_invalidate(where_conditions, unique_field, key_changed, "set_data") if bounded_cache else ""
+        post_image_options = generate_post_image_options(columns)
 
         cache_update = f"""
                 if (memory_update && updatedDoc != null && cache_data != null && "{unique_field}" != null) {{
                     {class_name} updatedData = new {class_name}(updatedDoc);
-                    {'cache_data.put(updatedData.' + unique_field_getter + '(), updatedData);' if len(index_fields) == 1 else f'Map<{index_types[1]}, {class_name}> innerMap = cache_data.computeIfAbsent(String.valueOf(updatedData.' + get_getter_name(index_fields[0], 'updatedData') + '), k -> new HashMap<>()); innerMap.put(updatedData.' + get_getter_name(index_fields[1], 'updatedData') + ', updatedData);'}
+                    cacheWrite(Collections.emptyList(), List.of(updatedData), false);
                 }}
 """
         methods.append(f"""
 public static {return_type_single} {method_name}(MongoDatabase db{', ' + param_str if param_str else ''}{', ' + extra_args_str if extra_args_str else ''}, boolean memory_update) {{
     try {{
         MongoCollection<Document> collection = db.getCollection("{collection_name}");
-        Document updatedDoc = collection.findOneAndUpdate({filter_clause}, Updates.{update_str}, new FindOneAndUpdateOptions().returnDocument(ReturnDocument.AFTER));
-        {cache_update}
+        if (!memory_update || cache_data == null) {{
+            // キャッシュを更新しない場合は更新後のドキュメントを受け取らない
+            UpdateResult result = collection.updateOne({filter_clause}, Updates.{update_str});
+{bounded_update_lean}            return DataBaseResultPair.of(result.getMatchedCount() > 0, null);
+        }}
+        Document updatedDoc = collection.findOneAndUpdate({filter_clause}, Updates.{update_str}, {post_image_options});
+        {cache_update}{bounded_update}
         return DataBaseResultPair.of(updatedDoc != null, null);
     }} catch (Exception e) {{
         return DataBaseResultPair.of(false, null);
@@ -398,8 +839,13 @@ public static {return_type_single} {method_name}(MongoDatabase db{', ' + param_s
 public static {return_type_single} {method_name}(MongoDatabase db, ClientSession session{', ' + param_str if param_str else ''}{', ' + extra_args_str if extra_args_str else ''}, boolean memory_update) {{
     try {{
         MongoCollection<Document> collection = db.getCollection("{collection_name}");
-        Document updatedDoc = collection.findOneAndUpdate(session, {filter_clause}, Updates.{update_str}, new FindOneAndUpdateOptions().returnDocument(ReturnDocument.AFTER));
-        {cache_update}
+        if (!memory_update || cache_data == null) {{
+            // キャッシュを更新しない場合は更新後のドキュメントを受け取らない
+            UpdateResult result = collection.updateOne(session, {filter_clause}, Updates.{update_str});
+{bounded_update_lean}            return DataBaseResultPair.of(result.getMatchedCount() > 0, null);
+        }}
+        Document updatedDoc = collection.findOneAndUpdate(session, {filter_clause}, Updates.{update_str}, {post_image_options});
+        {cache_update}{bounded_update}
         return DataBaseResultPair.of(updatedDoc != null, null);
     }} catch (Exception e) {{
         return DataBaseResultPair.of(false, null);
@@ -431,9 +877,8 @@ public static {return_type_single} {method_name}(MongoDatabase db, ClientSession
         for set_clause in set_clauses:
             field = set_clause["renewal"]
             details_type = set_clause.get("details_type")
-            java_type = next((col["variable_type"] for col in columns if col["variable_name"] == field), "Object")
-            java_type = generate_java_type(java_type)
-            is_array = next((col["is_array"] for col in columns if col["variable_name"] == field), False)
+            java_type = schema["java_types"].get(field, "Object")
+            is_array = schema["columns"][field]["is_array"] if field in schema["columns"] else False
             set_param_name = f"set_{field}"
             getter_name = get_getter_name(field, "set_data")
             if details_type == "Add" and set_clause.get("fixed_flag", False) and not is_array:
@@ -464,15 +909,20 @@ public static {return_type_single} {method_name}(MongoDatabase db, ClientSession
         cache_update_data = f"""
                 if (memory_update && updatedDoc != null && cache_data != null && "{unique_field}" != null) {{
                     {class_name} updatedData = new {class_name}(updatedDoc);
-                    {'cache_data.put(updatedData.' + unique_field_getter + '(), updatedData);' if len(index_fields) == 1 else f'Map<{index_types[1]}, {class_name}> innerMap = cache_data.computeIfAbsent(String.valueOf(updatedData.' + get_getter_name(index_fields[0], 'updatedData') + '), k -> new HashMap<>()); innerMap.put(updatedData.' + get_getter_name(index_fields[1], 'updatedData') + ', updatedData);'}
+                    cacheWrite(Collections.emptyList(), List.of(updatedData), false);
                 }}
 """
         methods.append(f"""
 public static {return_type_single} {method_name}(MongoDatabase db, {class_name} set_data{', ' + extra_args_str_data if extra_args_str_data else ''}, boolean memory_update) {{
     try {{
         MongoCollection<Document> collection = db.getCollection("{collection_name}");
-        Document updatedDoc = collection.findOneAndUpdate({set_filter_clause}, Updates.{set_update_str}, new FindOneAndUpdateOptions().returnDocument(ReturnDocument.AFTER));
-        {cache_update_data}
+        if (!memory_update || cache_data == null) {{
+            // キャッシュを更新しない場合は更新後のドキュメントを受け取らない
+            UpdateResult result = collection.updateOne({set_filter_clause}, Updates.{set_update_str});
+{bounded_update_lean_data}            return DataBaseResultPair.of(result.getMatchedCount() > 0, null);
+        }}
+        Document updatedDoc = collection.findOneAndUpdate({set_filter_clause}, Updates.{set_update_str}, {post_image_options});
+        {cache_update_data}{bounded_update}
         return DataBaseResultPair.of(updatedDoc != null, null);
     }} catch (Exception e) {{
         return DataBaseResultPair.of(false, null);
@@ -483,8 +933,13 @@ public static {return_type_single} {method_name}(MongoDatabase db, {class_name}
 public static {return_type_single} {method_name}(MongoDatabase db, ClientSession session, {class_name} set_data{', ' + extra_args_str_data if extra_args_str_data else ''}, boolean memory_update) {{
     try {{
         MongoCollection<Document> collection = db.getCollection("{collection_name}");
-        Document updatedDoc = collection.findOneAndUpdate(session, {set_filter_clause}, Updates.{set_update_str}, new FindOneAndUpdateOptions().returnDocument(ReturnDocument.AFTER));
-        {cache_update_data}
+        if (!memory_update || cache_data == null) {{
+            // キャッシュを更新しない場合は更新後のドキュメントを受け取らない
+            UpdateResult result = collection.updateOne(session, {set_filter_clause}, Updates.{set_update_str});
+{bounded_update_lean_data}            return DataBaseResultPair.of(result.getMatchedCount() > 0, null);
+        }}
+        Document updatedDoc = collection.findOneAndUpdate(session, {set_filter_clause}, Updates.{set_update_str}, {post_image_options});
+        {cache_update_data}{bounded_update}
         return DataBaseResultPair.of(updatedDoc != null, null);
     }} catch (Exception e) {{
         return DataBaseResultPair.of(false, null);
@@ -494,10 +949,11 @@ public static {return_type_single} {method_name}(MongoDatabase db, ClientSession
     # DELETEメソッド
     if query_type == "DELETE":
         param_str = ', '.join(f"{param[0]} {param[1]}" for param in param_variations)
+        bounded_delete = generate_bounded_invalidate("deletedDoc", columns, unique_field) if bounded_cache else ""
         cache_delete = f"""
                 if (memory_update && deletedDoc != null && cache_data != null && "{unique_field}" != null) {{
                     {class_name} deletedData = new {class_name}(deletedDoc);
-                    {'cache_data.remove(deletedData.' + unique_field_getter + '());' if len(index_fields) == 1 else f'Map<{index_types[1]}, {class_name}> innerMap = cache_data.get(String.valueOf(deletedData.' + get_getter_name(index_fields[0], 'deletedData') + ')); if (innerMap != null) innerMap.remove(deletedData.' + get_getter_name(index_fields[1], 'deletedData') + ');'}
+                    cacheWrite(List.of(deletedData), Collections.emptyList(), false);
                 }}
 """
         methods.append(f"""
@@ -505,7 +961,7 @@ public static {return_type_single} {method_name}(MongoDatabase db{', ' + param_s
     try {{
         MongoCollection<Document> collection = db.getCollection("{collection_name}");
         Document deletedDoc = collection.findOneAndDelete({filter_clause});
-        {cache_delete}
+        {cache_delete}{bounded_delete}
         return DataBaseResultPair.of(deletedDoc != null, null);
     }} catch (Exception e) {{
         return DataBaseResultPair.of(false, null);
@@ -517,7 +973,7 @@ public static {return_type_single} {method_name}(MongoDatabase db, ClientSession
     try {{
         MongoCollection<Document> collection = db.getCollection("{collection_name}");
         Document deletedDoc = collection.findOneAndDelete(session, {filter_clause});
-        {cache_delete}
+        {cache_delete}{bounded_delete}
         return DataBaseResultPair.of(deletedDoc != null, null);
     }} catch (Exception e) {{
         return DataBaseResultPair.of(false, null);
@@ -549,7 +1005,7 @@ public static {return_type_single} {method_name}(MongoDatabase db, ClientSession
         cache_delete_data = f"""
                 if (memory_update && deletedDoc != null && cache_data != null && "{unique_field}" != null) {{
                     {class_name} deletedData = new {class_name}(deletedDoc);
-                    {'cache_data.remove(deletedData.' + unique_field_getter + '());' if len(index_fields) == 1 else f'Map<{index_types[1]}, {class_name}> innerMap = cache_data.get(String.valueOf(deletedData.' + get_getter_name(index_fields[0], 'deletedData') + ')); if (innerMap != null) innerMap.remove(deletedData.' + get_getter_name(index_fields[1], 'deletedData') + ');'}
+                    cacheWrite(List.of(deletedData), Collections.emptyList(), false);
                 }}
 """
         methods.append(f"""
@@ -557,7 +1013,7 @@ public static {return_type_single} {method_name}(MongoDatabase db, {class_name}
     try {{
         MongoCollection<Document> collection = db.getCollection("{collection_name}");
         Document deletedDoc = collection.findOneAndDelete({set_filter_clause});
-        {cache_delete_data}
+        {cache_delete_data}{bounded_delete}
         return DataBaseResultPair.of(deletedDoc != null, null);
     }} catch (Exception e) {{
         return DataBaseResultPair.of(false, null);
@@ -569,7 +1025,7 @@ public static {return_type_single} {method_name}(MongoDatabase db, ClientSession
     try {{
         MongoCollection<Document> collection = db.getCollection("{collection_name}");
         Document deletedDoc = collection.findOneAndDelete(session, {set_filter_clause});
-        {cache_delete_data}
+        {cache_delete_data}{bounded_delete}
         return DataBaseResultPair.of(deletedDoc != null, null);
     }} catch (Exception e) {{
         return DataBaseResultPair.of(false, null);
@@ -580,7 +1036,7 @@ public static {return_type_single} {method_name}(MongoDatabase db, ClientSession
     if query_type == "INSERT":
         cache_insert = f"""
                 if (memory_update && cache_data != null) {{
-                    {'cache_data.put(data.' + unique_field_getter + '(), data);' if len(index_fields) == 1 else f'Map<{index_types[1]}, {class_name}> innerMap = cache_data.computeIfAbsent(String.valueOf(data.' + get_getter_name(index_fields[0], 'data') + '), k -> new HashMap<>()); innerMap.put(data.' + get_getter_name(index_fields[1], 'data') + ', data);'}
+                    cacheWrite(Collections.emptyList(), List.of(data), false);
                 }}
 """
         methods.append(f"""
@@ -611,91 +1067,191 @@ public static {return_type_single} {method_name}(MongoDatabase db, ClientSession
 
 
 
-def generate_db_class(class_name, queries, columns, collection_name):
-    query_methods = "\n".join(generate_query_methods(query, collection_name, class_name, columns) for query in queries) if queries else ""
+# キャッシュ対象カラムだけを取得し、バッチ単位でワーカースレッドにデコードさせる読み込み関数を生成
+def generate_warmup_loader(class_name, columns, change_stream=False):
+    projection = ", ".join(f'"{col["variable_name"]}"' for col in columns)
+    # Change Stream の削除イベント用に _id とデータの対応を記録する
+    decode = """{
+                """ + class_name + """ data = doc.decode(codec);
+                cache_document_ids.put(documentId(doc), data);
+                decoded.add(data);
+            }""" if change_stream else "decoded.add(doc.decode(codec));"
+    return f"""
+    private static List<{class_name}> loadCache{class_name}(MongoDatabase db, int batchSize, int threads, LongConsumer progress) {{
+        int size = Math.max(1, batchSize);
+        // カーソル側はバイト列のまま受け取り、デコードはワーカースレッドで Codec により行う
+        MongoCollection<RawBsonDocument> collection = db.getCollection(collection_name).withDocumentClass(RawBsonDocument.class);
+        FindIterable<RawBsonDocument> results = collection.find()
+            .projection(Projections.include({projection}))
+            .batchSize(size);
+        ExecutorService pool = Executors.newFixedThreadPool(Math.max(1, threads));
+        try {{
+            List<Future<List<{class_name}>>> futures = new ArrayList<>();
+            List<RawBsonDocument> batch = new ArrayList<>(size);
+            for (RawBsonDocument doc : results) {{
+                batch.add(doc);
+                if (batch.size() >= size) {{
+                    futures.add(pool.submit(decode{class_name}Batch(batch)));
+                    batch = new ArrayList<>(size);
+                }}
+            }}
+            if (!batch.isEmpty()) futures.add(pool.submit(decode{class_name}Batch(batch)));
+            List<{class_name}> dataList = new ArrayList<>();
+            for (Future<List<{class_name}>> future : futures) {{
+                dataList.addAll(future.get());
+                if (progress != null) progress.accept(dataList.size());
+            }}
+            return dataList;
+        }} catch (InterruptedException e) {{
+            Thread.currentThread().interrupt();
+            throw new IllegalStateException("cache warm-up interrupted", e);
+        }} catch (ExecutionException e) {{
+            throw new IllegalStateException("cache warm-up failed", e.getCause());
+        }} finally {{
+            pool.shutdown();
+        }}
+    }}
+
+    private static Callable<List<{class_name}>> decode{class_name}Batch(List<RawBsonDocument> docs) {{
+        return () -> {{
+            Codec<{class_name}> codec = {get_codec_class_name(class_name)}.REGISTRY.get({class_name}.class);
+            List<{class_name}> decoded = new ArrayList<>(docs.size());
+            for (RawBsonDocument doc : docs) {decode}
+            return decoded;
+        }};
+    }}
+"""
+
+# Change Stream 監視用のフィールドと関数を生成
+def generate_change_stream_members(class_name):
+    replace_lines = ["cacheWrite(old == null ? Collections.emptyList() : List.of(old), data == null ? Collections.emptyList() : List.of(data), false);"]
+    lines = generate_change_stream_fields(class_name) + [""] + generate_change_stream_code(class_name, f"MemoryCache{class_name}", replace_lines)
+    return "\n" + "\n".join(("    " + line) if line else "" for line in lines) + "\n"
+
+# bounded_cache: 上限付きキャッシュを使う場合はコレクション定義（cache_max_size / cache_ttl_seconds を参照）、使わない場合は None
+@profiled("emitter", name="db class")
+def generate_db_class(class_name, queries, columns, collection_name, change_stream=False, bounded_cache=None):
+    query_methods = "\n".join(generate_query_methods(query, collection_name, class_name, columns, bounded_cache is not None) for query in queries) if queries else ""
     
     # インデックスフィールドを取得（優先順位: unique > hash > index）
-    index_fields = []
-    for col in columns:
-        if col["index_type"] == "unique":
-            index_fields.insert(0, col["variable_name"])
-        elif col["index_type"] == "hash":
-            index_fields.append(col["variable_name"])
-        elif col["index_type"] == "index":
-            index_fields.append(col["variable_name"])
+    index_fields = get_index_fields(columns)
     index_types = get_index_types(columns, index_fields)
 
-    # キャッシュデータ型を動的に生成
-    cache_type = f"Map<{index_types[0]}, {class_name}>" if len(index_fields) == 1 else f"Map<{index_types[0]}, Map<{index_types[1]}, {class_name}>>"
     
     # キャッシュ初期化ロジック
-    cache_init = f"""
-    cache_data = new HashMap<>();
-    MongoCollection<Document> collection = db.getCollection(collection_name);
-    FindIterable<Document> results = collection.find();
-    for (Document doc : results) {{
-        {class_name} data = new {class_name}(doc);
-        {'cache_data.put(' + get_getter_name(index_fields[0], 'data') + ', data);' if len(index_fields) == 1 else f'Map<{index_types[1]}, {class_name}> innerMap = cache_data.computeIfAbsent(String.valueOf(data.' + get_getter_name(index_fields[0], 'data') + '), k -> new HashMap<>()); innerMap.put(String.valueOf(data.' + get_getter_name(index_fields[1], 'data') + '), data);'}
-    }}
+    reset_document_ids = "\n    cache_document_ids = new ConcurrentHashMap<>();" if change_stream else ""
+    cache_init = f"""{reset_document_ids}
+    List<{class_name}> dataList = loadCache{class_name}(db, batchSize, threads, progress);
+    // 新しいスナップショットを作り終えてから差し替える（作っている間も読み取り側は前のキャッシュを使う）
+    cacheWrite(Collections.emptyList(), dataList, true);
 """
+    cache_write = generate_cache_write_method(class_name, columns, index_fields, index_types)
+
+    typed_collection = "\n".join("    " + line for line in generate_typed_collection_code(class_name))
+    cursor_stream = "\n".join(("    " + line).rstrip() for line in generate_cursor_stream_code() + [""] + generate_sorted_top_code())
+    cursor_fields = "\n".join("    " + line for line in generate_cursor_fields())
+    bounded_cache_fields = ""
+    if bounded_cache is not None:
+        # unique キーで引いたデータだけを上限付きで保持する
+        unique_column = next(col for col in get_schema(columns)["indexed_columns"] if col["index_type"] == "unique")
+        bounded_cache_fields = "".join("\n    " + line for line in generate_bounded_cache_fields(bounded_cache, get_schema(columns)["java_types"][unique_column["variable_name"]], class_name))
+
+    # Change Stream による差分更新（任意）
+    change_stream_imports = "".join("\n" + line for line in generate_change_stream_imports()) if change_stream else ""
+    change_stream_members = generate_change_stream_members(class_name) if change_stream else ""
 
     # インデックス作成
     index_creation = ''.join(f'collection.createIndex(Indexes.ascending("{col["variable_name"]}"), new IndexOptions().unique({"true" if col["index_type"] == "unique" else "false"}));' for col in columns if col["index_type"] != "none")
 
-    return f"""import com.mongodb.bulk.BulkWriteResult;
+    result_type = get_bulk_insert_result_type(class_name)
+    bulk_insert_chunks = "\n".join("    " + line if line else "" for line in generate_bulk_insert_chunks_code())
+    bulk_insert_fields = "\n".join("    " + line for line in generate_bulk_insert_fields())
+
+    return f"""import com.mongodb.MongoException;
+import com.mongodb.bulk.BulkWriteResult;
 import com.mongodb.client.ClientSession;
 import com.mongodb.client.FindIterable;
 import com.mongodb.client.MongoCollection;
+import com.mongodb.client.MongoCursor;
 import com.mongodb.client.MongoDatabase;
 import com.mongodb.client.model.*;
 import com.mongodb.client.result.UpdateResult;
 import com.mongodb.client.result.DeleteResult;
 import org.bson.Document;
+import org.bson.RawBsonDocument;
+import org.bson.codecs.Codec;
 import org.bson.conversions.Bson;
+import java.util.AbstractMap;
 import java.util.ArrayList;
+import java.util.Collection;
 import java.util.Collections;
+import java.util.Comparator;
 import java.util.HashMap;
+import java.util.LinkedHashSet;
 import java.util.List;
 import java.util.Map;
 import java.util.Objects;
+import java.util.PriorityQueue;
+import java.util.Set;
+import java.util.Spliterator;
+import java.util.Spliterators;
+import java.util.concurrent.Callable;
+import java.util.concurrent.ExecutionException;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.Executors;
+import java.util.concurrent.Future;
+import java.util.function.Function;
+import java.util.function.LongConsumer;
 import java.util.stream.Collectors;
+import java.util.stream.Stream;
+import java.util.stream.StreamSupport;{change_stream_imports}
 
 public class {class_name.replace("Data","")}Db {{
     public static final String collection_name = "{collection_name}";
-    public static {cache_type} cache_data;
+    // 読み取り側は cache_data を1回読み、そのスナップショットだけを使う
+    public static volatile CacheSnapshot cache_data;{bounded_cache_fields}
+{generate_cache_snapshot_class(class_name, columns, index_fields, index_types)}{generate_array_index_members(columns)}
+    public static int warmup_batch_size = 1000;
+    public static int warmup_threads = Runtime.getRuntime().availableProcessors();
+    public static int bulk_write_chunk_size = 1000;
+{bulk_insert_fields}
+{cursor_fields}
+
+    public static void MemoryCache{class_name}(MongoDatabase db) {{
+        MemoryCache{class_name}(db, warmup_batch_size, warmup_threads, null);
+    }}
 
-    public static void MemoryCache{class_name}(MongoDatabase db) {{{cache_init}
+    public static void MemoryCache{class_name}(MongoDatabase db, int batchSize, int threads, LongConsumer progress) {{{cache_init}
     }}
+{generate_warmup_loader(class_name, columns, change_stream)}{cache_write}
+{typed_collection}
+
+{cursor_stream}
+{change_stream_members}
 
     public static void createIndexes(MongoDatabase db) {{
         MongoCollection<Document> collection = db.getCollection(collection_name);
         {index_creation}
     }}
 
-    public static boolean bulkInsert{class_name}(MongoDatabase db, List<{class_name}> dataList) {{
-        try {{
-            if(cache_data == null) cache_data = new HashMap<>();
-            MongoCollection<Document> collection = db.getCollection(collection_name);
-            List<Document> documents = new ArrayList<>();
-            for ({class_name} data : dataList) {{
-                documents.add(data.toDocument());
-                {'cache_data.put(' + get_getter_name(index_fields[0], 'data') + ', data);' if len(index_fields) == 1 else f'Map<{index_types[1]}, {class_name}> innerMap = cache_data.computeIfAbsent(String.valueOf(data.' + get_getter_name(index_fields[0], 'data') + '), k -> new HashMap<>()); innerMap.put(String.valueOf(data.' + get_getter_name(index_fields[1], 'data') + '), data);'}
-            }}
-            collection.insertMany(documents);
-            return true;
-        }} catch (com.mongodb.MongoWriteException e) {{
-            if (e.getCode() == 11000) {{
-                return false;
-            }}
-            throw e;
-        }} catch (Exception e) {{
-            return false;
-        }}
+    public static {result_type} bulkInsert{class_name}(MongoDatabase db, List<{class_name}> dataList) {{
+        return bulkInsert{class_name}(db, dataList, bulk_write_chunk_size, bulk_insert_parallelism);
+    }}
+
+    // chunkSize 件ずつ ordered(false) で挿入し、挿入できたデータだけをキャッシュに加える
+    public static {result_type} bulkInsert{class_name}(MongoDatabase db, List<{class_name}> dataList, int chunkSize, int parallelism) {{
+        MongoCollection<Document> collection = db.getCollection(collection_name);
+        {result_type} result = bulkInsertChunks(collection, dataList, {class_name}::toDocument, chunkSize, parallelism);
+        cacheWrite(Collections.emptyList(), result.getInserted(dataList), cache_data == null);
+        return result;
     }}
 
+{bulk_insert_chunks}
+
     {query_methods}
 }}
 """
+@profiled("emitter", name="data class")
 def generate_java_class(class_name, columns):
     fields = "\n".join(generate_field_declaration(col) for col in columns)
     getters = "\n".join(generate_getter(col) for col in columns)
@@ -748,29 +1304,70 @@ public class {class_name} {{
 }}
 """
 
-def generate_java_code(json_data, collection_name):
+# BSON から直接データクラスを読み込む Codec を生成
+@profiled("emitter", name="codec")
+def generate_java_codec(class_name, columns, nested_classes=()):
+    fields = []
+    for col in columns:
+        camel_name = to_camel_case(col["variable_name"])
+        fields.append((col["variable_name"], generate_java_type(col["variable_type"]), col["is_array"], f"set{camel_name[0].upper() + camel_name[1:]}"))
+    return "\n".join(generate_codec_class(class_name, fields, nested_classes)) + "\n"
+
+# 生成したファイルを write_path に書き出す
+# 生成したファイルを write_path に書き出す（内容が変わらないファイルは書き換えない）
+def write_generated_file(write_path, file_name, content, verbose=True, written=None):
+    path = os.path.join(write_path, file_name)
+    digest, changed = write_if_changed(path, content)
+    if written is not None:
+        written[path] = digest
+    if verbose:
+        print(f"{'Generated' if changed else 'Unchanged'} {file_name}")
+
+# write_path: 出力先ディレクトリ（既定はカレントディレクトリ）、verbose=False で生成したファイル名を表示しない
+# コレクション定義・ジェネレータが前回と同じで出力も変わっていなければ何もしない（use_build_cache=False で必ず生成する）。戻り値は生成したかどうか
+@profiled("collection", name=lambda arguments: arguments["collection_name"])
+def generate_java_code(json_data, collection_name, write_path=".", verbose=True, use_build_cache=True):
+    os.makedirs(write_path, exist_ok=True)
+    build_key = compute_build_key("json", collection_name, json_data[collection_name])
+    if use_build_cache and is_up_to_date(write_path, f"json_{collection_name}", build_key):
+        if verbose:
+            print(f"Up to date {collection_name}")
+        return False
+    written = {}
     job_type = json_data[collection_name]
     main_class_name = generate_class_name(collection_name)
     main_columns = job_type["column_list"]
     queries = job_type.get("queries", [])
 
-    with open(f"{main_class_name}.java", "w") as f:
-        f.write(generate_java_class(main_class_name, main_columns))
-    print(f"Generated {main_class_name}.java")
+    write_generated_file(write_path, f"{main_class_name}.java", generate_java_class(main_class_name, main_columns), verbose, written)
 
-    with open(f"{main_class_name.replace('Data','')}Db.java", "w") as f:
-        f.write(generate_db_class(main_class_name, queries, main_columns, collection_name))
-    print(f"Generated {main_class_name.replace('Data','')}Db.java")
+    custom_class_names = [generate_class_name(var_type) for custom_var in job_type.get("customVariables", []) for var_type in custom_var]
+    write_generated_file(write_path, f"{get_codec_class_name(main_class_name)}.java", generate_java_codec(main_class_name, main_columns, custom_class_names), verbose, written)
+
+    write_generated_file(write_path, f"{BULK_INSERT_RESULT_CLASS}.java", "\n".join(generate_bulk_insert_result_class()) + "\n", verbose, written)
+    write_generated_file(write_path, f"{CACHE_MAP_CLASS}.java", "\n".join(generate_cache_map_class()) + "\n", verbose, written)
+
+    # cache_mode="bounded" の場合、unique キーで引いたデータだけを上限付きでキャッシュする
+    bounded_cache = job_type if is_bounded_cache_enabled(job_type) else None
+    if bounded_cache is not None:
+        if not any(col["index_type"] == "unique" for col in main_columns):
+            raise ValueError(f"cache_mode=\"bounded\" には unique インデックスのカラムが必要です: {collection_name}")
+        write_generated_file(write_path, f"{BOUNDED_CACHE_CLASS}.java", "\n".join(generate_bounded_cache_class()) + "\n", verbose, written)
+
+    write_generated_file(write_path, f"{main_class_name.replace('Data','')}Db.java", generate_db_class(main_class_name, queries, main_columns, collection_name, is_change_stream_enabled(job_type), bounded_cache), verbose, written)
 
     if "customVariables" in job_type:
         for custom_var in job_type["customVariables"]:
             for var_type, columns in custom_var.items():
                 custom_class_name = generate_class_name(var_type)
-                with open(f"{custom_class_name}.java", "w") as f:
-                    f.write(generate_java_class(custom_class_name, columns))
-                print(f"Generated {custom_class_name}.java")
+                write_generated_file(write_path, f"{custom_class_name}.java", generate_java_class(custom_class_name, columns), verbose, written)
+                write_generated_file(write_path, f"{get_codec_class_name(custom_class_name)}.java", generate_java_codec(custom_class_name, columns), verbose, written)
+
+    save_manifest(write_path, f"json_{collection_name}", build_key, written)
+    return True
 
-def main():
+# profile: 経過時間を Chrome の trace event 形式で書き出すパス（None なら計測しない）
+def main(profile=None):
 
     
     json_data = {
@@ -805,7 +1402,13 @@ def main():
 
 
     
+    enable_profiling(profile is not None)
     generate_java_code(json_data, "item_block_game")
+    if profile:
+        write_trace(profile)
+        print_profile_summary()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="サンプルのコレクション定義からJavaコードを生成する")
+    parser.add_argument("--profile", metavar="TRACE", help="コレクション・クエリ・生成関数ごとの経過時間を Chrome の trace event 形式で TRACE に書き出す")
+    main(parser.parse_args().profile)
\ No newline at end of file
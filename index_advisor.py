@@ -0,0 +1,256 @@
+# クエリ定義（collection_info[...]["queries"]）から必要なインデックスを分析する
+# 等価条件 → ソート → 範囲条件（ESR ルール）の順に複合インデックスを提案し、
+# COLLSCAN になるクエリとインデックスだけで結果を返せる（covered）クエリを判定する
+import argparse
+import json
+import re
+
+# 等価として扱う演算子（IN / ALL もインデックス上は等価条件と同じ位置に置く）
+EQUALITY_OPERATORS = {"=", "IN", "ALL", "ANY"}
+RANGE_OPERATORS = {">", "<", ">=", "<=", "!=", "<>", "LIKE"}
+
+condition_pattern = re.compile(r'^\(?\s*(\w+)\s*(>=|<=|!=|<>|=\s*ANY\s*\(|=|>|<|\bIN\b|\bALL\b|\bLIKE\b)\s*(.*?)\)?$', re.IGNORECASE)
+logical_pattern = re.compile(r'\s+(AND|OR|XOR)\s+', re.IGNORECASE)
+
+def get_existing_indexes(column_list):
+    """
+    column_list の index_type から既存の単一フィールドインデックスを取得する
+
+    Returns:
+        list: {"keys": [[フィールド, 1 or -1]], "type": index_type} のリスト
+    """
+    indexes = []
+    for col in column_list:
+        index_type = col.get("index_type", "none")
+        if index_type == "none":
+            continue
+        direction = -1 if index_type == "descending" else 1
+        indexes.append({"keys": [[col["variable_name"], direction]], "type": index_type})
+    return indexes
+
+def split_where_branches(where_clause):
+    """
+    WHERE 句を OR で区切った分岐ごとの条件リストに分ける（AND は同じ分岐）
+
+    Returns:
+        list: 分岐ごとの [(フィールド, 演算子, 任意引数か)] のリスト
+    """
+    where_clause = re.sub(r'\s+(AND|OR|XOR)\s*$', '', where_clause.strip(), flags=re.IGNORECASE)
+    branches = [[]]
+    parts = logical_pattern.split(where_clause)
+    # parts は [条件, 演算子, 条件, 演算子, ...] の順
+    for i, part in enumerate(parts):
+        if i % 2 == 1:
+            if part.upper() in ("OR", "XOR"):
+                branches.append([])
+            continue
+        match = condition_pattern.match(part.strip())
+        if not match:
+            continue
+        operator = re.sub(r'\s+', '', match.group(2)).upper()
+        operator = "ANY" if operator.startswith("=ANY") else operator
+        branches[-1].append((match.group(1), operator, match.group(3).strip().endswith("?")))
+    return [branch for branch in branches if branch]
+
+def parse_order_by(order_by_clause):
+    sort = []
+    if not order_by_clause:
+        return sort
+    for item in order_by_clause.split(','):
+        field, *direction = item.strip().split()
+        sort.append([field, -1 if direction and direction[0].upper() == "DESC" else 1])
+    return sort
+
+def parse_query_shape(sql):
+    """
+    SQL から操作・WHERE 句・ORDER BY・GROUP BY・SELECT のカラムを取り出す
+
+    Returns:
+        dict: operation / where / order_by / group_by / select_columns
+    """
+    operation = sql.strip().split()[0].lower()
+    where_match = re.search(r'\bWHERE\s+(.*?)(?:\s+GROUP\s+BY\s+|\s+HAVING\s+|\s+ORDER\s+BY\s+|\s+LIMIT\s+\d+|$)', sql, re.IGNORECASE)
+    group_match = re.search(r'\bGROUP\s+BY\s+(.*?)(?:\s+HAVING\s+|\s+ORDER\s+BY\s+|\s+LIMIT\s+\d+|$)', sql, re.IGNORECASE)
+    order_match = re.search(r'\bORDER\s+BY\s+(.*?)(?:\s+LIMIT\s+\d+)?$', sql, re.IGNORECASE)
+    select_match = re.search(r'^\s*SELECT\s+(.*?)\s+FROM\b', sql, re.IGNORECASE)
+    select_columns = None
+    if select_match and select_match.group(1).strip() != "*":
+        select_columns = [name.strip() for name in select_match.group(1).split(',')]
+    return {
+        "operation": operation,
+        "where": where_match.group(1) if where_match else "",
+        "order_by": order_match.group(1) if order_match else "",
+        "group_by": group_match.group(1) if group_match else "",
+        "select_columns": select_columns,
+    }
+
+def build_esr_index(branch, sort, array_fields):
+    """
+    1つの分岐に対して ESR ルールで複合インデックスのキーを組み立てる
+    （必須の等価条件 → 任意引数の等価条件 → ソート → 範囲条件）
+
+    Returns:
+        tuple: (キーのリスト [[フィールド, 方向]], 除外した配列フィールド)
+    """
+    required_equality = [field for field, op, optional in branch if op in EQUALITY_OPERATORS and not optional]
+    optional_equality = [field for field, op, optional in branch if op in EQUALITY_OPERATORS and optional]
+    ranges = [field for field, op, _ in branch if op in RANGE_OPERATORS]
+    keys = []
+    seen = set()
+    for field, direction in [[f, 1] for f in required_equality + optional_equality] + sort + [[f, 1] for f in ranges]:
+        if field not in seen:
+            seen.add(field)
+            keys.append([field, direction])
+    # 配列フィールド（マルチキー）は1つの複合インデックスに1つまで
+    skipped = []
+    array_in_keys = False
+    result = []
+    for field, direction in keys:
+        if field in array_fields:
+            if array_in_keys:
+                skipped.append(field)
+                continue
+            array_in_keys = True
+        result.append([field, direction])
+    return result, skipped
+
+def is_branch_indexed(branch, sort, existing_indexes):
+    # 既存の単一フィールドインデックスで条件かソートのどれかを処理できるか（hash は等価条件のみ）
+    for index in existing_indexes:
+        field = index["keys"][0][0]
+        for cond_field, op, optional in branch:
+            if cond_field == field and not optional and (index["type"] != "hash" or op in EQUALITY_OPERATORS):
+                return True
+        if not branch and sort and sort[0][0] == field and index["type"] != "hash":
+            return True
+    return False
+
+def is_index_prefix(prefix, keys):
+    return len(prefix) <= len(keys) and keys[:len(prefix)] == prefix
+
+def analyze_queries(collection_info, collection=None):
+    """
+    コレクションのクエリ定義を分析し、インデックスの提案レポートを作る
+
+    Args:
+        collection_info (dict): main.py / generate.py と同じ形式のコレクション情報
+        collection (str): 対象コレクション名（省略時は先頭のコレクション）
+
+    Returns:
+        dict: JSON にそのまま書き出せるレポート
+    """
+    collection = collection or next(iter(collection_info))
+    detail = collection_info[collection]
+    column_list = detail["column_list"]
+    array_fields = {col["variable_name"] for col in column_list if col.get("is_array", False)}
+    existing_indexes = get_existing_indexes(column_list)
+    unique_fields = {col["variable_name"] for col in column_list if col.get("index_type", "none") == "unique"}
+
+    query_reports = []
+    recommended = []
+    for item in detail.get("queries", []):
+        shape = parse_query_shape(item["query"])
+        report = {"method_name": item["method_name"], "sql": item["query"], "operation": shape["operation"]}
+        query_reports.append(report)
+        if shape["operation"] not in ("select", "update", "delete"):
+            report["plan"] = "NONE"
+            continue
+        # GROUP BY の ORDER BY は集計結果の並び替えなのでインデックスでは処理できない
+        sort = parse_order_by(shape["order_by"]) if shape["operation"] == "select" and not shape["group_by"] else []
+        branches = split_where_branches(shape["where"]) if shape["where"] else []
+        indexed = all(is_branch_indexed(branch, sort, existing_indexes) for branch in (branches or [[]]))
+        report["branches"] = [
+            {
+                "equality": [field for field, op, _ in branch if op in EQUALITY_OPERATORS],
+                "range": [field for field, op, _ in branch if op in RANGE_OPERATORS],
+                "optional": [field for field, _, optional in branch if optional],
+            }
+            for branch in branches
+        ]
+        report["sort"] = sort
+        report["plan"] = "IXSCAN" if indexed else "COLLSCAN"
+        if not indexed:
+            report["collscan_reason"] = "no filter or sort" if not branches and not sort else "no index on filter fields"
+
+        report["recommended_indexes"] = []
+        for branch in (branches or [[]]):
+            # unique カラムの等価条件があれば1件に絞れるので、その単一インデックスで十分
+            unique_field = next((field for field, op, optional in branch if field in unique_fields and op == "=" and not optional), None)
+            keys, skipped = ([[unique_field, 1]], []) if unique_field else build_esr_index(branch, sort, array_fields)
+            if not keys:
+                continue
+            report["recommended_indexes"].append(keys)
+            if skipped:
+                report.setdefault("skipped_array_fields", []).extend(skipped)
+            recommended.append((keys, item["method_name"]))
+
+        # インデックス + projection だけで返せるか（配列は covered にならない、OR は分岐ごとに別インデックス）
+        covered = False
+        if shape["operation"] == "select" and shape["select_columns"] and not shape["group_by"] and len(report["recommended_indexes"]) == 1:
+            index_fields = {field for field, _ in report["recommended_indexes"][0]}
+            used_fields = set(shape["select_columns"]) | {field for branch in branches for field, _, _ in branch} | {field for field, _ in sort}
+            covered = used_fields <= index_fields and not (used_fields & array_fields)
+        report["covered"] = covered
+
+    # 他の提案の先頭部分になっている提案・既存インデックスと同じ提案はまとめる
+    merged = []
+    for keys, method_name in sorted(recommended, key=lambda entry: -len(entry[0])):
+        for entry in merged:
+            if is_index_prefix(keys, entry["keys"]):
+                entry["queries"].append(method_name)
+                break
+        else:
+            merged.append({"keys": keys, "queries": [method_name]})
+    existing_keys = [index["keys"] for index in existing_indexes]
+    compound = [entry for entry in merged if len(entry["keys"]) > 1 or entry["keys"] not in existing_keys]
+    for entry in compound:
+        entry["queries"] = sorted(set(entry["queries"]))
+
+    return {
+        "collection": collection,
+        "existing_indexes": existing_indexes,
+        "queries": query_reports,
+        "recommended_indexes": compound,
+        "collscan_queries": [report["method_name"] for report in query_reports if report["plan"] == "COLLSCAN"],
+        "covered_queries": [report["method_name"] for report in query_reports if report.get("covered")],
+    }
+
+def generate_recommended_index_code(report):
+    """
+    提案された複合インデックスの createIndex 呼び出しを生成する
+
+    Returns:
+        list: createIndexes 内に置く Java 文
+    """
+    java_code = []
+    for entry in report["recommended_indexes"]:
+        keys = ", ".join(f'Indexes.{"descending" if direction == -1 else "ascending"}("{field}")' for field, direction in entry["keys"])
+        java_code.append(f'// ESR: {", ".join(entry["queries"])}')
+        if len(entry["keys"]) == 1:
+            java_code.append(f'collection.createIndex({keys});')
+        else:
+            java_code.append(f'collection.createIndex(Indexes.compoundIndex({keys}));')
+    return java_code
+
+def write_index_report(report, path):
+    with open(path, mode="w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Generated {path}")
+    return path
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="クエリ定義からインデックスを提案する")
+    parser.add_argument("collection_json", help="コレクション情報（column_list / queries）の JSON ファイル")
+    parser.add_argument("--collection", help="対象コレクション名（省略時は先頭）")
+    parser.add_argument("--output", help="レポートの出力先（省略時は標準出力）")
+    args = parser.parse_args()
+    with open(args.collection_json, encoding="utf-8") as f:
+        collection_info = json.load(f)
+    report = analyze_queries(collection_info, args.collection)
+    if args.output:
+        write_index_report(report, args.output)
+    else:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main_cli()
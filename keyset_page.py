@@ -0,0 +1,124 @@
+# Many 系の SELECT に keyset（seek）ページング版のメソッドを追加するための共通処理（main.py / generate.py 共通）
+# skip / limit ではなく「前ページ最後の並び替えキーより後ろ」を範囲条件で取得するので、
+# 何ページ目でもインデックス上の走査量は pageSize 件分で変わらない
+
+def get_keyset_keys(sort, columns, unique_field):
+    """
+    ページングの並び替えキーを決める（ORDER BY の後ろに unique キーを足して順序を一意にする）
+
+    Args:
+        sort (list): [[フィールド, 1 or -1]] の ORDER BY
+        columns (list): カラム定義
+        unique_field (str): unique インデックスのカラム（無ければ None）
+
+    Returns:
+        list: [[フィールド, 1 or -1]]（unique キーが無い・配列や未知のカラムで並び替える場合は None）
+    """
+    if not unique_field:
+        return None
+    column_map = {col["variable_name"]: col for col in columns}
+    keys = []
+    for field, direction in sort:
+        column = column_map.get(field)
+        if not column or column.get("is_array", False):
+            return None
+        keys.append([field, direction])
+        if field == unique_field:
+            # unique キーより後ろのキーは順序に影響しない
+            return keys
+    keys.append([unique_field, 1])
+    return keys
+
+def get_last_param_name(field):
+    return f'last_{field.replace(".", "_")}'
+
+def generate_keyset_params(keys, java_type):
+    # 前ページ最後の並び替えキー（最初のページは null）とページサイズ
+    params = [f'{java_type(field)} {get_last_param_name(field)}' for field, _ in keys]
+    params.append('int pageSize')
+    return ', '.join(params)
+
+def generate_keyset_sort(keys):
+    sorts = ", ".join(f'Sorts.{"descending" if direction == -1 else "ascending"}("{field}")' for field, direction in keys)
+    return f'Sorts.orderBy({sorts})'
+
+# 1つのキーで前ページ最後の値より後ろを表すフィルタ（null は昇順で先頭、降順で末尾に並ぶ）
+def generate_seek_key_filter(field, direction):
+    last = get_last_param_name(field)
+    if direction == -1:
+        # 降順で null より後ろは無い。値の後ろはより小さい値と null
+        return f'({last} == null ? Filters.in("{field}", Collections.emptyList()) : Filters.or(Filters.lt("{field}", {last}), Filters.eq("{field}", null)))'
+    # 昇順で null より後ろは null 以外のすべて
+    return f'({last} == null ? Filters.ne("{field}", null) : Filters.gt("{field}", {last}))'
+
+def generate_seek_filter(keys):
+    """
+    前ページ最後のキーより後ろを表すフィルタ
+    （a DESC, id ASC なら a < last_a OR (a == last_a AND id > last_id)。前ページ最後のキーが null の場合も続きを取得できる）
+    """
+    branches = []
+    for i, (field, direction) in enumerate(keys):
+        conditions = [f'Filters.eq("{prev}", {get_last_param_name(prev)})' for prev, _ in keys[:i]]
+        conditions.append(generate_seek_key_filter(field, direction))
+        branches.append(conditions[0] if len(conditions) == 1 else f'Filters.and({", ".join(conditions)})')
+    return branches[0] if len(branches) == 1 else f'Filters.or({", ".join(branches)})'
+
+# generate_seek_key_filter と同じ条件を要素に対して評価する式
+def generate_seek_key_predicate(value, direction, last):
+    if direction == -1:
+        return f'{last} != null && ({value} == null || {value}.compareTo({last}) < 0)'
+    return f'{value} != null && ({last} == null || {value}.compareTo({last}) > 0)'
+
+def generate_seek_predicate(keys, getter):
+    """
+    generate_seek_filter と同じ条件を cache_data の要素に対して評価する式（null の並び順は generate_keyset_comparator と同じ）
+
+    Args:
+        keys (list): get_keyset_keys の結果
+        getter (callable): フィールド名 → 要素の getter 呼び出し（例: data.getBalance()）
+    """
+    branches = []
+    for i, (field, direction) in enumerate(keys):
+        conditions = [f'Objects.equals({getter(prev)}, {get_last_param_name(prev)})' for prev, _ in keys[:i]]
+        conditions.append(f'({generate_seek_key_predicate(getter(field), direction, get_last_param_name(field))})')
+        branches.append(" && ".join(conditions))
+    return branches[0] if len(branches) == 1 else " || ".join(f'({branch})' for branch in branches)
+
+def generate_keyset_comparator(keys, getter_reference):
+    """
+    cache_data をページングと同じ順に並べる Comparator（MongoDB と同じく null は昇順で先頭、降順で末尾）
+
+    Args:
+        keys (list): get_keyset_keys の結果
+        getter_reference (callable): フィールド名 → getter のメソッド参照（例: XCollectionData::getBalance）
+    """
+    comparators = []
+    for i, (field, direction) in enumerate(keys):
+        order = "Comparator.nullsLast(Collections.reverseOrder())" if direction == -1 else "Comparator.nullsFirst(Comparator.naturalOrder())"
+        comparators.append(f'{"Comparator.comparing" if i == 0 else ".thenComparing"}({getter_reference(field)}, {order})')
+    return "".join(comparators)
+
+def generate_sorted_top_code():
+    """
+    cache_data の候補から並び順で先頭の limit 件を取り出すメソッド（全件を並び替えず、limit 件のヒープだけを保持して1回走査する）
+    """
+    return [
+        "// 並び順で先頭から limit 件を返す（全件を並び替えず、limit 件のヒープだけを保持する）",
+        "public static <T> List<T> sortedTop(Stream<T> items, Comparator<? super T> comparator, int limit) {",
+        "    List<T> result = new ArrayList<>();",
+        "    if (limit <= 0) return result;",
+        "    // 逆順のヒープにして、保持している中で最も後ろに並ぶ要素を先頭に置く",
+        "    PriorityQueue<T> heap = new PriorityQueue<>(comparator.reversed());",
+        "    items.forEachOrdered(item -> {",
+        "        if (heap.size() < limit) {",
+        "            heap.offer(item);",
+        "        } else if (comparator.compare(item, heap.peek()) < 0) {",
+        "            heap.poll();",
+        "            heap.offer(item);",
+        "        }",
+        "    });",
+        "    result.addAll(heap);",
+        "    result.sort(comparator);",
+        "    return result;",
+        "}",
+    ]
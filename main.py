@@ -1,9 +1,24 @@
+import argparse
 import sqlparse
-import re
 import os
 from textwrap import indent
 import json
 
+from index_advisor import analyze_queries, generate_recommended_index_code, parse_order_by, parse_query_shape, write_index_report
+from cursor_stream import generate_cursor_fields, generate_cursor_stream_code
+from keyset_page import generate_keyset_comparator, generate_keyset_params, generate_keyset_sort, generate_seek_filter, generate_seek_predicate, get_keyset_keys, get_last_param_name
+from change_stream import generate_change_stream_code, generate_change_stream_fields, generate_change_stream_imports, is_change_stream_enabled
+from pojo_codec import generate_codec_class, generate_typed_collection_code, get_codec_class_name
+from build_cache import compute_build_key, is_up_to_date, open_generated, save_manifest
+from codegen_profile import count_event, enable_profiling, print_profile_summary, profile_span, profiled, write_trace
+from column_schema import get_column_schema
+from bounded_cache import BOUNDED_CACHE_CLASS, generate_bounded_cache_class, generate_bounded_cache_fields, is_bounded_cache_enabled
+from cache_map import CACHE_MAP_CLASS, generate_cache_map_class
+from bulk_insert import generate_bulk_insert_chunks_code, generate_bulk_insert_fields, generate_bulk_insert_result_class, get_bulk_insert_result_type, BULK_INSERT_RESULT_CLASS
+from sql_aggregate import find_aggregate, generate_aggregate_pipeline, generate_cache_aggregate_code, generate_cache_predicate, generate_compare_aggregate_values_code, get_having_args, parse_aggregate_query
+from reactive_async import ASYNC_DRIVERS, convert_to_reactive, generate_reactive_helpers, generate_reactive_imports
+from sql_tokenizer import arg_pattern, and_pattern, equality_pattern, mongo_op_pattern, or_xor_pattern, scan_statement, split_conditions, tokenize_where
+
 # 比較演算子のマッピング
 comparison_operators = {
     '>=': 'gte',
@@ -79,6 +94,8 @@ collection_info_money_user = {
             {"query": "SELECT * FROM user_game_player WHERE player_id = arg1 AND", "method_name": "findPlayerGameData"},
             {"query": "UPDATE user_game_player SET balance = balance + arg1? WHERE player_id = arg2 AND", "method_name": "addBalance"},
             {"query": "UPDATE user_game_player SET job_id = arg1 WHERE player_id = arg2 AND", "method_name": "changeJobID"},
+            {"query": "SELECT job_id, COUNT(*), SUM(balance) FROM user_game_player GROUP BY job_id", "method_name": "sumBalanceByJob"},
+            {"query": "SELECT job_id, AVG(balance) AS average FROM user_game_player WHERE balance >= arg1 GROUP BY job_id HAVING COUNT(*) > arg2 ORDER BY average DESC LIMIT 10", "method_name": "findRichJobs"},
         ]
     }
 }
@@ -220,29 +237,21 @@ collection_info_zone_type= {
     }
 }
 
-# コレクション情報から引数の型を取得
-def get_arg_type(collection, arg_name, sql, collection_info):
-    arg_name = arg_name.replace(";","").strip()
-    if collection not in collection_info:
-        return "Object"
-
-    # SET句、INSERT句、WHERE句からフィールドと引数の対応を抽出
-    set_clause = re.search(r'SET\s+(.*?)\s*WHERE', sql, re.IGNORECASE)
-    insert_clause = re.search(r'INSERT INTO \w+\s*\((.*?)\)\s*VALUES\s*\((.*?)\)', sql, re.IGNORECASE)
-    where_clause = re.search(r'WHERE\s+(.*)', sql, re.IGNORECASE)
+# 配列操作の特別判定
+def is_array_operation(value):
+    """値が配列操作を含むか判定"""
+    return any(op in value for op in [' + ', ' - ', ' ALL ', ' IN ', ' ANY('])
 
-    # Java型マッピング
-    type_mapping = {
-        "String": "String",
-        "int": "Integer",
-        "double": "Double",
-        "Date": "Date"
-    }
-    
-    # 配列操作の特別判定
-    def is_array_operation(value):
-        """値が配列操作を含むか判定"""
-        return any(op in value for op in [' + ', ' - ', ' ALL ', ' IN ', ' ANY('])
+# SET句、INSERT句、WHERE句を先頭から順に見て (引数名, 型) を返す（同じ引数は最初のものが優先）
+def iter_arg_types(collection, sql, collection_info):
+    # SET句、INSERT句、WHERE句からフィールドと引数の対応を抽出（文ごとに一度だけ切り出す）
+    statement = scan_statement(sql)
+    set_clause = statement["set_clause"]
+    insert_clause = statement["insert_clause"]
+    where_clause = statement["where_clause"]
+    schema = get_collection_schema(collection_info, collection)
+    columns = schema["columns"]
+    java_types = schema["java_types"]
 
     # SET句の解析
     if set_clause:
@@ -251,22 +260,19 @@ def get_arg_type(collection, arg_name, sql, collection_info):
             value = value.rstrip(';').strip()
             
             # arg{数値} を抽出
-            arg_match = re.search(r'arg\d+', value)
+            arg_match = arg_pattern.search(value)
             if arg_match:
                 value = arg_match.group(0)
-                if value == arg_name:
-                    for col in collection_info[collection]["column_list"]:
-                        if col["variable_name"] == field:
-                            element_type = col["variable_type"]
-                            
-                            # 配列操作が含まれている場合
-                            if is_array_operation(set_item):
-                                # 配列操作の場合、要素の型を返す
-                                return type_mapping.get(element_type, "Object")
-                            
-                            if col.get("is_array", False):
-                                return f"List<{type_mapping.get(element_type, 'Object')}>"
-                            return type_mapping.get(element_type, "Object")
+                col = columns.get(field)
+                if col is not None:
+                    # 配列操作が含まれている場合
+                    if is_array_operation(set_item):
+                        # 配列操作の場合、要素の型を返す
+                        yield value, java_types[field]
+                    elif col.get("is_array", False):
+                        yield value, f"List<{java_types[field]}>"
+                    else:
+                        yield value, java_types[field]
 
     # INSERT句の解析
     if insert_clause:
@@ -276,21 +282,20 @@ def get_arg_type(collection, arg_name, sql, collection_info):
             value = value.rstrip(';').strip()
             
             # arg{数値} を抽出
-            arg_match = re.search(r'arg\d+', value)
+            arg_match = arg_pattern.search(value)
             if arg_match:
                 value = arg_match.group(0)
-                if value == arg_name:
-                    for col in collection_info[collection]["column_list"]:
-                        if col["variable_name"] == field:
-                            element_type = col["variable_type"]
-                            if col.get("is_array", False):
-                                return f"List<{type_mapping.get(element_type, 'Object')}>"
-                            return type_mapping.get(element_type, "Object")
+                col = columns.get(field)
+                if col is not None:
+                    if col.get("is_array", False):
+                        yield value, f"List<{java_types[field]}>"
+                    else:
+                        yield value, java_types[field]
 
     # WHERE句の解析（強化版）
     if where_clause:
         # 条件をAND/ORで分割
-        conditions = re.split(r'\bAND\b|\bOR\b', where_clause.group(1), flags=re.IGNORECASE)
+        conditions = split_conditions(where_clause.group(1))
         
         for condition in conditions:
             condition = condition.strip()
@@ -301,14 +306,10 @@ def get_arg_type(collection, arg_name, sql, collection_info):
                 value = value.rstrip(';').strip()
                 
                 # arg{数値} を抽出
-                arg_match = re.search(r'arg\d+', value)
-                if arg_match and arg_match.group(0) == arg_name:
+                arg_match = arg_pattern.search(value)
+                if arg_match:
                     # ALL演算子の値は常に配列
-                    for col in collection_info[collection]["column_list"]:
-                        if col["variable_name"] == field:
-                            element_type = col["variable_type"]
-                            return f"List<{type_mapping.get(element_type, 'Object')}>"
-                    return "List<Object>"
+                    yield arg_match.group(0), get_list_arg_type(schema, field)
             
             # IN演算子の処理
             if ' IN ' in condition.upper():
@@ -316,14 +317,10 @@ def get_arg_type(collection, arg_name, sql, collection_info):
                 value = value.rstrip(';').strip()
                 
                 # arg{数値} を抽出
-                arg_match = re.search(r'arg\d+', value)
-                if arg_match and arg_match.group(0) == arg_name:
+                arg_match = arg_pattern.search(value)
+                if arg_match:
                     # IN演算子の値は常に配列
-                    for col in collection_info[collection]["column_list"]:
-                        if col["variable_name"] == field:
-                            element_type = col["variable_type"]
-                            return f"List<{type_mapping.get(element_type, 'Object')}>"
-                    return "List<Object>"
+                    yield arg_match.group(0), get_list_arg_type(schema, field)
             
             # ANY演算子の処理
             if '= ANY(' in condition.upper():
@@ -331,14 +328,10 @@ def get_arg_type(collection, arg_name, sql, collection_info):
                 value = value.rstrip(')').strip()
                 
                 # arg{数値} を抽出
-                arg_match = re.search(r'arg\d+', value)
-                if arg_match and arg_match.group(0) == arg_name:
+                arg_match = arg_pattern.search(value)
+                if arg_match:
                     # ANY演算子の値は常に配列
-                    for col in collection_info[collection]["column_list"]:
-                        if col["variable_name"] == field:
-                            element_type = col["variable_type"]
-                            return f"List<{type_mapping.get(element_type, 'Object')}>"
-                    return "List<Object>"
+                    yield arg_match.group(0), get_list_arg_type(schema, field)
             
             # 通常の比較演算子
             for op in comparison_operators.keys():
@@ -351,82 +344,75 @@ def get_arg_type(collection, arg_name, sql, collection_info):
                     value = value.rstrip(';').strip()
                     
                     # arg{数値} を抽出
-                    arg_match = re.search(r'arg\d+', value)
+                    arg_match = arg_pattern.search(value)
                     if arg_match:
                         value = arg_match.group(0)
-                        if value == arg_name:
-                            for col in collection_info[collection]["column_list"]:
-                                if col["variable_name"] == field:
-                                    element_type = col["variable_type"]
-                                    if col.get("is_array", False):
-                                        # 配列フィールドの比較は単一要素
-                                        return type_mapping.get(element_type, "Object")
-                                    return type_mapping.get(element_type, "Object")
+                        if field in columns:
+                            # 配列フィールドの比較は単一要素
+                            yield value, java_types[field]
+
+# ALL / IN / ANY の引数の型（カラムが無ければ List<Object>）
+def get_list_arg_type(schema, field):
+    if field in schema["columns"]:
+        return f"List<{schema['java_types'][field]}>"
+    return "List<Object>"
 
-    return "Object"
+# コレクション情報から引数の型をまとめて取得（SQLは一度だけ走査し、すべての引数の型が決まった時点で打ち切る）
+def get_arg_types(collection, arg_names, sql, collection_info):
+    arg_types = {}
+    remaining = set(arg_names)
+    if collection in collection_info and remaining:
+        for arg_name, java_type in iter_arg_types(collection, sql, collection_info):
+            if arg_name in remaining:
+                arg_types[arg_name] = java_type
+                remaining.discard(arg_name)
+                if not remaining:
+                    break
+    return {arg_name: arg_types.get(arg_name, "Object") for arg_name in arg_names}
+
+# コレクション情報から引数の型を取得
+def get_arg_type(collection, arg_name, sql, collection_info):
+    arg_name = arg_name.replace(";","").strip()
+    return get_arg_types(collection, [arg_name], sql, collection_info)[arg_name]
 
 def clean_value(value):
     """値から不要なセミコロンや空白を除去"""
     return value.rstrip(';').strip()
 
 # WHERE句を解析してMongoDBフィルターに変換
-def parse_where_clause(where_clause, collection_info, collection, auto_index=True, is_with_data=False):
+# auto_index=True の場合に WHERE 句へ追加する条件の決め方
+# "planner": 追加しない。$exists: true はインデックス全体を走査するだけで絞り込みにならず、
+#            unique / hash インデックスの等価条件がある場合は余計な条件でプランナが別のインデックスを選ぶことがある
+# "exists" : 従来通り、条件に無いインデックス付きカラムすべてに Filters.exists を追加する
+AUTO_INDEX_MODES = ("planner", "exists")
+
+def validate_auto_index_mode(mode):
+    if mode not in AUTO_INDEX_MODES:
+        raise ValueError(f"auto_index_mode は {AUTO_INDEX_MODES} のいずれかを指定してください: {mode}")
+    return mode
+
+# 条件に追加するインデックス用の Filters.exists（mode は AUTO_INDEX_MODES のいずれか）
+def get_auto_index_filters(filters, collection_info, collection, mode="planner"):
+    if mode == "planner":
+        return []
+    exists_filters = []
+    for col in get_collection_schema(collection_info, collection)["indexed_columns"]:
+        if col.get("index_type", "none") in ["ascending", "descending", "hash", "unique"]:
+            field = col["variable_name"]
+            # 既にそのフィールドに対する条件が無い場合のみ追加
+            if not any(f'"{field}"' in f for f in filters):
+                exists_filters.append(f'Filters.exists("{field}")')
+    return exists_filters
+
+def parse_where_clause(where_clause, collection_info, collection, auto_index=True, is_with_data=False, auto_index_mode="planner"):
     if not where_clause:
         return 'new Document()'
 
-    conditions = []
-    current_condition = ""
-    parenthesis_level = 0
-    i = 0
-    while i < len(where_clause):
-        char = where_clause[i]
-        if char == '(':
-            parenthesis_level += 1
-        elif char == ')':
-            parenthesis_level -= 1
-        elif parenthesis_level == 0 and char == ' ' and i + 3 < len(where_clause):
-            next_part = where_clause[i+1:i+4].upper()
-            if next_part in ['AND', 'OR ', 'XOR']:
-                if current_condition:
-                    conditions.append(current_condition.strip())
-                    current_condition = ""
-                i += 4 if next_part != 'OR ' else 3
-                continue
-        current_condition += char
-        i += 1
-    if current_condition:
-        conditions.append(current_condition.strip())
-
-    # 条件を再分割して論理演算子を正確に処理
-    final_conditions = []
+    # 括弧の外の AND / OR / XOR で条件に分割したトークン列
+    tokens = tokenize_where(where_clause)
+    final_conditions = [text for kind, text in tokens if kind == "condition"]
+    # 論理演算子は従来通り結合に使わない（条件はすべて AND で結合する）
     logical_operators = []
-    for condition in conditions:
-        parts = []
-        current = ""
-        paren_level = 0
-        i = 0
-        while i < len(condition):
-            char = condition[i]
-            if char == '(':
-                paren_level += 1
-            elif char == ')':
-                paren_level -= 1
-            elif paren_level == 0 and char == ' ' and i + 3 < len(condition):
-                next_part = condition[i+1:i+4].upper()
-                if next_part in ['AND', 'OR ', 'XOR']:
-                    if current:
-                        parts.append((current.strip(), next_part.strip()))
-                        current = ""
-                    i += 4 if next_part != 'OR ' else 3
-                    continue
-            current += char
-            i += 1
-        if current:
-            parts.append((current.strip(), None))
-        for cond, op in parts:
-            final_conditions.append(cond)
-            if op:
-                logical_operators.append(op.lower())
 
     # フィルタ生成
     filters = []
@@ -456,8 +442,7 @@ def parse_where_clause(where_clause, collection_info, collection, auto_index=Tru
                 field, value = [clean_value(x) for x in condition.split(op, 1)]
                 
                 # カラム情報を取得
-                field_info = next((col for col in collection_info[collection]["column_list"] 
-                                 if col["variable_name"] == field), None)
+                field_info = get_collection_schema(collection_info, collection)["columns"].get(field)
                 if not field_info:
                     continue
                     
@@ -487,12 +472,7 @@ def parse_where_clause(where_clause, collection_info, collection, auto_index=Tru
 
     # インデックスの自動追加
     if auto_index:
-        for col in collection_info[collection]["column_list"]:
-            if col.get("index_type", "none") in ["ascending", "descending", "hash", "unique"]:
-                field = col["variable_name"]
-                # 既にそのフィールドに対する条件が無い場合のみ追加
-                if not any(f'"{field}"' in f for f in filters):
-                    filters.append(f'Filters.exists("{field}")')
+        filters.extend(get_auto_index_filters(filters, collection_info, collection, auto_index_mode))
 
     # フィルタの結合処理
     if not filters:
@@ -542,55 +522,32 @@ def generate_bulk_operations(collection_info):
     java_code = []
     collection = next(iter(collection_info))
     class_name = snake_to_pascal(collection.capitalize())
+    result_type = get_bulk_insert_result_type(f'{class_name}CollectionData')
     java_code.append('@SuppressWarnings({"java:S3776", "unused"})')
-    java_code.append(f'public static boolean bulkInsert{class_name}(MongoDatabase db, List<{class_name}CollectionData> dataList) {{')
-    java_code.append('    try {')
-    java_code.append(f'        MongoCollection<Document> collection = db.getCollection("{collection}");')
-    java_code.append('        List<Document> documents = new ArrayList<>();')
-    java_code.append(f'        for ({class_name}CollectionData data : dataList)' + '{')
-    java_code.append('            documents.add(data.toDocument());')
-    java_code.append('        }')
-    java_code.append('        collection.insertMany(documents);')
-    java_code.append('        return true;')
-    java_code.append('    } catch (com.mongodb.MongoWriteException e) {')
-    java_code.append('        if (e.getCode() == 11000) {')
-    java_code.append('            return false;')
-    java_code.append('        }')
-    java_code.append('        throw e;')
-    java_code.append('    } catch (Exception e) {')
-    java_code.append('        return false;')
-    java_code.append('    }')
+    java_code.append(f'public static {result_type} bulkInsert{class_name}(MongoDatabase db, List<{class_name}CollectionData> dataList) {{')
+    java_code.append(f'    return bulkInsert{class_name}(db, dataList, bulk_write_chunk_size, bulk_insert_parallelism);')
+    java_code.append('}')
+    java_code.append('')
+    java_code.append('// chunkSize 件ずつ ordered(false) で挿入し、重複キー等で失敗したデータを結果に残す')
+    java_code.append('@SuppressWarnings({"java:S3776", "unused"})')
+    java_code.append(f'public static {result_type} bulkInsert{class_name}(MongoDatabase db, List<{class_name}CollectionData> dataList, int chunkSize, int parallelism) {{')
+    java_code.append(f'    MongoCollection<Document> collection = db.getCollection("{collection}");')
+    java_code.append(f'    return bulkInsertChunks(collection, dataList, {class_name}CollectionData::toDocument, chunkSize, parallelism);')
     java_code.append('}')
     
 
     java_code.append('@SuppressWarnings({"java:S3776", "unused"})')
     java_code.append(f'public static boolean bulkUpdate{class_name}(MongoDatabase db, List<{class_name}CollectionData> dataList) {{')
+    java_code.append(f'    return bulkUpdate{class_name}(db, dataList, bulk_write_chunk_size, bulk_write_ordered);')
+    java_code.append('}')
+    java_code.append('')
+    java_code.append('// chunkSize 件ずつ書き込む。ordered=false の場合は途中の失敗で残りの書き込みを止めない')
+    java_code.append('@SuppressWarnings({"java:S3776", "unused"})')
+    java_code.append(f'public static boolean bulkUpdate{class_name}(MongoDatabase db, List<{class_name}CollectionData> dataList, int chunkSize, boolean ordered) {{')
     java_code.append('    try {')
     java_code.append(f'        MongoCollection<Document> collection = db.getCollection("{collection}");')
-    java_code.append('        List<WriteModel<Document>> updates = new ArrayList<>();')
-    java_code.append(f'        for ({class_name}CollectionData data : dataList)' + '{')
-    java_code.append('            List<Bson> filters = new ArrayList<>();')
-    for col in collection_info[collection]["column_list"]:
-        field = col["variable_name"]
-        java_code.append(f'            if (data.is{field.capitalize()}Flag()) {{')
-        java_code.append(f'                filters.add(Filters.eq("{field}", data.get{field.capitalize()}()));')
-        java_code.append('            }')
-    java_code.append('            Bson filter = filters.isEmpty() ? new Document() : Filters.and(filters);')
-    java_code.append('            List<Bson> updateOps = new ArrayList<>();')
-    for col in collection_info[collection]["column_list"]:
-        field = col["variable_name"]
-        java_code.append(f'            if (data.is{field.capitalize()}Flag()) {{')
-        java_code.append(f'                updateOps.add(Updates.set("{field}", data.get{field.capitalize()}()));')
-        java_code.append('            }')
-    java_code.append('            if (!updateOps.isEmpty()) {')
-    java_code.append('                updates.add(new UpdateManyModel<>(filter, Updates.combine(updateOps)));')
-    java_code.append('            }')
-    java_code.append('        }')
-    java_code.append('        if (!updates.isEmpty()) {')
-    java_code.append('            BulkWriteResult result = collection.bulkWrite(updates);')
-    java_code.append('            return result.getModifiedCount() > 0;')
-    java_code.append('        }')
-    java_code.append('        return false;')
+    java_code.append(f'        List<WriteModel<Document>> updates = bulkUpdateModels{class_name}(dataList);')
+    java_code.extend('        ' + line for line in generate_bulk_write_with_invalidate(collection_info, collection, "chunkSize, ordered"))
     java_code.append('    } catch (Exception e) {')
     java_code.append('        return false;')
     java_code.append('    }')
@@ -598,30 +555,207 @@ def generate_bulk_operations(collection_info):
 
     return java_code
 
-# SQLを解析してMongoDB用Javaコードを生成（単一引数版）
-def parse_sql_to_mongodb_single(sql, method_name, collection_info, auto_index=True,is_transaction = False):
+# bulkUpdate の書き込みを生成する。途中のチャンクで失敗しても前のチャンクは反映済みなので、上限付きキャッシュは finally で外す
+def generate_bulk_write_with_invalidate(collection_info, collection, chunk_args, cache_owner=""):
+    write = f'long modified = bulkWriteChunks(collection, updates, {chunk_args});'
+    invalidate = generate_bounded_invalidate_code(collection_info, collection, list_name="dataList", cache_owner=cache_owner)
+    if not invalidate:
+        return [write, 'return modified > 0;']
+    java_code = ['try {', f'    {write}', '    return modified > 0;', '} finally {']
+    java_code.extend('    ' + line for line in invalidate)
+    java_code.append('}')
+    return java_code
+
+# bulkUpdate の設定（1回の bulkWrite に含める件数・順序保証）のフィールドを生成
+def generate_bulk_write_fields(default_chunk_size=1000):
+    return [
+        f'  public static int bulk_write_chunk_size = {default_chunk_size};',
+        '  public static boolean bulk_write_ordered = false;',
+    ]
+
+# bulkUpdate で更新対象を特定するキー（1件に決まる unique のみ。hash は複数件に一致するので使わない）
+def get_bulk_update_key(collection_info, collection):
+    columns = [col for col in get_cache_index_columns(collection_info, collection) if col["index_type"] == "unique"]
+    return columns[0] if columns else None
+
+def generate_bulk_update_models_code(collection_info):
+    """
+    bulkUpdate 用の WriteModel を作る関数を生成する
+
+    unique キーのフラグが立っているデータはキーの値だけで対象を特定し（インデックスで検索される）、
+    キー以外のフラグ付きフィールドを UpdateOneModel で更新する。
+    unique キーが無い、またはキーのフラグが立っていないデータは従来通りフラグ付きの全フィールドで対象を特定する。
+
+    Args:
+        collection_info (dict): コレクション情報
+
+    Returns:
+        list: Java コードの行リスト
+    """
+    java_code = []
+    collection = next(iter(collection_info))
+    class_name = snake_to_pascal(collection.capitalize())
+    data_class = f'{class_name}CollectionData'
+    columns = collection_info[collection]["column_list"]
+    key = get_bulk_update_key(collection_info, collection)
+    java_code.append(f'public static List<WriteModel<Document>> bulkUpdateModels{class_name}(List<{data_class}> dataList) {{')
+    java_code.append('    List<WriteModel<Document>> updates = new ArrayList<>();')
+    java_code.append(f'    for ({data_class} data : dataList) {{')
+    indent = '        '
+    if key is not None:
+        key_field = key["variable_name"]
+        java_code.append(f'        if (data.is{key_field.capitalize()}Flag()) {{')
+        java_code.append('            List<Bson> updateOps = new ArrayList<>();')
+        for col in columns:
+            field = col["variable_name"]
+            if field == key_field:
+                continue
+            java_code.append(f'            if (data.is{field.capitalize()}Flag()) {{')
+            java_code.append(f'                updateOps.add(Updates.set("{field}", data.get{field.capitalize()}()));')
+            java_code.append('            }')
+        java_code.append('            if (!updateOps.isEmpty()) {')
+        java_code.append(f'                updates.add(new UpdateOneModel<>(Filters.eq("{key_field}", data.get{key_field.capitalize()}()), Updates.combine(updateOps)));')
+        java_code.append('            }')
+        java_code.append('            continue;')
+        java_code.append('        }')
+    # キーで特定できない場合は従来通りフラグ付きの全フィールドで対象を特定する（ここに来るのはキーのフラグが立っていないデータなのでキーは見ない）
+    fallback_columns = [col for col in columns if key is None or col["variable_name"] != key["variable_name"]]
+    java_code.append(f'{indent}List<Bson> filters = new ArrayList<>();')
+    for col in fallback_columns:
+        field = col["variable_name"]
+        java_code.append(f'{indent}if (data.is{field.capitalize()}Flag()) {{')
+        java_code.append(f'{indent}    filters.add(Filters.eq("{field}", data.get{field.capitalize()}()));')
+        java_code.append(f'{indent}}}')
+    java_code.append(f'{indent}Bson filter = filters.isEmpty() ? new Document() : Filters.and(filters);')
+    java_code.append(f'{indent}List<Bson> updateOps = new ArrayList<>();')
+    for col in fallback_columns:
+        field = col["variable_name"]
+        java_code.append(f'{indent}if (data.is{field.capitalize()}Flag()) {{')
+        java_code.append(f'{indent}    updateOps.add(Updates.set("{field}", data.get{field.capitalize()}()));')
+        java_code.append(f'{indent}}}')
+    java_code.append(f'{indent}if (!updateOps.isEmpty()) {{')
+    java_code.append(f'{indent}    updates.add(new UpdateManyModel<>(filter, Updates.combine(updateOps)));')
+    java_code.append(f'{indent}}}')
+    java_code.append('    }')
+    java_code.append('    return updates;')
+    java_code.append('}')
+    return java_code
+
+# WriteModel を chunkSize 件ずつ bulkWrite する関数を生成（同期ドライバ版）
+def generate_bulk_write_chunks_code():
+    return [
+        "// 更新件数の合計を返す",
+        "public static long bulkWriteChunks(MongoCollection<Document> collection, List<WriteModel<Document>> models, int chunkSize, boolean ordered) {",
+        "    BulkWriteOptions options = new BulkWriteOptions().ordered(ordered);",
+        "    int size = Math.max(1, chunkSize);",
+        "    long modified = 0;",
+        "    for (int from = 0; from < models.size(); from += size) {",
+        "        BulkWriteResult result = collection.bulkWrite(models.subList(from, Math.min(from + size, models.size())), options);",
+        "        modified += result.getModifiedCount();",
+        "    }",
+        "    return modified;",
+        "}",
+    ]
+
+# SQLを一度だけ解析して中間表現を生成（全エミッタで共有）
+# --profile で生成関数ごとの区間に付ける名前（非同期版は " async"、トランザクション版は " transaction" を付ける）
+def emitter_span_name(kind):
+    return lambda arguments: f"{kind}{' async' if arguments.get('is_async') else ''}{' transaction' if arguments.get('is_transaction') else ''}"
+
+@profiled("parse", arg_names=("sql",))
+def parse_sql_query(sql, collection_info, auto_index_mode="planner"):
+    """
+    SQLクエリを解析し、各 parse_sql_to_mongodb_* に渡す中間表現を生成する
+
+    sqlparse による解析、テーブル名・引数の抽出、引数型の判定、各句の切り出し（scan_statement）を
+    クエリごとに一度だけ行い、結果を辞書にまとめる。WHERE句のフィルタ変換結果は
+    get_where_filter で遅延生成してキャッシュする。
+
+    Args:
+        sql (str): 解析するSQLクエリ
+        collection_info (dict): コレクション情報
+        auto_index_mode (str): auto_index=True のときに WHERE 句へ追加する条件の決め方（AUTO_INDEX_MODES）
+
+    Returns:
+        dict: 解析済みクエリ
+    """
+    count_event("sqlparse.parse")
     parsed = sqlparse.parse(sql)[0]
     operation = parsed.get_type().lower()
-    java_code = []
 
-    table_match = re.search(r'\bFROM\s+(\w+)|INTO\s+(\w+)', sql, re.IGNORECASE)
+    statement = scan_statement(sql)
+    table_match = statement["table"]
     collection = table_match.group(1) or table_match.group(2) if table_match else next(iter(collection_info))
-    args = sorted(set(re.findall(r'arg\d+', sql)), key=lambda x: int(x[3:]))
+    args = statement["args"]
+    arg_types = get_arg_types(collection, args, sql, collection_info)
+    arg_params = ', '.join(f'{arg_types[arg]} {arg}' for arg in args)
+    new_params, optional_flag = process_args(sql, arg_params)
+    limit_match = statement["limit"]
+
+    # SELECT のカラム指定（* や未知のカラムを含む場合は None = ドキュメント全体）
+    select_columns = None
+    select_match = statement["select_columns"]
+    if operation == "select" and select_match:
+        column_names = get_collection_schema(collection_info, collection)["columns"] if collection in collection_info else {}
+        selected = [name.strip() for name in select_match.group(1).split(',')]
+        if all(name in column_names for name in selected):
+            select_columns = list(dict.fromkeys(selected))
+
+    return {
+        "sql": sql,
+        "operation": operation,
+        "collection": collection,
+        "args": args,
+        "arg_params": arg_params,
+        "new_params": new_params,
+        "optional_flag": optional_flag,
+        "limit_match": limit_match,
+        "limit_value": int(limit_match.group(1)) if limit_match else None,
+        "select_columns": select_columns,
+        "insert_fields": statement["insert_fields"],
+        "set_clause": statement["set_clause"],
+        "where_clause": statement["where_clause"],
+        "select_where_clause": statement["select_where_clause"],
+        "where_filters": {},
+        "auto_index_mode": validate_auto_index_mode(auto_index_mode),
+        # GROUP BY・集計関数を含む SELECT の解析結果（それ以外は None）
+        "aggregate": parse_aggregate_query(parsed, collection_info[collection]["column_list"]) if operation == "select" and collection in collection_info else None,
+    }
+
+# 解析済みクエリに対する WHERE句フィルタを取得（同じ条件の変換は一度だけ）
+def get_where_filter(parsed_query, where_clause, collection_info, collection, auto_index=True, is_with_data=False):
+    auto_index_mode = parsed_query["auto_index_mode"]
+    key = (where_clause, collection, auto_index, is_with_data, auto_index_mode)
+    where_filters = parsed_query["where_filters"]
+    if key not in where_filters:
+        where_filters[key] = parse_where_clause(where_clause, collection_info, collection, auto_index=auto_index, is_with_data=is_with_data, auto_index_mode=auto_index_mode)
+    return where_filters[key]
+
+# SQLを解析してMongoDB用Javaコードを生成（単一引数版）
+@profiled("emitter", name=emitter_span_name("single"), arg_names=("method_name", "auto_index"))
+def parse_sql_to_mongodb_single(sql, method_name, collection_info, auto_index=True,is_transaction = False, parsed_query=None, auto_index_mode="planner"):
+    if parsed_query is None:
+        parsed_query = parse_sql_query(sql, collection_info, auto_index_mode)
+    operation = parsed_query["operation"]
+    java_code = []
+
+    collection = parsed_query["collection"]
+    args = parsed_query["args"]
     class_name = snake_to_pascal(collection.capitalize())
     # 引数の型をcollection_infoから正確に取得
-    fields = re.search(r'\((.*?)\)\s*VALUES\s*\((.*?)\)', sql, re.IGNORECASE)
+    fields = parsed_query["insert_fields"]
     if fields:
         field_list = [f.strip() for f in fields.group(1).split(',')]
         arg_params = ', '.join(
-            f'{next(col["variable_type"] for col in collection_info[collection]["column_list"] if col["variable_name"] == field)} {args[i]}'
+            f'{get_collection_schema(collection_info, collection)["columns"][field]["variable_type"]} {args[i]}'
             for i, field in enumerate(field_list)
         )
     else:
-        arg_params = ', '.join(f'{get_arg_type(collection, arg, sql, collection_info)} {arg}' for arg in args)
+        arg_params = parsed_query["arg_params"]
     
     java_code.append('@SuppressWarnings({"java:S3776", "unused"})')
     if operation == "insert":
-        fields = re.search(r'\((.*?)\)\s*VALUES\s*\((.*?)\)', sql, re.IGNORECASE)
+        fields = parsed_query["insert_fields"]
         if fields:
             field_list = [f.strip() for f in fields.group(1).split(',')]
             args = [a.strip() for a in fields.group(2).split(',')]
@@ -644,8 +778,8 @@ def parse_sql_to_mongodb_single(sql, method_name, collection_info, auto_index=Tr
             java_code.append('}')
 
     elif operation == "update":
-        set_clause = re.search(r'SET\s+(.*?)\s*WHERE', sql, re.IGNORECASE)
-        where_clause = re.search(r'WHERE\s+(.*)', sql, re.IGNORECASE)
+        set_clause = parsed_query["set_clause"]
+        where_clause = parsed_query["where_clause"]
         java_code.append(f'public static boolean {method_name}{"Transaction" if is_transaction else ""}(MongoDatabase db, {"ClientSession session" if is_transaction else ""}{"," if arg_params != "" else ""}{arg_params}) {{')
         java_code.append('    try {')
         java_code.append(f'        MongoCollection<Document> collection = db.getCollection("{collection}");')
@@ -653,9 +787,8 @@ def parse_sql_to_mongodb_single(sql, method_name, collection_info, auto_index=Tr
             updates = []
             for set_item in set_clause.group(1).split(','):
                 field, value = [x.strip() for x in set_item.split('=')]
-                mongo_op_match = re.match(r'\$(\w+)\((.*?)\)', value.strip())
-                field_info = next((col for col in collection_info[collection]["column_list"] 
-                    if col["variable_name"] == field), None)
+                mongo_op_match = mongo_op_pattern.match(value.strip())
+                field_info = get_collection_schema(collection_info, collection)["columns"].get(field)
                 is_array = field_info.get("is_array", False) if field_info else False
                 
                 # 配列操作の特別処理
@@ -703,12 +836,14 @@ def parse_sql_to_mongodb_single(sql, method_name, collection_info, auto_index=Tr
             java_code.append(f'        Bson update = Updates.combine({", ".join(updates)});')
 
         if where_clause:
-            filters = parse_where_clause(where_clause.group(1), collection_info, collection, auto_index=auto_index)
+            filters = get_where_filter(parsed_query, where_clause.group(1), collection_info, collection, auto_index=auto_index)
             java_code.append(f'        Bson filter = {filters};')
             java_code.append(f'        UpdateResult result = collection.updateOne({"session," if is_transaction else ""}filter, update);')
+            java_code.extend('        ' + line for line in generate_bounded_invalidate_code(collection_info, collection, where_clause.group(1)))
             java_code.append('        return result.getMatchedCount() > 0;')
         else:
             java_code.append(f'        UpdateResult result = collection.updateOne({"session," if is_transaction else ""}new Document(), update);')
+            java_code.extend('        ' + line for line in generate_bounded_invalidate_code(collection_info, collection))
             java_code.append('        return result.getMatchedCount() > 0;')
         java_code.append('    } catch (Exception e) {')
         java_code.append('        return false;')
@@ -716,17 +851,19 @@ def parse_sql_to_mongodb_single(sql, method_name, collection_info, auto_index=Tr
         java_code.append('}')
 
     elif operation == "delete":
-        where_clause = re.search(r'WHERE\s+(.*)', sql, re.IGNORECASE)
+        where_clause = parsed_query["where_clause"]
         java_code.append(f'public static boolean {method_name}{"Transaction" if is_transaction else ""}(MongoDatabase db, {"ClientSession session" if is_transaction else ""}{"," if arg_params != "" else ""}{arg_params}) {{')
         java_code.append('    try {')
         java_code.append(f'        MongoCollection<Document> collection = db.getCollection("{collection}");')
         if where_clause:
-            filters = parse_where_clause(where_clause.group(1), collection_info, collection, auto_index=auto_index)
+            filters = get_where_filter(parsed_query, where_clause.group(1), collection_info, collection, auto_index=auto_index)
             java_code.append(f'        Bson filter = {filters};')
             java_code.append('        DeleteResult result = collection.deleteOne(filter);')
+            java_code.extend('        ' + line for line in generate_bounded_invalidate_code(collection_info, collection, where_clause.group(1)))
             java_code.append('        return result.getDeletedCount() > 0;')
         else:
             java_code.append(f'        DeleteResult result = collection.deleteOne({"session," if is_transaction else ""}new Document());')
+            java_code.extend('        ' + line for line in generate_bounded_invalidate_code(collection_info, collection))
             java_code.append('        return result.getDeletedCount() > 0;')
         java_code.append('    } catch (Exception e) {')
         java_code.append('        return false;')
@@ -734,13 +871,17 @@ def parse_sql_to_mongodb_single(sql, method_name, collection_info, auto_index=Tr
         java_code.append('}')
         
     elif operation == "select":
-        where_clause = re.search(r'WHERE\s+(.*?)(?:\s*(?:ORDER\s+BY\s+(.*?)|LIMIT\s+\d+))?$', sql, re.IGNORECASE)
+        where_clause = parsed_query["select_where_clause"]
         order_by_clause = where_clause.group(2) if where_clause and where_clause.group(2) else None
         where_conditions = where_clause.group(1) if where_clause else None
-        limit_match = re.search(r'LIMIT\s+(\d+)', sql, re.IGNORECASE)
+        limit_match = parsed_query["limit_match"]
         limit_value = int(limit_match.group(1)) if limit_match else None
         return_type = f'{class_name}CollectionData' if limit_value == 1 else f'List<{class_name}CollectionData>'
         return_value = 'null' if limit_value == 1 else 'Collections.emptyList()'
+        # SELECT a, b ... の場合は DB からもキャッシュからも指定カラムだけを返す
+        select_columns = parsed_query["select_columns"]
+        find_projection = generate_find_projection(select_columns)
+        cache_row = generate_cache_projection(select_columns)
 
 
         # LIMIT 1 の場合
@@ -752,33 +893,44 @@ def parse_sql_to_mongodb_single(sql, method_name, collection_info, auto_index=Tr
             java_code.append(f'        if (cache_data != null) {{')
             if where_conditions:
                 # WHERE条件をキャッシュに適用
-                filters = parse_where_clause(where_conditions, collection_info, collection, auto_index=auto_index)
-                java_code.append(f'            List<{class_name}CollectionData> filteredCache = cache_data.stream()')
-                java_code.append(f'                .filter(data -> {convert_bson_filter_to_lambda(filters, class_name)})')
+                filters = get_where_filter(parsed_query, where_conditions, collection_info, collection, auto_index=auto_index)
+                index_lookup = find_cache_index_lookup(where_conditions, collection_info, collection)
+                if index_lookup:
+                    # ハッシュインデックスで候補を絞り込み、残りの条件だけを評価
+                    index_col, index_arg, has_rest = index_lookup
+                    java_code.append(f'            DataBaseResultPair<Boolean, {class_name}CollectionData> filteredCache = {generate_cache_index_stream(index_col, index_arg)}')
+                    if has_rest:
+                        java_code.append(f'                .filter(data -> {convert_bson_filter_to_lambda(filters, class_name)})')
+                else:
+                    java_code.append(f'            DataBaseResultPair<Boolean, {class_name}CollectionData> filteredCache = cache_data.stream()')
+                    java_code.append(f'                .filter(data -> {convert_bson_filter_to_lambda(filters, class_name)})')
                 if order_by_clause:
                     # ORDER BYをキャッシュに適用
                     sort_comparator = generate_comparator(order_by_clause, class_name)
                     java_code.append(f'                .sorted({sort_comparator})')
                 java_code.append('                .findFirst()')
-                java_code.append(f'                .map(data -> DataBaseResultPair.of(true, data))')
+                java_code.append(f'                .map(data -> DataBaseResultPair.of(true, {cache_row}))')
                 java_code.append(f'                .orElse(DataBaseResultPair.of(false, null));')
                 java_code.append('            if (filteredCache.getFirst()) return filteredCache;')
             else:
                 # WHERE条件がない場合
                 if order_by_clause:
                     sort_comparator = generate_comparator(order_by_clause, class_name)
-                    java_code.append(f'            List<{class_name}CollectionData> sortedCache = cache_data.stream().sorted({sort_comparator}).findFirst()')
-                    java_code.append(f'                .map(data -> DataBaseResultPair.of(true, data))')
+                    java_code.append(f'            DataBaseResultPair<Boolean, {class_name}CollectionData> sortedCache = cache_data.stream().sorted({sort_comparator}).findFirst()')
+                    java_code.append(f'                .map(data -> DataBaseResultPair.of(true, {cache_row}))')
                     java_code.append(f'                .orElse(DataBaseResultPair.of(false, null));')
                     java_code.append('            if (sortedCache.getFirst()) return sortedCache;')
                 else:
-                    java_code.append(f'            return !cache_data.isEmpty() ? DataBaseResultPair.of(true, cache_data.get(0)) : DataBaseResultPair.of(false, null);')
+                    java_code.append(f'            return cache_data.stream().findFirst().map(data -> DataBaseResultPair.of(true, {cache_row})).orElse(DataBaseResultPair.of(false, null));')
             java_code.append('        }')
 
+            # 上限付きキャッシュ（トランザクション内の読み込みはセッションの状態を見るため使わない）
+            bounded_read, bounded_put = ([], None) if is_transaction else generate_bounded_cache_read_code(where_conditions, collection_info, collection, select_columns)
+            java_code.extend(bounded_read)
             # キャッシュがない場合、MongoDBから取得
             java_code.append(f'        MongoCollection<Document> collection = db.getCollection("{collection}");')
             if where_conditions:
-                filters = parse_where_clause(where_conditions, collection_info, collection, auto_index=auto_index)
+                filters = get_where_filter(parsed_query, where_conditions, collection_info, collection, auto_index=auto_index)
                 java_code.append(f'        Bson filter = {filters};')
                 if order_by_clause:
                     sort_fields = []
@@ -787,13 +939,15 @@ def parse_sql_to_mongodb_single(sql, method_name, collection_info, auto_index=Tr
                         direction = direction[0].upper() if direction else 'ASC'
                         sort_value = '1' if direction == 'ASC' else '-1'
                         sort_fields.append(f'"{field}", {sort_value}')
-                    java_code.append(f'        Document doc = collection.find({"session" if is_transaction else ""}{"," if arg_params != "" else ""}filter).sort(new Document().append({", ".join(sort_fields)})).first();')
+                    java_code.append(f'        {class_name}CollectionData doc = typedCollection(collection).find({"session" if is_transaction else ""}{"," if arg_params != "" else ""}filter).sort(new Document().append({", ".join(sort_fields)})){find_projection}.first();')
                 else:
-                    java_code.append(f'        Document doc = collection.find({"session" if is_transaction else ""}{"," if arg_params != "" else ""}filter).first();')
+                    java_code.append(f'        {class_name}CollectionData doc = typedCollection(collection).find({"session" if is_transaction else ""}{"," if arg_params != "" else ""}filter){find_projection}.first();')
+                if bounded_put:
+                    java_code.append(bounded_put)
                 java_code.append('        if (doc == null) {')
                 java_code.append(f'            return DataBaseResultPair.of(false, null);')
                 java_code.append('        }')
-                java_code.append(f'        return DataBaseResultPair.of(true, new {class_name}CollectionData(doc));')
+                java_code.append('        return DataBaseResultPair.of(true, doc);')
             else:
                 if order_by_clause:
                     sort_fields = []
@@ -802,13 +956,13 @@ def parse_sql_to_mongodb_single(sql, method_name, collection_info, auto_index=Tr
                         direction = direction[0].upper() if direction else 'ASC'
                         sort_value = '1' if direction == 'ASC' else '-1'
                         sort_fields.append(f'"{field}", {sort_value}')
-                    java_code.append(f'        Document doc = collection.find({"session" if is_transaction else ""}).sort(new Document().append({", ".join(sort_fields)})).first();')
+                    java_code.append(f'        {class_name}CollectionData doc = typedCollection(collection).find({"session" if is_transaction else ""}).sort(new Document().append({", ".join(sort_fields)})){find_projection}.first();')
                 else:
-                    java_code.append(f'        Document doc = collection.find({"session" if is_transaction else ""}).first();')
+                    java_code.append(f'        {class_name}CollectionData doc = typedCollection(collection).find({"session" if is_transaction else ""}){find_projection}.first();')
                 java_code.append('        if (doc == null) {')
                 java_code.append(f'            return DataBaseResultPair.of(false, null);')
                 java_code.append('        }')
-                java_code.append(f'        return DataBaseResultPair.of(true, new {class_name}CollectionData(doc));')
+                java_code.append('        return DataBaseResultPair.of(true, doc);')
             java_code.append('    } catch (Exception e) {')
             java_code.append(f'        return DataBaseResultPair.of(false, null);')
             java_code.append('    }')
@@ -822,31 +976,42 @@ def parse_sql_to_mongodb_single(sql, method_name, collection_info, auto_index=Tr
             java_code.append('        // Check cache first')
             java_code.append(f'        if (cache_data != null) {{')
             if where_conditions:
-                filters = parse_where_clause(where_conditions, collection_info, collection, auto_index=auto_index)
-                java_code.append(f'            List<{class_name}CollectionData> filteredCache = cache_data.stream()')
-                java_code.append(f'                .filter(data -> {convert_bson_filter_to_lambda(filters, class_name)})')
+                filters = get_where_filter(parsed_query, where_conditions, collection_info, collection, auto_index=auto_index)
+                index_lookup = find_cache_index_lookup(where_conditions, collection_info, collection)
+                if index_lookup:
+                    # ハッシュインデックスで候補を絞り込み、残りの条件だけを評価
+                    index_col, index_arg, has_rest = index_lookup
+                    java_code.append(f'            DataBaseResultPair<Boolean, {class_name}CollectionData> filteredCache = {generate_cache_index_stream(index_col, index_arg)}')
+                    if has_rest:
+                        java_code.append(f'                .filter(data -> {convert_bson_filter_to_lambda(filters, class_name)})')
+                else:
+                    java_code.append(f'            DataBaseResultPair<Boolean, {class_name}CollectionData> filteredCache = cache_data.stream()')
+                    java_code.append(f'                .filter(data -> {convert_bson_filter_to_lambda(filters, class_name)})')
                 if order_by_clause:
                     sort_comparator = generate_comparator(order_by_clause, class_name)
                     java_code.append(f'                .sorted({sort_comparator})')
                 java_code.append('                .findFirst()')
-                java_code.append(f'                .map(data -> DataBaseResultPair.of(true, data))')
+                java_code.append(f'                .map(data -> DataBaseResultPair.of(true, {cache_row}))')
                 java_code.append(f'                .orElse(DataBaseResultPair.of(false, null));')
                 java_code.append('            if (filteredCache.getFirst()) return filteredCache;')
             else:
                 if order_by_clause:
                     sort_comparator = generate_comparator(order_by_clause, class_name)
-                    java_code.append(f'            List<{class_name}CollectionData> sortedCache = cache_data.stream().sorted({sort_comparator}).findFirst()')
-                    java_code.append(f'                .map(data -> DataBaseResultPair.of(true, data))')
+                    java_code.append(f'            DataBaseResultPair<Boolean, {class_name}CollectionData> sortedCache = cache_data.stream().sorted({sort_comparator}).findFirst()')
+                    java_code.append(f'                .map(data -> DataBaseResultPair.of(true, {cache_row}))')
                     java_code.append(f'                .orElse(DataBaseResultPair.of(false, null));')
                     java_code.append('            if (sortedCache.getFirst()) return sortedCache;')
                 else:
-                    java_code.append(f'            return !cache_data.isEmpty() ? DataBaseResultPair.of(true, cache_data.get(0)) : DataBaseResultPair.of(false, null);')
+                    java_code.append(f'            return cache_data.stream().findFirst().map(data -> DataBaseResultPair.of(true, {cache_row})).orElse(DataBaseResultPair.of(false, null));')
             java_code.append('        }')
 
+            # 上限付きキャッシュ（トランザクション内の読み込みはセッションの状態を見るため使わない）
+            bounded_read, bounded_put = ([], None) if is_transaction else generate_bounded_cache_read_code(where_conditions, collection_info, collection, select_columns)
+            java_code.extend(bounded_read)
             # キャッシュがない場合、MongoDBから取得
             java_code.append(f'        MongoCollection<Document> collection = db.getCollection("{collection}");')
             if where_conditions:
-                filters = parse_where_clause(where_conditions, collection_info, collection, auto_index=auto_index)
+                filters = get_where_filter(parsed_query, where_conditions, collection_info, collection, auto_index=auto_index)
                 java_code.append(f'        Bson filter = {filters};')
                 if order_by_clause:
                     sort_fields = []
@@ -855,13 +1020,15 @@ def parse_sql_to_mongodb_single(sql, method_name, collection_info, auto_index=Tr
                         direction = direction[0].upper() if direction else 'ASC'
                         sort_value = '1' if direction == 'ASC' else '-1'
                         sort_fields.append(f'"{field}", {sort_value}')
-                    java_code.append(f'        Document doc = collection.find({"session" if is_transaction else ""}{"," if arg_params != "" and is_transaction else ""}filter).sort(new Document().append({", ".join(sort_fields)})).first();')
+                    java_code.append(f'        {class_name}CollectionData doc = typedCollection(collection).find({"session" if is_transaction else ""}{"," if arg_params != "" and is_transaction else ""}filter).sort(new Document().append({", ".join(sort_fields)})){find_projection}.first();')
                 else:
-                    java_code.append(f'        Document doc = collection.find({"session" if is_transaction else ""}{"," if arg_params != "" and is_transaction else ""}filter).first();')
+                    java_code.append(f'        {class_name}CollectionData doc = typedCollection(collection).find({"session" if is_transaction else ""}{"," if arg_params != "" and is_transaction else ""}filter){find_projection}.first();')
+                if bounded_put:
+                    java_code.append(bounded_put)
                 java_code.append('        if (doc == null) {')
                 java_code.append(f'            return DataBaseResultPair.of(false, null);')
                 java_code.append('        }')
-                java_code.append(f'        return DataBaseResultPair.of(true, new {class_name}CollectionData(doc));')
+                java_code.append('        return DataBaseResultPair.of(true, doc);')
             else:
                 if order_by_clause:
                     sort_fields = []
@@ -870,13 +1037,13 @@ def parse_sql_to_mongodb_single(sql, method_name, collection_info, auto_index=Tr
                         direction = direction[0].upper() if direction else 'ASC'
                         sort_value = '1' if direction == 'ASC' else '-1'
                         sort_fields.append(f'"{field}", {sort_value}')
-                    java_code.append(f'        Document doc = collection.find({"session" if is_transaction else ""}).sort(new Document().append({", ".join(sort_fields)})).first();')
+                    java_code.append(f'        {class_name}CollectionData doc = typedCollection(collection).find({"session" if is_transaction else ""}).sort(new Document().append({", ".join(sort_fields)})){find_projection}.first();')
                 else:
-                    java_code.append(f'        Document doc = collection.find({"session" if is_transaction else ""}).first();')
+                    java_code.append(f'        {class_name}CollectionData doc = typedCollection(collection).find({"session" if is_transaction else ""}){find_projection}.first();')
                 java_code.append('        if (doc == null) {')
                 java_code.append(f'            return DataBaseResultPair.of(false, null);')
                 java_code.append('        }')
-                java_code.append(f'        return DataBaseResultPair.of(true, new {class_name}CollectionData(doc));')
+                java_code.append('        return DataBaseResultPair.of(true, doc);')
             java_code.append('    } catch (Exception e) {')
             java_code.append(f'        return DataBaseResultPair.of(false, null);')
             java_code.append('    }')
@@ -888,15 +1055,26 @@ def parse_sql_to_mongodb_single(sql, method_name, collection_info, auto_index=Tr
             # キャッシュチェック
             java_code.append('        // Check cache first')
             java_code.append(f'        if (cache_data != null) {{')
-            java_code.append(f'            List<{class_name}CollectionData> resultList = cache_data.stream()')
-            if where_conditions:
-                filters = parse_where_clause(where_conditions, collection_info, collection, auto_index=auto_index)
-                java_code.append(f'                .filter(data -> {convert_bson_filter_to_lambda(filters, class_name)})')
+            index_lookup = find_cache_index_lookup(where_conditions, collection_info, collection)
+            if index_lookup:
+                # ハッシュインデックスで候補を絞り込み、残りの条件だけを評価
+                index_col, index_arg, has_rest = index_lookup
+                java_code.append(f'            List<{class_name}CollectionData> resultList = {generate_cache_index_stream(index_col, index_arg)}')
+                if has_rest:
+                    filters = get_where_filter(parsed_query, where_conditions, collection_info, collection, auto_index=auto_index)
+                    java_code.append(f'                .filter(data -> {convert_bson_filter_to_lambda(filters, class_name)})')
+            else:
+                java_code.append(f'            List<{class_name}CollectionData> resultList = cache_data.stream()')
+                if where_conditions:
+                    filters = get_where_filter(parsed_query, where_conditions, collection_info, collection, auto_index=auto_index)
+                    java_code.append(f'                .filter(data -> {convert_bson_filter_to_lambda(filters, class_name)})')
             if order_by_clause:
                 sort_comparator = generate_comparator(order_by_clause, class_name)
                 java_code.append(f'                .sorted({sort_comparator})')
             if limit_value:
                 java_code.append(f'                .limit({limit_value})')
+            if select_columns:
+                java_code.append(f'                .map(data -> {cache_row})')
             java_code.append('                .collect(Collectors.toList());')
             java_code.append(f'            return resultList.isEmpty() ? DataBaseResultPair.of(false, Collections.emptyList()) : DataBaseResultPair.of(true, resultList);')
             java_code.append('        }')
@@ -904,11 +1082,11 @@ def parse_sql_to_mongodb_single(sql, method_name, collection_info, auto_index=Tr
             # キャッシュがない場合、MongoDBから取得
             java_code.append(f'        MongoCollection<Document> collection = db.getCollection("{collection}");')
             if where_conditions:
-                filters = parse_where_clause(where_conditions, collection_info, collection, auto_index=auto_index)
+                filters = get_where_filter(parsed_query, where_conditions, collection_info, collection, auto_index=auto_index)
                 java_code.append(f'        Bson filter = {filters};')
-                java_code.append(f'        FindIterable<Document> results = collection.find({"session" if is_transaction else ""}{"," if arg_params != "" else ""}filter);')
+                java_code.append(f'        FindIterable<{class_name}CollectionData> results = typedCollection(collection).find({"session" if is_transaction else ""}{"," if arg_params != "" else ""}filter);')
             else:
-                java_code.append(f'        FindIterable<Document> results = collection.find({"session" if is_transaction else ""});')
+                java_code.append(f'        FindIterable<{class_name}CollectionData> results = typedCollection(collection).find({"session" if is_transaction else ""});')
             if order_by_clause:
                 sort_fields = []
                 for sort_item in order_by_clause.split(','):
@@ -919,18 +1097,306 @@ def parse_sql_to_mongodb_single(sql, method_name, collection_info, auto_index=Tr
                 java_code.append(f'        results = results.sort(new Document().append({", ".join(sort_fields)}));')
             if limit_value:
                 java_code.append(f'        results = results.limit({limit_value});')
+            if find_projection:
+                java_code.append(f'        results = results{find_projection};')
             java_code.append(f'        List<{class_name}CollectionData> resultList = new ArrayList<>();')
-            java_code.append('        for (Document doc : results) {')
-            java_code.append(f'            resultList.add(new {class_name}CollectionData(doc));')
+            java_code.append(f'        for ({class_name}CollectionData doc : results) {{')
+            java_code.append('            resultList.add(doc);')
             java_code.append('        }')
             java_code.append(f'        return resultList.isEmpty() ? DataBaseResultPair.of(false, Collections.emptyList()) : DataBaseResultPair.of(true, resultList);')
             java_code.append('    } catch (Exception e) {')
             java_code.append(f'        return DataBaseResultPair.of(false, Collections.emptyList());')
             java_code.append('    }')
             java_code.append('}')
+            # keyset ページング版（Many と同じ条件を pageSize 件ずつ取得する）
+            java_code.extend(generate_keyset_page_method(parsed_query, method_name, collection_info, where_conditions, auto_index, is_transaction))
+            # カーソル・Stream 版（List に溜めずに1件ずつデコードする）
+            java_code.extend(generate_cursor_methods(parsed_query, method_name, collection_info, where_conditions, auto_index, is_transaction))
+
+    return java_code
+
+# SQLを解析して keyset（seek）ページングのメソッドを生成（ORDER BY + unique キーの範囲条件で次のページを取得する）
+def generate_keyset_page_method(parsed_query, method_name, collection_info, where_conditions, auto_index=True, is_transaction=False):
+    """
+    Many メソッドの keyset ページング版 {method_name}Page を生成する
+    skip を使わず、前ページ最後の並び替えキーより後ろを範囲条件で取得するので、何ページ目でもコストは同じ。
+    LIMIT の代わりに pageSize を受け取る。unique カラムが無い（順序を一意にできない）場合は生成しない。
+
+    Returns:
+        list: Java コードの行
+    """
+    collection = parsed_query["collection"]
+    column_list = collection_info[collection]["column_list"]
+    schema = get_collection_schema(collection_info, collection)
+    unique_field = next((col["variable_name"] for col in schema["indexed_columns"] if col.get("index_type", "none") == "unique" and not col.get("is_array", False)), None)
+    keys = get_keyset_keys(parse_order_by(parse_query_shape(parsed_query["sql"])["order_by"]), column_list, unique_field)
+    if not keys:
+        return []
+    class_name = snake_to_pascal(collection.capitalize())
+    data_class = f'{class_name}CollectionData'
+    column_types = schema["java_types"]
+    params = ["MongoDatabase db"]
+    if is_transaction:
+        params.append("ClientSession session")
+    if parsed_query["arg_params"]:
+        params.append(parsed_query["arg_params"])
+    params.append(generate_keyset_params(keys, column_types.get))
+    # 呼び出し側が次のページのキーを取り出せるよう、カラム指定があっても並び替えキーは返す
+    select_columns = parsed_query["select_columns"]
+    if select_columns:
+        select_columns = select_columns + [field for field, _ in keys if field not in select_columns]
+    key_order = ", ".join(f'{field} {"DESC" if direction == -1 else "ASC"}' for field, direction in keys)
 
+    java_code = [f'// keyset ページング: ({key_order}) の順で前ページ最後のキーより後ろを pageSize 件取得する（最初のページは {get_last_param_name(unique_field)} に null）']
+    java_code.append('@SuppressWarnings({"java:S3776", "unused"})')
+    java_code.append(f'public static DataBaseResultPair<Boolean, List<{data_class}>> {method_name}{"Transaction" if is_transaction else ""}Page({", ".join(params)}) {{')
+    java_code.append('    try {')
+    java_code.append(f'        boolean firstPage = {get_last_param_name(unique_field)} == null;')
+    predicate = generate_cache_predicate(where_conditions, column_list) if where_conditions else "true"
+    if predicate is not None:
+        java_code.append('        // Check cache first')
+        java_code.append('        if (cache_data != null) {')
+        index_lookup = find_cache_index_lookup(where_conditions, collection_info, collection) if where_conditions else None
+        if index_lookup:
+            index_col, index_arg, has_rest = index_lookup
+            java_code.append(f'            List<{data_class}> resultList = {generate_cache_index_stream(index_col, index_arg)}')
+        else:
+            has_rest = True
+            java_code.append(f'            List<{data_class}> resultList = cache_data.stream()')
+        if has_rest and predicate != "true":
+            java_code.append(f'                .filter(data -> {predicate})')
+        java_code.append(f'                .filter(data -> firstPage || {generate_seek_predicate(keys, lambda field: f"data.get{field.capitalize()}()")})')
+        java_code.append(f'                .sorted({generate_keyset_comparator(keys, lambda field: f"{data_class}::get{field.capitalize()}")})')
+        java_code.append('                .limit(pageSize)')
+        if select_columns:
+            java_code.append(f'                .map(data -> {generate_cache_projection(select_columns)})')
+        java_code.append('                .collect(Collectors.toList());')
+        java_code.append('            return resultList.isEmpty() ? DataBaseResultPair.of(false, Collections.emptyList()) : DataBaseResultPair.of(true, resultList);')
+        java_code.append('        }')
+    java_code.append(f'        MongoCollection<Document> collection = db.getCollection("{collection}");')
+    if where_conditions:
+        java_code.append(f'        Bson filter = {get_where_filter(parsed_query, where_conditions, collection_info, collection, auto_index=auto_index)};')
+        java_code.append('        if (!firstPage) {')
+        java_code.append(f'            filter = Filters.and(filter, {generate_seek_filter(keys)});')
+        java_code.append('        }')
+    else:
+        java_code.append(f'        Bson filter = firstPage ? new Document() : {generate_seek_filter(keys)};')
+    java_code.append(f'        FindIterable<{data_class}> results = typedCollection(collection).find({"session, " if is_transaction else ""}filter).sort({generate_keyset_sort(keys)}).limit(pageSize){generate_find_projection(select_columns)};')
+    java_code.append(f'        List<{data_class}> resultList = new ArrayList<>();')
+    java_code.append(f'        for ({data_class} doc : results) {{')
+    java_code.append('            resultList.add(doc);')
+    java_code.append('        }')
+    java_code.append('        return resultList.isEmpty() ? DataBaseResultPair.of(false, Collections.emptyList()) : DataBaseResultPair.of(true, resultList);')
+    java_code.append('    } catch (Exception e) {')
+    java_code.append('        return DataBaseResultPair.of(false, Collections.emptyList());')
+    java_code.append('    }')
+    java_code.append('}')
     return java_code
 
+# SQLを解析して MongoCursor / Stream を返すメソッドを生成（大量の結果を List に溜めずに処理する）
+def generate_cursor_methods(parsed_query, method_name, collection_info, where_conditions, auto_index=True, is_transaction=False):
+    """
+    Many メソッドと同じ条件の {method_name}Cursor / {method_name}Stream を生成する
+    カーソルは batchSize 件ずつサーバから取得して1件ずつデコードするので、結果全体をメモリに載せない。
+    どちらも呼び出し側で close する（Stream は try-with-resources で閉じるとカーソルも閉じる）。
+
+    Returns:
+        list: Java コードの行
+    """
+    collection = parsed_query["collection"]
+    column_list = collection_info[collection]["column_list"]
+    class_name = snake_to_pascal(collection.capitalize())
+    data_class = f'{class_name}CollectionData'
+    suffix = "Transaction" if is_transaction else ""
+    params = ["MongoDatabase db"]
+    call_args = ["db"]
+    if is_transaction:
+        params.append("ClientSession session")
+        call_args.append("session")
+    if parsed_query["arg_params"]:
+        params.append(parsed_query["arg_params"])
+        call_args.extend(parsed_query["args"])
+    params_str = ", ".join(params)
+    call_args_str = ", ".join(call_args)
+    sort = parse_order_by(parse_query_shape(parsed_query["sql"])["order_by"])
+    limit_value = parsed_query["limit_value"]
+    select_columns = parsed_query["select_columns"]
+
+    find_call = f'typedCollection(collection).find({"session, " if is_transaction else ""}filter)'
+    if sort:
+        find_call += f'.sort({generate_keyset_sort(sort)})'
+    if limit_value:
+        find_call += f'.limit({limit_value})'
+    find_call += generate_find_projection(select_columns)
+
+    java_code = ['', '// カーソル版: batchSize 件ずつ取得しながら1件ずつデコードする（使い終わったら close すること）']
+    java_code.append('@SuppressWarnings({"java:S3776", "unused"})')
+    java_code.append(f'public static MongoCursor<{data_class}> {method_name}{suffix}Cursor({params_str}, int batchSize) {{')
+    java_code.append(f'    MongoCollection<Document> collection = db.getCollection("{collection}");')
+    if where_conditions:
+        java_code.append(f'    Bson filter = {get_where_filter(parsed_query, where_conditions, collection_info, collection, auto_index=auto_index)};')
+    else:
+        java_code.append('    Bson filter = new Document();')
+    java_code.append(f'    return {find_call}.batchSize(batchSize).iterator();')
+    java_code.append('}')
+    java_code.append('')
+    java_code.append(f'public static MongoCursor<{data_class}> {method_name}{suffix}Cursor({params_str}) {{')
+    java_code.append(f'    return {method_name}{suffix}Cursor({call_args_str}, cursor_batch_size);')
+    java_code.append('}')
+    java_code.append('')
+
+    java_code.append('// Stream 版: cache_data があればキャッシュから、無ければカーソルから逐次デコードする（try-with-resources で close すること）')
+    java_code.append('@SuppressWarnings({"java:S3776", "unused"})')
+    java_code.append(f'public static Stream<{data_class}> {method_name}{suffix}Stream({params_str}, int batchSize) {{')
+    predicate = generate_cache_predicate(where_conditions, column_list) if where_conditions else "true"
+    if predicate is not None:
+        java_code.append('    if (cache_data != null) {')
+        index_lookup = find_cache_index_lookup(where_conditions, collection_info, collection) if where_conditions else None
+        if index_lookup:
+            index_col, index_arg, has_rest = index_lookup
+            java_code.append(f'        return {generate_cache_index_stream(index_col, index_arg)}')
+        else:
+            has_rest = True
+            java_code.append('        return cache_data.stream()')
+        if has_rest and predicate != "true":
+            java_code.append(f'            .filter(data -> {predicate})')
+        if sort:
+            java_code.append(f'            .sorted({generate_keyset_comparator(sort, lambda field: f"{data_class}::get{field.capitalize()}")})')
+        if limit_value:
+            java_code.append(f'            .limit({limit_value})')
+        if select_columns:
+            java_code.append(f'            .map(data -> {generate_cache_projection(select_columns)})')
+        java_code[-1] += ';'
+        java_code.append('    }')
+    java_code.append(f'    return streamCursor({method_name}{suffix}Cursor({call_args_str}, batchSize));')
+    java_code.append('}')
+    java_code.append('')
+    java_code.append(f'public static Stream<{data_class}> {method_name}{suffix}Stream({params_str}) {{')
+    java_code.append(f'    return {method_name}{suffix}Stream({call_args_str}, cursor_batch_size);')
+    java_code.append('}')
+    return java_code
+
+# 集計クエリの引数（WHERE 句はカラムの型、HAVING は比較する集計値の型）
+def get_aggregate_arg_params(parsed_query, collection_info):
+    collection = parsed_query["collection"]
+    aggregate_query = parsed_query["aggregate"]
+    where_sql = f'SELECT * FROM {collection} WHERE {aggregate_query["where"]}'
+    having_args = get_having_args(aggregate_query)
+    columns = get_collection_schema(collection_info, collection)["columns"]
+    where_arg_types = get_arg_types(collection, [arg for arg in parsed_query["args"] if arg not in having_args], where_sql, collection_info)
+    params = []
+    for arg in parsed_query["args"]:
+        if arg not in having_args:
+            params.append(f'{where_arg_types[arg]} {arg}')
+            continue
+        name = having_args[arg]
+        aggregate = find_aggregate(aggregate_query, name)
+        if aggregate is None:
+            group_key = next(output["group_key"] for output in aggregate_query["select"] if output["name"] == name)
+            params.append(f'{get_java_wrapper_type(columns[group_key]["variable_type"])} {arg}')
+        elif aggregate["function"] == "COUNT":
+            params.append(f'Long {arg}')
+        elif aggregate["function"] == "AVG":
+            params.append(f'Double {arg}')
+        else:
+            params.append(f'{get_java_wrapper_type(aggregate["column"]["variable_type"])} {arg}')
+    return ', '.join(params)
+
+# SQLを解析して集計（GROUP BY / COUNT / SUM / AVG / MIN / MAX / HAVING）の aggregate パイプラインを生成
+@profiled("emitter", name=emitter_span_name("aggregate"), arg_names=("method_name", "auto_index"))
+def parse_sql_to_mongodb_aggregate(sql, method_name, collection_info, auto_index=True, is_transaction=False, is_async=False, cache_owner="", parsed_query=None, auto_index_mode="planner"):
+    """
+    集計クエリを collection.aggregate(...) で実行するメソッドを生成する
+    結果は SELECT の名前（別名が無い集計値は count / sum_balance 等）をキーにした Document のリスト。
+    cache_data が読み込まれていて WHERE 句をそのまま評価できる場合は、キャッシュ上で同じ集計を行う。
+
+    Args:
+        sql (str): GROUP BY・集計関数を含む SELECT
+        method_name (str): メソッド名
+        collection_info (dict): コレクション情報
+        auto_index (bool): WHERE 句にインデックス用の条件を追加するか
+        is_transaction (bool): ClientSession を受け取る版を生成するか
+        is_async (bool): CompletableFuture を返す版を生成するか
+        cache_owner (str): キャッシュを持つクラス（Reactive 版は "XCollectionDb."）
+        parsed_query (dict): parse_sql_query の結果
+
+    Returns:
+        list: Java コードの行
+    """
+    if parsed_query is None:
+        parsed_query = parse_sql_query(sql, collection_info, auto_index_mode)
+    aggregate_query = parsed_query["aggregate"]
+    collection = parsed_query["collection"]
+    class_name = snake_to_pascal(collection.capitalize())
+    data_class = f'{class_name}CollectionData'
+    arg_params = get_aggregate_arg_params(parsed_query, collection_info)
+    result_type = 'DataBaseResultPair<Boolean, List<Document>>'
+    where_clause = aggregate_query["where"]
+    match_filter = get_where_filter(parsed_query, where_clause, collection_info, collection, auto_index=auto_index) if where_clause else None
+
+    params = ["MongoDatabase db"]
+    if is_transaction:
+        params.append("ClientSession session")
+    if arg_params:
+        params.append(arg_params)
+    java_code = ['@SuppressWarnings({"java:S3776", "unused"})']
+    if is_async:
+        java_code.append(f'public static CompletableFuture<{result_type}> {method_name}{"Transaction" if is_transaction else ""}Async({", ".join(params)}) {{')
+        java_code.append('    return CompletableFuture.supplyAsync(() -> {')
+        body_indent = '        '
+    else:
+        java_code.append(f'public static {result_type} {method_name}{"Transaction" if is_transaction else ""}({", ".join(params)}) {{')
+        body_indent = '    '
+    body = ['try {']
+    # キャッシュ上で集計（ハッシュインデックスで絞り込めれば候補だけを集計する）
+    predicate = generate_cache_predicate(where_clause, collection_info[collection]["column_list"])
+    if predicate is not None:
+        body.append(f'    if ({cache_owner}cache_data != null) {{')
+        index_lookup = find_cache_index_lookup(where_clause, collection_info, collection)
+        if index_lookup:
+            index_col, index_arg, has_rest = index_lookup
+            source_stream = generate_cache_index_stream(index_col, index_arg).replace("cache_data.", f"{cache_owner}cache_data.")
+        else:
+            source_stream, has_rest = f'{cache_owner}cache_data.stream()', True
+        cache_code = generate_cache_aggregate_code(aggregate_query, data_class, source_stream, predicate if has_rest else None)
+        body.extend(f'        {line}' for line in cache_code)
+        body.append('    }')
+    body.append(f'    MongoCollection<Document> collection = db.getCollection("{collection}");')
+    stages = generate_aggregate_pipeline(aggregate_query, "filter" if match_filter else None)
+    if match_filter:
+        body.append(f'    Bson filter = {match_filter};')
+    body.append('    List<Bson> pipeline = Arrays.asList(')
+    for i, stage in enumerate(stages):
+        body.append(f'        {stage}{"," if i < len(stages) - 1 else ");"}')
+    body.append(f'    AggregateIterable<Document> results = collection.aggregate({"session, " if is_transaction else ""}pipeline);')
+    body.append('    List<Document> resultList = new ArrayList<>();')
+    body.append('    for (Document doc : results) {')
+    body.append('        resultList.add(doc);')
+    body.append('    }')
+    body.append('    return resultList.isEmpty() ? DataBaseResultPair.of(false, Collections.emptyList()) : DataBaseResultPair.of(true, resultList);')
+    body.append('} catch (Exception e) {')
+    body.append('    return DataBaseResultPair.of(false, Collections.emptyList());')
+    body.append('}')
+    java_code.extend(body_indent + line for line in body)
+    if is_async:
+        java_code.append(f'    }}, {get_async_executor("select")});')
+    java_code.append('}')
+    return java_code
+
+# SELECT のカラム指定を find の projection にする（指定が無ければ空文字）
+def generate_find_projection(select_columns):
+    if not select_columns:
+        return ''
+    fields = ", ".join(f'"{name}"' for name in select_columns)
+    return f'.projection(Projections.fields(Projections.include({fields}), Projections.excludeId()))'
+
+# キャッシュから返すデータにも同じカラム指定を適用する
+def generate_cache_projection(select_columns, data_expr="data"):
+    if not select_columns:
+        return data_expr
+    fields = ", ".join(f'"{name}"' for name in select_columns)
+    return f'{data_expr}.project({fields})'
+
 def convert_bson_filter_to_lambda(filters, class_name):
     # 簡易的な実装例（実際はBSONフィルタの構造に応じて詳細に変換）
     filter_str = str(filters).replace('Filters.eq', f'data.get').replace('"', '')
@@ -951,7 +1417,7 @@ def generate_comparator(order_by_clause, class_name):
 
 def process_args(sql, arg_params):
     # SQLクエリから?が付いている引数名を抽出 (例: {'arg3', 'arg4'})
-    optional_args = set(re.findall(r'(arg\d+)\?', sql))
+    optional_args = scan_statement(sql)["optional_args"]
     
     # 元のarg_paramsをカンマで分割して個々の引数定義に分解
     params_list = [p.strip() for p in arg_params.split(',')]
@@ -1014,24 +1480,25 @@ def is_optional_arg_present(arg_params, optional_arg_name):
 
 # SQLを解析してMongoDB用Javaコードを生成（List<UserCollectionData>引数版）
 # SQLを解析してMongoDB用Javaコードを生成（UserCollectionData引数版）
-def parse_sql_to_mongodb_user_collection_data(sql, method_name, collection_info, auto_index=True,is_transaction = False):
-    parsed = sqlparse.parse(sql)[0]
-    operation = parsed.get_type().lower()
+@profiled("emitter", name=emitter_span_name("WithData"), arg_names=("method_name", "auto_index"))
+def parse_sql_to_mongodb_user_collection_data(sql, method_name, collection_info, auto_index=True,is_transaction = False, parsed_query=None, auto_index_mode="planner"):
+    if parsed_query is None:
+        parsed_query = parse_sql_query(sql, collection_info, auto_index_mode)
+    operation = parsed_query["operation"]
     java_code = []
 
-    table_match = re.search(r'\bFROM\s+(\w+)|INTO\s+(\w+)', sql, re.IGNORECASE)
-    collection = table_match.group(1) or table_match.group(2) if table_match else next(iter(collection_info))
-    limit_match = re.search(r'LIMIT\s+(\d+)', sql, re.IGNORECASE)
+    collection = parsed_query["collection"]
+    limit_match = parsed_query["limit_match"]
     limit_value = int(limit_match.group(1)) if limit_match else None
     
-    args = sorted(set(re.findall(r'arg\d+', sql)), key=lambda x: int(x[3:]))
-    arg_params = ', '.join(f'{get_arg_type(collection, arg, sql, collection_info)} {arg}' for arg in args)
-    new_params, optional_flag = process_args(sql, arg_params)
+    args = parsed_query["args"]
+    arg_params = parsed_query["arg_params"]
+    new_params, optional_flag = parsed_query["new_params"], parsed_query["optional_flag"]
     class_name = snake_to_pascal(collection.capitalize())
     java_code.append('@SuppressWarnings({"java:S3776", "unused"})')
     
     if operation == "insert":
-        fields = re.search(r'\((.*?)\)\s*VALUES\s*\((.*?)\)', sql, re.IGNORECASE)
+        fields = parsed_query["insert_fields"]
         if fields:
             java_code.append(f'public static boolean {method_name}{"Transaction" if is_transaction else ""}WithData(MongoDatabase db,{"ClientSession session," if is_transaction else ""} {class_name}CollectionData data) {{')
             java_code.append('    try {')
@@ -1049,8 +1516,8 @@ def parse_sql_to_mongodb_user_collection_data(sql, method_name, collection_info,
             java_code.append('}')
 
     elif operation == "update":
-        set_clause = re.search(r'SET\s+(.*?)\s*WHERE', sql, re.IGNORECASE)
-        where_clause = re.search(r'WHERE\s+(.*)', sql, re.IGNORECASE)
+        set_clause = parsed_query["set_clause"]
+        where_clause = parsed_query["where_clause"]
         
         java_code.append(f'public static boolean {method_name}{"Transaction" if is_transaction else ""}WithData(MongoDatabase db,{"ClientSession session," if is_transaction else ""} {class_name}CollectionData data{", " + new_params if optional_flag else ""}) {{')
         java_code.append('    try {')
@@ -1076,8 +1543,7 @@ def parse_sql_to_mongodb_user_collection_data(sql, method_name, collection_info,
                 value = clean_value(value)
                 
                 # フィールド情報を取得
-                field_info = next((col for col in collection_info[collection]["column_list"] 
-                                 if col["variable_name"] == field), None)
+                field_info = get_collection_schema(collection_info, collection)["columns"].get(field)
                 is_array = field_info.get("is_array", False) if field_info else False
                 
                 # 配列操作の特別処理
@@ -1108,7 +1574,7 @@ def parse_sql_to_mongodb_user_collection_data(sql, method_name, collection_info,
             where_conditions = where_clause.group(1)
             
             # 条件を分割
-            for condition in re.split(r'\bAND\b|\bOR\b', where_conditions, flags=re.IGNORECASE):
+            for condition in split_conditions(where_conditions):
                 condition = condition.strip()
                 
                 # ALL演算子の処理
@@ -1140,11 +1606,7 @@ def parse_sql_to_mongodb_user_collection_data(sql, method_name, collection_info,
             
             # インデックスの自動追加
             if auto_index:
-                for col in collection_info[collection]["column_list"]:
-                    if col.get("index_type", "none") in ["ascending", "descending", "hash", "unique"]:
-                        field = col["variable_name"]
-                        if not any(f'"{field}"' in f for f in where_filters):
-                            where_filters.append(f'Filters.exists("{field}")')
+                where_filters.extend(get_auto_index_filters(where_filters, collection_info, collection, parsed_query["auto_index_mode"]))
             
             # フィルターを結合
             if where_filters:
@@ -1155,9 +1617,11 @@ def parse_sql_to_mongodb_user_collection_data(sql, method_name, collection_info,
             java_code.append(f'        Bson whereFilter = {where_filter};')
             java_code.append('        Bson combinedFilter = Filters.and(filter, whereFilter);')
             java_code.append(f'        UpdateResult result = collection.updateOne(c{"session," if is_transaction else ""}ombinedFilter, updateOps);')
+            java_code.extend('        ' + line for line in generate_bounded_invalidate_code(collection_info, collection, data_name="data"))
             java_code.append('        return result.getMatchedCount() > 0;')
         else:
             java_code.append(f'        UpdateResult result = collection.updateOne({"session," if is_transaction else ""}filter, updateOps);')
+            java_code.extend('        ' + line for line in generate_bounded_invalidate_code(collection_info, collection, data_name="data"))
             java_code.append('        return result.getMatchedCount() > 0;')
         
         java_code.append('    } catch (Exception e) {')
@@ -1166,7 +1630,7 @@ def parse_sql_to_mongodb_user_collection_data(sql, method_name, collection_info,
         java_code.append('}')
 
     elif operation == "delete":
-        where_clause = re.search(r'WHERE\s+(.*)', sql, re.IGNORECASE)
+        where_clause = parsed_query["where_clause"]
         java_code.append(f'public static boolean {method_name}{"Transaction" if is_transaction else ""}WithData(MongoDatabase db, {"ClientSession session," if is_transaction else ""}{class_name}CollectionData data{", " + new_params if optional_flag else ""}) {{')
         java_code.append('    try {')
         java_code.append(f'        MongoCollection<Document> collection = db.getCollection("{collection}");')
@@ -1188,7 +1652,7 @@ def parse_sql_to_mongodb_user_collection_data(sql, method_name, collection_info,
             where_conditions = where_clause.group(1)
             
             # 条件を分割
-            for condition in re.split(r'\bAND\b|\bOR\b', where_conditions, flags=re.IGNORECASE):
+            for condition in split_conditions(where_conditions):
                 condition = condition.strip()
                 
                 # ALL演算子の処理
@@ -1219,11 +1683,7 @@ def parse_sql_to_mongodb_user_collection_data(sql, method_name, collection_info,
             
             # インデックスの自動追加
             if auto_index:
-                for col in collection_info[collection]["column_list"]:
-                    if col.get("index_type", "none") in ["ascending", "descending", "hash", "unique"]:
-                        field = col["variable_name"]
-                        if not any(f'"{field}"' in f for f in where_filters):
-                            where_filters.append(f'Filters.exists("{field}")')
+                where_filters.extend(get_auto_index_filters(where_filters, collection_info, collection, parsed_query["auto_index_mode"]))
             
             # フィルターを結合
             if where_filters:
@@ -1234,9 +1694,11 @@ def parse_sql_to_mongodb_user_collection_data(sql, method_name, collection_info,
             java_code.append(f'        Bson whereFilter = {where_filter};')
             java_code.append('        Bson combinedFilter = Filters.and(filter, whereFilter);')
             java_code.append(f'        DeleteResult result = collection.deleteOne({"session," if is_transaction else ""}combinedFilter);')
+            java_code.extend('        ' + line for line in generate_bounded_invalidate_code(collection_info, collection, data_name="data"))
             java_code.append('        return result.getDeletedCount() > 0;')
         else:
             java_code.append(f'        DeleteResult result = collection.deleteOne({"session," if is_transaction else ""}filter);')
+            java_code.extend('        ' + line for line in generate_bounded_invalidate_code(collection_info, collection, data_name="data"))
             java_code.append('        return result.getDeletedCount() > 0;')
         
         java_code.append('    } catch (Exception e) {')
@@ -1245,10 +1707,10 @@ def parse_sql_to_mongodb_user_collection_data(sql, method_name, collection_info,
         java_code.append('}')
 
     elif operation == "select":
-        where_clause = re.search(r'WHERE\s+(.*?)(?:\s*(?:ORDER\s+BY\s+(.*?)|LIMIT\s+\d+))?$', sql, re.IGNORECASE)
+        where_clause = parsed_query["select_where_clause"]
         order_by_clause = where_clause.group(2) if where_clause and where_clause.group(2) else None
         where_conditions = where_clause.group(1) if where_clause else None
-        limit_match = re.search(r'LIMIT\s+(\d+)', sql, re.IGNORECASE)
+        limit_match = parsed_query["limit_match"]
         limit_value = int(limit_match.group(1)) if limit_match else None
         return_type = f'{class_name}CollectionData' if limit_value == 1 else f'List<{class_name}CollectionData>'
         return_value = 'null' if limit_value == 1 else 'Collections.emptyList()'
@@ -1261,7 +1723,8 @@ def parse_sql_to_mongodb_user_collection_data(sql, method_name, collection_info,
             java_code.append('    try {')
             java_code.append('        // Check cache first')
             java_code.append(f'        if (cache_data != null) {{')
-            java_code.append(f'            DataBaseResultPair<Boolean, {class_name}CollectionData> result = cache_data.stream()')
+            # フラグの立っているハッシュインデックスで候補を絞り込む
+            java_code.append(f'            DataBaseResultPair<Boolean, {class_name}CollectionData> result = ({generate_cache_index_stream_with_data(collection_info, collection)})')
             java_code.append('                .filter(item -> {')
             java_code.append('                    boolean match = true;')
             for col in collection_info[collection]["column_list"]:
@@ -1296,7 +1759,7 @@ def parse_sql_to_mongodb_user_collection_data(sql, method_name, collection_info,
             java_code.append('        Bson filter = filters.isEmpty() ? new Document() : Filters.and(filters);')
             if where_conditions:
                 where_filters = []
-                for condition in re.split(r'\bAND\b|\bOR\b', where_conditions, flags=re.IGNORECASE):
+                for condition in split_conditions(where_conditions):
                     condition = condition.strip()
                     if ' ALL ' in condition:
                         field, value = [clean_value(x) for x in condition.split(' ALL ', 1)]
@@ -1315,11 +1778,7 @@ def parse_sql_to_mongodb_user_collection_data(sql, method_name, collection_info,
                             where_filters.append(f'Filters.{comparison_operators[op]}("{field}", {value if optional_flag and is_optional_arg_present(new_params, value) else "data.get" + field.capitalize() + "()"})')
                             break
                 if auto_index:
-                    for col in collection_info[collection]["column_list"]:
-                        if col.get("index_type", "none") in ["ascending", "descending", "hash", "unique"]:
-                            field = col["variable_name"]
-                            if not any(f'"{field}"' in f for f in where_filters):
-                                where_filters.append(f'Filters.exists("{field}")')
+                    where_filters.extend(get_auto_index_filters(where_filters, collection_info, collection, parsed_query["auto_index_mode"]))
                 where_filter = f'Filters.and({", ".join(where_filters)})' if where_filters else 'new Document()'
                 java_code.append(f'        Bson whereFilter = {where_filter};')
                 java_code.append('        Bson combinedFilter = Filters.and(filter, whereFilter);')
@@ -1330,9 +1789,9 @@ def parse_sql_to_mongodb_user_collection_data(sql, method_name, collection_info,
                         direction = direction[0].upper() if direction else 'ASC'
                         sort_value = '1' if direction == 'ASC' else '-1'
                         sort_fields.append(f'"{field}", {sort_value}')
-                    java_code.append(f'        Document doc = collection.find({"session," if is_transaction else ""}combinedFilter).sort(new Document().append({", ".join(sort_fields)})).first();')
+                    java_code.append(f'        {class_name}CollectionData doc = typedCollection(collection).find({"session," if is_transaction else ""}combinedFilter).sort(new Document().append({", ".join(sort_fields)})).first();')
                 else:
-                    java_code.append(f'        Document doc = collection.find({"session," if is_transaction else ""}combinedFilter).first();')
+                    java_code.append(f'        {class_name}CollectionData doc = typedCollection(collection).find({"session," if is_transaction else ""}combinedFilter).first();')
             else:
                 if order_by_clause:
                     sort_fields = []
@@ -1341,13 +1800,13 @@ def parse_sql_to_mongodb_user_collection_data(sql, method_name, collection_info,
                         direction = direction[0].upper() if direction else 'ASC'
                         sort_value = '1' if direction == 'ASC' else '-1'
                         sort_fields.append(f'"{field}", {sort_value}')
-                    java_code.append(f'        Document doc = collection.find({"session," if is_transaction else ""}filter).sort(new Document().append({", ".join(sort_fields)})).first();')
+                    java_code.append(f'        {class_name}CollectionData doc = typedCollection(collection).find({"session," if is_transaction else ""}filter).sort(new Document().append({", ".join(sort_fields)})).first();')
                 else:
-                    java_code.append(f'        Document doc = collection.find({"session," if is_transaction else ""}filter).first();')
+                    java_code.append(f'        {class_name}CollectionData doc = typedCollection(collection).find({"session," if is_transaction else ""}filter).first();')
             java_code.append('        if (doc == null) {')
             java_code.append(f'            return DataBaseResultPair.of(false, null);')
             java_code.append('        }')
-            java_code.append(f'        return DataBaseResultPair.of(true, new {class_name}CollectionData(doc));')
+            java_code.append('        return DataBaseResultPair.of(true, doc);')
             java_code.append('    } catch (Exception e) {')
             java_code.append(f'        return DataBaseResultPair.of(false, null);')
             java_code.append('}')
@@ -1359,7 +1818,8 @@ def parse_sql_to_mongodb_user_collection_data(sql, method_name, collection_info,
             java_code.append('    try {')
             java_code.append('        // Check cache first')
             java_code.append(f'        if (cache_data != null) {{')
-            java_code.append(f'            DataBaseResultPair<Boolean, {class_name}CollectionData> result = cache_data.stream()')
+            # フラグの立っているハッシュインデックスで候補を絞り込む
+            java_code.append(f'            DataBaseResultPair<Boolean, {class_name}CollectionData> result = ({generate_cache_index_stream_with_data(collection_info, collection)})')
             java_code.append('                .filter(item -> {')
             java_code.append('                    boolean match = true;')
             for col in collection_info[collection]["column_list"]:
@@ -1394,7 +1854,7 @@ def parse_sql_to_mongodb_user_collection_data(sql, method_name, collection_info,
             java_code.append('        Bson filter = filters.isEmpty() ? new Document() : Filters.and(filters);')
             if where_conditions:
                 where_filters = []
-                for condition in re.split(r'\bAND\b|\bOR\b', where_conditions, flags=re.IGNORECASE):
+                for condition in split_conditions(where_conditions):
                     condition = condition.strip()
                     if ' ALL ' in condition:
                         field, value = [clean_value(x) for x in condition.split(' ALL ', 1)]
@@ -1413,11 +1873,7 @@ def parse_sql_to_mongodb_user_collection_data(sql, method_name, collection_info,
                             where_filters.append(f'Filters.{comparison_operators[op]}("{field}", {value if optional_flag and is_optional_arg_present(new_params, value) else "data.get" + field.capitalize() + "()"})')
                             break
                 if auto_index:
-                    for col in collection_info[collection]["column_list"]:
-                        if col.get("index_type", "none") in ["ascending", "descending", "hash", "unique"]:
-                            field = col["variable_name"]
-                            if not any(f'"{field}"' in f for f in where_filters):
-                                where_filters.append(f'Filters.exists("{field}")')
+                    where_filters.extend(get_auto_index_filters(where_filters, collection_info, collection, parsed_query["auto_index_mode"]))
                 where_filter = f'Filters.and({", ".join(where_filters)})' if where_filters else 'new Document()'
                 java_code.append(f'        Bson whereFilter = {where_filter};')
                 java_code.append('        Bson combinedFilter = Filters.and(filter, whereFilter);')
@@ -1428,9 +1884,9 @@ def parse_sql_to_mongodb_user_collection_data(sql, method_name, collection_info,
                         direction = direction[0].upper() if direction else 'ASC'
                         sort_value = '1' if direction == 'ASC' else '-1'
                         sort_fields.append(f'"{field}", {sort_value}')
-                    java_code.append(f'        Document doc = collection.find(combinedFilter).sort(new Document().append({", ".join(sort_fields)})).first();')
+                    java_code.append(f'        {class_name}CollectionData doc = typedCollection(collection).find(combinedFilter).sort(new Document().append({", ".join(sort_fields)})).first();')
                 else:
-                    java_code.append(f'        Document doc = collection.find(combinedFilter).first();')
+                    java_code.append(f'        {class_name}CollectionData doc = typedCollection(collection).find(combinedFilter).first();')
             else:
                 if order_by_clause:
                     sort_fields = []
@@ -1439,13 +1895,13 @@ def parse_sql_to_mongodb_user_collection_data(sql, method_name, collection_info,
                         direction = direction[0].upper() if direction else 'ASC'
                         sort_value = '1' if direction == 'ASC' else '-1'
                         sort_fields.append(f'"{field}", {sort_value}')
-                    java_code.append(f'        Document doc = collection.find(filter).sort(new Document().append({", ".join(sort_fields)})).first();')
+                    java_code.append(f'        {class_name}CollectionData doc = typedCollection(collection).find(filter).sort(new Document().append({", ".join(sort_fields)})).first();')
                 else:
-                    java_code.append(f'        Document doc = collection.find(filter).first();')
+                    java_code.append(f'        {class_name}CollectionData doc = typedCollection(collection).find(filter).first();')
             java_code.append('        if (doc == null) {')
             java_code.append(f'            return DataBaseResultPair.of(false, null);')
             java_code.append('        }')
-            java_code.append(f'        return DataBaseResultPair.of(true, new {class_name}CollectionData(doc));')
+            java_code.append('        return DataBaseResultPair.of(true, doc);')
             java_code.append('    } catch (Exception e) {')
             java_code.append(f'        return DataBaseResultPair.of(false, null);')
             java_code.append('}')
@@ -1457,7 +1913,8 @@ def parse_sql_to_mongodb_user_collection_data(sql, method_name, collection_info,
             java_code.append('    try {')
             java_code.append('        // Check cache first')
             java_code.append(f'        if (cache_data != null) {{')
-            java_code.append(f'            List<{class_name}CollectionData> resultList = cache_data.stream()')
+            # フラグの立っているハッシュインデックスで候補を絞り込む
+            java_code.append(f'            List<{class_name}CollectionData> resultList = ({generate_cache_index_stream_with_data(collection_info, collection)})')
             java_code.append('                .filter(item -> {')
             java_code.append('                    boolean match = true;')
             for col in collection_info[collection]["column_list"]:
@@ -1492,7 +1949,7 @@ def parse_sql_to_mongodb_user_collection_data(sql, method_name, collection_info,
             java_code.append('        Bson filter = filters.isEmpty() ? new Document() : Filters.and(filters);')
             if where_conditions:
                 where_filters = []
-                for condition in re.split(r'\bAND\b|\bOR\b', where_conditions, flags=re.IGNORECASE):
+                for condition in split_conditions(where_conditions):
                     condition = condition.strip()
                     if ' ALL ' in condition:
                         field, value = [clean_value(x) for x in condition.split(' ALL ', 1)]
@@ -1511,17 +1968,13 @@ def parse_sql_to_mongodb_user_collection_data(sql, method_name, collection_info,
                             where_filters.append(f'Filters.{comparison_operators[op]}("{field}", {value if optional_flag and is_optional_arg_present(new_params, value) else "data.get" + field.capitalize() + "()"})')
                             break
                 if auto_index:
-                    for col in collection_info[collection]["column_list"]:
-                        if col.get("index_type", "none") in ["ascending", "descending", "hash", "unique"]:
-                            field = col["variable_name"]
-                            if not any(f'"{field}"' in f for f in where_filters):
-                                where_filters.append(f'Filters.exists("{field}")')
+                    where_filters.extend(get_auto_index_filters(where_filters, collection_info, collection, parsed_query["auto_index_mode"]))
                 where_filter = f'Filters.and({", ".join(where_filters)})' if where_filters else 'new Document()'
                 java_code.append(f'        Bson whereFilter = {where_filter};')
                 java_code.append('        Bson combinedFilter = Filters.and(filter, whereFilter);')
-                java_code.append(f'        FindIterable<Document> results = collection.find({"session," if is_transaction else ""}combinedFilter);')
+                java_code.append(f'        FindIterable<{class_name}CollectionData> results = typedCollection(collection).find({"session," if is_transaction else ""}combinedFilter);')
             else:
-                java_code.append(f'        FindIterable<Document> results = collection.find({"session," if is_transaction else ""}filter);')
+                java_code.append(f'        FindIterable<{class_name}CollectionData> results = typedCollection(collection).find({"session," if is_transaction else ""}filter);')
             if order_by_clause:
                 sort_fields = []
                 for sort_item in order_by_clause.split(','):
@@ -1533,8 +1986,8 @@ def parse_sql_to_mongodb_user_collection_data(sql, method_name, collection_info,
             if limit_value:
                 java_code.append(f'        results = results.limit({limit_value});')
             java_code.append(f'        List<{class_name}CollectionData> resultList = new ArrayList<>();')
-            java_code.append('        for (Document doc : results) {')
-            java_code.append(f'            resultList.add(new {class_name}CollectionData(doc));')
+            java_code.append(f'        for ({class_name}CollectionData doc : results) {{')
+            java_code.append('            resultList.add(doc);')
             java_code.append('        }')
             java_code.append(f'        return resultList.isEmpty() ? DataBaseResultPair.of(false, Collections.emptyList()) : DataBaseResultPair.of(true, resultList);')
             java_code.append('    } catch (Exception e) {')
@@ -1546,7 +1999,7 @@ def parse_sql_to_mongodb_user_collection_data(sql, method_name, collection_info,
 
 def convert_where_to_lambda(where_conditions, class_name, optional_flag, new_params):
     conditions = []
-    for condition in re.split(r'\bAND\b|\bOR\b', where_conditions, flags=re.IGNORECASE):
+    for condition in split_conditions(where_conditions):
         condition = condition.strip()
         if ' ALL ' in condition:
             field, value = [clean_value(x) for x in condition.split(' ALL ', 1)]
@@ -1580,19 +2033,20 @@ def generate_comparator(order_by_clause, class_name):
     return 'Comparator.' + '.thenComparing('.join(comparators) + ')' * len(comparators)
 
 # SQLを解析してMongoDB用Javaコードを生成（List<UserCollectionData>引数版）
-def parse_sql_to_mongodb_list_user_collection_data(sql, method_name, collection_info, auto_index=True):
-    parsed = sqlparse.parse(sql)[0]
-    operation = parsed.get_type().lower()
+@profiled("emitter", name=emitter_span_name("WithDataList"), arg_names=("method_name", "auto_index"))
+def parse_sql_to_mongodb_list_user_collection_data(sql, method_name, collection_info, auto_index=True, parsed_query=None, auto_index_mode="planner"):
+    if parsed_query is None:
+        parsed_query = parse_sql_query(sql, collection_info, auto_index_mode)
+    operation = parsed_query["operation"]
     java_code = []
 
-    table_match = re.search(r'\bFROM\s+(\w+)|INTO\s+(\w+)', sql, re.IGNORECASE)
-    collection = table_match.group(1) or table_match.group(2) if table_match else next(iter(collection_info))
-    limit_match = re.search(r'LIMIT\s+(\d+)', sql, re.IGNORECASE)
+    collection = parsed_query["collection"]
+    limit_match = parsed_query["limit_match"]
     limit_value = int(limit_match.group(1)) if limit_match else None
     
-    args = sorted(set(re.findall(r'arg\d+', sql)), key=lambda x: int(x[3:]))
-    arg_params = ', '.join(f'{get_arg_type(collection, arg, sql, collection_info)} {arg}' for arg in args)
-    new_params, optional_flag = process_args(sql, arg_params)
+    args = parsed_query["args"]
+    arg_params = parsed_query["arg_params"]
+    new_params, optional_flag = parsed_query["new_params"], parsed_query["optional_flag"]
 
     java_code.append('@SuppressWarnings({"java:S3776", "unused"})')
     if operation == "insert":
@@ -1616,8 +2070,8 @@ def parse_sql_to_mongodb_list_user_collection_data(sql, method_name, collection_
         java_code.append('}')
 
     elif operation == "update":
-        set_clause = re.search(r'SET\s+(.*?)\s*WHERE', sql, re.IGNORECASE)
-        where_clause = re.search(r'WHERE\s+(.*)', sql, re.IGNORECASE)
+        set_clause = parsed_query["set_clause"]
+        where_clause = parsed_query["where_clause"]
         java_code.append(f'public static boolean {method_name}WithDataList(MongoDatabase db, List<{collection.capitalize()}CollectionData> dataList{", " + new_params if optional_flag else ""}) {{')
         java_code.append('    try {')
         java_code.append(f'        MongoCollection<Document> collection = db.getCollection("{collection}");')
@@ -1643,8 +2097,7 @@ def parse_sql_to_mongodb_list_user_collection_data(sql, method_name, collection_
                 value = clean_value(value)
                 
                 # フィールド情報を取得
-                field_info = next((col for col in collection_info[collection]["column_list"] 
-                                 if col["variable_name"] == field), None)
+                field_info = get_collection_schema(collection_info, collection)["columns"].get(field)
                 is_array = field_info.get("is_array", False) if field_info else False
                 
                 # 配列操作の特別処理
@@ -1677,7 +2130,7 @@ def parse_sql_to_mongodb_list_user_collection_data(sql, method_name, collection_
             where_conditions = where_clause.group(1)
             
             # 条件を分割
-            for condition in re.split(r'\bAND\b|\bOR\b', where_conditions, flags=re.IGNORECASE):
+            for condition in split_conditions(where_conditions):
                 condition = condition.strip()
                 
                 # ALL演算子の処理
@@ -1708,11 +2161,7 @@ def parse_sql_to_mongodb_list_user_collection_data(sql, method_name, collection_
             
             # インデックスの自動追加
             if auto_index:
-                for col in collection_info[collection]["column_list"]:
-                    if col.get("index_type", "none") in ["ascending", "descending", "hash", "unique"]:
-                        field = col["variable_name"]
-                        if not any(f'"{field}"' in f for f in where_filters):
-                            where_filters.append(f'Filters.exists("{field}")')
+                where_filters.extend(get_auto_index_filters(where_filters, collection_info, collection, parsed_query["auto_index_mode"]))
             
             # フィルターを結合
             if where_filters:
@@ -1738,7 +2187,7 @@ def parse_sql_to_mongodb_list_user_collection_data(sql, method_name, collection_
         java_code.append('}')
 
     elif operation == "delete":
-        where_clause = re.search(r'WHERE\s+(.*)', sql, re.IGNORECASE)
+        where_clause = parsed_query["where_clause"]
         java_code.append(f'public static boolean {method_name}WithDataList(MongoDatabase db, List<{collection.capitalize()}CollectionData> dataList{", " + new_params if optional_flag else ""}) {{')
         java_code.append('    try {')
         java_code.append(f'        MongoCollection<Document> collection = db.getCollection("{collection}");')
@@ -1760,7 +2209,7 @@ def parse_sql_to_mongodb_list_user_collection_data(sql, method_name, collection_
             where_conditions = where_clause.group(1)
             
             # 条件を分割
-            for condition in re.split(r'\bAND\b|\bOR\b', where_conditions, flags=re.IGNORECASE):
+            for condition in split_conditions(where_conditions):
                 condition = condition.strip()
                 
                 # ALL演算子の処理
@@ -1791,11 +2240,7 @@ def parse_sql_to_mongodb_list_user_collection_data(sql, method_name, collection_
             
             # インデックスの自動追加
             if auto_index:
-                for col in collection_info[collection]["column_list"]:
-                    if col.get("index_type", "none") in ["ascending", "descending", "hash", "unique"]:
-                        field = col["variable_name"]
-                        if not any(f'"{field}"' in f for f in where_filters):
-                            where_filters.append(f'Filters.exists("{field}")')
+                where_filters.extend(get_auto_index_filters(where_filters, collection_info, collection, parsed_query["auto_index_mode"]))
             
             # フィルターを結合
             if where_filters:
@@ -1821,10 +2266,10 @@ def parse_sql_to_mongodb_list_user_collection_data(sql, method_name, collection_
         java_code.append('}')
 
     elif operation == "select":
-        where_clause = re.search(r'WHERE\s+(.*?)(?:\s*(?:ORDER\s+BY\s+(.*?)|LIMIT\s+\d+))?$', sql, re.IGNORECASE)
+        where_clause = parsed_query["select_where_clause"]
         order_by_clause = where_clause.group(2) if where_clause and where_clause.group(2) else None
         where_conditions = where_clause.group(1) if where_clause else None
-        limit_match = re.search(r'LIMIT\s+(\d+)', sql, re.IGNORECASE)
+        limit_match = parsed_query["limit_match"]
         limit_value = int(limit_match.group(1)) if limit_match else None
         return_type = f'{collection.capitalize()}CollectionData' if limit_value == 1 else f'List<{collection.capitalize()}CollectionData>'
         return_value = 'null' if limit_value == 1 else 'Collections.emptyList()'
@@ -1851,7 +2296,7 @@ def parse_sql_to_mongodb_list_user_collection_data(sql, method_name, collection_
                 where_filters = []
                 
                 # 条件を分割
-                for condition in re.split(r'\bAND\b|\bOR\b', where_conditions, flags=re.IGNORECASE):
+                for condition in split_conditions(where_conditions):
                     condition = condition.strip()
                     
                     # ALL演算子の処理
@@ -1882,11 +2327,7 @@ def parse_sql_to_mongodb_list_user_collection_data(sql, method_name, collection_
                 
                 # インデックスの自動追加
                 if auto_index:
-                    for col in collection_info[collection]["column_list"]:
-                        if col.get("index_type", "none") in ["ascending", "descending", "hash", "unique"]:
-                            field = col["variable_name"]
-                            if not any(f'"{field}"' in f for f in where_filters):
-                                where_filters.append(f'Filters.exists("{field}")')
+                    where_filters.extend(get_auto_index_filters(where_filters, collection_info, collection, parsed_query["auto_index_mode"]))
                 
                 # フィルターを結合
                 if where_filters:
@@ -1910,14 +2351,14 @@ def parse_sql_to_mongodb_list_user_collection_data(sql, method_name, collection_
                     direction = direction[0].upper() if direction else 'ASC'
                     sort_value = '1' if direction == 'ASC' else '-1'
                     sort_fields.append(f'"{field}", {sort_value}')
-                java_code.append(f'        Document doc = collection.find(finalFilter).sort(new Document().append({", ".join(sort_fields)})).first();')
+                java_code.append(f'        {collection.capitalize()}CollectionData doc = typedCollection(collection).find(finalFilter).sort(new Document().append({", ".join(sort_fields)})).first();')
             else:
-                java_code.append(f'        Document doc = collection.find(finalFilter).first();')
+                java_code.append(f'        {collection.capitalize()}CollectionData doc = typedCollection(collection).find(finalFilter).first();')
             
             java_code.append('        if (doc == null) {')
             java_code.append(f'            return DataBaseResultPair.of(false, null);')
             java_code.append('        }')
-            java_code.append(f'         return DataBaseResultPair.of(true, new {collection.capitalize()}CollectionData(doc));')
+            java_code.append('         return DataBaseResultPair.of(true, doc);')
             java_code.append('    } catch (Exception e) {')
             java_code.append(f'        return DataBaseResultPair.of(false, null);')
             java_code.append('    }')
@@ -1945,7 +2386,7 @@ def parse_sql_to_mongodb_list_user_collection_data(sql, method_name, collection_
                 where_filters = []
                 
                 # 条件を分割
-                for condition in re.split(r'\bAND\b|\bOR\b', where_conditions, flags=re.IGNORECASE):
+                for condition in split_conditions(where_conditions):
                     condition = condition.strip()
                     
                     # ALL演算子の処理
@@ -1976,11 +2417,7 @@ def parse_sql_to_mongodb_list_user_collection_data(sql, method_name, collection_
                 
                 # インデックスの自動追加
                 if auto_index:
-                    for col in collection_info[collection]["column_list"]:
-                        if col.get("index_type", "none") in ["ascending", "descending", "hash", "unique"]:
-                            field = col["variable_name"]
-                            if not any(f'"{field}"' in f for f in where_filters):
-                                where_filters.append(f'Filters.exists("{field}")')
+                    where_filters.extend(get_auto_index_filters(where_filters, collection_info, collection, parsed_query["auto_index_mode"]))
                 
                 # フィルターを結合
                 if where_filters:
@@ -2004,14 +2441,14 @@ def parse_sql_to_mongodb_list_user_collection_data(sql, method_name, collection_
                     direction = direction[0].upper() if direction else 'ASC'
                     sort_value = '1' if direction == 'ASC' else '-1'
                     sort_fields.append(f'"{field}", {sort_value}')
-                java_code.append(f'        Document doc = collection.find(finalFilter).sort(new Document().append({", ".join(sort_fields)})).first();')
+                java_code.append(f'        {collection.capitalize()}CollectionData doc = typedCollection(collection).find(finalFilter).sort(new Document().append({", ".join(sort_fields)})).first();')
             else:
-                java_code.append(f'        Document doc = collection.find(finalFilter).first();')
+                java_code.append(f'        {collection.capitalize()}CollectionData doc = typedCollection(collection).find(finalFilter).first();')
             
             java_code.append('        if (doc == null) {')
             java_code.append(f'            return DataBaseResultPair.of(false, null);')
             java_code.append('        }')
-            java_code.append(f'         return DataBaseResultPair.of(true, new {collection.capitalize()}CollectionData(doc));')
+            java_code.append('         return DataBaseResultPair.of(true, doc);')
             java_code.append('    } catch (Exception e) {')
             java_code.append(f'        return DataBaseResultPair.of(false, null);')
             java_code.append('    }')
@@ -2039,7 +2476,7 @@ def parse_sql_to_mongodb_list_user_collection_data(sql, method_name, collection_
                 where_filters = []
                 
                 # 条件を分割
-                for condition in re.split(r'\bAND\b|\bOR\b', where_conditions, flags=re.IGNORECASE):
+                for condition in split_conditions(where_conditions):
                     condition = condition.strip()
                     
                     # ALL演算子の処理
@@ -2070,11 +2507,7 @@ def parse_sql_to_mongodb_list_user_collection_data(sql, method_name, collection_
                 
                 # インデックスの自動追加
                 if auto_index:
-                    for col in collection_info[collection]["column_list"]:
-                        if col.get("index_type", "none") in ["ascending", "descending", "hash", "unique"]:
-                            field = col["variable_name"]
-                            if not any(f'"{field}"' in f for f in where_filters):
-                                where_filters.append(f'Filters.exists("{field}")')
+                    where_filters.extend(get_auto_index_filters(where_filters, collection_info, collection, parsed_query["auto_index_mode"]))
                 
                 # フィルターを結合
                 if where_filters:
@@ -2090,7 +2523,7 @@ def parse_sql_to_mongodb_list_user_collection_data(sql, method_name, collection_
             
             java_code.append('        }')
             java_code.append('        Bson finalFilter = allFilters.isEmpty() ? new Document() : Filters.or(allFilters);')
-            java_code.append('        FindIterable<Document> results = collection.find(finalFilter);')
+            java_code.append(f'        FindIterable<{collection.capitalize()}CollectionData> results = typedCollection(collection).find(finalFilter);')
             
             if order_by_clause:
                 sort_fields = []
@@ -2105,8 +2538,8 @@ def parse_sql_to_mongodb_list_user_collection_data(sql, method_name, collection_
                 java_code.append(f'        results = results.limit({limit_value});')
             
             java_code.append(f'        List<{collection.capitalize()}CollectionData> resultList = new ArrayList<>();')
-            java_code.append('        for (Document doc : results) {')
-            java_code.append(f'            resultList.add(new {collection.capitalize()}CollectionData(doc));')
+            java_code.append(f'        for ({collection.capitalize()}CollectionData doc : results) {{')
+            java_code.append('            resultList.add(doc);')
             java_code.append('        }')
             java_code.append(f'        return resultList.isEmpty() ? DataBaseResultPair.of(false, Collections.emptyList()) : DataBaseResultPair.of(true, resultList);')
             java_code.append('    } catch (Exception e) {')
@@ -2222,11 +2655,40 @@ def generate_user_collection_data_class(collection_info):
     java_code.append('        return doc;')
     java_code.append('    }')
 
+    # カラムを指定した SELECT をキャッシュから返す場合に使う
+    java_code.append('    // 指定したフィールドだけを持つコピーを返す')
+    java_code.append(f'    public {class_name}CollectionData project(String... fields) {{')
+    java_code.append(f'        {class_name}CollectionData copy = new {class_name}CollectionData();')
+    java_code.append('        for (String field : fields) {')
+    java_code.append('            switch (field) {')
+    for col in collection_info[collection]["column_list"]:
+        java_code.append(f'                case "{col["variable_name"]}":')
+        java_code.append(f'                    if ({col["variable_name"]}_flag) {{')
+        java_code.append(f'                        copy.set{col["variable_name"].capitalize()}({col["variable_name"]});')
+        java_code.append('                    }')
+        java_code.append('                    break;')
+    java_code.append('                default:')
+    java_code.append('                    break;')
+    java_code.append('            }')
+    java_code.append('        }')
+    java_code.append('        return copy;')
+    java_code.append('    }')
+
     java_code.append('}')
     return java_code
 
+# BSON から直接 CollectionData を読み込む Codec を生成
+def generate_user_collection_data_codec(collection_info):
+    collection = next(iter(collection_info))
+    class_name = snake_to_pascal(collection.capitalize())
+    fields = []
+    for col in collection_info[collection]["column_list"]:
+        java_type = get_java_wrapper_type(col["variable_type"])
+        fields.append((col["variable_name"], java_type, col.get("is_array", False), f'set{col["variable_name"].capitalize()}'))
+    return generate_codec_class(f"{class_name}CollectionData", fields)
+
 # インデックス作成用の Java コードを生成
-def generate_index_creation_code(collection_info):
+def generate_index_creation_code(collection_info, index_report=None):
     java_code = []
     collection = next(iter(collection_info))
     java_code.append('    public static void createIndexes(MongoDatabase db) {')
@@ -2242,27 +2704,405 @@ def generate_index_creation_code(collection_info):
             java_code.append(f'        collection.createIndex(Indexes.ascending("{col["variable_name"]}"));')
         elif index_type == "descending":
             java_code.append(f'        collection.createIndex(Indexes.descending("{col["variable_name"]}"));')
+    # クエリの分析で提案された複合インデックス
+    if index_report is not None:
+        for line in generate_recommended_index_code(index_report):
+            java_code.append("        " + line)
     
     java_code.append('    }')
     return java_code
 
+# キャッシュ用ハッシュインデックスの対象カラム（unique / hash の非配列カラム、unique を優先）
+def get_cache_index_columns(collection_info, collection):
+    columns = [col for col in get_collection_schema(collection_info, collection)["indexed_columns"]
+               if col.get("index_type", "none") in ["unique", "hash"] and not col.get("is_array", False)]
+    return sorted(columns, key=lambda col: col["index_type"] != "unique")
+
+def get_java_wrapper_type(variable_type):
+    return {
+        "String": "String",
+        "int": "Integer",
+        "double": "Double",
+        "Date": "Date"
+    }.get(variable_type, "Object")
+
+def get_getter_method(field):
+    return f"get{field.capitalize()}"
+
+# コレクションのカラム参照表（カラム名 → 定義・Java の型・getter 名、インデックス付きのカラム）
+def get_collection_schema(collection_info, collection):
+    return get_column_schema(collection_info[collection]["column_list"], get_java_wrapper_type, get_getter_method)
+
+# cache_data のスナップショットが持つ (型, フィールド名) の一覧（全件・各ハッシュインデックス）
+# Change Stream で差分更新する場合は CacheMap（変更したキーの経路だけを作り直せる変更しないマップ）を使う
+def get_cache_snapshot_fields(collection_info):
+    collection = next(iter(collection_info))
+    data_class = f'{snake_to_pascal(collection.capitalize())}CollectionData'
+    change_stream = is_change_stream_enabled(collection_info[collection])
+    map_type = CACHE_MAP_CLASS if change_stream else "Map"
+    fields = [(f"{CACHE_MAP_CLASS}<{data_class}, Boolean>" if change_stream else f"List<{data_class}>", "rows")]
+    for col in get_cache_index_columns(collection_info, collection):
+        key_type = get_java_wrapper_type(col["variable_type"])
+        # unique は1件、hash は同じキーを持つ複数件を保持
+        value_type = data_class if col["index_type"] == "unique" else f'List<{data_class}>'
+        fields.append((f"{map_type}<{key_type}, {value_type}>", f'index_{col["variable_name"]}'))
+    return fields
+
+# cache_data のスナップショットクラスとフィールド宣言を生成
+def generate_cache_data_fields(collection_info):
+    collection = next(iter(collection_info))
+    data_class = f'{snake_to_pascal(collection.capitalize())}CollectionData'
+    fields = get_cache_snapshot_fields(collection_info)
+    rows_iterator = "rows.keySet().iterator()" if is_change_stream_enabled(collection_info[collection]) else "rows.iterator()"
+    java_code = [
+        "  // cache_data のスナップショット: 全件（rows）と各ハッシュインデックス（index_*）をまとめて持ち、公開後は変更しない",
+        "  // 全件読み込み・Change Stream のイベントは新しいスナップショットを作り、cache_data への1回の volatile 代入で公開する",
+        "  // （読み取り側はロック不要で、全件とインデックスが食い違う途中の状態は見えない）",
+        f"  public static final class CacheSnapshot extends AbstractCollection<{data_class}> {{",
+    ]
+    if is_change_stream_enabled(collection_info[collection]):
+        # rows はデータ自体をキーにした CacheMap なので、並びは読み込み順ではない
+        java_code.insert(3, "  // Change Stream で差分更新するため rows は CacheMap のキー集合で持つ（並びは読み込み順ではなく、ORDER BY の無い検索は DB と同じく順不同）")
+    java_code.extend(f"    public final {field_type} {name};" for field_type, name in fields)
+    java_code.append("")
+    java_code.append(f"    CacheSnapshot({', '.join(f'{field_type} {name}' for field_type, name in fields)}) {{")
+    java_code.extend(f"      this.{name} = {name};" for _, name in fields)
+    java_code.append("    }")
+    java_code.append("")
+    java_code.append("    @Override")
+    java_code.append(f"    public Iterator<{data_class}> iterator() {{")
+    java_code.append(f"      return {rows_iterator};")
+    java_code.append("    }")
+    java_code.append("")
+    java_code.append("    @Override")
+    java_code.append("    public int size() {")
+    java_code.append("      return rows.size();")
+    java_code.append("    }")
+    java_code.append("  }")
+    java_code.append("")
+    java_code.append("  public static volatile CacheSnapshot cache_data;")
+    return java_code
+
+# キャッシュのウォームアップ設定（バッチサイズ・デコードスレッド数）のフィールドを生成
+def generate_warmup_fields(default_batch_size=1000):
+    return [
+        f'  public static int warmup_batch_size = {default_batch_size};',
+        '  public static int warmup_threads = Runtime.getRuntime().availableProcessors();',
+    ]
+
+# 非同期メソッドが supplyAsync に渡す Executor（読み込みと書き込みでスレッドプールを分けられる）
+def generate_async_executor_fields():
+    return [
+        '  // 未設定時は従来通り ForkJoinPool.commonPool() で実行する',
+        '  public static volatile Executor read_executor = ForkJoinPool.commonPool();',
+        '  public static volatile Executor write_executor = ForkJoinPool.commonPool();',
+    ]
+
+def generate_async_executor_code():
+    return [
+        "// 非同期メソッドの実行先をまとめて差し替える（ブロッキング I/O 用に上限付きのプールを渡す）",
+        "public static void setAsyncExecutor(Executor executor) {",
+        "    setAsyncExecutors(executor, executor);",
+        "}",
+        "",
+        "// 読み込み（SELECT）と書き込み（INSERT / UPDATE / DELETE / バルク操作）で実行先を分ける",
+        "public static void setAsyncExecutors(Executor readExecutor, Executor writeExecutor) {",
+        "    if (readExecutor == null || writeExecutor == null) {",
+        '        throw new IllegalArgumentException("executor must not be null");',
+        "    }",
+        "    read_executor = readExecutor;",
+        "    write_executor = writeExecutor;",
+        "}",
+    ]
+
+# 操作に対応する Executor のフィールド名
+def get_async_executor(operation):
+    return "read_executor" if operation == "select" else "write_executor"
+
+# キャッシュ対象カラムだけを取得し、バッチ単位でワーカースレッドにデコードさせる読み込み関数を生成
+def generate_warmup_loader_code(collection_info):
+    java_code = []
+    collection = next(iter(collection_info))
+    class_name = snake_to_pascal(collection.capitalize())
+    projection = ", ".join(f'"{col["variable_name"]}"' for col in collection_info[collection]["column_list"])
+    data_class = f'{class_name}CollectionData'
+    java_code.append("")
+    java_code.append(f"private static List<{data_class}> loadCache{data_class}(MongoDatabase db, int batchSize, int threads, LongConsumer progress)" + "{")
+    java_code.append("  int size = Math.max(1, batchSize);")
+    java_code.append("  // カーソル側はバイト列のまま受け取り、デコードはワーカースレッドで Codec により行う")
+    java_code.append("  MongoCollection<RawBsonDocument> collection = db.getCollection(collection_name).withDocumentClass(RawBsonDocument.class);")
+    java_code.append("  FindIterable<RawBsonDocument> results = collection.find()")
+    java_code.append(f"      .projection(Projections.include({projection}))")
+    java_code.append("      .batchSize(size);")
+    java_code.append("  ExecutorService pool = Executors.newFixedThreadPool(Math.max(1, threads));")
+    java_code.append("  try {")
+    java_code.append(f"      List<Future<List<{data_class}>>> futures = new ArrayList<>();")
+    java_code.append("      List<RawBsonDocument> batch = new ArrayList<>(size);")
+    java_code.append("      for (RawBsonDocument doc : results) {")
+    java_code.append("          batch.add(doc);")
+    java_code.append("          if (batch.size() >= size) {")
+    java_code.append(f"              futures.add(pool.submit(decode{data_class}Batch(batch)));")
+    java_code.append("              batch = new ArrayList<>(size);")
+    java_code.append("          }")
+    java_code.append("      }")
+    java_code.append(f"      if (!batch.isEmpty()) futures.add(pool.submit(decode{data_class}Batch(batch)));")
+    java_code.append(f"      List<{data_class}> data_list = new ArrayList<>();")
+    java_code.append("      for (Future<List<" + data_class + ">> future : futures) {")
+    java_code.append("          data_list.addAll(future.get());")
+    java_code.append("          if (progress != null) progress.accept(data_list.size());")
+    java_code.append("      }")
+    java_code.append("      return data_list;")
+    java_code.append("  } catch (InterruptedException e) {")
+    java_code.append("      Thread.currentThread().interrupt();")
+    java_code.append("      throw new IllegalStateException(\"cache warm-up interrupted\", e);")
+    java_code.append("  } catch (ExecutionException e) {")
+    java_code.append("      throw new IllegalStateException(\"cache warm-up failed\", e.getCause());")
+    java_code.append("  } finally {")
+    java_code.append("      pool.shutdown();")
+    java_code.append("  }")
+    java_code.append("}")
+    java_code.append("")
+    java_code.append(f"private static Callable<List<{data_class}>> decode{data_class}Batch(List<RawBsonDocument> docs)" + "{")
+    java_code.append("  return () -> {")
+    java_code.append(f"      Codec<{data_class}> codec = {get_codec_class_name(data_class)}.REGISTRY.get({data_class}.class);")
+    java_code.append(f"      List<{data_class}> decoded = new ArrayList<>(docs.size());")
+    if is_change_stream_enabled(collection_info[collection]):
+        # Change Stream の削除イベント用に _id とデータの対応を記録する
+        java_code.append("      for (RawBsonDocument doc : docs) {")
+        java_code.append(f"          {data_class} data = doc.decode(codec);")
+        java_code.append("          cache_document_ids.put(documentId(doc), data);")
+        java_code.append("          decoded.add(data);")
+        java_code.append("      }")
+    else:
+        java_code.append("      for (RawBsonDocument doc : docs) decoded.add(doc.decode(codec));")
+    java_code.append("      return decoded;")
+    java_code.append("  };")
+    java_code.append("}")
+    return java_code
+
+# MemoryCache関数を生成（cache_data と各ハッシュインデックスを構築）
+def generate_memory_cache_code(collection_info):
+    java_code = []
+    collection = next(iter(collection_info))
+    class_name = snake_to_pascal(collection.capitalize())
+    index_columns = get_cache_index_columns(collection_info, collection)
+    change_stream = is_change_stream_enabled(collection_info[collection])
+    java_code.append(f"public static void MemoryCache{class_name}CollectionData(MongoDatabase db)" + "{")
+    java_code.append(f"  MemoryCache{class_name}CollectionData(db, warmup_batch_size, warmup_threads, null);")
+    java_code.append("}")
+    java_code.append("")
+    java_code.append(f"public static void MemoryCache{class_name}CollectionData(MongoDatabase db, int batchSize, int threads, LongConsumer progress)" + "{")
+    if is_change_stream_enabled(collection_info[collection]):
+        java_code.append("  cache_document_ids = new ConcurrentHashMap<>();")
+    java_code.append(f"  List<{class_name}CollectionData> data_list = loadCache{class_name}CollectionData(db, batchSize, threads, progress);")
+    for col in index_columns:
+        key_type = get_java_wrapper_type(col["variable_type"])
+        value_type = f'{class_name}CollectionData' if col["index_type"] == "unique" else f'List<{class_name}CollectionData>'
+        java_code.append(f'  Map<{key_type}, {value_type}> index_{col["variable_name"]} = new HashMap<>();')
+    if change_stream:
+        java_code.append(f"  {CACHE_MAP_CLASS}<{class_name}CollectionData, Boolean> rows = {CACHE_MAP_CLASS}.empty();")
+    java_code.append(f"  for ({class_name}CollectionData data : data_list) {{")
+    if change_stream:
+        java_code.append("      rows = rows.with(data, Boolean.TRUE);")
+    for col in index_columns:
+        field = col["variable_name"]
+        if col["index_type"] == "unique":
+            java_code.append(f'      index_{field}.put(data.get{field.capitalize()}(), data);')
+        else:
+            java_code.append(f'      index_{field}.computeIfAbsent(data.get{field.capitalize()}(), k -> new ArrayList<>()).add(data);')
+    java_code.append("  }")
+    # 同じキーのリストは余分な容量の無い変更不可リストに詰め直す
+    for col in index_columns:
+        if col["index_type"] != "unique":
+            java_code.append(f'  index_{col["variable_name"]}.replaceAll((key, bucket) -> List.copyOf(bucket));')
+    # 全件とインデックスを1つのスナップショットにまとめて1回で公開する（Change Stream の書き込みとは排他）
+    if change_stream:
+        snapshot_args = ["rows"] + [f'{CACHE_MAP_CLASS}.of(index_{col["variable_name"]})' for col in index_columns]
+    else:
+        snapshot_args = ["List.copyOf(data_list)"] + [f'Collections.unmodifiableMap(index_{col["variable_name"]})' for col in index_columns]
+    java_code.append(f"  CacheSnapshot snapshot = new CacheSnapshot({', '.join(snapshot_args)});")
+    java_code.append(f"  synchronized ({class_name}CollectionDb.class) {{")
+    java_code.append("      cache_data = snapshot;")
+    java_code.append("  }")
+    java_code.append("}")
+    return java_code
+
+# Change Stream 監視用の関数を生成（cache_data とハッシュインデックスを差分更新する）
+# 1件のイベントは公開中のスナップショットの CacheMap から変更したキーだけを作り直した新しいスナップショットを作り、1回で公開する
+# （同じキーのリストは複製に反映してから置き換える。applyChange は synchronized なので書き込みは1本）
+def generate_change_stream_watcher_code(collection_info):
+    collection = next(iter(collection_info))
+    class_name = snake_to_pascal(collection.capitalize())
+    data_class = f'{class_name}CollectionData'
+    fields = get_cache_snapshot_fields(collection_info)
+    replace_lines = ["CacheSnapshot current = cache_data;"]
+    replace_lines.extend(f"{field_type} {name} = current.{name};" for field_type, name in fields)
+    remove_lines = ["rows = rows.without(old);"]
+    put_lines = ["rows = rows.with(data, Boolean.TRUE);"]
+    for col in get_cache_index_columns(collection_info, collection):
+        field = col["variable_name"]
+        index = f"index_{field}"
+        if col["index_type"] == "unique":
+            # 同じキーで後から入ったデータは外さない
+            remove_lines.append(f'if ({index}.get(old.get{field.capitalize()}()) == old) {index} = {index}.without(old.get{field.capitalize()}());')
+            put_lines.append(f'{index} = {index}.with(data.get{field.capitalize()}(), data);')
+        else:
+            remove_lines.append(f'List<{data_class}> bucket_{field} = new ArrayList<>({index}.getOrDefault(old.get{field.capitalize()}(), Collections.emptyList()));')
+            remove_lines.append(f'if (bucket_{field}.remove(old)) {{')
+            remove_lines.append(f'    {index} = bucket_{field}.isEmpty() ? {index}.without(old.get{field.capitalize()}()) : {index}.with(old.get{field.capitalize()}(), List.copyOf(bucket_{field}));')
+            remove_lines.append('}')
+            put_lines.append(f'List<{data_class}> bucket_{field} = new ArrayList<>({index}.getOrDefault(data.get{field.capitalize()}(), Collections.emptyList()));')
+            put_lines.append(f'bucket_{field}.add(data);')
+            put_lines.append(f'{index} = {index}.with(data.get{field.capitalize()}(), List.copyOf(bucket_{field}));')
+    replace_lines.append("if (old != null) {")
+    replace_lines.extend("    " + line for line in remove_lines)
+    replace_lines.append("}")
+    replace_lines.append("if (data != null) {")
+    replace_lines.extend("    " + line for line in put_lines)
+    replace_lines.append("}")
+    replace_lines.append(f"cache_data = new CacheSnapshot({', '.join(name for _, name in fields)});")
+    return generate_change_stream_code(data_class, f"MemoryCache{data_class}", replace_lines)
+
+# WHERE句がANDのみの場合、(条件のリスト, カラム → 必須引数の等価条件) を返す
+def get_where_equalities(where_conditions):
+    if not where_conditions or or_xor_pattern.search(where_conditions):
+        return None
+    conditions = [c.strip() for c in and_pattern.split(where_conditions) if c.strip(' ;')]
+    equalities = {}
+    for condition in conditions:
+        match = equality_pattern.fullmatch(condition)
+        if match:
+            equalities.setdefault(match.group(1), match.group(2))
+    return conditions, equalities
+
+# WHERE句がANDのみで、ハッシュインデックス対象カラムへの必須引数の等価条件を含む場合、(カラム, 引数, 残りの条件があるか) を返す
+def find_cache_index_lookup(where_conditions, collection_info, collection):
+    parsed = get_where_equalities(where_conditions)
+    if parsed is None:
+        return None
+    conditions, equalities = parsed
+    for col in get_cache_index_columns(collection_info, collection):
+        if col["variable_name"] in equalities:
+            return col, equalities[col["variable_name"]], len(conditions) > 1
+    return None
+
+# 上限付きキャッシュのキーにするカラム（最初の unique の非配列カラム）
+def get_bounded_cache_column(collection_info, collection):
+    return next((col for col in get_cache_index_columns(collection_info, collection) if col["index_type"] == "unique"), None)
+
+# WHERE句がANDのみで、上限付きキャッシュのキーへの必須引数の等価条件を含む場合、(カラム, 引数, 残りの条件があるか) を返す
+def find_bounded_cache_key(where_conditions, collection_info, collection):
+    if not is_bounded_cache_enabled(collection_info[collection]):
+        return None
+    col = get_bounded_cache_column(collection_info, collection)
+    parsed = get_where_equalities(where_conditions)
+    if col is None or parsed is None:
+        return None
+    conditions, equalities = parsed
+    if col["variable_name"] not in equalities:
+        return None
+    return col, equalities[col["variable_name"]], len(conditions) > 1
+
+def generate_bounded_cache_read_code(where_conditions, collection_info, collection, select_columns):
+    """
+    unique キーで1件取得する SELECT に上限付きキャッシュの read-through を追加する
+
+    Args:
+        where_conditions (str): WHERE句
+        collection_info (dict): コレクション情報
+        collection (str): コレクション名
+        select_columns (list): SELECT のカラム指定（指定ありの場合は取得結果をキャッシュに追加しない）
+
+    Returns:
+        tuple: (DB を読む前に挿入する行, DB から読んだ doc をキャッシュに追加する行)。対象外の場合は ([], None)
+    """
+    lookup = find_bounded_cache_key(where_conditions, collection_info, collection)
+    if lookup is None:
+        return [], None
+    _, arg, has_rest = lookup
+    data_class = f'{snake_to_pascal(collection.capitalize())}CollectionData'
+    cached = f'cache_bounded.get({arg})'
+    if has_rest:
+        # 残りの条件を満たさない場合は DB で確認する
+        predicate = generate_cache_predicate(where_conditions, collection_info[collection]["column_list"])
+        if predicate is None:
+            return [], None
+        cached = f'Stream.ofNullable({cached}).filter(data -> {predicate}).findFirst().orElse(null)'
+    java_code = [
+        '        // 上限付きキャッシュ（unique キーで引いたデータを保持）を確認し、無ければ DB から読んで追加する',
+        f'        {data_class} bounded = {cached};',
+        f'        if (bounded != null) return DataBaseResultPair.of(true, {generate_cache_projection(select_columns, "bounded")});',
+    ]
+    if select_columns:
+        return java_code, None
+    java_code.append('        long boundedGeneration = cache_bounded.generation();')
+    return java_code, f'        if (doc != null) cache_bounded.put({arg}, doc, boundedGeneration);'
+
+def generate_bounded_invalidate_code(collection_info, collection, where_conditions=None, data_name=None, list_name=None, cache_owner=""):
+    """
+    書き込みの後に上限付きキャッシュから対象を外す行を生成する（Reactive 版へ変換できるように1行にする）
+
+    unique キーが分かる場合はそのキーだけ、分からない場合は全件を外す。
+    トランザクション内の書き込みはコミット前に外すので、コミットまでの間に読まれた値は TTL で失効するまで残りうる。
+
+    Args:
+        collection_info (dict): コレクション情報
+        collection (str): コレクション名
+        where_conditions (str): 単一引数版の WHERE句
+        data_name (str): UserCollectionData 引数版のデータの変数名
+        list_name (str): バルク操作の List<UserCollectionData> の変数名
+        cache_owner (str): キャッシュを持つクラスの修飾（Reactive 版は "XCollectionDb."）
+
+    Returns:
+        list: Java コードの行リスト（上限付きキャッシュを使わない場合は空）
+    """
+    if not is_bounded_cache_enabled(collection_info[collection]):
+        return []
+    cache = f'{cache_owner}cache_bounded'
+    field = get_bounded_cache_column(collection_info, collection)["variable_name"].capitalize()
+    if list_name:
+        data_class = f'{snake_to_pascal(collection.capitalize())}CollectionData'
+        # キーの無い行は UpdateMany で任意のドキュメントを書き換えうるので全件を外す
+        return [f'if ({list_name}.stream().allMatch({data_class}::is{field}Flag)) {list_name}.forEach(data -> {cache}.invalidate(data.get{field}())); else {cache}.invalidateAll();']
+    if data_name:
+        return [f'if ({data_name}.is{field}Flag()) {cache}.invalidate({data_name}.get{field}()); else {cache}.invalidateAll();']
+    lookup = find_bounded_cache_key(where_conditions, collection_info, collection)
+    if lookup:
+        return [f'{cache}.invalidate({lookup[1]});']
+    return [f'{cache}.invalidateAll();']
+
+# ハッシュインデックスから候補を取り出す Stream 式を生成
+def generate_cache_index_stream(col, key_expr):
+    if col["index_type"] == "unique":
+        return f'Stream.ofNullable(cache_data.index_{col["variable_name"]}.get({key_expr}))'
+    return f'cache_data.index_{col["variable_name"]}.getOrDefault({key_expr}, Collections.emptyList()).stream()'
+
+# UserCollectionData引数版: フラグの立っているインデックスカラムから候補を取り出す Stream 式を生成
+def generate_cache_index_stream_with_data(collection_info, collection):
+    stream_expr = 'cache_data.stream()'
+    for col in reversed(get_cache_index_columns(collection_info, collection)):
+        field = col["variable_name"]
+        stream_expr = f'data.is{field.capitalize()}Flag() ? {generate_cache_index_stream(col, f"data.get{field.capitalize()}()")} : {stream_expr}'
+    return stream_expr
+
 
 # 非同期版: 単一引数用の関数
 # 非同期版: 単一引数用の関数
-def parse_sql_to_mongodb_single_async(sql, method_name, collection_info, auto_index=True):
-    parsed = sqlparse.parse(sql)[0]
-    operation = parsed.get_type().lower()
+@profiled("emitter", name=emitter_span_name("single async"), arg_names=("method_name", "auto_index"))
+def parse_sql_to_mongodb_single_async(sql, method_name, collection_info, auto_index=True, parsed_query=None, auto_index_mode="planner"):
+    if parsed_query is None:
+        parsed_query = parse_sql_query(sql, collection_info, auto_index_mode)
+    operation = parsed_query["operation"]
     java_code = []
 
-    table_match = re.search(r'\bFROM\s+(\w+)|INTO\s+(\w+)', sql, re.IGNORECASE)
-    collection = table_match.group(1) or table_match.group(2) if table_match else next(iter(collection_info))
-    args = sorted(set(re.findall(r'arg\d+', sql)), key=lambda x: int(x[3:]))
-    arg_params = ', '.join(f'{get_arg_type(collection, arg, sql, collection_info)} {arg}' for arg in args)
+    collection = parsed_query["collection"]
+    args = parsed_query["args"]
+    arg_params = parsed_query["arg_params"]
     
     java_code.append('@SuppressWarnings({"java:S3776", "unused"})')
     
     if operation == "insert":
-        fields = re.search(r'\((.*?)\)\s*VALUES\s*\((.*?)\)', sql, re.IGNORECASE)
+        fields = parsed_query["insert_fields"]
         if fields:
             field_list = [f.strip() for f in fields.group(1).split(',')]
             args = [a.strip() for a in fields.group(2).split(',')]
@@ -2283,12 +3123,12 @@ def parse_sql_to_mongodb_single_async(sql, method_name, collection_info, auto_in
             java_code.append('        } catch (Exception e) {')
             java_code.append('            return false;')
             java_code.append('        }')
-            java_code.append('    });')
+            java_code.append(f'    }}, {get_async_executor(operation)});')
             java_code.append('}')
 
     elif operation == "update":
-        set_clause = re.search(r'SET\s+(.*?)\s*WHERE', sql, re.IGNORECASE)
-        where_clause = re.search(r'WHERE\s+(.*)', sql, re.IGNORECASE)
+        set_clause = parsed_query["set_clause"]
+        where_clause = parsed_query["where_clause"]
         java_code.append(f'public static CompletableFuture<Boolean> {method_name}Async(MongoDatabase db, {arg_params}) {{')
         java_code.append('    return CompletableFuture.supplyAsync(() -> {')
         java_code.append('        try {')
@@ -2300,8 +3140,7 @@ def parse_sql_to_mongodb_single_async(sql, method_name, collection_info, auto_in
                 value = clean_value(value)
                 
                 # フィールド情報を取得
-                field_info = next((col for col in collection_info[collection]["column_list"] 
-                                 if col["variable_name"] == field), None)
+                field_info = get_collection_schema(collection_info, collection)["columns"].get(field)
                 is_array = field_info.get("is_array", False) if field_info else False
                 
                 # 配列操作の特別処理
@@ -2324,7 +3163,7 @@ def parse_sql_to_mongodb_single_async(sql, method_name, collection_info, auto_in
             java_code.append(f'            Bson update = Updates.combine({", ".join(updates)});')
 
         if where_clause:
-            filters = parse_where_clause(where_clause.group(1), collection_info, collection, auto_index=auto_index)
+            filters = get_where_filter(parsed_query, where_clause.group(1), collection_info, collection, auto_index=auto_index)
             java_code.append(f'            Bson filter = {filters};')
             java_code.append('            UpdateResult result = collection.updateOne(filter, update);')
             java_code.append('            return result.getMatchedCount() > 0;')
@@ -2334,17 +3173,17 @@ def parse_sql_to_mongodb_single_async(sql, method_name, collection_info, auto_in
         java_code.append('        } catch (Exception e) {')
         java_code.append('            return false;')
         java_code.append('        }')
-        java_code.append('    });')
+        java_code.append(f'    }}, {get_async_executor(operation)});')
         java_code.append('}')
 
     elif operation == "delete":
-        where_clause = re.search(r'WHERE\s+(.*)', sql, re.IGNORECASE)
+        where_clause = parsed_query["where_clause"]
         java_code.append(f'public static CompletableFuture<Boolean> {method_name}Async(MongoDatabase db, {arg_params}) {{')
         java_code.append('    return CompletableFuture.supplyAsync(() -> {')
         java_code.append('        try {')
         java_code.append(f'            MongoCollection<Document> collection = db.getCollection("{collection}");')
         if where_clause:
-            filters = parse_where_clause(where_clause.group(1), collection_info, collection, auto_index=auto_index)
+            filters = get_where_filter(parsed_query, where_clause.group(1), collection_info, collection, auto_index=auto_index)
             java_code.append(f'            Bson filter = {filters};')
             java_code.append('            DeleteResult result = collection.deleteOne(filter);')
             java_code.append('            return result.getDeletedCount() > 0;')
@@ -2354,14 +3193,14 @@ def parse_sql_to_mongodb_single_async(sql, method_name, collection_info, auto_in
         java_code.append('        } catch (Exception e) {')
         java_code.append('            return false;')
         java_code.append('        }')
-        java_code.append('    });')
+        java_code.append(f'    }}, {get_async_executor(operation)});')
         java_code.append('}')
 
     elif operation == "select":
-        where_clause = re.search(r'WHERE\s+(.*?)(?:\s*(?:ORDER\s+BY\s+(.*?)|LIMIT\s+\d+))?$', sql, re.IGNORECASE)
+        where_clause = parsed_query["select_where_clause"]
         order_by_clause = where_clause.group(2) if where_clause and where_clause.group(2) else None
         where_conditions = where_clause.group(1) if where_clause else None
-        limit_match = re.search(r'LIMIT\s+(\d+)', sql, re.IGNORECASE)
+        limit_match = parsed_query["limit_match"]
         limit_value = int(limit_match.group(1)) if limit_match else None
         return_type = f'DataBaseResultPair<Boolean, {collection.capitalize()}CollectionData>' if limit_value == 1 else f'DataBaseResultPair<Boolean, List<{collection.capitalize()}CollectionData>>'
         return_value = 'DataBaseResultPair.of(false, null)' if limit_value == 1 else 'DataBaseResultPair.of(false, Collections.emptyList())'
@@ -2372,7 +3211,7 @@ def parse_sql_to_mongodb_single_async(sql, method_name, collection_info, auto_in
             java_code.append('        try {')
             java_code.append(f'            MongoCollection<Document> collection = db.getCollection("{collection}");')
             if where_conditions:
-                filters = parse_where_clause(where_conditions, collection_info, collection, auto_index=auto_index)
+                filters = get_where_filter(parsed_query, where_conditions, collection_info, collection, auto_index=auto_index)
                 java_code.append(f'            Bson filter = {filters};')
                 if order_by_clause:
                     sort_fields = []
@@ -2381,13 +3220,13 @@ def parse_sql_to_mongodb_single_async(sql, method_name, collection_info, auto_in
                         direction = direction[0].upper() if direction else 'ASC'
                         sort_value = '1' if direction == 'ASC' else '-1'
                         sort_fields.append(f'"{field}", {sort_value}')
-                    java_code.append(f'            Document doc = collection.find(filter).sort(new Document().append({", ".join(sort_fields)})).first();')
+                    java_code.append(f'            {collection.capitalize()}CollectionData doc = typedCollection(collection).find(filter).sort(new Document().append({", ".join(sort_fields)})).first();')
                 else:
-                    java_code.append(f'            Document doc = collection.find(filter).first();')
+                    java_code.append(f'            {collection.capitalize()}CollectionData doc = typedCollection(collection).find(filter).first();')
                 java_code.append('            if (doc == null) {')
                 java_code.append(f'                return {return_value};')
                 java_code.append('            }')
-                java_code.append(f'            return DataBaseResultPair.of(true, new {collection.capitalize()}CollectionData(doc));')
+                java_code.append('            return DataBaseResultPair.of(true, doc);')
             else:
                 if order_by_clause:
                     sort_fields = []
@@ -2396,17 +3235,17 @@ def parse_sql_to_mongodb_single_async(sql, method_name, collection_info, auto_in
                         direction = direction[0].upper() if direction else 'ASC'
                         sort_value = '1' if direction == 'ASC' else '-1'
                         sort_fields.append(f'"{field}", {sort_value}')
-                    java_code.append(f'            Document doc = collection.find().sort(new Document().append({", ".join(sort_fields)})).first();')
+                    java_code.append(f'            {collection.capitalize()}CollectionData doc = typedCollection(collection).find().sort(new Document().append({", ".join(sort_fields)})).first();')
                 else:
-                    java_code.append('            Document doc = collection.find().first();')
+                    java_code.append(f'            {collection.capitalize()}CollectionData doc = typedCollection(collection).find().first();')
                 java_code.append('            if (doc == null) {')
                 java_code.append(f'                return {return_value};')
                 java_code.append('            }')
-                java_code.append(f'            return DataBaseResultPair.of(true, new {collection.capitalize()}CollectionData(doc));')
+                java_code.append('            return DataBaseResultPair.of(true, doc);')
             java_code.append('        } catch (Exception e) {')
             java_code.append(f'            return {return_value};')
             java_code.append('        }')
-            java_code.append('    });')
+            java_code.append(f'    }}, {get_async_executor(operation)});')
             java_code.append('}')
         else:
             # One バージョンの生成
@@ -2415,7 +3254,7 @@ def parse_sql_to_mongodb_single_async(sql, method_name, collection_info, auto_in
             java_code.append('        try {')
             java_code.append(f'            MongoCollection<Document> collection = db.getCollection("{collection}");')
             if where_conditions:
-                filters = parse_where_clause(where_conditions, collection_info, collection, auto_index=auto_index)
+                filters = get_where_filter(parsed_query, where_conditions, collection_info, collection, auto_index=auto_index)
                 java_code.append(f'            Bson filter = {filters};')
                 if order_by_clause:
                     sort_fields = []
@@ -2424,13 +3263,13 @@ def parse_sql_to_mongodb_single_async(sql, method_name, collection_info, auto_in
                         direction = direction[0].upper() if direction else 'ASC'
                         sort_value = '1' if direction == 'ASC' else '-1'
                         sort_fields.append(f'"{field}", {sort_value}')
-                    java_code.append(f'            Document doc = collection.find(filter).sort(new Document().append({", ".join(sort_fields)})).first();')
+                    java_code.append(f'            {collection.capitalize()}CollectionData doc = typedCollection(collection).find(filter).sort(new Document().append({", ".join(sort_fields)})).first();')
                 else:
-                    java_code.append(f'            Document doc = collection.find(filter).first();')
+                    java_code.append(f'            {collection.capitalize()}CollectionData doc = typedCollection(collection).find(filter).first();')
                 java_code.append('            if (doc == null) {')
                 java_code.append(f'                return DataBaseResultPair.of(false, null);')
                 java_code.append('            }')
-                java_code.append(f'            return DataBaseResultPair.of(true, new {collection.capitalize()}CollectionData(doc));')
+                java_code.append('            return DataBaseResultPair.of(true, doc);')
             else:
                 if order_by_clause:
                     sort_fields = []
@@ -2439,17 +3278,17 @@ def parse_sql_to_mongodb_single_async(sql, method_name, collection_info, auto_in
                         direction = direction[0].upper() if direction else 'ASC'
                         sort_value = '1' if direction == 'ASC' else '-1'
                         sort_fields.append(f'"{field}", {sort_value}')
-                    java_code.append(f'            Document doc = collection.find().sort(new Document().append({", ".join(sort_fields)})).first();')
+                    java_code.append(f'            {collection.capitalize()}CollectionData doc = typedCollection(collection).find().sort(new Document().append({", ".join(sort_fields)})).first();')
                 else:
-                    java_code.append('            Document doc = collection.find().first();')
+                    java_code.append(f'            {collection.capitalize()}CollectionData doc = typedCollection(collection).find().first();')
                 java_code.append('            if (doc == null) {')
                 java_code.append(f'                return DataBaseResultPair.of(false, null);')
                 java_code.append('            }')
-                java_code.append(f'            return DataBaseResultPair.of(true, new {collection.capitalize()}CollectionData(doc));')
+                java_code.append('            return DataBaseResultPair.of(true, doc);')
             java_code.append('        } catch (Exception e) {')
             java_code.append(f'            return DataBaseResultPair.of(false, null);')
             java_code.append('        }')
-            java_code.append('    });')
+            java_code.append(f'    }}, {get_async_executor(operation)});')
             java_code.append('}')
             
             # Many バージョンの生成
@@ -2459,11 +3298,11 @@ def parse_sql_to_mongodb_single_async(sql, method_name, collection_info, auto_in
             java_code.append('        try {')
             java_code.append(f'            MongoCollection<Document> collection = db.getCollection("{collection}");')
             if where_conditions:
-                filters = parse_where_clause(where_conditions, collection_info, collection, auto_index=auto_index)
+                filters = get_where_filter(parsed_query, where_conditions, collection_info, collection, auto_index=auto_index)
                 java_code.append(f'            Bson filter = {filters};')
-                java_code.append('            FindIterable<Document> results = collection.find(filter);')
+                java_code.append(f'            FindIterable<{collection.capitalize()}CollectionData> results = typedCollection(collection).find(filter);')
             else:
-                java_code.append('            FindIterable<Document> results = collection.find();')
+                java_code.append(f'            FindIterable<{collection.capitalize()}CollectionData> results = typedCollection(collection).find();')
             if order_by_clause:
                 sort_fields = []
                 for sort_item in order_by_clause.split(','):
@@ -2475,29 +3314,30 @@ def parse_sql_to_mongodb_single_async(sql, method_name, collection_info, auto_in
             if limit_value:
                 java_code.append(f'            results = results.limit({limit_value});')
             java_code.append(f'            List<{collection.capitalize()}CollectionData> resultList = new ArrayList<>();')
-            java_code.append('            for (Document doc : results) {')
-            java_code.append(f'                resultList.add(new {collection.capitalize()}CollectionData(doc));')
+            java_code.append(f'            for ({collection.capitalize()}CollectionData doc : results) {{')
+            java_code.append('                resultList.add(doc);')
             java_code.append('            }')
             java_code.append(f'            return resultList.isEmpty() ? DataBaseResultPair.of(false, Collections.emptyList()) : DataBaseResultPair.of(true, resultList);')
             java_code.append('        } catch (Exception e) {')
             java_code.append(f'            return DataBaseResultPair.of(false, Collections.emptyList());')
             java_code.append('        }')
-            java_code.append('    });')
+            java_code.append(f'    }}, {get_async_executor(operation)});')
             java_code.append('}')
 
     return java_code
 
 # 非同期版: UserCollectionData引数用の関数
-def parse_sql_to_mongodb_user_collection_data_async(sql, method_name, collection_info, auto_index=True,is_transaction = False):
-    parsed = sqlparse.parse(sql)[0]
-    operation = parsed.get_type().lower()
+@profiled("emitter", name=emitter_span_name("WithData async"), arg_names=("method_name", "auto_index"))
+def parse_sql_to_mongodb_user_collection_data_async(sql, method_name, collection_info, auto_index=True,is_transaction = False, parsed_query=None, cache_owner="", auto_index_mode="planner"):
+    if parsed_query is None:
+        parsed_query = parse_sql_query(sql, collection_info, auto_index_mode)
+    operation = parsed_query["operation"]
     java_code = []
 
-    table_match = re.search(r'\bFROM\s+(\w+)|INTO\s+(\w+)', sql, re.IGNORECASE)
-    collection = table_match.group(1) or table_match.group(2) if table_match else next(iter(collection_info))
-    args = sorted(set(re.findall(r'arg\d+', sql)), key=lambda x: int(x[3:]))
-    arg_params = ', '.join(f'{get_arg_type(collection, arg, sql, collection_info)} {arg}' for arg in args)
-    new_params, optional_flag = process_args(sql, arg_params)
+    collection = parsed_query["collection"]
+    args = parsed_query["args"]
+    arg_params = parsed_query["arg_params"]
+    new_params, optional_flag = parsed_query["new_params"], parsed_query["optional_flag"]
     
     class_name = snake_to_pascal(collection.capitalize())
 
@@ -2519,12 +3359,12 @@ def parse_sql_to_mongodb_user_collection_data_async(sql, method_name, collection
         java_code.append('        } catch (Exception e) {')
         java_code.append('            return false;')
         java_code.append('        }')
-        java_code.append('    });')
+        java_code.append(f'    }}, {get_async_executor(operation)});')
         java_code.append('}')
 
     elif operation == "update":
-        set_clause = re.search(r'SET\s+(.*?)\s*WHERE', sql, re.IGNORECASE)
-        where_clause = re.search(r'WHERE\s+(.*)', sql, re.IGNORECASE)
+        set_clause = parsed_query["set_clause"]
+        where_clause = parsed_query["where_clause"]
         
         java_code.append(f'public static CompletableFuture<Boolean> {method_name}{"Transaction" if is_transaction else ""}AsyncWithData(MongoDatabase db,{"ClientSession session," if is_transaction else ""} {class_name}CollectionData data{", " + new_params if optional_flag else ""}) {{')
         java_code.append('    return CompletableFuture.supplyAsync(() -> {')
@@ -2550,8 +3390,7 @@ def parse_sql_to_mongodb_user_collection_data_async(sql, method_name, collection
                 value = clean_value(value)
                 
                 # フィールド情報を取得
-                field_info = next((col for col in collection_info[collection]["column_list"] 
-                                 if col["variable_name"] == field), None)
+                field_info = get_collection_schema(collection_info, collection)["columns"].get(field)
                 is_array = field_info.get("is_array", False) if field_info else False
                 
                 # 配列操作の特別処理
@@ -2580,7 +3419,7 @@ def parse_sql_to_mongodb_user_collection_data_async(sql, method_name, collection
             where_conditions = where_clause.group(1)
             
             # 条件を分割
-            for condition in re.split(r'\bAND\b|\bOR\b', where_conditions, flags=re.IGNORECASE):
+            for condition in split_conditions(where_conditions):
                 condition = condition.strip()
                 
                 # ALL演算子の処理
@@ -2609,11 +3448,7 @@ def parse_sql_to_mongodb_user_collection_data_async(sql, method_name, collection
             
             # インデックスの自動追加
             if auto_index:
-                for col in collection_info[collection]["column_list"]:
-                    if col.get("index_type", "none") in ["ascending", "descending", "hash", "unique"]:
-                        field = col["variable_name"]
-                        if not any(f'"{field}"' in f for f in where_filters):
-                            where_filters.append(f'Filters.exists("{field}")')
+                where_filters.extend(get_auto_index_filters(where_filters, collection_info, collection, parsed_query["auto_index_mode"]))
             
             # フィルターを結合
             if where_filters:
@@ -2624,19 +3459,21 @@ def parse_sql_to_mongodb_user_collection_data_async(sql, method_name, collection
             java_code.append(f'            Bson whereFilter = {where_filter};')
             java_code.append('            Bson combinedFilter = Filters.and(filter, whereFilter);')
             java_code.append(f'            UpdateResult result = collection.updateOne({"session," if is_transaction else ""}combinedFilter, updateOps);')
+            java_code.extend('            ' + line for line in generate_bounded_invalidate_code(collection_info, collection, data_name="data", cache_owner=cache_owner))
             java_code.append('            return result.getMatchedCount() > 0;')
         else:
             java_code.append(f'            UpdateResult result = collection.updateOne({"session," if is_transaction else ""}filter, updateOps);')
+            java_code.extend('            ' + line for line in generate_bounded_invalidate_code(collection_info, collection, data_name="data", cache_owner=cache_owner))
             java_code.append('            return result.getMatchedCount() > 0;')
         
         java_code.append('        } catch (Exception e) {')
         java_code.append('            return false;')
         java_code.append('        }')
-        java_code.append('    });')
+        java_code.append(f'    }}, {get_async_executor(operation)});')
         java_code.append('}')
 
     elif operation == "delete":
-        where_clause = re.search(r'WHERE\s+(.*)', sql, re.IGNORECASE)
+        where_clause = parsed_query["where_clause"]
         java_code.append(f'public static CompletableFuture<Boolean> {method_name}{"Transaction" if is_transaction else ""}AsyncWithData(MongoDatabase db,{"ClientSession session," if is_transaction else ""} {class_name}CollectionData data{", " + new_params if optional_flag else ""}) {{')
         java_code.append('    return CompletableFuture.supplyAsync(() -> {')
         java_code.append('        try {')
@@ -2658,7 +3495,7 @@ def parse_sql_to_mongodb_user_collection_data_async(sql, method_name, collection
             where_conditions = where_clause.group(1)
             
             # 条件を分割
-            for condition in re.split(r'\bAND\b|\bOR\b', where_conditions, flags=re.IGNORECASE):
+            for condition in split_conditions(where_conditions):
                 condition = condition.strip()
                 
                 # ALL演算子の処理
@@ -2686,11 +3523,7 @@ def parse_sql_to_mongodb_user_collection_data_async(sql, method_name, collection
             
             # インデックスの自動追加
             if auto_index:
-                for col in collection_info[collection]["column_list"]:
-                    if col.get("index_type", "none") in ["ascending", "descending", "hash", "unique"]:
-                        field = col["variable_name"]
-                        if not any(f'"{field}"' in f for f in where_filters):
-                            where_filters.append(f'Filters.exists("{field}")')
+                where_filters.extend(get_auto_index_filters(where_filters, collection_info, collection, parsed_query["auto_index_mode"]))
             
             # フィルターを結合
             if where_filters:
@@ -2701,22 +3534,24 @@ def parse_sql_to_mongodb_user_collection_data_async(sql, method_name, collection
             java_code.append(f'            Bson whereFilter = {where_filter};')
             java_code.append('            Bson combinedFilter = Filters.and(filter, whereFilter);')
             java_code.append(f'            DeleteResult result = collection.deleteOne({"session," if is_transaction else ""}combinedFilter);')
+            java_code.extend('            ' + line for line in generate_bounded_invalidate_code(collection_info, collection, data_name="data", cache_owner=cache_owner))
             java_code.append('            return result.getDeletedCount() > 0;')
         else:
             java_code.append(f'            DeleteResult result = collection.deleteOne({"session," if is_transaction else ""}filter);')
+            java_code.extend('            ' + line for line in generate_bounded_invalidate_code(collection_info, collection, data_name="data", cache_owner=cache_owner))
             java_code.append('            return result.getDeletedCount() > 0;')
         
         java_code.append('        } catch (Exception e) {')
         java_code.append('            return false;')
         java_code.append('        }')
-        java_code.append('    });')
+        java_code.append(f'    }}, {get_async_executor(operation)});')
         java_code.append('}')
 
     elif operation == "select":
-        where_clause = re.search(r'WHERE\s+(.*?)(?:\s*(?:ORDER\s+BY\s+(.*?)|LIMIT\s+\d+))?$', sql, re.IGNORECASE)
+        where_clause = parsed_query["select_where_clause"]
         order_by_clause = where_clause.group(2) if where_clause and where_clause.group(2) else None
         where_conditions = where_clause.group(1) if where_clause else None
-        limit_match = re.search(r'LIMIT\s+(\d+)', sql, re.IGNORECASE)
+        limit_match = parsed_query["limit_match"]
         limit_value = int(limit_match.group(1)) if limit_match else None
         return_type = f'DataBaseResultPair<Boolean, {class_name}CollectionData>' if limit_value == 1 else f'DataBaseResultPair<Boolean, List<{class_name}CollectionData>>'
         return_value = 'DataBaseResultPair.of(false, null)' if limit_value == 1 else 'DataBaseResultPair.of(false, Collections.emptyList())'
@@ -2742,7 +3577,7 @@ def parse_sql_to_mongodb_user_collection_data_async(sql, method_name, collection
                 where_filters = []
                 
                 # 条件を分割
-                for condition in re.split(r'\bAND\b|\bOR\b', where_conditions, flags=re.IGNORECASE):
+                for condition in split_conditions(where_conditions):
                     condition = condition.strip()
                     
                     # ALL演算子の処理
@@ -2770,11 +3605,7 @@ def parse_sql_to_mongodb_user_collection_data_async(sql, method_name, collection
                 
                 # インデックスの自動追加
                 if auto_index:
-                    for col in collection_info[collection]["column_list"]:
-                        if col.get("index_type", "none") in ["ascending", "descending", "hash", "unique"]:
-                            field = col["variable_name"]
-                            if not any(f'"{field}"' in f for f in where_filters):
-                                where_filters.append(f'Filters.exists("{field}")')
+                    where_filters.extend(get_auto_index_filters(where_filters, collection_info, collection, parsed_query["auto_index_mode"]))
                 
                 # フィルターを結合
                 if where_filters:
@@ -2792,9 +3623,9 @@ def parse_sql_to_mongodb_user_collection_data_async(sql, method_name, collection
                         direction = direction[0].upper() if direction else 'ASC'
                         sort_value = '1' if direction == 'ASC' else '-1'
                         sort_fields.append(f'"{field}", {sort_value}')
-                    java_code.append(f'            Document doc = collection.find(combinedFilter).sort(new Document().append({", ".join(sort_fields)})).first();')
+                    java_code.append(f'            {class_name}CollectionData doc = typedCollection(collection).find(combinedFilter).sort(new Document().append({", ".join(sort_fields)})).first();')
                 else:
-                    java_code.append(f'            Document doc = collection.find(combinedFilter).first();')
+                    java_code.append(f'            {class_name}CollectionData doc = typedCollection(collection).find(combinedFilter).first();')
             else:
                 if order_by_clause:
                     sort_fields = []
@@ -2803,18 +3634,18 @@ def parse_sql_to_mongodb_user_collection_data_async(sql, method_name, collection
                         direction = direction[0].upper() if direction else 'ASC'
                         sort_value = '1' if direction == 'ASC' else '-1'
                         sort_fields.append(f'"{field}", {sort_value}')
-                    java_code.append(f'            Document doc = collection.find({"session," if is_transaction else ""}filter).sort(new Document().append({", ".join(sort_fields)})).first();')
+                    java_code.append(f'            {class_name}CollectionData doc = typedCollection(collection).find({"session," if is_transaction else ""}filter).sort(new Document().append({", ".join(sort_fields)})).first();')
                 else:
-                    java_code.append(f'            Document doc = collection.find({"session," if is_transaction else ""}filter).first();')
+                    java_code.append(f'            {class_name}CollectionData doc = typedCollection(collection).find({"session," if is_transaction else ""}filter).first();')
             
             java_code.append('            if (doc == null) {')
             java_code.append(f'                return {return_value};')
             java_code.append('            }')
-            java_code.append(f'            return DataBaseResultPair.of(true, new {class_name}CollectionData(doc));')
+            java_code.append('            return DataBaseResultPair.of(true, doc);')
             java_code.append('        } catch (Exception e) {')
             java_code.append(f'            return {return_value};')
             java_code.append('        }')
-            java_code.append('    });')
+            java_code.append(f'    }}, {get_async_executor(operation)});')
             java_code.append('}')
         else:
             # One バージョンの生成
@@ -2838,7 +3669,7 @@ def parse_sql_to_mongodb_user_collection_data_async(sql, method_name, collection
                 where_filters = []
                 
                 # 条件を分割
-                for condition in re.split(r'\bAND\b|\bOR\b', where_conditions, flags=re.IGNORECASE):
+                for condition in split_conditions(where_conditions):
                     condition = condition.strip()
                     
                     # ALL演算子の処理
@@ -2866,11 +3697,7 @@ def parse_sql_to_mongodb_user_collection_data_async(sql, method_name, collection
                 
                 # インデックスの自動追加
                 if auto_index:
-                    for col in collection_info[collection]["column_list"]:
-                        if col.get("index_type", "none") in ["ascending", "descending", "hash", "unique"]:
-                            field = col["variable_name"]
-                            if not any(f'"{field}"' in f for f in where_filters):
-                                where_filters.append(f'Filters.exists("{field}")')
+                    where_filters.extend(get_auto_index_filters(where_filters, collection_info, collection, parsed_query["auto_index_mode"]))
                 
                 # フィルターを結合
                 if where_filters:
@@ -2888,9 +3715,9 @@ def parse_sql_to_mongodb_user_collection_data_async(sql, method_name, collection
                         direction = direction[0].upper() if direction else 'ASC'
                         sort_value = '1' if direction == 'ASC' else '-1'
                         sort_fields.append(f'"{field}", {sort_value}')
-                    java_code.append(f'            Document doc = collection.find(combinedFilter).sort(new Document().append({", ".join(sort_fields)})).first();')
+                    java_code.append(f'            {class_name}CollectionData doc = typedCollection(collection).find(combinedFilter).sort(new Document().append({", ".join(sort_fields)})).first();')
                 else:
-                    java_code.append(f'            Document doc = collection.find(combinedFilter).first();')
+                    java_code.append(f'            {class_name}CollectionData doc = typedCollection(collection).find(combinedFilter).first();')
             else:
                 if order_by_clause:
                     sort_fields = []
@@ -2899,18 +3726,18 @@ def parse_sql_to_mongodb_user_collection_data_async(sql, method_name, collection
                         direction = direction[0].upper() if direction else 'ASC'
                         sort_value = '1' if direction == 'ASC' else '-1'
                         sort_fields.append(f'"{field}", {sort_value}')
-                    java_code.append(f'            Document doc = collection.find({"session," if is_transaction else ""}filter).sort(new Document().append({", ".join(sort_fields)})).first();')
+                    java_code.append(f'            {class_name}CollectionData doc = typedCollection(collection).find({"session," if is_transaction else ""}filter).sort(new Document().append({", ".join(sort_fields)})).first();')
                 else:
-                    java_code.append(f'            Document doc = collection.find({"session," if is_transaction else ""}filter).first();')
+                    java_code.append(f'            {class_name}CollectionData doc = typedCollection(collection).find({"session," if is_transaction else ""}filter).first();')
             
             java_code.append('            if (doc == null) {')
             java_code.append(f'                return DataBaseResultPair.of(false, null);')
             java_code.append('            }')
-            java_code.append(f'            return DataBaseResultPair.of(true, new {class_name}CollectionData(doc));')
+            java_code.append('            return DataBaseResultPair.of(true, doc);')
             java_code.append('        } catch (Exception e) {')
             java_code.append(f'            return DataBaseResultPair.of(false, null);')
             java_code.append('        }')
-            java_code.append('    });')
+            java_code.append(f'    }}, {get_async_executor(operation)});')
             java_code.append('}')
             
             # Many バージョンの生成
@@ -2935,7 +3762,7 @@ def parse_sql_to_mongodb_user_collection_data_async(sql, method_name, collection
                 where_filters = []
                 
                 # 条件を分割
-                for condition in re.split(r'\bAND\b|\bOR\b', where_conditions, flags=re.IGNORECASE):
+                for condition in split_conditions(where_conditions):
                     condition = condition.strip()
                     
                     # ALL演算子の処理
@@ -2963,11 +3790,7 @@ def parse_sql_to_mongodb_user_collection_data_async(sql, method_name, collection
                 
                 # インデックスの自動追加
                 if auto_index:
-                    for col in collection_info[collection]["column_list"]:
-                        if col.get("index_type", "none") in ["ascending", "descending", "hash", "unique"]:
-                            field = col["variable_name"]
-                            if not any(f'"{field}"' in f for f in where_filters):
-                                where_filters.append(f'Filters.exists("{field}")')
+                    where_filters.extend(get_auto_index_filters(where_filters, collection_info, collection, parsed_query["auto_index_mode"]))
                 
                 # フィルターを結合
                 if where_filters:
@@ -2977,9 +3800,9 @@ def parse_sql_to_mongodb_user_collection_data_async(sql, method_name, collection
                 
                 java_code.append(f'            Bson whereFilter = {where_filter};')
                 java_code.append('            Bson combinedFilter = Filters.and(filter, whereFilter);')
-                java_code.append(f'            FindIterable<Document> results = collection.find({"session," if is_transaction else ""}combinedFilter);')
+                java_code.append(f'            FindIterable<{class_name}CollectionData> results = typedCollection(collection).find({"session," if is_transaction else ""}combinedFilter);')
             else:
-                java_code.append(f'            FindIterable<Document> results = collection.find({"session," if is_transaction else ""}filter);')
+                java_code.append(f'            FindIterable<{class_name}CollectionData> results = typedCollection(collection).find({"session," if is_transaction else ""}filter);')
             
             if order_by_clause:
                 sort_fields = []
@@ -2994,32 +3817,33 @@ def parse_sql_to_mongodb_user_collection_data_async(sql, method_name, collection
                 java_code.append(f'            results = results.limit({limit_value});')
             
             java_code.append(f'            List<{class_name}CollectionData> resultList = new ArrayList<>();')
-            java_code.append('            for (Document doc : results) {')
-            java_code.append(f'                resultList.add(new {class_name}CollectionData(doc));')
+            java_code.append(f'            for ({class_name}CollectionData doc : results) {{')
+            java_code.append('                resultList.add(doc);')
             java_code.append('            }')
             java_code.append(f'            return resultList.isEmpty() ? DataBaseResultPair.of(false, Collections.emptyList()) : DataBaseResultPair.of(true, resultList);')
             java_code.append('        } catch (Exception e) {')
             java_code.append(f'            return DataBaseResultPair.of(false, Collections.emptyList());')
             java_code.append('        }')
-            java_code.append('    });')
+            java_code.append(f'    }}, {get_async_executor(operation)});')
             java_code.append('}')
 
     return java_code
 
 # 非同期版: List<UserCollectionData>引数用の関数
-def parse_sql_to_mongodb_list_user_collection_data_async(sql, method_name, collection_info, auto_index=True):
-    parsed = sqlparse.parse(sql)[0]
-    operation = parsed.get_type().lower()
+@profiled("emitter", name=emitter_span_name("WithDataList async"), arg_names=("method_name", "auto_index"))
+def parse_sql_to_mongodb_list_user_collection_data_async(sql, method_name, collection_info, auto_index=True, parsed_query=None, auto_index_mode="planner"):
+    if parsed_query is None:
+        parsed_query = parse_sql_query(sql, collection_info, auto_index_mode)
+    operation = parsed_query["operation"]
     java_code = []
 
-    table_match = re.search(r'\bFROM\s+(\w+)|INTO\s+(\w+)', sql, re.IGNORECASE)
-    collection = table_match.group(1) or table_match.group(2) if table_match else next(iter(collection_info))
-    limit_match = re.search(r'LIMIT\s+(\d+)', sql, re.IGNORECASE)
+    collection = parsed_query["collection"]
+    limit_match = parsed_query["limit_match"]
     limit_value = int(limit_match.group(1)) if limit_match else None
     
-    args = sorted(set(re.findall(r'arg\d+', sql)), key=lambda x: int(x[3:]))
-    arg_params = ', '.join(f'{get_arg_type(collection, arg, sql, collection_info)} {arg}' for arg in args)
-    new_params, optional_flag = process_args(sql, arg_params)
+    args = parsed_query["args"]
+    arg_params = parsed_query["arg_params"]
+    new_params, optional_flag = parsed_query["new_params"], parsed_query["optional_flag"]
 
     java_code.append('@SuppressWarnings({"java:S3776", "unused"})')
     if operation == "insert":
@@ -3041,12 +3865,12 @@ def parse_sql_to_mongodb_list_user_collection_data_async(sql, method_name, colle
         java_code.append('        } catch (Exception e) {')
         java_code.append('            return false;')
         java_code.append('        }')
-        java_code.append('    });')
+        java_code.append(f'    }}, {get_async_executor(operation)});')
         java_code.append('}')
 
     elif operation == "update":
-        set_clause = re.search(r'SET\s+(.*?)\s*WHERE', sql, re.IGNORECASE)
-        where_clause = re.search(r'WHERE\s+(.*)', sql, re.IGNORECASE)
+        set_clause = parsed_query["set_clause"]
+        where_clause = parsed_query["where_clause"]
         java_code.append(f'public static CompletableFuture<Boolean> {method_name}AsyncWithDataList(MongoDatabase db, List<{collection.capitalize()}CollectionData> dataList{", " + new_params if optional_flag else ""}) {{')
         java_code.append('    return CompletableFuture.supplyAsync(() -> {')
         java_code.append('        try {')
@@ -3073,8 +3897,7 @@ def parse_sql_to_mongodb_list_user_collection_data_async(sql, method_name, colle
                 value = clean_value(value)
                 
                 # フィールド情報を取得
-                field_info = next((col for col in collection_info[collection]["column_list"] 
-                                 if col["variable_name"] == field), None)
+                field_info = get_collection_schema(collection_info, collection)["columns"].get(field)
                 is_array = field_info.get("is_array", False) if field_info else False
                 
                 # 配列操作の特別処理
@@ -3103,7 +3926,7 @@ def parse_sql_to_mongodb_list_user_collection_data_async(sql, method_name, colle
             where_conditions = where_clause.group(1)
             
             # 条件を分割
-            for condition in re.split(r'\bAND\b|\bOR\b', where_conditions, flags=re.IGNORECASE):
+            for condition in split_conditions(where_conditions):
                 condition = condition.strip()
                 
                 # ALL演算子の処理
@@ -3131,11 +3954,7 @@ def parse_sql_to_mongodb_list_user_collection_data_async(sql, method_name, colle
             
             # インデックスの自動追加
             if auto_index:
-                for col in collection_info[collection]["column_list"]:
-                    if col.get("index_type", "none") in ["ascending", "descending", "hash", "unique"]:
-                        field = col["variable_name"]
-                        if not any(f'"{field}"' in f for f in where_filters):
-                            where_filters.append(f'Filters.exists("{field}")')
+                where_filters.extend(get_auto_index_filters(where_filters, collection_info, collection, parsed_query["auto_index_mode"]))
             
             # フィルターを結合
             if where_filters:
@@ -3158,11 +3977,11 @@ def parse_sql_to_mongodb_list_user_collection_data_async(sql, method_name, colle
         java_code.append('        } catch (Exception e) {')
         java_code.append('            return false;')
         java_code.append('        }')
-        java_code.append('    });')
+        java_code.append(f'    }}, {get_async_executor(operation)});')
         java_code.append('}')
 
     elif operation == "delete":
-        where_clause = re.search(r'WHERE\s+(.*)', sql, re.IGNORECASE)
+        where_clause = parsed_query["where_clause"]
         java_code.append(f'public static CompletableFuture<Boolean> {method_name}AsyncWithDataList(MongoDatabase db, List<{collection.capitalize()}CollectionData> dataList{", " + new_params if optional_flag else ""}) {{')
         java_code.append('    return CompletableFuture.supplyAsync(() -> {')
         java_code.append('        try {')
@@ -3185,7 +4004,7 @@ def parse_sql_to_mongodb_list_user_collection_data_async(sql, method_name, colle
             where_conditions = where_clause.group(1)
             
             # 条件を分割
-            for condition in re.split(r'\bAND\b|\bOR\b', where_conditions, flags=re.IGNORECASE):
+            for condition in split_conditions(where_conditions):
                 condition = condition.strip()
                 
                 # ALL演算子の処理
@@ -3213,11 +4032,7 @@ def parse_sql_to_mongodb_list_user_collection_data_async(sql, method_name, colle
             
             # インデックスの自動追加
             if auto_index:
-                for col in collection_info[collection]["column_list"]:
-                    if col.get("index_type", "none") in ["ascending", "descending", "hash", "unique"]:
-                        field = col["variable_name"]
-                        if not any(f'"{field}"' in f for f in where_filters):
-                            where_filters.append(f'Filters.exists("{field}")')
+                where_filters.extend(get_auto_index_filters(where_filters, collection_info, collection, parsed_query["auto_index_mode"]))
             
             # フィルターを結合
             if where_filters:
@@ -3240,14 +4055,14 @@ def parse_sql_to_mongodb_list_user_collection_data_async(sql, method_name, colle
         java_code.append('        } catch (Exception e) {')
         java_code.append('            return false;')
         java_code.append('        }')
-        java_code.append('    });')
+        java_code.append(f'    }}, {get_async_executor(operation)});')
         java_code.append('}')
 
     elif operation == "select":
-        where_clause = re.search(r'WHERE\s+(.*?)(?:\s*(?:ORDER\s+BY\s+(.*?)|LIMIT\s+\d+))?$', sql, re.IGNORECASE)
+        where_clause = parsed_query["select_where_clause"]
         order_by_clause = where_clause.group(2) if where_clause and where_clause.group(2) else None
         where_conditions = where_clause.group(1) if where_clause else None
-        limit_match = re.search(r'LIMIT\s+(\d+)', sql, re.IGNORECASE)
+        limit_match = parsed_query["limit_match"]
         limit_value = int(limit_match.group(1)) if limit_match else None
         return_type = f'DataBaseResultPair<Boolean, {collection.capitalize()}CollectionData>' if limit_value == 1 else f'DataBaseResultPair<Boolean, List<{collection.capitalize()}CollectionData>>'
         return_value = 'DataBaseResultPair.of(false, null)' if limit_value == 1 else 'DataBaseResultPair.of(false, Collections.emptyList())'
@@ -3275,7 +4090,7 @@ def parse_sql_to_mongodb_list_user_collection_data_async(sql, method_name, colle
                 where_filters = []
                 
                 # 条件を分割
-                for condition in re.split(r'\bAND\b|\bOR\b', where_conditions, flags=re.IGNORECASE):
+                for condition in split_conditions(where_conditions):
                     condition = condition.strip()
                     
                     # ALL演算子の処理
@@ -3303,11 +4118,7 @@ def parse_sql_to_mongodb_list_user_collection_data_async(sql, method_name, colle
                 
                 # インデックスの自動追加
                 if auto_index:
-                    for col in collection_info[collection]["column_list"]:
-                        if col.get("index_type", "none") in ["ascending", "descending", "hash", "unique"]:
-                            field = col["variable_name"]
-                            if not any(f'"{field}"' in f for f in where_filters):
-                                where_filters.append(f'Filters.exists("{field}")')
+                    where_filters.extend(get_auto_index_filters(where_filters, collection_info, collection, parsed_query["auto_index_mode"]))
                 
                 # フィルターを結合
                 if where_filters:
@@ -3331,18 +4142,18 @@ def parse_sql_to_mongodb_list_user_collection_data_async(sql, method_name, colle
                     direction = direction[0].upper() if direction else 'ASC'
                     sort_value = '1' if direction == 'ASC' else '-1'
                     sort_fields.append(f'"{field}", {sort_value}')
-                java_code.append(f'            Document doc = collection.find(finalFilter).sort(new Document().append({", ".join(sort_fields)})).first();')
+                java_code.append(f'            {collection.capitalize()}CollectionData doc = typedCollection(collection).find(finalFilter).sort(new Document().append({", ".join(sort_fields)})).first();')
             else:
-                java_code.append(f'            Document doc = collection.find(finalFilter).first();')
+                java_code.append(f'            {collection.capitalize()}CollectionData doc = typedCollection(collection).find(finalFilter).first();')
             
             java_code.append('            if (doc == null) {')
             java_code.append(f'                return {return_value};')
             java_code.append('            }')
-            java_code.append(f'            return DataBaseResultPair.of(true, new {collection.capitalize()}CollectionData(doc));')
+            java_code.append('            return DataBaseResultPair.of(true, doc);')
             java_code.append('        } catch (Exception e) {')
             java_code.append(f'            return {return_value};')
             java_code.append('        }')
-            java_code.append('    });')
+            java_code.append(f'    }}, {get_async_executor(operation)});')
             java_code.append('}')
         else:
             # One バージョンの生成
@@ -3368,7 +4179,7 @@ def parse_sql_to_mongodb_list_user_collection_data_async(sql, method_name, colle
                 where_filters = []
                 
                 # 条件を分割
-                for condition in re.split(r'\bAND\b|\bOR\b', where_conditions, flags=re.IGNORECASE):
+                for condition in split_conditions(where_conditions):
                     condition = condition.strip()
                     
                     # ALL演算子の処理
@@ -3396,11 +4207,7 @@ def parse_sql_to_mongodb_list_user_collection_data_async(sql, method_name, colle
                 
                 # インデックスの自動追加
                 if auto_index:
-                    for col in collection_info[collection]["column_list"]:
-                        if col.get("index_type", "none") in ["ascending", "descending", "hash", "unique"]:
-                            field = col["variable_name"]
-                            if not any(f'"{field}"' in f for f in where_filters):
-                                where_filters.append(f'Filters.exists("{field}")')
+                    where_filters.extend(get_auto_index_filters(where_filters, collection_info, collection, parsed_query["auto_index_mode"]))
                 
                 # フィルターを結合
                 if where_filters:
@@ -3424,18 +4231,18 @@ def parse_sql_to_mongodb_list_user_collection_data_async(sql, method_name, colle
                     direction = direction[0].upper() if direction else 'ASC'
                     sort_value = '1' if direction == 'ASC' else '-1'
                     sort_fields.append(f'"{field}", {sort_value}')
-                java_code.append(f'            Document doc = collection.find(finalFilter).sort(new Document().append({", ".join(sort_fields)})).first();')
+                java_code.append(f'            {collection.capitalize()}CollectionData doc = typedCollection(collection).find(finalFilter).sort(new Document().append({", ".join(sort_fields)})).first();')
             else:
-                java_code.append(f'            Document doc = collection.find(finalFilter).first();')
+                java_code.append(f'            {collection.capitalize()}CollectionData doc = typedCollection(collection).find(finalFilter).first();')
             
             java_code.append('            if (doc == null) {')
             java_code.append(f'                return DataBaseResultPair.of(false, null);')
             java_code.append('            }')
-            java_code.append(f'            return DataBaseResultPair.of(true, new {collection.capitalize()}CollectionData(doc));')
+            java_code.append('            return DataBaseResultPair.of(true, doc);')
             java_code.append('        } catch (Exception e) {')
             java_code.append(f'            return DataBaseResultPair.of(false, null);')
             java_code.append('        }')
-            java_code.append('    });')
+            java_code.append(f'    }}, {get_async_executor(operation)});')
             java_code.append('}')
             
             # Many バージョンの生成
@@ -3462,7 +4269,7 @@ def parse_sql_to_mongodb_list_user_collection_data_async(sql, method_name, colle
                 where_filters = []
                 
                 # 条件を分割
-                for condition in re.split(r'\bAND\b|\bOR\b', where_conditions, flags=re.IGNORECASE):
+                for condition in split_conditions(where_conditions):
                     condition = condition.strip()
                     
                     # ALL演算子の処理
@@ -3490,11 +4297,7 @@ def parse_sql_to_mongodb_list_user_collection_data_async(sql, method_name, colle
                 
                 # インデックスの自動追加
                 if auto_index:
-                    for col in collection_info[collection]["column_list"]:
-                        if col.get("index_type", "none") in ["ascending", "descending", "hash", "unique"]:
-                            field = col["variable_name"]
-                            if not any(f'"{field}"' in f for f in where_filters):
-                                where_filters.append(f'Filters.exists("{field}")')
+                    where_filters.extend(get_auto_index_filters(where_filters, collection_info, collection, parsed_query["auto_index_mode"]))
                 
                 # フィルターを結合
                 if where_filters:
@@ -3510,7 +4313,7 @@ def parse_sql_to_mongodb_list_user_collection_data_async(sql, method_name, colle
             
             java_code.append('            }')
             java_code.append('            Bson finalFilter = allFilters.isEmpty() ? new Document() : Filters.or(allFilters);')
-            java_code.append('            FindIterable<Document> results = collection.find(finalFilter);')
+            java_code.append(f'            FindIterable<{collection.capitalize()}CollectionData> results = typedCollection(collection).find(finalFilter);')
             
             if order_by_clause:
                 sort_fields = []
@@ -3525,93 +4328,62 @@ def parse_sql_to_mongodb_list_user_collection_data_async(sql, method_name, colle
                 java_code.append(f'            results = results.limit({limit_value});')
             
             java_code.append(f'            List<{collection.capitalize()}CollectionData> resultList = new ArrayList<>();')
-            java_code.append('            for (Document doc : results) {')
-            java_code.append(f'                resultList.add(new {collection.capitalize()}CollectionData(doc));')
+            java_code.append(f'            for ({collection.capitalize()}CollectionData doc : results) {{')
+            java_code.append('                resultList.add(doc);')
             java_code.append('            }')
             java_code.append(f'            return resultList.isEmpty() ? DataBaseResultPair.of(false, Collections.emptyList()) : DataBaseResultPair.of(true, resultList);')
             java_code.append('        } catch (Exception e) {')
             java_code.append(f'            return DataBaseResultPair.of(false, Collections.emptyList());')
             java_code.append('        }')
-            java_code.append('    });')
+            java_code.append(f'    }}, {get_async_executor(operation)});')
             java_code.append('}')
 
     return java_code
 
 # 非同期版: バルク操作
-def generate_bulk_operations_async(collection_info):
+def generate_bulk_operations_async(collection_info, cache_owner=""):
     java_code = []
     collection = next(iter(collection_info))
     class_name = snake_to_pascal(collection.capitalize())
+    result_type = get_bulk_insert_result_type(f'{class_name}CollectionData')
     java_code.append('@SuppressWarnings({"java:S3776", "unused"})')
-    java_code.append(f'public static CompletableFuture<Boolean> bulkInsert{class_name}Async(MongoDatabase db, List<{class_name}CollectionData> dataList) {{')
+    java_code.append(f'public static CompletableFuture<{result_type}> bulkInsert{class_name}Async(MongoDatabase db, List<{class_name}CollectionData> dataList) {{')
     java_code.append('    return CompletableFuture.supplyAsync(() -> {')
     java_code.append('        try {')
     java_code.append(f'            MongoCollection<Document> collection = db.getCollection("{collection}");')
-    java_code.append('            List<Document> documents = new ArrayList<>();')
-    java_code.append(f'            for ({class_name}CollectionData data : dataList) {{')
-    java_code.append('                documents.add(data.toDocument());')
-    java_code.append('            }')
-    java_code.append('            collection.insertMany(documents);')
-    java_code.append('            return true;')
-    java_code.append('        } catch (com.mongodb.MongoWriteException e) {')
-    java_code.append('            if (e.getCode() == 11000) {')
-    java_code.append('                return false;')
-    java_code.append('            }')
-    java_code.append('            throw e;')
+    java_code.append(f'            return bulkInsertChunks(collection, dataList, {class_name}CollectionData::toDocument, bulk_write_chunk_size, bulk_insert_parallelism);')
     java_code.append('        } catch (Exception e) {')
-    java_code.append('            return false;')
+    java_code.append(f'            return {BULK_INSERT_RESULT_CLASS}.failed(dataList);')
     java_code.append('        }')
-    java_code.append('    });')
+    java_code.append(f'    }}, {get_async_executor("insert")});')
     java_code.append('}')
-
     java_code.append('@SuppressWarnings({"java:S3776", "unused"})')
     java_code.append(f'public static CompletableFuture<Boolean> bulkUpdate{class_name}Async(MongoDatabase db, List<{class_name}CollectionData> dataList) {{')
     java_code.append('    return CompletableFuture.supplyAsync(() -> {')
     java_code.append('        try {')
     java_code.append(f'            MongoCollection<Document> collection = db.getCollection("{collection}");')
-    java_code.append('            List<WriteModel<Document>> updates = new ArrayList<>();')
-    java_code.append(f'            for ({class_name}CollectionData data : dataList) {{')
-    java_code.append('                List<Bson> filters = new ArrayList<>();')
-    for col in collection_info[collection]["column_list"]:
-        field = col["variable_name"]
-        java_code.append(f'                if (data.is{field.capitalize()}Flag()) {{')
-        java_code.append(f'                    filters.add(Filters.eq("{field}", data.get{field.capitalize()}()));')
-        java_code.append('                }')
-    java_code.append('                Bson filter = filters.isEmpty() ? new Document() : Filters.and(filters);')
-    java_code.append('                List<Bson> updateOps = new ArrayList<>();')
-    for col in collection_info[collection]["column_list"]:
-        field = col["variable_name"]
-        java_code.append(f'                if (data.is{field.capitalize()}Flag()) {{')
-        java_code.append(f'                    updateOps.add(Updates.set("{field}", data.get{field.capitalize()}()));')
-        java_code.append('                }')
-    java_code.append('                if (!updateOps.isEmpty()) {')
-    java_code.append('                    updates.add(new UpdateManyModel<>(filter, Updates.combine(updateOps)));')
-    java_code.append('                }')
-    java_code.append('            }')
-    java_code.append('            if (!updates.isEmpty()) {')
-    java_code.append('                BulkWriteResult result = collection.bulkWrite(updates);')
-    java_code.append('                return result.getModifiedCount() > 0;')
-    java_code.append('            }')
-    java_code.append('            return false;')
+    java_code.append(f'            List<WriteModel<Document>> updates = bulkUpdateModels{class_name}(dataList);')
+    java_code.extend('            ' + line for line in generate_bulk_write_with_invalidate(collection_info, collection, "bulk_write_chunk_size, bulk_write_ordered", cache_owner))
     java_code.append('        } catch (Exception e) {')
     java_code.append('            return false;')
     java_code.append('        }')
-    java_code.append('    });')
+    java_code.append(f'    }}, {get_async_executor("update")});')
     java_code.append('}')
 
     return java_code
 
-def parse_sql_to_mongodb_transaction(sql, method_name, collection_info, auto_index=True, is_async=False, is_with_data=False, is_list=False):
-    parsed = sqlparse.parse(sql)[0]
-    operation = parsed.get_type().lower()
+@profiled("emitter", name=emitter_span_name("transaction"), arg_names=("method_name", "auto_index"))
+def parse_sql_to_mongodb_transaction(sql, method_name, collection_info, auto_index=True, is_async=False, is_with_data=False, is_list=False, parsed_query=None, auto_index_mode="planner"):
+    if parsed_query is None:
+        parsed_query = parse_sql_query(sql, collection_info, auto_index_mode)
+    operation = parsed_query["operation"]
     java_code = []
 
-    table_match = re.search(r'\bFROM\s+(\w+)|INTO\s+(\w+)', sql, re.IGNORECASE)
-    collection = table_match.group(1) or table_match.group(2) if table_match else next(iter(collection_info))
+    collection = parsed_query["collection"]
     
-    args = sorted(set(re.findall(r'arg\d+', sql)), key=lambda x: int(x[3:]))
-    arg_params = ', '.join(f'{get_arg_type(collection, arg, sql, collection_info)} {arg}' for arg in args)
-    new_params, optional_flag = process_args(sql, arg_params) if is_with_data or is_list else (arg_params, False)
+    args = parsed_query["args"]
+    arg_params = parsed_query["arg_params"]
+    new_params, optional_flag = (parsed_query["new_params"], parsed_query["optional_flag"]) if is_with_data or is_list else (arg_params, False)
     
     # データ引数の設定
     if is_with_data:
@@ -3628,7 +4400,7 @@ def parse_sql_to_mongodb_transaction(sql, method_name, collection_info, auto_ind
     # 戻り値の型を同期/非同期で切り替え
     if is_async:
         return_type = 'CompletableFuture<Boolean>' if operation in ["insert", "update", "delete"] else 'CompletableFuture<DataBaseResultPair<Boolean, %s>>'
-        limit_match = re.search(r'LIMIT\s+(\d+)', sql, re.IGNORECASE)
+        limit_match = parsed_query["limit_match"]
         limit_value = int(limit_match.group(1)) if limit_match else None
         if operation == "select":
             if limit_value == 1:
@@ -3639,7 +4411,7 @@ def parse_sql_to_mongodb_transaction(sql, method_name, collection_info, auto_ind
             return_type = 'CompletableFuture<Boolean>'
     else:
         return_type = 'boolean' if operation in ["insert", "update", "delete"] else 'DataBaseResultPair<Boolean, %s>'
-        limit_match = re.search(r'LIMIT\s+(\d+)', sql, re.IGNORECASE)
+        limit_match = parsed_query["limit_match"]
         limit_value = int(limit_match.group(1)) if limit_match else None
         if operation == "select":
             if limit_value == 1:
@@ -3675,7 +4447,7 @@ def parse_sql_to_mongodb_transaction(sql, method_name, collection_info, auto_ind
             else:
                 java_code.append('        collection.insertOne(session, data.toDocument());')
         else:
-            fields = re.search(r'\((.*?)\)\s*VALUES\s*\((.*?)\)', sql, re.IGNORECASE)
+            fields = parsed_query["insert_fields"]
             if fields:
                 field_list = [f.strip() for f in fields.group(1).split(',')]
                 args = [a.strip() for a in fields.group(2).split(',')]
@@ -3686,8 +4458,8 @@ def parse_sql_to_mongodb_transaction(sql, method_name, collection_info, auto_ind
         java_code.append('        return true;')
     
     elif operation == "update":
-        set_clause = re.search(r'SET\s+(.*?)\s*WHERE', sql, re.IGNORECASE)
-        where_clause = re.search(r'WHERE\s+(.*)', sql, re.IGNORECASE)
+        set_clause = parsed_query["set_clause"]
+        where_clause = parsed_query["where_clause"]
         
         if is_with_data:
             if is_list:
@@ -3711,7 +4483,7 @@ def parse_sql_to_mongodb_transaction(sql, method_name, collection_info, auto_ind
                 java_code.append(f'            Bson updateOps = Updates.combine({", ".join(updates)});')
                 
                 if where_clause:
-                    filters = parse_where_clause(where_clause.group(1), collection_info, collection, auto_index=auto_index, is_with_data=True)
+                    filters = get_where_filter(parsed_query, where_clause.group(1), collection_info, collection, auto_index=auto_index, is_with_data=True)
                     java_code.append(f'            Bson whereFilter = {filters};')
                     java_code.append('            Bson combinedFilter = Filters.and(filter, FeesFilter);')
                     java_code.append('            updates.add(new UpdateManyModel<>(combinedFilter, updateOps));')
@@ -3742,7 +4514,7 @@ def parse_sql_to_mongodb_transaction(sql, method_name, collection_info, auto_ind
                 java_code.append(f'        Bson updateOps = Updates.combine({", ".join(updates)});')
                 
                 if where_clause:
-                    filters = parse_where_clause(where_clause.group(1), collection_info, collection, auto_index=auto_index, is_with_data=True)
+                    filters = get_where_filter(parsed_query, where_clause.group(1), collection_info, collection, auto_index=auto_index, is_with_data=True)
                     java_code.append(f'        Bson whereFilter = {filters};')
                     java_code.append('        Bson combinedFilter = Filters.and(filter, whereFilter);')
                     java_code.append('        UpdateResult result = collection.updateOne(session, combinedFilter, updateOps);')
@@ -3759,7 +4531,7 @@ def parse_sql_to_mongodb_transaction(sql, method_name, collection_info, auto_ind
                 java_code.append(f'        Bson update = Updates.combine({", ".join(updates)});')
             
             if where_clause:
-                filters = parse_where_clause(where_clause.group(1), collection_info, collection, auto_index=auto_index)
+                filters = get_where_filter(parsed_query, where_clause.group(1), collection_info, collection, auto_index=auto_index)
                 java_code.append(f'        Bson filter = {filters};')
                 java_code.append('        UpdateResult result = collection.updateOne(session, filter, update);')
             else:
@@ -3767,7 +4539,7 @@ def parse_sql_to_mongodb_transaction(sql, method_name, collection_info, auto_ind
             java_code.append('        return result.getMatchedCount() > 0;')
     
     elif operation == "delete":
-        where_clause = re.search(r'WHERE\s+(.*)', sql, re.IGNORECASE)
+        where_clause = parsed_query["where_clause"]
         
         if is_with_data:
             if is_list:
@@ -3783,7 +4555,7 @@ def parse_sql_to_mongodb_transaction(sql, method_name, collection_info, auto_ind
                 java_code.append('            Bson filter = filters.isEmpty() ? new Document() : Filters.and(filters);')
                 
                 if where_clause:
-                    filters = parse_where_clause(where_clause.group(1), collection_info, collection, auto_index=auto_index, is_with_data=True)
+                    filters = get_where_filter(parsed_query, where_clause.group(1), collection_info, collection, auto_index=auto_index, is_with_data=True)
                     java_code.append(f'            Bson whereFilter = {filters};')
                     java_code.append('            Bson combinedFilter = Filters.and(filter, whereFilter);')
                     java_code.append('            deletes.add(new DeleteManyModel<>(combinedFilter));')
@@ -3806,7 +4578,7 @@ def parse_sql_to_mongodb_transaction(sql, method_name, collection_info, auto_ind
                 java_code.append('        Bson filter = filters.isEmpty() ? new Document() : Filters.and(filters);')
                 
                 if where_clause:
-                    filters = parse_where_clause(where_clause.group(1), collection_info, collection, auto_index=auto_index, is_with_data=True)
+                    filters = get_where_filter(parsed_query, where_clause.group(1), collection_info, collection, auto_index=auto_index, is_with_data=True)
                     java_code.append(f'        Bson whereFilter = {filters};')
                     java_code.append('        Bson combinedFilter = Filters.and(filter, whereFilter);')
                     java_code.append('        DeleteResult result = collection.deleteOne(session, combinedFilter);')
@@ -3815,7 +4587,7 @@ def parse_sql_to_mongodb_transaction(sql, method_name, collection_info, auto_ind
                 java_code.append('        return result.getDeletedCount() > 0;')
         else:
             if where_clause:
-                filters = parse_where_clause(where_clause.group(1), collection_info, collection, auto_index=auto_index)
+                filters = get_where_filter(parsed_query, where_clause.group(1), collection_info, collection, auto_index=auto_index)
                 java_code.append(f'        Bson filter = {filters};')
                 java_code.append('        DeleteResult result = collection.deleteOne(session, filter);')
             else:
@@ -3823,10 +4595,10 @@ def parse_sql_to_mongodb_transaction(sql, method_name, collection_info, auto_ind
             java_code.append('        return result.getDeletedCount() > 0;')
     
     elif operation == "select":
-        where_clause = re.search(r'WHERE\s+(.*?)(?:\s*(?:ORDER\s+BY\s+(.*?)|LIMIT\s+\d+))?$', sql, re.IGNORECASE)
+        where_clause = parsed_query["select_where_clause"]
         order_by_clause = where_clause.group(2) if where_clause and where_clause.group(2) else None
         where_conditions = where_clause.group(1) if where_clause else None
-        limit_match = re.search(r'LIMIT\s+(\d+)', sql, re.IGNORECASE)
+        limit_match = parsed_query["limit_match"]
         limit_value = int(limit_match.group(1)) if limit_match else None
         
         if limit_value == 1:
@@ -3844,7 +4616,7 @@ def parse_sql_to_mongodb_transaction(sql, method_name, collection_info, auto_ind
                     java_code.append('            Bson filter = filters.isEmpty() ? new Document() : Filters.and(filters);')
                     
                     if where_conditions:
-                        filters = parse_where_clause(where_conditions, collection_info, collection, auto_index=auto_index, is_with_data=True)
+                        filters = get_where_filter(parsed_query, where_conditions, collection_info, collection, auto_index=auto_index, is_with_data=True)
                         java_code.append(f'            Bson whereFilter = {filters};')
                         java_code.append('            Bson combinedFilter = Filters.and(filter, whereFilter);')
                         java_code.append('            allFilters.add(combinedFilter);')
@@ -3863,7 +4635,7 @@ def parse_sql_to_mongodb_transaction(sql, method_name, collection_info, auto_ind
                     java_code.append('        Bson filter = filters.isEmpty() ? new Document() : Filters.and(filters);')
                     
                     if where_conditions:
-                        filters = parse_where_clause(where_conditions, collection_info, collection, auto_index=auto_index, is_with_data=True)
+                        filters = get_where_filter(parsed_query, where_conditions, collection_info, collection, auto_index=auto_index, is_with_data=True)
                         java_code.append(f'        Bson whereFilter = {filters};')
                         java_code.append('        Bson combinedFilter = Filters.and(filter, whereFilter);')
                 
@@ -3874,12 +4646,12 @@ def parse_sql_to_mongodb_transaction(sql, method_name, collection_info, auto_ind
                         direction = direction[0].upper() if direction else 'ASC'
                         sort_value = '1' if direction == 'ASC' else '-1'
                         sort_fields.append(f'"{field}", {sort_value}')
-                    java_code.append(f'        Document doc = collection.find(session, {"finalFilter" if is_list else "combinedFilter"}).sort(new Document().append({", ".join(sort_fields)})).first();')
+                    java_code.append(f'        {collection.capitalize()}CollectionData doc = typedCollection(collection).find(session, {"finalFilter" if is_list else "combinedFilter"}).sort(new Document().append({", ".join(sort_fields)})).first();')
                 else:
-                    java_code.append(f'        Document doc = collection.find(session, {"finalFilter" if is_list else "combinedFilter"}).first();')
+                    java_code.append(f'        {collection.capitalize()}CollectionData doc = typedCollection(collection).find(session, {"finalFilter" if is_list else "combinedFilter"}).first();')
             else:
                 if where_conditions:
-                    filters = parse_where_clause(where_conditions, collection_info, collection, auto_index=auto_index)
+                    filters = get_where_filter(parsed_query, where_conditions, collection_info, collection, auto_index=auto_index)
                     java_code.append(f'        Bson filter = {filters};')
                     if order_by_clause:
                         sort_fields = []
@@ -3888,9 +4660,9 @@ def parse_sql_to_mongodb_transaction(sql, method_name, collection_info, auto_ind
                             direction = direction[0].upper() if direction else 'ASC'
                             sort_value = '1' if direction == 'ASC' else '-1'
                             sort_fields.append(f'"{field}", {sort_value}')
-                        java_code.append(f'        Document doc = collection.find(session, filter).sort(new Document().append({", ".join(sort_fields)})).first();')
+                        java_code.append(f'        {collection.capitalize()}CollectionData doc = typedCollection(collection).find(session, filter).sort(new Document().append({", ".join(sort_fields)})).first();')
                     else:
-                        java_code.append(f'        Document doc = collection.find(session, filter).first();')
+                        java_code.append(f'        {collection.capitalize()}CollectionData doc = typedCollection(collection).find(session, filter).first();')
                 else:
                     if order_by_clause:
                         sort_fields = []
@@ -3899,14 +4671,14 @@ def parse_sql_to_mongodb_transaction(sql, method_name, collection_info, auto_ind
                             direction = direction[0].upper() if direction else 'ASC'
                             sort_value = '1' if direction == 'ASC' else '-1'
                             sort_fields.append(f'"{field}", {sort_value}')
-                        java_code.append(f'        Document doc = collection.find(session).sort(new Document().append({", ".join(sort_fields)})).first();')
+                        java_code.append(f'        {collection.capitalize()}CollectionData doc = typedCollection(collection).find(session).sort(new Document().append({", ".join(sort_fields)})).first();')
                     else:
-                        java_code.append('        Document doc = collection.find(session).first();')
+                        java_code.append(f'        {collection.capitalize()}CollectionData doc = typedCollection(collection).find(session).first();')
             
             java_code.append('        if (doc == null) {')
             java_code.append('            return DataBaseResultPair.of(false, null);')
             java_code.append('        }')
-            java_code.append(f'        return DataBaseResultPair.of(true, new {collection.capitalize()}CollectionData(doc));')
+            java_code.append('        return DataBaseResultPair.of(true, doc);')
         else:
             if is_with_data:
                 if is_list:
@@ -3922,7 +4694,7 @@ def parse_sql_to_mongodb_transaction(sql, method_name, collection_info, auto_ind
                     java_code.append('            Bson filter = filters.isEmpty() ? new Document() : Filters.and(filters);')
                     
                     if where_conditions:
-                        filters = parse_where_clause(where_conditions, collection_info, collection, auto_index=auto_index, is_with_data=True)
+                        filters = get_where_filter(parsed_query, where_conditions, collection_info, collection, auto_index=auto_index, is_with_data=True)
                         java_code.append(f'            Bson whereFilter = {filters};')
                         java_code.append('            Bson combinedFilter = Filters.and(filter, whereFilter);')
                         java_code.append('            allFilters.add(combinedFilter);')
@@ -3930,7 +4702,7 @@ def parse_sql_to_mongodb_transaction(sql, method_name, collection_info, auto_ind
                         java_code.append('            allFilters.add(filter);')
                     java_code.append('        }')
                     java_code.append('        Bson finalFilter = allFilters.isEmpty() ? new Document() : Filters.or(allFilters);')
-                    java_code.append('        FindIterable<Document> results = collection.find(session, finalFilter);')
+                    java_code.append(f'        FindIterable<{collection.capitalize()}CollectionData> results = typedCollection(collection).find(session, finalFilter);')
                 else:
                     java_code.append('        List<Bson> filters = new ArrayList<>();')
                     for col in collection_info[collection]["column_list"]:
@@ -3942,19 +4714,19 @@ def parse_sql_to_mongodb_transaction(sql, method_name, collection_info, auto_ind
                     java_code.append('        Bson filter = filters.isEmpty() ? new Document() : Filters.and(filters);')
                     
                     if where_conditions:
-                        filters = parse_where_clause(where_conditions, collection_info, collection, auto_index=auto_index, is_with_data=True)
+                        filters = get_where_filter(parsed_query, where_conditions, collection_info, collection, auto_index=auto_index, is_with_data=True)
                         java_code.append(f'        Bson whereFilter = {filters};')
                         java_code.append('        Bson combinedFilter = Filters.and(filter, whereFilter);')
-                        java_code.append('        FindIterable<Document> results = collection.find(session, combinedFilter);')
+                        java_code.append(f'        FindIterable<{collection.capitalize()}CollectionData> results = typedCollection(collection).find(session, combinedFilter);')
                     else:
-                        java_code.append('        FindIterable<Document> results = collection.find(session, filter);')
+                        java_code.append(f'        FindIterable<{collection.capitalize()}CollectionData> results = typedCollection(collection).find(session, filter);')
             else:
                 if where_conditions:
-                    filters = parse_where_clause(where_conditions, collection_info, collection, auto_index=auto_index)
+                    filters = get_where_filter(parsed_query, where_conditions, collection_info, collection, auto_index=auto_index)
                     java_code.append(f'        Bson filter = {filters};')
-                    java_code.append('        FindIterable<Document> results = collection.find(session, filter);')
+                    java_code.append(f'        FindIterable<{collection.capitalize()}CollectionData> results = typedCollection(collection).find(session, filter);')
                 else:
-                    java_code.append('        FindIterable<Document> results = collection.find(session);')
+                    java_code.append(f'        FindIterable<{collection.capitalize()}CollectionData> results = typedCollection(collection).find(session);')
             
             if order_by_clause:
                 sort_fields = []
@@ -3969,8 +4741,8 @@ def parse_sql_to_mongodb_transaction(sql, method_name, collection_info, auto_ind
                 java_code.append(f'        results = results.limit({limit_value});')
             
             java_code.append(f'        List<{collection.capitalize()}CollectionData> resultList = new ArrayList<>();')
-            java_code.append('        for (Document doc : results) {')
-            java_code.append(f'            resultList.add(new {collection.capitalize()}CollectionData(doc));')
+            java_code.append(f'        for ({collection.capitalize()}CollectionData doc : results) {{')
+            java_code.append('            resultList.add(doc);')
             java_code.append('        }')
             java_code.append('        return resultList.isEmpty() ? DataBaseResultPair.of(false, Collections.emptyList()) : DataBaseResultPair.of(true, resultList);')
     
@@ -3985,7 +4757,7 @@ def parse_sql_to_mongodb_transaction(sql, method_name, collection_info, auto_ind
     java_code.append('        }')
     
     if is_async:
-        java_code.append('    });')
+        java_code.append(f'    }}, {get_async_executor(operation)});')
     
     java_code.append('}')
     
@@ -3998,32 +4770,104 @@ def snake_to_pascal(snake_str):
     return ''.join(word.capitalize() for word in words)
 
 # writeJavaCode関数内のSQLクエリごとのコード生成部分に以下を追加
-def writeJavaCode(collection, db_name,write_path,parent_path="io.github.chigadio.javamongodbbridge"):
+@profiled("collection", name=lambda arguments: arguments["db_name"])
+def writeJavaCode(collection, db_name,write_path,parent_path="io.github.chigadio.javamongodbbridge", share_parse=True, async_driver="sync", recommend_indexes=False, auto_index_mode="planner", use_build_cache=True):
+    # auto_index_mode="exists" で WHERE 句へ Filters.exists を追加する従来の出力になる（benchmark.py --filter-shapes で比較できる）
+    validate_auto_index_mode(auto_index_mode)
+    # async_driver="reactive" の場合、非同期メソッドは Reactive Streams ドライバ版として {X}ReactiveRepository.java に出力する
+    if async_driver not in ASYNC_DRIVERS:
+        raise ValueError(f"async_driver は {ASYNC_DRIVERS} のいずれかを指定してください: {async_driver}")
     os.makedirs(write_path, exist_ok=True)
+    # recommend_indexes=True の場合、クエリの分析結果を {X}IndexReport.json に出力し、提案された複合インデックスも createIndexes で作成する
+    index_report = None
+    # Reactive Streams 版へ変換する非同期メソッド
+    reactive_code = []
     catitalize_data = next(iter(collection))
     class_name = snake_to_pascal(catitalize_data.capitalize())
+    # コレクション定義・オプション・ジェネレータが前回と同じで出力も変わっていなければ何もしない（use_build_cache=False で必ず生成する）
+    # 生成する場合も内容が変わったファイルだけを書き換える。戻り値は生成したかどうか
+    build_key = compute_build_key("sql", db_name, collection, {"parent_path": parent_path, "share_parse": share_parse, "async_driver": async_driver, "recommend_indexes": recommend_indexes, "auto_index_mode": auto_index_mode})
+    if use_build_cache and is_up_to_date(write_path, f"sql_{db_name}", build_key):
+        return False
+    written = {}
+    if recommend_indexes:
+        index_report = analyze_queries(collection)
+        write_index_report(index_report, write_path + f"/{class_name}IndexReport.json")
     
-    with open(write_path + f"/{class_name}CollectionData.java", mode="w", encoding="utf-8") as f:
+    with open_generated(write_path + f"/{class_name}CollectionData.java", written) as f:
         for line in generate_user_collection_data_class(collection):
             f.write(line + '\n')
         
-    with open(write_path+ f"/{class_name}Repository.java", mode="w", encoding="utf-8") as f:
+    with open_generated(write_path + f"/{get_codec_class_name(class_name + 'CollectionData')}.java", written) as f:
+        for line in generate_user_collection_data_codec(collection):
+            f.write(line + '\n')
+
+    with open_generated(write_path + f"/{BULK_INSERT_RESULT_CLASS}.java", written) as f:
+        for line in generate_bulk_insert_result_class():
+            f.write(line + '\n')
+
+    # cache_mode="bounded" の場合、unique キーで引いたデータだけを上限付きでキャッシュする
+    bounded_cache = is_bounded_cache_enabled(collection[catitalize_data])
+    if bounded_cache:
+        bounded_column = get_bounded_cache_column(collection, catitalize_data)
+        if bounded_column is None:
+            raise ValueError(f"cache_mode=\"bounded\" には unique インデックスのカラムが必要です: {catitalize_data}")
+        with open_generated(write_path + f"/{BOUNDED_CACHE_CLASS}.java", written) as f:
+            for line in generate_bounded_cache_class():
+                f.write(line + '\n')
+
+    # Change Stream で差分更新する場合は、変更したキーの経路だけを作り直せる CacheMap をスナップショットに使う
+    if is_change_stream_enabled(collection[catitalize_data]):
+        with open_generated(write_path + f"/{CACHE_MAP_CLASS}.java", written) as f:
+            for line in generate_cache_map_class():
+                f.write(line + '\n')
+
+    with open_generated(write_path+ f"/{class_name}Repository.java", written) as f:
         # インポート文（修正済み、CompletableFutureを追加）
         java_imports = [
+            "import com.mongodb.MongoException;",
             "import com.mongodb.bulk.BulkWriteResult;",
+            "import com.mongodb.client.AggregateIterable;",
             "import com.mongodb.client.ClientSession;",
             "import com.mongodb.client.FindIterable;",
             "import com.mongodb.client.MongoCollection;",
+            "import com.mongodb.client.MongoCursor;",
             "import com.mongodb.client.MongoDatabase;",
             "import com.mongodb.client.model.*;",
             "import com.mongodb.client.result.UpdateResult;",
             "import org.bson.Document;",
+            "import org.bson.RawBsonDocument;",
+            "import org.bson.codecs.Codec;",
             "import org.bson.conversions.Bson;",
+            "import java.util.AbstractCollection;",
             "import java.util.ArrayList;",
+            "import java.util.Arrays;",
             "import java.util.Collections;",
+            "import java.util.Comparator;",
+            "import java.util.HashMap;",
+            "import java.util.Iterator;",
+            "import java.util.LinkedHashMap;",
             "import java.util.List;",
-            "import java.util.concurrent.CompletableFuture;"
+            "import java.util.Map;",
+            "import java.util.Objects;",
+            "import java.util.Spliterator;",
+            "import java.util.Spliterators;",
+            "import java.util.concurrent.Callable;",
+            "import java.util.concurrent.CompletableFuture;",
+            "import java.util.concurrent.ExecutionException;",
+            "import java.util.concurrent.Executor;",
+            "import java.util.concurrent.ExecutorService;",
+            "import java.util.concurrent.Executors;",
+            "import java.util.concurrent.ForkJoinPool;",
+            "import java.util.concurrent.Future;",
+            "import java.util.function.Function;",
+            "import java.util.function.LongConsumer;",
+            "import java.util.stream.Collectors;",
+            "import java.util.stream.Stream;",
+            "import java.util.stream.StreamSupport;"
         ]
+        if is_change_stream_enabled(collection[catitalize_data]):
+            java_imports.extend(generate_change_stream_imports())
 
         for line in java_imports:
             f.write(line + "\n")
@@ -4034,118 +4878,242 @@ def writeJavaCode(collection, db_name,write_path,parent_path="io.github.chigadio
         class_name = snake_to_pascal(collection_details.capitalize())
         f.write(f'public class {class_name}CollectionDb ' + "{\n")
         f.write(f'  public static final String collection_name = "{db_name}";\n')
-        f.write(f'  public static  List<{class_name}CleectionData> cache_data;\n')
+        for line in generate_cache_data_fields(collection):
+            f.write(line + "\n")
+        if bounded_cache:
+            for line in generate_bounded_cache_fields(collection[catitalize_data], get_java_wrapper_type(bounded_column["variable_type"]), f"{class_name}CollectionData"):
+                f.write("  " + line + "\n")
+        for line in generate_warmup_fields():
+            f.write(line + "\n")
+        for line in generate_cursor_fields():
+            f.write("  " + line + "\n")
+        for line in generate_bulk_write_fields():
+            f.write(line + "\n")
+        for line in generate_bulk_insert_fields():
+            f.write("  " + line + "\n")
+        if async_driver == "sync":
+            for line in generate_async_executor_fields():
+                f.write(line + "\n")
+        if is_change_stream_enabled(collection[catitalize_data]):
+            for line in generate_change_stream_fields(f"{class_name}CollectionData"):
+                f.write("  " + line + "\n")
         
         #キャッチ関数を作成
-        catch_string = []
-        catch_string.append(f"public static void MemoryCache{class_name}CollectionData(MongoDatabase db)" + "{")
-        catch_string.append(f"  MongoCollection<Document> collection = db.getCollection(collection_name);")
-        catch_string.append(f"  FindIterable<Document> results = collection.find();")
-        catch_string.append(f"  cache_data = new ArrayList<>();")
-        catch_string.append("  for (Document doc : results) {")
-        catch_string.append(f"      cache_data.add(new {class_name}CollectionData(doc));")   
-        catch_string.append("  }")  
-        catch_string.append("}")
-        for line in catch_string:
+        for line in generate_memory_cache_code(collection):
+            f.write("   " + line + "\n")
+        for line in generate_warmup_loader_code(collection):
+            f.write("   " + line + "\n")
+        f.write('\n')
+        for line in generate_typed_collection_code(f"{class_name}CollectionData"):
+            f.write("   " + line + "\n")
+        f.write('\n')
+        for line in generate_cursor_stream_code():
             f.write("   " + line + "\n")
+        # 集計クエリがある場合、キャッシュ上の HAVING / ORDER BY で使う比較関数
+        has_aggregate_queries = any(parse_aggregate_query(item["query"], collection[db_name]["column_list"]) for item in collection[db_name]["queries"])
+        if has_aggregate_queries:
+            f.write('\n')
+            for line in generate_compare_aggregate_values_code():
+                f.write("   " + line + "\n")
+        if is_change_stream_enabled(collection[catitalize_data]):
+            f.write('\n')
+            for line in generate_change_stream_watcher_code(collection):
+                f.write("   " + line + "\n")
         
         
         # インデックス作成クラスの生成
-        for line in generate_index_creation_code(collection):
+        for line in generate_index_creation_code(collection, index_report):
             f.write(line + '\n')
         
         f.write('\n')
         
         # バルク操作の生成（同期版）
+        for line in generate_bulk_update_models_code(collection):
+            f.write("   " + line + '\n')
+        f.write('\n')
+        for line in generate_bulk_write_chunks_code():
+            f.write("   " + line + '\n')
+        f.write('\n')
+        for line in generate_bulk_insert_chunks_code():
+            f.write("   " + line + '\n')
+        f.write('\n')
         for line in generate_bulk_operations(collection):
             f.write("   " + line + '\n')
         
         f.write('\n')
         
         # バルク操作の生成（非同期版）
-        f.write('// Asynchronous Bulk Operations\n')
-        for line in generate_bulk_operations_async(collection):
-            f.write("   " + line + '\n')
-        
-        f.write('\n')
+        if async_driver == "sync":
+            for line in generate_async_executor_code():
+                f.write("   " + line + '\n')
+            f.write('\n')
+            f.write('// Asynchronous Bulk Operations\n')
+            for line in generate_bulk_operations_async(collection):
+                f.write("   " + line + '\n')
+            
+            f.write('\n')
+        else:
+            reactive_code.extend(generate_bulk_operations_async(collection, cache_owner=f'{class_name}CollectionDb.'))
         
         # SQLクエリでコード生成
         for item in collection[db_name]["queries"]:
             sql = item["query"]
             method_name = item["method_name"]
-            # 同期版（既存）
-            f.write(f'// SQL: {sql}\n')
-            f.write(f'// Generated Java MongoDB Code for method: {method_name} (Single Arguments)\n')
-            for line in parse_sql_to_mongodb_single(sql, method_name, collection, auto_index=True,is_transaction=False):
+            with profile_span(method_name, "query", sql=sql):
+                # クエリの解析は一度だけ行い、全バリエーションで共有する（share_parse=False で従来通り毎回解析）
+                parsed_query = parse_sql_query(sql, collection, auto_index_mode) if share_parse else None
+                # 集計クエリは aggregate パイプラインで実行するメソッドだけを生成する
+                if (parsed_query or parse_sql_query(sql, collection, auto_index_mode))["aggregate"]:
+                    f.write(f'// SQL: {sql}\n')
+                    f.write(f'// Generated Java MongoDB Code for method: {method_name} (Aggregation Pipeline)\n')
+                    for is_transaction in (False, True):
+                        for line in parse_sql_to_mongodb_aggregate(sql, method_name, collection, is_transaction=is_transaction, parsed_query=parsed_query, auto_index_mode=auto_index_mode):
+                            f.write("   " + line + '\n')
+                        f.write('\n')
+                    if async_driver != "sync":
+                        reactive_code.append(f'// SQL: {sql}')
+                        for is_transaction in (False, True):
+                            reactive_code.extend(parse_sql_to_mongodb_aggregate(sql, method_name, collection, is_transaction=is_transaction, is_async=True, cache_owner=f'{class_name}CollectionDb.', parsed_query=parsed_query, auto_index_mode=auto_index_mode))
+                        reactive_code.append('')
+                        continue
+                    f.write(f'// Generated Java MongoDB Code for method: {method_name}Async (Aggregation Pipeline, Async)\n')
+                    for is_transaction in (False, True):
+                        for line in parse_sql_to_mongodb_aggregate(sql, method_name, collection, is_transaction=is_transaction, is_async=True, parsed_query=parsed_query, auto_index_mode=auto_index_mode):
+                            f.write("   " + line + '\n')
+                        f.write('\n')
+                    continue
+                # 同期版（既存）
+                f.write(f'// SQL: {sql}\n')
+                f.write(f'// Generated Java MongoDB Code for method: {method_name} (Single Arguments)\n')
+                for line in parse_sql_to_mongodb_single(sql, method_name, collection, auto_index=True,is_transaction=False, parsed_query=parsed_query, auto_index_mode=auto_index_mode):
 
-                f.write("   " + line + '\n')
-            f.write('\n')            
-            for line in parse_sql_to_mongodb_single(sql, method_name, collection, auto_index=True,is_transaction=True):
+                    f.write("   " + line + '\n')
+                f.write('\n')            
+                for line in parse_sql_to_mongodb_single(sql, method_name, collection, auto_index=True,is_transaction=True, parsed_query=parsed_query, auto_index_mode=auto_index_mode):
 
-                f.write("   " + line + '\n')
-            f.write('\n')
-            f.write(f'// Generated Java MongoDB Code for method: {method_name}NoAutoIndex (Single Arguments)\n')
-            for line in parse_sql_to_mongodb_single(sql, f'{method_name}NoAutoIndex', collection, auto_index=False,is_transaction=False):
-#
-                f.write("   " + line + '\n')
-            f.write('\n')
-            for line in parse_sql_to_mongodb_single(sql, f'{method_name}NoAutoIndex', collection, auto_index=False,is_transaction=True):
-#
-                f.write("   " + line + '\n')
-            f.write('\n')
-            f.write(f'// Generated Java MongoDB Code for method: {method_name}WithData (UsersCollectionData Argument)\n')
-            for line in parse_sql_to_mongodb_user_collection_data(sql, method_name, collection, auto_index=False):
-##
-                f.write("   " + line + '\n')
-            f.write('\n')
-            #f.write(f'// Generated Java MongoDB Code for method: {method_name}NoAutoIndexWithData (UsersCollectionData Argument)\n')
-            #for line in parse_sql_to_mongodb_user_collection_data(sql, f'{method_name}NoAutoIndex', collection_info, auto_index=False):
-            #    f.write("   " + line + '\n')
-            #f.write('\n')
-            #f.write(f'// Generated Java MongoDB Code for method: {method_name}WithDataList (List<UsersCollectionData> Argument)\n')
-            #for line in parse_sql_to_mongodb_list_user_collection_data(sql, method_name, collection_info, auto_index=True):
-##
-            #    f.write("   " + line + '\n')
-            #f.write('\n')
-            #f.write(f'// Generated Java MongoDB Code for method: {method_name}NoAutoIndexWithDataList (List<UsersCollectionData> Argument)\n')
-            #for line in parse_sql_to_mongodb_list_user_collection_data(sql, f'{method_name}NoAutoIndex', collection_info, auto_index=False):
-##
-            #    f.write("   " + line + '\n')
-            #f.write('\n')
-            ##
-            ### 非同期版
-            #f.write(f'// Generated Java MongoDB Code for method: {method_name}Async (Single Arguments, Async)\n')
-            #for line in parse_sql_to_mongodb_single_async(sql, method_name, collection_info, auto_index=True):
-##
-            #    f.write("   " + line + '\n')
-            #f.write('\n')
-            #f.write(f'// Generated Java MongoDB Code for method: {method_name}NoAutoIndexAsync (Single Arguments, Async)\n')
-            #for line in parse_sql_to_mongodb_single_async(sql, f'{method_name}NoAutoIndex', collection_info, auto_index=False):
-##
-            #    f.write("   " + line + '\n')
-            #f.write('\n')
-            f.write(f'// Generated Java MongoDB Code for method: {method_name}AsyncWithData (UsersCollectionData Argument, Async)\n')
-            for line in parse_sql_to_mongodb_user_collection_data_async(sql, method_name, collection, auto_index=True,is_transaction=True):
-##
-                f.write("   " + line + '\n')
-            f.write('\n')
-            f.write(f'// Generated Java MongoDB Code for method: {method_name}NoAutoIndexAsyncWithData (UsersCollectionData Argument, Async)\n')
-            for line in parse_sql_to_mongodb_user_collection_data_async(sql, f'{method_name}', collection, auto_index=True,is_transaction=False):
-##
-                f.write("   " + line + '\n')
-            f.write('\n')
-            #f.write(f'// Generated Java MongoDB Code for method: {method_name}AsyncWithDataList (List<UsersCollectionData> Argument, Async)\n')
-            #for line in parse_sql_to_mongodb_list_user_collection_data_async(sql, method_name, collection_info, auto_index=True):
-##
-            #    f.write("   " + line + '\n')
-            #f.write('\n')
-            #f.write(f'// Generated Java MongoDB Code for method: {method_name}NoAutoIndexAsyncWithDataList (List<UsersCollectionData> Argument, Async)\n')
-            #for line in parse_sql_to_mongodb_list_user_collection_data_async(sql, f'{method_name}NoAutoIndex', collection_info, auto_index=False):
-            #    f.write("   " + line + '\n')
-            #f.write('\n')
+                    f.write("   " + line + '\n')
+                f.write('\n')
+                f.write(f'// Generated Java MongoDB Code for method: {method_name}NoAutoIndex (Single Arguments)\n')
+                for line in parse_sql_to_mongodb_single(sql, f'{method_name}NoAutoIndex', collection, auto_index=False,is_transaction=False, parsed_query=parsed_query, auto_index_mode=auto_index_mode):
+    #
+                    f.write("   " + line + '\n')
+                f.write('\n')
+                for line in parse_sql_to_mongodb_single(sql, f'{method_name}NoAutoIndex', collection, auto_index=False,is_transaction=True, parsed_query=parsed_query, auto_index_mode=auto_index_mode):
+    #
+                    f.write("   " + line + '\n')
+                f.write('\n')
+                f.write(f'// Generated Java MongoDB Code for method: {method_name}WithData (UsersCollectionData Argument)\n')
+                for line in parse_sql_to_mongodb_user_collection_data(sql, method_name, collection, auto_index=False, parsed_query=parsed_query, auto_index_mode=auto_index_mode):
+    ##
+                    f.write("   " + line + '\n')
+                f.write('\n')
+                #f.write(f'// Generated Java MongoDB Code for method: {method_name}NoAutoIndexWithData (UsersCollectionData Argument)\n')
+                #for line in parse_sql_to_mongodb_user_collection_data(sql, f'{method_name}NoAutoIndex', collection_info, auto_index=False):
+                #    f.write("   " + line + '\n')
+                #f.write('\n')
+                #f.write(f'// Generated Java MongoDB Code for method: {method_name}WithDataList (List<UsersCollectionData> Argument)\n')
+                #for line in parse_sql_to_mongodb_list_user_collection_data(sql, method_name, collection_info, auto_index=True):
+    ##
+                #    f.write("   " + line + '\n')
+                #f.write('\n')
+                #f.write(f'// Generated Java MongoDB Code for method: {method_name}NoAutoIndexWithDataList (List<UsersCollectionData> Argument)\n')
+                #for line in parse_sql_to_mongodb_list_user_collection_data(sql, f'{method_name}NoAutoIndex', collection_info, auto_index=False):
+    ##
+                #    f.write("   " + line + '\n')
+                #f.write('\n')
+                ##
+                ### 非同期版
+                #f.write(f'// Generated Java MongoDB Code for method: {method_name}Async (Single Arguments, Async)\n')
+                #for line in parse_sql_to_mongodb_single_async(sql, method_name, collection_info, auto_index=True):
+    ##
+                #    f.write("   " + line + '\n')
+                #f.write('\n')
+                #f.write(f'// Generated Java MongoDB Code for method: {method_name}NoAutoIndexAsync (Single Arguments, Async)\n')
+                #for line in parse_sql_to_mongodb_single_async(sql, f'{method_name}NoAutoIndex', collection_info, auto_index=False):
+    ##
+                #    f.write("   " + line + '\n')
+                #f.write('\n')
+                if async_driver != "sync":
+                    reactive_code.append(f'// SQL: {sql}')
+                    reactive_code.extend(parse_sql_to_mongodb_user_collection_data_async(sql, method_name, collection, auto_index=True,is_transaction=True, parsed_query=parsed_query, cache_owner=f'{class_name}CollectionDb.', auto_index_mode=auto_index_mode))
+                    reactive_code.extend(parse_sql_to_mongodb_user_collection_data_async(sql, f'{method_name}', collection, auto_index=True,is_transaction=False, parsed_query=parsed_query, cache_owner=f'{class_name}CollectionDb.', auto_index_mode=auto_index_mode))
+                    reactive_code.append('')
+                    continue
+                f.write(f'// Generated Java MongoDB Code for method: {method_name}AsyncWithData (UsersCollectionData Argument, Async)\n')
+                for line in parse_sql_to_mongodb_user_collection_data_async(sql, method_name, collection, auto_index=True,is_transaction=True, parsed_query=parsed_query, auto_index_mode=auto_index_mode):
+    ##
+                    f.write("   " + line + '\n')
+                f.write('\n')
+                f.write(f'// Generated Java MongoDB Code for method: {method_name}NoAutoIndexAsyncWithData (UsersCollectionData Argument, Async)\n')
+                for line in parse_sql_to_mongodb_user_collection_data_async(sql, f'{method_name}', collection, auto_index=True,is_transaction=False, parsed_query=parsed_query, auto_index_mode=auto_index_mode):
+    ##
+                    f.write("   " + line + '\n')
+                f.write('\n')
+                #f.write(f'// Generated Java MongoDB Code for method: {method_name}AsyncWithDataList (List<UsersCollectionData> Argument, Async)\n')
+                #for line in parse_sql_to_mongodb_list_user_collection_data_async(sql, method_name, collection_info, auto_index=True):
+    ##
+                #    f.write("   " + line + '\n')
+                #f.write('\n')
+                #f.write(f'// Generated Java MongoDB Code for method: {method_name}NoAutoIndexAsyncWithDataList (List<UsersCollectionData> Argument, Async)\n')
+                #for line in parse_sql_to_mongodb_list_user_collection_data_async(sql, f'{method_name}NoAutoIndex', collection_info, auto_index=False):
+                #    f.write("   " + line + '\n')
+                #f.write('\n')
             
         f.write("}")
+
+    if async_driver == "reactive":
+        # bulkUpdate の設定と WriteModel の生成は Reactive 版のクラスにも持たせる
+        members = [line.strip() for line in generate_bulk_write_fields()]
+        members.extend(generate_bulk_insert_fields())
+        members.append('')
+        members.extend(generate_bulk_update_models_code(collection))
+        if has_aggregate_queries:
+            members.append('')
+            members.extend(generate_compare_aggregate_values_code())
+        writeReactiveJavaCode(class_name, reactive_code, write_path, members, written)
+    save_manifest(write_path, f"sql_{db_name}", build_key, written)
+    return True
+
+
+@profiled("emitter", name="reactive")
+def writeReactiveJavaCode(class_name, async_code, write_path, members=(), written=None):
+    """
+    非同期メソッドを Reactive Streams ドライバ版に変換して {X}ReactiveRepository.java に書き出す
+    （スレッドプールで同期ドライバを呼ぶ代わりに、ドライバの Publisher から CompletableFuture を完了させる）
+
+    Args:
+        class_name (str): コレクションのクラス名
+        async_code (list): 非同期メソッド生成関数の出力
+        write_path (str): 出力先ディレクトリ
+        members (iterable): 非同期メソッドが参照するフィールド・関数の行
+        written (dict): 出力したファイルを記録する（ビルドキャッシュのマニフェスト用）
+    """
+    with open_generated(write_path + f"/{class_name}ReactiveRepository.java", written) as f:
+        for line in generate_reactive_imports():
+            f.write(line + "\n")
+        f.write('\n')
+        f.write(f'public class {class_name}CollectionReactiveDb ' + "{\n")
+        for line in members:
+            f.write("   " + line + "\n")
+        f.write('\n')
+        for line in generate_typed_collection_code(f"{class_name}CollectionData"):
+            f.write("   " + line + "\n")
+        f.write('\n')
+        for line in generate_reactive_helpers():
+            f.write("   " + line + "\n")
+        f.write('\n')
+        for line in convert_to_reactive(async_code):
+            f.write("   " + line + '\n')
+        f.write("}")
             
 
-writeJavaCode(collection=collection_info_money_user,db_name="user_game_player",write_path="./Java/Generate/Users")
-writeJavaCode(collection=collection_info_job_type,db_name="job_type",write_path="./Java/Generate/Users")
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="サンプルのコレクション定義からJavaコードを生成する")
+    parser.add_argument("--profile", metavar="TRACE", help="コレクション・クエリ・生成関数ごとの経過時間を Chrome の trace event 形式で TRACE に書き出す")
+    args = parser.parse_args()
+    enable_profiling(args.profile is not None)
+    writeJavaCode(collection=collection_info_money_user,db_name="user_game_player",write_path="./Java/Generate/Users")
+    writeJavaCode(collection=collection_info_job_type,db_name="job_type",write_path="./Java/Generate/Users")
+    if args.profile:
+        write_trace(args.profile)
+        print_profile_summary()
\ No newline at end of file
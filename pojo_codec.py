@@ -0,0 +1,154 @@
+# Document を経由せずに BSON から直接データクラスへ読み込む Codec / CodecProvider を生成する（main.py / generate.py 共通）
+
+# Document 経由の読み込みと違い、値ごとの中間オブジェクトを作らない
+SCALAR_READERS = {
+    "String": "reader.readString()",
+    "Integer": "reader.readInt32()",
+    "Double": "readDouble(reader)",
+    "Boolean": "reader.readBoolean()",
+    "Date": "new Date(reader.readDateTime())",
+    "Object": "readValue(reader, decoderContext)",
+}
+
+def get_codec_class_name(class_name):
+    return f"{class_name}Codec"
+
+# 型付きコレクションを取得する関数を生成（find の結果を Codec で直接デコードする）
+def generate_typed_collection_code(class_name):
+    return [
+        f"// find の結果を {get_codec_class_name(class_name)} で直接 {class_name} にデコードする",
+        f"public static MongoCollection<{class_name}> typedCollection(MongoCollection<Document> collection) {{",
+        f"    return collection.withDocumentClass({class_name}.class).withCodecRegistry({get_codec_class_name(class_name)}.REGISTRY);",
+        "}",
+    ]
+
+def generate_codec_class(class_name, fields, nested_classes=()):
+    """
+    データクラス用の Codec と CodecProvider を生成する
+
+    Args:
+        class_name (str): データクラス名
+        fields (list): (BSONのフィールド名, Javaの型, 配列か, setter名) のリスト
+        nested_classes (iterable): フィールドに含まれる独自クラス名（それぞれの Codec をレジストリに登録する）
+
+    Returns:
+        list: Java コードの行リスト
+    """
+    codec_name = get_codec_class_name(class_name)
+    providers = ", ".join(["new Provider()"] + [f"new {get_codec_class_name(nested)}.Provider()" for nested in nested_classes])
+    java_code = [
+        "import com.mongodb.MongoClientSettings;",
+        "import org.bson.BsonReader;",
+        "import org.bson.BsonType;",
+        "import org.bson.BsonWriter;",
+        "import org.bson.Document;",
+        "import org.bson.codecs.BsonTypeClassMap;",
+        "import org.bson.codecs.Codec;",
+        "import org.bson.codecs.Decoder;",
+        "import org.bson.codecs.DecoderContext;",
+        "import org.bson.codecs.EncoderContext;",
+        "import org.bson.codecs.configuration.CodecProvider;",
+        "import org.bson.codecs.configuration.CodecRegistries;",
+        "import org.bson.codecs.configuration.CodecRegistry;",
+        "import java.util.ArrayList;",
+        "import java.util.Date;",
+        "import java.util.List;",
+        "",
+        f"public class {codec_name} implements Codec<{class_name}> {{",
+        f"    // 既定の Codec に {class_name} 用の Codec を加えたレジストリ",
+        "    public static final CodecRegistry REGISTRY = CodecRegistries.fromRegistries(",
+        f"        CodecRegistries.fromProviders({providers}),",
+        "        MongoClientSettings.getDefaultCodecRegistry());",
+        "    private static final BsonTypeClassMap BSON_TYPE_CLASS_MAP = new BsonTypeClassMap();",
+        "",
+        "    private final CodecRegistry registry;",
+        "",
+        f"    public {codec_name}(CodecRegistry registry) {{",
+        "        this.registry = registry;",
+        "    }",
+        "",
+        "    @Override",
+        f"    public {class_name} decode(BsonReader reader, DecoderContext decoderContext) {{",
+        f"        {class_name} data = new {class_name}();",
+        "        reader.readStartDocument();",
+        "        while (reader.readBsonType() != BsonType.END_OF_DOCUMENT) {",
+        "            String name = reader.readName();",
+        "            switch (name) {",
+    ]
+    for bson_name, java_type, is_array, setter in fields:
+        if is_array:
+            element_decoder = "this::readValue" if java_type == "Object" else f"registry.get({java_type}.class)"
+            read_expr = f"readList(reader, decoderContext, {element_decoder})"
+        else:
+            read_expr = SCALAR_READERS.get(java_type, f"decoderContext.decodeWithChildContext(registry.get({java_type}.class), reader)")
+        java_code.append(f'                case "{bson_name}":')
+        java_code.append("                    if (reader.getCurrentBsonType() == BsonType.NULL) {")
+        java_code.append("                        reader.readNull();")
+        java_code.append(f"                        data.{setter}(null);")
+        java_code.append("                    } else {")
+        java_code.append(f"                        data.{setter}({read_expr});")
+        java_code.append("                    }")
+        java_code.append("                    break;")
+    java_code += [
+        "                default:",
+        "                    reader.skipValue();",
+        "            }",
+        "        }",
+        "        reader.readEndDocument();",
+        "        return data;",
+        "    }",
+        "",
+        "    @Override",
+        f"    public void encode(BsonWriter writer, {class_name} value, EncoderContext encoderContext) {{",
+        "        encoderContext.encodeWithChildContext(registry.get(Document.class), writer, value.toDocument());",
+        "    }",
+        "",
+        "    @Override",
+        f"    public Class<{class_name}> getEncoderClass() {{",
+        f"        return {class_name}.class;",
+        "    }",
+        "",
+        "    private static Double readDouble(BsonReader reader) {",
+        "        switch (reader.getCurrentBsonType()) {",
+        "            case INT32:",
+        "                return (double) reader.readInt32();",
+        "            case INT64:",
+        "                return (double) reader.readInt64();",
+        "            default:",
+        "                return reader.readDouble();",
+        "        }",
+        "    }",
+        "",
+        "    private Object readValue(BsonReader reader, DecoderContext decoderContext) {",
+        "        if (reader.getCurrentBsonType() == BsonType.NULL) {",
+        "            reader.readNull();",
+        "            return null;",
+        "        }",
+        "        return decoderContext.decodeWithChildContext(registry.get(BSON_TYPE_CLASS_MAP.get(reader.getCurrentBsonType())), reader);",
+        "    }",
+        "",
+        "    private <T> List<T> readList(BsonReader reader, DecoderContext decoderContext, Decoder<T> decoder) {",
+        "        List<T> list = new ArrayList<>();",
+        "        reader.readStartArray();",
+        "        while (reader.readBsonType() != BsonType.END_OF_DOCUMENT) {",
+        "            if (reader.getCurrentBsonType() == BsonType.NULL) {",
+        "                reader.readNull();",
+        "                list.add(null);",
+        "            } else {",
+        "                list.add(decoderContext.decodeWithChildContext(decoder, reader));",
+        "            }",
+        "        }",
+        "        reader.readEndArray();",
+        "        return list;",
+        "    }",
+        "",
+        f"    public static final class Provider implements CodecProvider {{",
+        "        @Override",
+        "        @SuppressWarnings(\"unchecked\")",
+        "        public <T> Codec<T> get(Class<T> clazz, CodecRegistry registry) {",
+        f"            return clazz == {class_name}.class ? (Codec<T>) new {codec_name}(registry) : null;",
+        "        }",
+        "    }",
+        "}",
+    ]
+    return java_code
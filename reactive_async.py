@@ -0,0 +1,388 @@
+# 同期ドライバ + CompletableFuture.supplyAsync で生成した非同期メソッドを
+# Reactive Streams ドライバのノンブロッキング呼び出しに書き換える
+import re
+
+from bulk_insert import BULK_INSERT_RESULT_CLASS
+
+# 非同期メソッドの生成モード
+ASYNC_DRIVERS = ("sync", "reactive")
+
+# 書き込み結果を返す同期呼び出し（UpdateResult result = collection.updateOne(...); 等）
+write_result_pattern = re.compile(r'^(\s*)(?:UpdateResult|DeleteResult|BulkWriteResult) result = (.+);$')
+# 戻り値を使わない挿入（collection.insertOne(...); 等）
+insert_pattern = re.compile(r'^(\s*)(collection\.insert(?:One|Many)\(.+\));$')
+# 1件取得（X doc = typedCollection(collection).find(...).first();）
+find_first_pattern = re.compile(r'^(\s*)\w+ doc = (typedCollection\(collection\)\.find\(.*\)\.first\(\));$')
+# 分割書き込み（long modified = bulkWriteChunks(...);）
+chunk_write_pattern = re.compile(r'^(\s*)long (\w+) = (bulkWriteChunks\(.+\));$')
+# 複数件取得（find / aggregate）
+find_many_pattern = re.compile(r'^(\s*)(FindIterable|AggregateIterable)<(\w+)> results = (.+);$')
+# 複数件取得の結果を resultList に集める for 文（for (X doc : results) {）
+collect_loop_pattern = re.compile(r'^\s*for \(\w+ doc : results\) \{$')
+# 同期ドライバの Iterable → Reactive Streams ドライバの Publisher
+reactive_publishers = {"FindIterable": "FindPublisher", "AggregateIterable": "AggregatePublisher"}
+return_pattern = re.compile(r'^(\s*)return (.+);$')
+# 書き込みの後に上限付きキャッシュから対象を外す行（書き込みの完了時に実行する）
+cache_invalidate_pattern = re.compile(r'cache_bounded(?:\.|::)invalidate')
+# CompletableFuture を返す補助関数（Reactive 版にも同名の関数があるのでそのまま返す）
+FUTURE_HELPERS = ("bulkInsertChunks(",)
+# supplyAsync の閉じ（}); または }, read_executor); 等）
+supply_async_end_pattern = re.compile(r'^\s*\}(?:, \w+)?\);$')
+
+def generate_reactive_imports():
+    return [
+        "import com.mongodb.MongoWriteException;",
+        "import com.mongodb.bulk.BulkWriteResult;",
+        "import com.mongodb.client.model.*;",
+        "import com.mongodb.client.result.DeleteResult;",
+        "import com.mongodb.client.result.UpdateResult;",
+        "import com.mongodb.reactivestreams.client.AggregatePublisher;",
+        "import com.mongodb.reactivestreams.client.ClientSession;",
+        "import com.mongodb.reactivestreams.client.FindPublisher;",
+        "import com.mongodb.reactivestreams.client.MongoCollection;",
+        "import com.mongodb.reactivestreams.client.MongoDatabase;",
+        "import org.bson.Document;",
+        "import org.bson.conversions.Bson;",
+        "import org.reactivestreams.Publisher;",
+        "import org.reactivestreams.Subscriber;",
+        "import org.reactivestreams.Subscription;",
+        "import java.util.ArrayList;",
+        "import java.util.Arrays;",
+        "import java.util.Collections;",
+        "import java.util.Comparator;",
+        "import java.util.LinkedHashMap;",
+        "import java.util.List;",
+        "import java.util.Map;",
+        "import java.util.Objects;",
+        "import java.util.concurrent.CompletableFuture;",
+        "import java.util.concurrent.CompletionException;",
+        "import java.util.function.Function;",
+        "import java.util.stream.Collectors;",
+        "import java.util.stream.Stream;",
+    ]
+
+# Publisher を CompletableFuture に変換する補助関数
+def generate_reactive_helpers():
+    return [
+        "// Publisher の最初の要素（無ければ null）で完了する",
+        "private static <T> CompletableFuture<T> first(Publisher<T> publisher) {",
+        "    CompletableFuture<T> future = new CompletableFuture<>();",
+        "    publisher.subscribe(new Subscriber<T>() {",
+        "        private Subscription subscription;",
+        "",
+        "        @Override",
+        "        public void onSubscribe(Subscription s) {",
+        "            subscription = s;",
+        "            s.request(1);",
+        "        }",
+        "",
+        "        @Override",
+        "        public void onNext(T item) {",
+        "            future.complete(item);",
+        "            subscription.cancel();",
+        "        }",
+        "",
+        "        @Override",
+        "        public void onError(Throwable t) {",
+        "            future.completeExceptionally(t);",
+        "        }",
+        "",
+        "        @Override",
+        "        public void onComplete() {",
+        "            future.complete(null);",
+        "        }",
+        "    });",
+        "    return future;",
+        "}",
+        "",
+        "// Publisher の全要素を List にまとめて完了する",
+        "private static <T> CompletableFuture<List<T>> collect(Publisher<T> publisher) {",
+        "    CompletableFuture<List<T>> future = new CompletableFuture<>();",
+        "    publisher.subscribe(new Subscriber<T>() {",
+        "        private final List<T> items = new ArrayList<>();",
+        "",
+        "        @Override",
+        "        public void onSubscribe(Subscription s) {",
+        "            s.request(Long.MAX_VALUE);",
+        "        }",
+        "",
+        "        @Override",
+        "        public void onNext(T item) {",
+        "            items.add(item);",
+        "        }",
+        "",
+        "        @Override",
+        "        public void onError(Throwable t) {",
+        "            future.completeExceptionally(t);",
+        "        }",
+        "",
+        "        @Override",
+        "        public void onComplete() {",
+        "            future.complete(items);",
+        "        }",
+        "    });",
+        "    return future;",
+        "}",
+        "",
+        "// WriteModel を chunkSize 件ずつ順に bulkWrite し、更新件数の合計で完了する",
+        "public static CompletableFuture<Long> bulkWriteChunks(MongoCollection<Document> collection, List<WriteModel<Document>> models, int chunkSize, boolean ordered) {",
+        "    BulkWriteOptions options = new BulkWriteOptions().ordered(ordered);",
+        "    int size = Math.max(1, chunkSize);",
+        "    CompletableFuture<Long> future = CompletableFuture.completedFuture(0L);",
+        "    for (int from = 0; from < models.size(); from += size) {",
+        "        List<WriteModel<Document>> chunk = models.subList(from, Math.min(from + size, models.size()));",
+        "        future = future.thenCompose(modified -> first(collection.bulkWrite(chunk, options)).thenApply(result -> modified + result.getModifiedCount()));",
+        "    }",
+        "    return future;",
+        "}",
+        "",
+        "// dataList を chunkSize 件ずつ ordered(false) で insertMany する。チャンクは parallelism 本の列に分けて各列を順に書き込む",
+        f"public static <T> CompletableFuture<{BULK_INSERT_RESULT_CLASS}<T>> bulkInsertChunks(MongoCollection<Document> collection, List<T> dataList, Function<T, Document> toDocument, int chunkSize, int parallelism) {{",
+        "    int size = Math.max(1, chunkSize);",
+        "    int lanes = Math.max(1, parallelism);",
+        f"    List<CompletableFuture<{BULK_INSERT_RESULT_CLASS}<T>>> futures = new ArrayList<>();",
+        "    for (int lane = 0; lane < lanes; lane++) {",
+        f"        futures.add(CompletableFuture.completedFuture(new {BULK_INSERT_RESULT_CLASS}<>()));",
+        "    }",
+        "    int chunkIndex = 0;",
+        "    for (int from = 0; from < dataList.size(); from += size, chunkIndex++) {",
+        "        List<T> chunk = dataList.subList(from, Math.min(from + size, dataList.size()));",
+        "        int lane = chunkIndex % lanes;",
+        "        futures.set(lane, futures.get(lane).thenCompose(result -> insertChunk(collection, chunk, toDocument).thenApply(result::merge)));",
+        "    }",
+        "    return CompletableFuture.allOf(futures.toArray(new CompletableFuture[0])).thenApply(done -> {",
+        f"        {BULK_INSERT_RESULT_CLASS}<T> result = new {BULK_INSERT_RESULT_CLASS}<>();",
+        f"        for (CompletableFuture<{BULK_INSERT_RESULT_CLASS}<T>> future : futures) {{",
+        "            result.merge(future.join());",
+        "        }",
+        "        return result;",
+        "    });",
+        "}",
+        "",
+        f"private static <T> CompletableFuture<{BULK_INSERT_RESULT_CLASS}<T>> insertChunk(MongoCollection<Document> collection, List<T> chunk, Function<T, Document> toDocument) {{",
+        "    List<Document> documents = new ArrayList<>(chunk.size());",
+        "    for (T data : chunk) {",
+        "        documents.add(toDocument.apply(data));",
+        "    }",
+        "    return first(collection.insertMany(documents, new InsertManyOptions().ordered(false)))",
+        f"        .handle((inserted, error) -> {BULK_INSERT_RESULT_CLASS}.of(chunk, error));",
+        "}",
+        "",
+        "// 重複キーは false、それ以外の書き込みエラーは例外のまま返す（同期版の catch と同じ扱い）",
+        "private static boolean writeFailed(Throwable e) {",
+        "    Throwable cause = e instanceof CompletionException && e.getCause() != null ? e.getCause() : e;",
+        "    if (cause instanceof MongoWriteException && ((MongoWriteException) cause).getCode() != 11000) {",
+        "        throw new CompletionException(cause);",
+        "    }",
+        "    return false;",
+        "}",
+    ]
+
+# メソッド宣言から CompletableFuture<T> の T を取り出す
+def get_future_type(signature):
+    start = signature.index("CompletableFuture<") + len("CompletableFuture<")
+    depth = 1
+    for i in range(start, len(signature)):
+        if signature[i] == "<":
+            depth += 1
+        elif signature[i] == ">":
+            depth -= 1
+            if depth == 0:
+                return signature[start:i]
+    raise ValueError(f"戻り値の型を解析できません: {signature}")
+
+def dedent(line, width=4):
+    return line[width:] if line.startswith(" " * width) else line.lstrip()
+
+def take_invalidations(lines, start):
+    """
+    書き込みの直後にある上限付きキャッシュの無効化の行を取り出す
+
+    Returns:
+        tuple: (whenComplete で呼ぶ式、無ければ空文字, 無効化の次の行の位置)
+    """
+    end = start
+    while end < len(lines) and cache_invalidate_pattern.search(lines[end]):
+        end += 1
+    if end == start:
+        return "", start
+    # 失敗した書き込みも途中まで反映されている場合があるので、成否にかかわらず外す
+    statements = " ".join(line.strip() for line in lines[start:end])
+    return f".whenComplete((done, error) -> {{ {statements} }})", end
+
+def take_find_first_returns(lines, start):
+    """
+    findFirst の後の「if (doc == null) { return X; } return Y;」を行のパターンで探して取り出す
+
+    間にある1行の文（上限付きキャッシュへの追加など）は doc を受け取る thenApply の中で実行する
+
+    Returns:
+        tuple: (thenApply で返す前に実行する文のリスト, X, Y, 次の行の位置)
+    """
+    null_check = next((j for j in range(start, len(lines)) if lines[j].strip() == "if (doc == null) {"), None)
+    if null_check is not None and null_check + 3 < len(lines):
+        not_found = return_pattern.match(lines[null_check + 1])
+        found = return_pattern.match(lines[null_check + 3])
+        statements = [line.strip() for line in lines[start:null_check]]
+        if not_found and lines[null_check + 2].strip() == "}" and found and all(line.endswith(";") for line in statements):
+            return statements, not_found.group(2), found.group(2), null_check + 4
+    raise ValueError(f"findFirst の後の null 判定と return の形を解析できません: {lines[start - 1:]}")
+
+def take_collect_return(lines, start):
+    """
+    「for (X doc : results) { resultList.add(doc); } return Y;」を行のパターンで探して Y を取り出す
+
+    Returns:
+        tuple: (Y, 次の行の位置)
+    """
+    if start + 3 < len(lines) and collect_loop_pattern.match(lines[start]) and lines[start + 1].strip() == "resultList.add(doc);" and lines[start + 2].strip() == "}":
+        value = return_pattern.match(lines[start + 3])
+        if value:
+            return value.group(2), start + 4
+    raise ValueError(f"resultList に集める for 文と return の形を解析できません: {lines[start - 1:]}")
+
+def unwrap_finally(lines):
+    """
+    try { 書き込み; return X; } finally { 無効化 } を「書き込み; 無効化; return X;」の並びに直す
+
+    無効化は take_invalidations で whenComplete に移るので、成否にかかわらず外す点は変わらない
+    """
+    result = []
+    i = 0
+    while i < len(lines):
+        if lines[i].strip() != "try {":
+            result.append(lines[i])
+            i += 1
+            continue
+        indent = lines[i][:len(lines[i]) - len(lines[i].lstrip())]
+        finally_index = next((j for j in range(i + 1, len(lines)) if lines[j] == f"{indent}}} finally {{"), None)
+        close_index = next((j for j in range(i + 1, len(lines)) if lines[j] == f"{indent}}}"), None)
+        if finally_index is None or close_index is None or close_index < finally_index:
+            raise ValueError(f"try/finally の形を解析できません: {lines[i:]}")
+        block = [dedent(line) for line in lines[i + 1:finally_index]]
+        invalidations = [dedent(line) for line in lines[finally_index + 1:close_index]]
+        result.extend(block[:-1] + invalidations + block[-1:])
+        i = close_index + 1
+    return result
+
+def convert_async_method(method_lines):
+    """
+    supplyAsync で包んだ非同期メソッド1つを Reactive Streams 版に書き換える
+
+    Args:
+        method_lines (list): public static CompletableFuture<...> から閉じ括弧までの行
+
+    Returns:
+        list: 書き換えたメソッドの行
+    """
+    signature = method_lines[0]
+    future_type = get_future_type(signature)
+    start = next(i for i, line in enumerate(method_lines) if "CompletableFuture.supplyAsync(() -> {" in line)
+    end = max(i for i, line in enumerate(method_lines) if supply_async_end_pattern.match(line))
+    body = method_lines[start + 1:end]
+
+    # try { ... } catch (MongoWriteException) { ... } catch (Exception e) { return X; }
+    try_end = next(i for i, line in enumerate(body) if line.strip().startswith("} catch ("))
+    catch_index = next(i for i, line in enumerate(body) if line.strip() == "} catch (Exception e) {")
+    fallback = return_pattern.match(body[catch_index + 1]).group(2)
+    has_write_catch = any("MongoWriteException" in line for line in body[try_end:catch_index])
+    on_error = "writeFailed(e)" if has_write_catch else fallback
+
+    try_body = unwrap_finally(body[1:try_end])
+    converted = []
+    i = 0
+    while i < len(try_body):
+        line = try_body[i]
+        next_line = try_body[i + 1] if i + 1 < len(try_body) else ""
+        invalidate, after = take_invalidations(try_body, i + 1)
+        after_line = try_body[after] if after < len(try_body) else ""
+        match = write_result_pattern.match(line)
+        if match and return_pattern.match(after_line):
+            indent, call = match.group(1), match.group(2)
+            check = return_pattern.match(after_line).group(2)
+            converted.append(f"{indent}CompletableFuture<{future_type}> future = first({call}){invalidate}.thenApply(result -> result != null && {check});")
+            converted.append(f"{indent}return future.exceptionally(e -> {on_error});")
+            i = after + 1
+            continue
+        match = insert_pattern.match(line)
+        if match and return_pattern.match(next_line):
+            indent, call = match.group(1), match.group(2)
+            value = return_pattern.match(next_line).group(2)
+            converted.append(f"{indent}CompletableFuture<{future_type}> future = first({call}).thenApply(result -> {value});")
+            converted.append(f"{indent}return future.exceptionally(e -> {on_error});")
+            i += 2
+            continue
+        match = chunk_write_pattern.match(line)
+        if match and return_pattern.match(after_line):
+            indent, name, call = match.group(1), match.group(2), match.group(3)
+            value = return_pattern.match(after_line).group(2)
+            converted.append(f"{indent}CompletableFuture<{future_type}> future = {call}{invalidate}.thenApply({name} -> {value});")
+            converted.append(f"{indent}return future.exceptionally(e -> {on_error});")
+            i = after + 1
+            continue
+        match = find_first_pattern.match(line)
+        if match:
+            # if (doc == null) { return X; } return DataBaseResultPair.of(true, doc);
+            indent, call = match.group(1), match.group(2)
+            statements, not_found, found, after = take_find_first_returns(try_body, i + 1)
+            result = f"doc == null ? {not_found} : {found}"
+            mapper = f"doc -> {{ {' '.join(statements)} return {result}; }}" if statements else f"doc -> {result}"
+            converted.append(f"{indent}CompletableFuture<{future_type}> future = first({call}).thenApply({mapper});")
+            converted.append(f"{indent}return future.exceptionally(e -> {on_error});")
+            i = after
+            continue
+        match = find_many_pattern.match(line)
+        if match:
+            converted.append(f"{match.group(1)}{reactive_publishers[match.group(2)]}<{match.group(3)}> results = {match.group(4)};")
+            i += 1
+            continue
+        if line.strip().startswith("List<") and "resultList = new ArrayList<>();" in line:
+            # for (X doc : results) { resultList.add(doc); } return ...;
+            indent = line[:len(line) - len(line.lstrip())]
+            value, after = take_collect_return(try_body, i + 1)
+            converted.append(f"{indent}CompletableFuture<{future_type}> future = collect(results).thenApply(resultList -> {value});")
+            converted.append(f"{indent}return future.exceptionally(e -> {on_error});")
+            i = after
+            continue
+        match = return_pattern.match(line)
+        if match and match.group(2).startswith(FUTURE_HELPERS):
+            converted.append(line)
+            i += 1
+            continue
+        if match:
+            # 書き込みを行わずに返す分岐
+            line = f"{match.group(1)}return CompletableFuture.completedFuture({match.group(2)});"
+        converted.append(line)
+        i += 1
+
+    java_code = method_lines[:start]
+    java_code.append("    try {")
+    java_code.extend(dedent(line) for line in converted)
+    java_code.append("    } catch (Exception e) {")
+    java_code.append(f"        return CompletableFuture.completedFuture({fallback});")
+    java_code.append("    }")
+    java_code.extend(method_lines[end + 1:])
+    return java_code
+
+def convert_to_reactive(java_code):
+    """
+    非同期メソッドの生成結果（行リスト）を Reactive Streams ドライバ版に変換する
+
+    Args:
+        java_code (list): parse_sql_to_mongodb_*_async / generate_bulk_operations_async の出力
+
+    Returns:
+        list: 変換後の行リスト
+    """
+    result = []
+    i = 0
+    while i < len(java_code):
+        line = java_code[i]
+        if line.startswith("public static CompletableFuture<"):
+            end = next(j for j in range(i + 1, len(java_code)) if java_code[j] == "}")
+            result.extend(convert_async_method(java_code[i:end + 1]))
+            i = end + 1
+            continue
+        result.append(line)
+        i += 1
+    return result
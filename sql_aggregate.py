@@ -0,0 +1,372 @@
+# GROUP BY・集計関数（COUNT / SUM / AVG / MIN / MAX）・HAVING を含む SELECT を sqlparse で解析し、
+# collection.aggregate(...) のパイプラインと、cache_data 上で同じ集計を行う Java コードを生成する
+import re
+
+import sqlparse
+from sqlparse.sql import Where
+from sqlparse.tokens import Keyword
+
+from codegen_profile import count_event
+
+# 句の区切りとして扱うキーワード
+CLAUSE_KEYWORDS = ("SELECT", "FROM", "GROUP BY", "HAVING", "ORDER BY", "LIMIT")
+
+aggregate_pattern = re.compile(r'^(COUNT|SUM|AVG|MIN|MAX)\s*\(\s*(\*|\w+)\s*\)$', re.IGNORECASE)
+alias_pattern = re.compile(r'^(.*?)\s+AS\s+(\w+)$', re.IGNORECASE)
+having_condition_pattern = re.compile(r'^\(?\s*(.+?)\s*(>=|<=|!=|=|>|<)\s*(.+?)\s*\)?$')
+where_condition_pattern = re.compile(r'^(\w+)\s*(>=|<=|!=|==|=|>|<|\bIN\b)\s*(\S+)$', re.IGNORECASE)
+logical_pattern = re.compile(r'\s+(AND|OR|XOR)\s+', re.IGNORECASE)
+
+# HAVING の比較演算子 → Filters のメソッド
+having_operators = {">=": "gte", "<=": "lte", ">": "gt", "<": "lt", "!=": "ne", "=": "eq"}
+
+def split_clauses(statement):
+    """
+    sqlparse で解析した SELECT 文を句ごとの文字列に分ける
+
+    Returns:
+        dict: {"SELECT": ..., "WHERE": ..., "GROUP BY": ..., ...}（存在する句のみ）
+    """
+    clauses = {}
+    current = None
+    for token in statement.tokens:
+        if token.is_whitespace:
+            continue
+        if isinstance(token, Where):
+            clauses["WHERE"] = re.sub(r'^WHERE\s+', '', str(token).strip(), flags=re.IGNORECASE).rstrip(';').strip()
+            current = None
+            continue
+        keyword = re.sub(r'\s+', ' ', token.value.upper()) if token.ttype in Keyword else None
+        if keyword in CLAUSE_KEYWORDS:
+            current = keyword
+            clauses[current] = ""
+            continue
+        if current:
+            clauses[current] = f'{clauses[current]} {token}'.strip()
+    return {key: value.rstrip(';').strip() for key, value in clauses.items()}
+
+def normalize_aggregate(expression):
+    # COUNT( * ) / count(*) などを COUNT(*) にそろえる（集計式の同一判定用）
+    match = aggregate_pattern.match(expression.strip())
+    return f'{match.group(1).upper()}({match.group(2)})' if match else None
+
+def get_aggregate_name(function, field):
+    return "count" if field == "*" else f'{function.lower()}_{field}'
+
+def parse_aggregate_query(statement, column_list):
+    """
+    GROUP BY・集計関数・HAVING を含む SELECT を解析する
+
+    Args:
+        statement: sqlparse.parse の結果（文字列の場合はここで解析する）
+        column_list (list): コレクションのカラム定義
+
+    Returns:
+        dict: group_by / aggregates / select / having / order_by / limit（集計クエリでなければ None）
+    """
+    if isinstance(statement, str):
+        count_event("sqlparse.parse")
+        statement = sqlparse.parse(statement)[0]
+    if statement.get_type() != "SELECT":
+        return None
+    clauses = split_clauses(statement)
+    select_items = [item.strip() for item in clauses.get("SELECT", "").split(',') if item.strip()]
+    has_aggregate = any(normalize_aggregate(alias_pattern.sub(r'\1', item)) for item in select_items)
+    if "GROUP BY" not in clauses and not has_aggregate:
+        return None
+
+    columns = {col["variable_name"]: col for col in column_list}
+    group_by = [name.strip() for name in clauses.get("GROUP BY", "").split(',') if name.strip()]
+    for name in group_by:
+        if name not in columns:
+            raise ValueError(f"GROUP BY のカラムが見つかりません: {name}")
+
+    # 集計式（COUNT(*) 等）→ {"name", "function", "field", "column"}
+    aggregates = {}
+
+    def add_aggregate(expression, alias=None):
+        key = normalize_aggregate(expression)
+        if key in aggregates:
+            return aggregates[key]
+        function, field = aggregate_pattern.match(expression.strip()).groups()
+        function = function.upper()
+        column = columns.get(field)
+        if field != "*" and not column:
+            raise ValueError(f"集計対象のカラムが見つかりません: {expression}")
+        if field == "*" and function != "COUNT":
+            raise ValueError(f"* を指定できるのは COUNT のみです: {expression}")
+        if column and column.get("is_array", False) and function != "COUNT":
+            raise ValueError(f"配列カラムは {function} で集計できません: {expression}")
+        if function in ("SUM", "AVG") and column["variable_type"] not in ("int", "double"):
+            raise ValueError(f"{function} は数値カラムのみ指定できます: {expression}")
+        aggregates[key] = {"name": alias or get_aggregate_name(function, field), "function": function, "field": field, "column": column}
+        return aggregates[key]
+
+    # SELECT の出力（グループキーと集計値、出力順）
+    select = []
+    for item in select_items:
+        alias_match = alias_pattern.match(item)
+        expression, alias = (alias_match.group(1).strip(), alias_match.group(2)) if alias_match else (item, None)
+        if normalize_aggregate(expression):
+            select.append({"name": add_aggregate(expression, alias)["name"], "expression": normalize_aggregate(expression)})
+        elif expression in group_by:
+            select.append({"name": alias or expression, "group_key": expression, "column": columns[expression]})
+        else:
+            raise ValueError(f"GROUP BY に含まれないカラムは集計関数で指定してください: {item}")
+
+    def resolve_output(expression):
+        # HAVING / ORDER BY の式（別名・集計式・グループキー）を出力名にする
+        expression = expression.strip()
+        for output in select:
+            if output["name"] == expression or output.get("group_key") == expression:
+                return output["name"]
+        if normalize_aggregate(expression):
+            return add_aggregate(expression)["name"]
+        raise ValueError(f"集計結果にない項目です: {expression}")
+
+    # HAVING（OR で区切った分岐ごとの [(出力名, 演算子, 値)]）
+    having = []
+    if clauses.get("HAVING"):
+        branch = []
+        parts = logical_pattern.split(clauses["HAVING"])
+        for i, part in enumerate(parts):
+            if i % 2 == 1:
+                if part.upper() == "XOR":
+                    raise ValueError("HAVING では XOR を使用できません")
+                if part.upper() == "OR":
+                    having.append(branch)
+                    branch = []
+                continue
+            match = having_condition_pattern.match(part.strip())
+            if not match:
+                raise ValueError(f"HAVING の条件を解析できません: {part}")
+            branch.append((resolve_output(match.group(1)), match.group(2), get_literal(match.group(3))))
+        having.append(branch)
+
+    order_by = []
+    for item in filter(None, (item.strip() for item in clauses.get("ORDER BY", "").split(','))):
+        direction_match = re.match(r'^(.*?)(?:\s+(ASC|DESC))?$', item, re.IGNORECASE)
+        order_by.append([resolve_output(direction_match.group(1)), -1 if (direction_match.group(2) or "").upper() == "DESC" else 1])
+
+    limit_match = re.match(r'^(\d+)$', clauses.get("LIMIT", ""))
+    return {
+        "group_by": group_by,
+        "aggregates": list(aggregates.values()),
+        "select": select,
+        "where": clauses.get("WHERE", ""),
+        "having": having,
+        "order_by": order_by,
+        "limit": int(limit_match.group(1)) if limit_match else None,
+    }
+
+def get_literal(value):
+    # SQL の値を Java の式にする（'abc' → "abc"、arg1 や数値はそのまま）
+    value = value.strip()
+    if value.startswith("'") and value.endswith("'"):
+        return '"' + value[1:-1].replace('"', '\\"') + '"'
+    return value
+
+def get_having_args(aggregate_query):
+    # HAVING で比較している引数 → 比較対象の出力名
+    return {value: name for branch in aggregate_query["having"] for name, _, value in branch if re.fullmatch(r'arg\d+', value)}
+
+def find_aggregate(aggregate_query, name):
+    return next((aggregate for aggregate in aggregate_query["aggregates"] if aggregate["name"] == name), None)
+
+def generate_group_id(group_by):
+    if not group_by:
+        return "null"
+    if len(group_by) == 1:
+        return f'"${group_by[0]}"'
+    fields = "".join(f'.append("{name}", "${name}")' for name in group_by[1:])
+    return f'new Document("{group_by[0]}", "${group_by[0]}"){fields}'
+
+def generate_accumulator(aggregate):
+    name, function, field = aggregate["name"], aggregate["function"], aggregate["field"]
+    if function == "COUNT" and field == "*":
+        return f'Accumulators.sum("{name}", 1L)'
+    if function == "COUNT":
+        # null / 存在しないフィールドは数えない
+        return f'Accumulators.sum("{name}", new Document("$cond", Arrays.asList(new Document("$eq", Arrays.asList(new Document("$ifNull", Arrays.asList("${field}", null)), null)), 0L, 1L)))'
+    return f'Accumulators.{function.lower()}("{name}", "${field}")'
+
+def generate_having_filter(having):
+    branches = []
+    for branch in having:
+        filters = [f'Filters.{having_operators[op]}("{name}", {value})' for name, op, value in branch]
+        branches.append(filters[0] if len(filters) == 1 else f'Filters.and({", ".join(filters)})')
+    return branches[0] if len(branches) == 1 else f'Filters.or({", ".join(branches)})'
+
+def generate_aggregate_pipeline(aggregate_query, match_filter=None):
+    """
+    集計クエリの aggregate パイプライン（Java の式のリスト）を生成する
+    （WHERE は $match として先頭に置き、インデックスで絞り込んでから $group する）
+
+    Args:
+        aggregate_query (dict): parse_aggregate_query の結果
+        match_filter (str): WHERE 句から生成した Bson フィルタの式（無ければ None）
+
+    Returns:
+        list: Aggregates.* の式
+    """
+    group_by = aggregate_query["group_by"]
+    stages = []
+    if match_filter:
+        stages.append(f'Aggregates.match({match_filter})')
+    accumulators = ", ".join(generate_accumulator(aggregate) for aggregate in aggregate_query["aggregates"])
+    stages.append(f'Aggregates.group({generate_group_id(group_by)}{", " + accumulators if accumulators else ""})')
+    if aggregate_query["having"]:
+        stages.append(f'Aggregates.match({generate_having_filter(aggregate_query["having"])})')
+    # _id に入ったグループキーを SELECT の名前で取り出し、SELECT にない集計値（HAVING 用）は除く
+    projections = ["Projections.excludeId()"]
+    for output in aggregate_query["select"]:
+        if "group_key" in output:
+            source = "$_id" if len(group_by) == 1 else f'$_id.{output["group_key"]}'
+            projections.append(f'Projections.computed("{output["name"]}", "{source}")')
+    included = [f'"{output["name"]}"' for output in aggregate_query["select"] if "group_key" not in output]
+    if included:
+        projections.append(f'Projections.include({", ".join(included)})')
+    stages.append(f'Aggregates.project(Projections.fields({", ".join(projections)}))')
+    if aggregate_query["order_by"]:
+        sorts = ", ".join(f'Sorts.{"descending" if direction == -1 else "ascending"}("{name}")' for name, direction in aggregate_query["order_by"])
+        stages.append(f'Aggregates.sort(Sorts.orderBy({sorts}))')
+    if aggregate_query["limit"]:
+        stages.append(f'Aggregates.limit({aggregate_query["limit"]})')
+    return stages
+
+def generate_cache_predicate(where_clause, column_list):
+    """
+    WHERE 句を cache_data の要素（data）に対する条件式にする
+    （$match と同じ結果になると言い切れない条件 = OR・任意引数・配列カラム・LIKE 等を含む場合は None）
+
+    Returns:
+        str: Java の条件式（WHERE 句が無ければ "true"）
+    """
+    if not where_clause:
+        return "true"
+    where_clause = re.sub(r'\s+(AND|OR|XOR)\s*;?\s*$', '', where_clause.strip(), flags=re.IGNORECASE)
+    parts = logical_pattern.split(where_clause)
+    if any(part.upper() != "AND" for part in parts[1::2]):
+        return None
+    columns = {col["variable_name"]: col for col in column_list}
+    conditions = []
+    for part in parts[::2]:
+        match = where_condition_pattern.match(part.strip().rstrip(';').strip())
+        if not match:
+            return None
+        field, op, value = match.group(1), match.group(2).upper(), match.group(3)
+        column = columns.get(field)
+        if not column or column.get("is_array", False) or value.endswith("?"):
+            return None
+        value = get_literal(value)
+        if re.fullmatch(r'-?\d+(\.\d+)?', value):
+            # Double / Integer の compareTo に渡せる数値リテラルにする
+            if column["variable_type"] == "double" and "." not in value:
+                value += ".0"
+            elif column["variable_type"] != "double":
+                if "." in value:
+                    return None
+        getter = f'data.get{field.capitalize()}()'
+        if op == "IN":
+            if not re.fullmatch(r'arg\d+', value):
+                return None
+            conditions.append(f'{value}.contains({getter})')
+        elif op in ("=", "=="):
+            conditions.append(f'Objects.equals({getter}, {value})')
+        elif op == "!=":
+            conditions.append(f'!Objects.equals({getter}, {value})')
+        else:
+            conditions.append(f'{getter} != null && {getter}.compareTo({value}) {op} 0')
+    return " && ".join(conditions)
+
+def generate_cache_aggregate_value(aggregate, data_class):
+    # グループ内の要素（rows）から集計値を計算する式（MongoDB の $group と同じく null は無視する）
+    function, field = aggregate["function"], aggregate["field"]
+    if function == "COUNT" and field == "*":
+        return "(long) rows.size()"
+    values = f'rows.stream().map({data_class}::get{field.capitalize()}).filter(Objects::nonNull)'
+    if function == "COUNT":
+        return f'{values}.count()'
+    if function == "SUM":
+        return f'{values}.mapToInt(Integer::intValue).sum()' if aggregate["column"]["variable_type"] == "int" else f'{values}.mapToDouble(Double::doubleValue).sum()'
+    if function == "AVG":
+        return f'{values}.mapToDouble(Number::doubleValue).average().stream().boxed().findFirst().orElse(null)'
+    return f'{values}.{function.lower()}(Comparator.naturalOrder()).orElse(null)'
+
+def generate_cache_having(having):
+    branches = []
+    for branch in having:
+        conditions = [f'compareAggregateValues(row.get("{name}"), {value}) {"==" if op == "=" else op} 0' for name, op, value in branch]
+        branches.append(" && ".join(conditions))
+    return branches[0] if len(branches) == 1 else " || ".join(f'({branch})' for branch in branches)
+
+def generate_cache_comparator(order_by):
+    comparators = []
+    for name, direction in order_by:
+        compare = "compareAggregateValues(y, x)" if direction == -1 else "compareAggregateValues(x, y)"
+        if not comparators:
+            comparators.append(f'Comparator.comparing((Document row) -> row.get("{name}"), (x, y) -> {compare})')
+        else:
+            comparators.append(f'.thenComparing(row -> row.get("{name}"), (x, y) -> {compare})')
+    return "".join(comparators)
+
+def generate_cache_aggregate_code(aggregate_query, data_class, source_stream, predicate):
+    """
+    cache_data 上で集計クエリと同じ結果を作るコードを生成する（if (cache_data != null) { ... } の中身）
+
+    Args:
+        aggregate_query (dict): parse_aggregate_query の結果
+        data_class (str): コレクションのデータクラス名
+        source_stream (str): 集計対象の Stream 式（ハッシュインデックスで絞り込んだもの等）
+        predicate (str): WHERE 句の条件式（絞り込み済みなら None）
+
+    Returns:
+        list: Java の文
+    """
+    group_key = ", ".join(f'data.get{name.capitalize()}()' for name in aggregate_query["group_by"])
+    java_code = [f'Map<List<Object>, List<{data_class}>> groups = {source_stream}']
+    if predicate and predicate != "true":
+        java_code.append(f'    .filter(data -> {predicate})')
+    java_code.append(f'    .collect(Collectors.groupingBy(data -> Arrays.<Object>asList({group_key}), LinkedHashMap::new, Collectors.toList()));')
+    java_code.append('List<Document> cacheRows = new ArrayList<>();')
+    java_code.append(f'for (List<{data_class}> rows : groups.values()) {{')
+    java_code.append('    Document row = new Document();')
+    for output in aggregate_query["select"]:
+        if "group_key" in output:
+            java_code.append(f'    row.append("{output["name"]}", rows.get(0).get{output["group_key"].capitalize()}());')
+        else:
+            java_code.append(f'    row.append("{output["name"]}", {generate_cache_aggregate_value(find_aggregate(aggregate_query, output["name"]), data_class)});')
+    if aggregate_query["having"]:
+        # SELECT にない集計値は HAVING の判定後に取り除く
+        hidden = [aggregate for aggregate in aggregate_query["aggregates"] if not any(output["name"] == aggregate["name"] for output in aggregate_query["select"])]
+        for aggregate in hidden:
+            java_code.append(f'    row.append("{aggregate["name"]}", {generate_cache_aggregate_value(aggregate, data_class)});')
+        java_code.append(f'    if (!({generate_cache_having(aggregate_query["having"])})) {{')
+        java_code.append('        continue;')
+        java_code.append('    }')
+        for aggregate in hidden:
+            java_code.append(f'    row.remove("{aggregate["name"]}");')
+    java_code.append('    cacheRows.add(row);')
+    java_code.append('}')
+    if aggregate_query["order_by"]:
+        java_code.append(f'cacheRows.sort({generate_cache_comparator(aggregate_query["order_by"])});')
+    if aggregate_query["limit"]:
+        java_code.append(f'cacheRows = new ArrayList<>(cacheRows.subList(0, Math.min({aggregate_query["limit"]}, cacheRows.size())));')
+    java_code.append('return cacheRows.isEmpty() ? DataBaseResultPair.of(false, Collections.emptyList()) : DataBaseResultPair.of(true, cacheRows);')
+    return java_code
+
+# 集計結果の比較（HAVING / ORDER BY のキャッシュ側の評価で使う）
+def generate_compare_aggregate_values_code():
+    return [
+        "// 集計結果の値を比較する（null は最小、数値は Integer / Long / Double の違いによらず値で比較）",
+        '@SuppressWarnings({"unchecked", "rawtypes"})',
+        "private static int compareAggregateValues(Object a, Object b) {",
+        "    if (a == null || b == null) {",
+        "        return a == null ? (b == null ? 0 : -1) : 1;",
+        "    }",
+        "    if (a instanceof Number && b instanceof Number) {",
+        "        return Double.compare(((Number) a).doubleValue(), ((Number) b).doubleValue());",
+        "    }",
+        "    return ((Comparable) a).compareTo(b);",
+        "}",
+    ]
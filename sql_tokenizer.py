@@ -0,0 +1,90 @@
+# SQL フロントエンド（main.py）共通の字句解析
+# 正規表現はモジュールの読み込み時に一度だけコンパイルし、
+# 文ごとの句の切り出し（scan_statement）と WHERE 句の条件・論理演算子への分割（tokenize_where）は
+# 同じ文字列に対して一度だけ行ってキャッシュする（各 parse_sql_to_mongodb_* はその結果を使う）
+import re
+from functools import lru_cache
+
+arg_pattern = re.compile(r'arg\d+')
+optional_arg_pattern = re.compile(r'(arg\d+)\?')
+table_pattern = re.compile(r'\bFROM\s+(\w+)|INTO\s+(\w+)', re.IGNORECASE)
+limit_pattern = re.compile(r'LIMIT\s+(\d+)', re.IGNORECASE)
+select_columns_pattern = re.compile(r'SELECT\s+(.*?)\s+FROM\b', re.IGNORECASE)
+insert_fields_pattern = re.compile(r'\((.*?)\)\s*VALUES\s*\((.*?)\)', re.IGNORECASE)
+insert_clause_pattern = re.compile(r'INSERT INTO \w+\s*\((.*?)\)\s*VALUES\s*\((.*?)\)', re.IGNORECASE)
+set_clause_pattern = re.compile(r'SET\s+(.*?)\s*WHERE', re.IGNORECASE)
+where_clause_pattern = re.compile(r'WHERE\s+(.*)', re.IGNORECASE)
+select_where_clause_pattern = re.compile(r'WHERE\s+(.*?)(?:\s*(?:ORDER\s+BY\s+(.*?)|LIMIT\s+\d+))?$', re.IGNORECASE)
+# SET 句の $inc(arg1) のような MongoDB 演算子の指定
+mongo_op_pattern = re.compile(r'\$(\w+)\((.*?)\)')
+# 条件の等価比較（カラム = 引数）
+equality_pattern = re.compile(r'(\w+)\s*==?\s*(arg\d+)\s*;?')
+and_or_pattern = re.compile(r'\bAND\b|\bOR\b', re.IGNORECASE)
+and_pattern = re.compile(r'\bAND\b', re.IGNORECASE)
+or_xor_pattern = re.compile(r'\b(?:OR|XOR)\b', re.IGNORECASE)
+# WHERE 句の区切り: 括弧と、空白に続く AND / XOR / OR（OR は後ろに空白があるものだけ）
+where_boundary_pattern = re.compile(r'[()]| (?:AND|XOR|OR(?= ))', re.IGNORECASE)
+
+@lru_cache(maxsize=4096)
+def scan_statement(sql):
+    """
+    SQL文から各句を切り出す（同じ文は一度だけ走査する）
+
+    Args:
+        sql (str): SQLクエリ
+
+    Returns:
+        dict: 句ごとの re.Match（無い句は None）と引数名。キャッシュを共有するので書き換えないこと
+    """
+    return {
+        "table": table_pattern.search(sql),
+        "args": sorted(set(arg_pattern.findall(sql)), key=lambda x: int(x[3:])),
+        "optional_args": set(optional_arg_pattern.findall(sql)),
+        "limit": limit_pattern.search(sql),
+        "select_columns": select_columns_pattern.search(sql),
+        "insert_fields": insert_fields_pattern.search(sql),
+        "insert_clause": insert_clause_pattern.search(sql),
+        "set_clause": set_clause_pattern.search(sql),
+        "where_clause": where_clause_pattern.search(sql),
+        "select_where_clause": select_where_clause_pattern.search(sql),
+    }
+
+@lru_cache(maxsize=4096)
+def tokenize_where(where_clause):
+    """
+    WHERE 句を括弧の外の AND / OR / XOR で条件に分割する
+
+    区切りの位置だけを正規表現で探し、条件は区切りの間をスライスで切り出すので、
+    WHERE 句の長さに対して線形に処理できる
+
+    Args:
+        where_clause (str): WHERE 句（WHERE を除いた部分）
+
+    Returns:
+        tuple: ("condition", 条件) と ("logical", "and" / "or" / "xor") のトークン列
+    """
+    tokens = []
+    level = 0
+    start = 0
+    for match in where_boundary_pattern.finditer(where_clause):
+        text = match.group(0)
+        if text == "(":
+            level += 1
+        elif text == ")":
+            level -= 1
+        elif level == 0:
+            append_condition_token(tokens, where_clause[start:match.start()])
+            tokens.append(("logical", text.strip().lower()))
+            start = match.end()
+    append_condition_token(tokens, where_clause[start:])
+    return tuple(tokens)
+
+def append_condition_token(tokens, text):
+    condition = text.strip()
+    if condition:
+        tokens.append(("condition", condition))
+
+# AND / OR で条件を分割する（re.split と同じ結果。同じ WHERE 句を各メソッドの生成で繰り返し分割するのでキャッシュする）
+@lru_cache(maxsize=4096)
+def split_conditions(where_conditions):
+    return tuple(and_or_pattern.split(where_conditions))